@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pytest 公共配置
+
+测试期间结构化事件日志写入临时目录，不写项目根目录 logs/events.jsonl；
+不启动吞吐指标导出（XHS_METRICS_DIR / XHS_METRICS_PORT）。
+在收集测试前设置，导入时就创建记录器的模块（如 publish_helper）也会生效。
+"""
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+_event_log_dir = None
+
+
+def pytest_configure(config):
+    global _event_log_dir
+    _event_log_dir = tempfile.mkdtemp(prefix='xhs_test_events_')
+    os.environ['XHS_EVENT_LOG'] = os.path.join(_event_log_dir, 'events.jsonl')
+    os.environ.pop('XHS_METRICS_DIR', None)
+    os.environ.pop('XHS_METRICS_PORT', None)
+
+
+def pytest_unconfigure(config):
+    from event_log import default_writer
+
+    writer = default_writer()
+    if writer is not None:
+        writer.close()
+    shutil.rmtree(_event_log_dir, ignore_errors=True)
@@ -13,12 +13,12 @@
 
 使用方法:
     python batch_publish_v2.py
+    python batch_publish_v2.py --path D:\\notes --profile-out profiles    # 性能分析（见 profiling.py）
 """
 
 import sys
 import os
 import json
-import time
 from pathlib import Path
 from datetime import datetime, timedelta
 import argparse
@@ -32,11 +32,18 @@ sys.path.insert(0, str(SCRIPT_DIR))
 
 try:
     from publish_helper import publish_note, get_user_info
+    from publish_queue import PublishQueue
+    from publish_scheduler import PublishScheduler
+    from note_catalog import default_catalog
+    from profiling import add_profile_argument, profiled
 except ImportError:
     print("Error: Cannot import publish_helper module")
     print("Please make sure publish_helper.py exists in the scripts directory")
     sys.exit(1)
 
+# 等待发布时间时每段最长等待（秒），保证 Ctrl+C 及时生效
+WAIT_STEP_SECONDS = 1.0
+
 
 def print_banner():
     """打印横幅"""
@@ -128,81 +135,27 @@ def detect_note_structure(resource_path):
     return None, []
 
 
-def load_note_info(note_dir):
-    """加载笔记信息"""
-    note_dir = Path(note_dir)
+def note_info_dict(info):
+    """NoteInfo 转为发布流程使用的字典（metadata 为副本，可安全修改）"""
     note_info = {
-        'note_dir': note_dir,
-        'note_id': note_dir.name,
-        'title': '',
+        'note_dir': Path(info.path),
+        'note_id': info.name,
+        'title': info.title,
         'desc': '',
-        'images': [],
-        'published': False,
-        'metadata': {}
+        'images': list(info.images),
+        'published': info.published,
+        'metadata': dict(info.metadata)
     }
-    
-    # 尝试读取元数据
-    meta_file = note_dir / 'metadata.json'
-    if meta_file.exists():
-        try:
-            with open(meta_file, 'r', encoding='utf-8') as f:
-                metadata = json.load(f)
-            note_info['metadata'] = metadata
-            note_info['title'] = metadata.get('title', '')
-            note_info['published'] = bool(metadata.get('published_at'))
-        except Exception as e:
-            print(f"Warning: Failed to read metadata: {e}")
-    
-    # 尝试读取发布记录
-    publish_record = note_dir / 'publish_record.json'
-    if publish_record.exists():
-        try:
-            with open(publish_record, 'r', encoding='utf-8') as f:
-                record = json.load(f)
-            note_info['published'] = True
-            note_info['publish_record'] = record
-        except Exception as e:
-            print(f"Warning: Failed to read publish record: {e}")
-    
-    # 收集图片（最多9张）
-    images = []
-    cover = note_dir / 'cover.png'
-    if cover.exists():
-        images.append(str(cover.absolute()))
-    
-    for i in range(1, 20):
-        card = note_dir / f'card_{i}.png'
-        if card.exists():
-            images.append(str(card.absolute()))
-        else:
-            break
-    
-    # 小红书最多9张图
-    note_info['images'] = images[:9]
-    
-    # 尝试读取 Markdown 文件获取标题
-    if not note_info['title']:
-        md_files = list(note_dir.glob('*.md'))
-        if md_files:
-            try:
-                with open(md_files[0], 'r', encoding='utf-8') as f:
-                    content = f.read()
-                # 简单提取标题（第一个 # 标题）
-                lines = content.split('\n')
-                for line in lines:
-                    if line.startswith('# '):
-                        note_info['title'] = line[2:].strip()
-                        break
-            except Exception as e:
-                print(f"Warning: Failed to read Markdown: {e}")
-    
-    # 如果还是没有标题，使用文件夹名
-    if not note_info['title']:
-        note_info['title'] = note_dir.name
-    
+    if info.publish_record is not None:
+        note_info['publish_record'] = info.publish_record
     return note_info
 
 
+def load_note_info(note_dir):
+    """加载笔记信息"""
+    return note_info_dict(default_catalog().get(note_dir))
+
+
 def get_note_content(note_info):
     """获取笔记内容（标题和正文）"""
     print(f"\nNote: {note_info['note_id']}")
@@ -239,6 +192,16 @@ def get_note_content(note_info):
     return title, desc
 
 
+def wait_for_slot(scheduler, slot, step=WAIT_STEP_SECONDS):
+    """
+    等待到发布时间 slot
+
+    分段等待（每段最多 step 秒）：Windows 上阻塞在 Condition.wait 中时 Ctrl+C 要等到超时才生效
+    """
+    while scheduler.until(slot) > 0:
+        scheduler.wait_until(min(slot, scheduler.now() + step))
+
+
 def publish_notes_batch(notes_info, interval_minutes=20, skip_published=True):
     """批量发布笔记"""
     
@@ -252,7 +215,11 @@ def publish_notes_batch(notes_info, interval_minutes=20, skip_published=True):
         print("   python scripts/login_xhs.py")
         return
     
-    print(f"OK Logged in, current user: {user_info['info'].get('nickname', 'Unknown')}")
+    nickname = user_info['info'].get('nickname') or 'Unknown'
+    if user_info.get('cached'):
+        print(f"OK Logged in, current user: {nickname} (verified recently, cached)")
+    else:
+        print(f"OK Logged in, current user: {nickname}")
     
     # 过滤待发布的笔记
     if skip_published:
@@ -292,25 +259,77 @@ def publish_notes_batch(notes_info, interval_minutes=20, skip_published=True):
     
     # 开始发布
     published_count = 0
+    scheduler = PublishScheduler(interval=interval_minutes * 60)
+    queue = PublishQueue()
     
     for i, note_info in enumerate(pending_notes):
         print(f"\n{'='*80}")
         print(f"Publishing note {i+1}/{len(pending_notes)}")
         print(f"{'='*80}")
         
-        # 获取笔记内容
-        title, desc = get_note_content(note_info)
+        # 检查持久化队列，避免崩溃后重复发布
+        job = queue.enqueue(note_info['note_dir'], title=note_info['title'], state='rendered')
         
-        if not title or not desc:
-            print(f"Warning: Skipping note {note_info['note_id']}")
+        if job.needs_manual_check:
+            print(f"Warning: Previous publish of {note_info['note_id']} was interrupted, result unknown")
+            print(f"   Check creator center, then run: python scripts/publish_queue.py --reset \"{note_info['note_dir']}\"")
             continue
         
-        # 发布笔记
-        print(f"\nStarting publish...")
-        print(f"   Title: {title}")
-        print(f"   Images: {len(note_info['images'])} images")
+        if job.state == 'verified':
+            if skip_published:
+                print(f"OK {note_info['note_id']} already published (Note ID: {job.note_id_xhs}), skipping")
+                continue
+            # --include-published：按用户要求重新发布（包括发布后修改过内容的笔记）
+            print(f"OK {note_info['note_id']} was published before (Note ID: {job.note_id_xhs}), publishing again")
+            job = queue.reset(note_info['note_dir'])
         
-        result = publish_note(title, desc, note_info['images'])
+        if job.state == 'created':
+            # 上次已发布成功但记录未写入，直接补写记录，不再重复发布
+            print(f"OK {note_info['note_id']} was published in a previous run, saving record")
+            title = job.title or note_info['title']
+            result = {
+                'success': True,
+                'note_id': job.note_id_xhs,
+                'link': f'https://www.xiaohongshu.com/explore/{job.note_id_xhs}'
+            }
+        else:
+            # 获取笔记内容
+            title, desc = get_note_content(note_info)
+            
+            if not title or not desc:
+                print(f"Warning: Skipping note {note_info['note_id']}")
+                continue
+            
+            # 等待发布时间窗口（跳过或失败的笔记不占用间隔）
+            slot = scheduler.reserve_slot()
+            wait_seconds = scheduler.until(slot)
+            if wait_seconds > 0:
+                next_time = datetime.now() + timedelta(seconds=wait_seconds)
+                print(f"\nWaiting {wait_seconds / 60:.1f} minutes...")
+                print(f"   Next publish time: {next_time.strftime('%H:%M:%S')}")
+                print(f"   Remaining notes: {len(pending_notes) - i}")
+                print(f"   Press Ctrl+C to stop (rerun to resume)")
+            try:
+                wait_for_slot(scheduler, slot)
+            except KeyboardInterrupt:
+                print(f"\nStopped by user before publishing {note_info['note_id']}")
+                break
+            
+            # 发布笔记
+            print(f"\nStarting publish...")
+            print(f"   Title: {title}")
+            print(f"   Images: {len(note_info['images'])} images")
+            
+            queue.begin_create(note_info['note_dir'])
+            result = publish_note(title, desc, note_info['images'])
+            
+            if result['success']:
+                queue.mark_created(note_info['note_dir'], result['note_id'])
+            else:
+                queue.record_error(note_info['note_dir'], result.get('error', 'Unknown error'))
+                if not result.get('request_sent'):
+                    # 发布请求未发出，可安全重试
+                    queue.clear_create_attempt(note_info['note_dir'])
         
         if result['success']:
             print(f"OK Published successfully!")
@@ -340,31 +359,18 @@ def publish_notes_batch(notes_info, interval_minutes=20, skip_published=True):
                 with open(meta_file, 'w', encoding='utf-8') as f:
                     json.dump(note_info['metadata'], f, ensure_ascii=False, indent=2)
             
+            queue.mark_verified(note_info['note_dir'])
             published_count += 1
-            
-            # 如果不是最后一篇，等待间隔时间
-            if i < len(pending_notes) - 1:
-                wait_seconds = interval_minutes * 60
-                next_time = datetime.now() + timedelta(seconds=wait_seconds)
-                
-                print(f"\nWaiting {interval_minutes} minutes...")
-                print(f"   Next publish time: {next_time.strftime('%H:%M:%S')}")
-                print(f"   Remaining notes: {len(pending_notes) - i - 1}")
-                
-                # 倒计时显示
-                for remaining in range(wait_seconds, 0, -60):
-                    mins = remaining // 60
-                    print(f"   Countdown: {mins:02d}:00", end='\r')
-                    time.sleep(60)
-                
-                print()  # 换行
         else:
             print(f"Error: Publish failed: {result.get('error', 'Unknown error')}")
-            print(f"Suggestion: Check network connection and login status")
             
-            retry = input("\nContinue to next note? (y/n): ").strip().lower()
-            if retry != 'y':
+            if result.get('error_kind') in ('auth', 'paused'):
+                # 登录失效或账号被暂停，后续笔记也会失败
+                print(f"Suggestion: Check login status (python scripts/login_xhs.py), then rerun to resume")
                 break
+            
+            # 网络错误已自动重试过，单篇失败不影响后续笔记
+            print(f"Continuing with next note...")
     
     # 发布完成
     print("\n" + "=" * 80)
@@ -382,6 +388,7 @@ def main():
     parser.add_argument('--path', type=str, help='Resource folder path (optional, interactive input if not specified)')
     parser.add_argument('--interval', type=int, default=20, help='Publish interval (minutes), default 20')
     parser.add_argument('--include-published', action='store_true', help='Include already published notes')
+    add_profile_argument(parser)
     
     args = parser.parse_args()
     
@@ -411,14 +418,15 @@ def main():
     # 加载笔记信息
     print(f"\nLoading note information...")
     notes_info = []
-    for note_dir in note_dirs:
-        note_info = load_note_info(note_dir)
+    catalog = default_catalog()
+    for info in catalog.load(note_dirs, on_error=lambda path, e: print(f"   Warning {Path(path).name}: {e}")):
+        note_info = note_info_dict(info)
         if note_info['images']:
             notes_info.append(note_info)
             status = "Published" if note_info['published'] else "Pending"
             print(f"   OK {note_info['note_id']}: {note_info['title']} ({len(note_info['images'])} images) [{status}]")
         else:
-            print(f"   Warning {note_dir.name}: No images, skipping")
+            print(f"   Warning {info.name}: No images, skipping")
     
     if not notes_info:
         print("\nNo publishable notes found")
@@ -426,7 +434,8 @@ def main():
     
     # 批量发布
     skip_published = not args.include_published
-    publish_notes_batch(notes_info, args.interval, skip_published)
+    with profiled('batch_publish_v2', args.profile_out):
+        publish_notes_batch(notes_info, args.interval, skip_published)
 
 
 if __name__ == '__main__':
@@ -21,6 +21,15 @@ except ImportError as e:
     print("Run: pip install xhs python-dotenv")
     sys.exit(1)
 
+sys.path.insert(0, str(Path(__file__).parent))
+
+from event_log import get_logger, total_size
+from rate_limiter import account_key, wait_for_token
+
+
+# 发布耗时和结果写入结构化事件日志
+events = get_logger('batch_publish_xhs')
+
 
 def load_cookie():
     """从 .env 文件加载 Cookie"""
@@ -91,12 +100,15 @@ def publish_note(client: XhsClient, title: str, desc: str, images: list):
         print(f"\n[INFO] Publishing: {title}")
         print(f"  Images: {len(images)} files")
         
-        result = client.create_image_note(
-            title=title,
-            desc=desc,
-            files=images,
-            is_private=False
-        )
+        with events.stage('create', images=len(images), bytes=total_size(images)) as fields:
+            result = client.create_image_note(
+                title=title,
+                desc=desc,
+                files=images,
+                is_private=False
+            )
+            if isinstance(result, dict):
+                fields['note_id'] = result.get('note_id') or result.get('id')
         
         print("[SUCCESS] Published!")
         if isinstance(result, dict):
@@ -200,7 +212,8 @@ def batch_publish(notes_dir: str, start_from: int = 1, wait_minutes: int = 10, d
         if dry_run:
             print("[DRY-RUN] Would publish here")
         else:
-            # 发布笔记
+            # 发布笔记（与其它发布工具共享限流）
+            wait_for_token(account_key(cookie), 'create')
             success = publish_note(client, title, desc, images)
             
             if not success:
@@ -22,23 +22,49 @@ except ImportError as e:
     print("Run: pip install xhs python-dotenv")
     sys.exit(1)
 
+sys.path.insert(0, str(Path(__file__).parent))
+
+from event_log import get_logger, total_size
+from rate_limiter import RateLimiter, account_key
+from xhs_resilience import ApiGuard, CircuitOpenError
+
 
 # 日志文件路径
 LOG_FILE = None
+# 日志文件只打开一次（行缓冲），不再每行重新打开
+_log_handle = None
+
+# 发布耗时和结果写入结构化事件日志
+events = get_logger('batch_publish_xhs_with_log')
+
+
+def open_log(path):
+    """打开日志文件（追加模式）"""
+    global LOG_FILE, _log_handle
+    close_log()
+    LOG_FILE = Path(path)
+    try:
+        _log_handle = open(LOG_FILE, 'a', encoding='utf-8', buffering=1)
+    except OSError as e:
+        print(f"[WARNING] Failed to open log file: {e}")
+
+
+def close_log():
+    global _log_handle
+    if _log_handle is not None:
+        _log_handle.close()
+        _log_handle = None
 
 
 def log(message: str, to_console: bool = True, to_file: bool = True):
     """记录日志到控制台和文件"""
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    log_message = f"[{timestamp}] {message}"
-    
     if to_console:
         print(message)
     
-    if to_file and LOG_FILE:
+    if to_file and _log_handle is not None:
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         try:
-            with open(LOG_FILE, 'a', encoding='utf-8') as f:
-                f.write(log_message + '\n')
+            _log_handle.write(f"[{timestamp}] {message}\n")
         except Exception as e:
             print(f"[WARNING] Failed to write log: {e}")
 
@@ -104,18 +130,28 @@ def get_note_images(note_dir: str):
     return images
 
 
-def publish_note(client: XhsClient, title: str, desc: str, images: list, note_name: str):
-    """发布单篇笔记"""
+def publish_note(client: XhsClient, title: str, desc: str, images: list, note_name: str,
+                 guard: ApiGuard = None):
+    """发布单篇笔记（账号被暂停时抛出 CircuitOpenError）"""
+    guard = guard or ApiGuard(log=log)
     try:
         log(f"\n[INFO] Publishing: {title}")
         log(f"  Images: {len(images)} files")
         
-        result = client.create_image_note(
-            title=title,
-            desc=desc,
-            files=images,
-            is_private=False
-        )
+        with events.stage('create', note_name=note_name, images=len(images),
+                          bytes=total_size(images)) as fields:
+            result = guard.call(
+                client.create_image_note,
+                title=title,
+                desc=desc,
+                files=images,
+                is_private=False,
+                idempotent=False,
+                label='Publish',
+                endpoint='create'
+            )
+            if isinstance(result, dict):
+                fields['note_id'] = result.get('note_id') or result.get('id') or result.get('data', {}).get('id')
         
         log("[SUCCESS] Published!")
         if isinstance(result, dict):
@@ -129,6 +165,8 @@ def publish_note(client: XhsClient, title: str, desc: str, images: list, note_na
         
         return True
         
+    except CircuitOpenError:
+        raise
     except Exception as e:
         log(f"[ERROR] Publish failed: {e}")
         return False
@@ -196,10 +234,8 @@ def create_description(metadata: dict):
 
 def batch_publish(notes_dir: str, start_from: int = 1, wait_minutes: int = 10, dry_run: bool = False):
     """批量发布笔记"""
-    global LOG_FILE
-    
     # 设置日志文件
-    LOG_FILE = Path(notes_dir) / f'publish_log_{datetime.now().strftime("%Y%m%d_%H%M%S")}.txt'
+    open_log(Path(notes_dir) / f'publish_log_{datetime.now().strftime("%Y%m%d_%H%M%S")}.txt')
     log(f"[INFO] Log file: {LOG_FILE}")
     
     # 获取所有笔记目录
@@ -226,6 +262,8 @@ def batch_publish(notes_dir: str, start_from: int = 1, wait_minutes: int = 10, d
     # 加载 Cookie 并创建客户端
     cookie = load_cookie()
     client = create_client(cookie)
+    guard = ApiGuard(log=log, limiter=RateLimiter(), account=account_key(cookie), events=events)
+    failed_notes = []
     
     # 逐个发布
     for i, note_dir in enumerate(note_dirs, 1):
@@ -257,12 +295,19 @@ def batch_publish(notes_dir: str, start_from: int = 1, wait_minutes: int = 10, d
             log("[DRY-RUN] Would publish here")
         else:
             # 发布笔记
-            success = publish_note(client, title, desc, images, note_name)
+            try:
+                success = publish_note(client, title, desc, images, note_name, guard)
+            except CircuitOpenError as e:
+                # 登录失效或账号被暂停，继续发布只会全部失败
+                log(f"[ERROR] {e}")
+                log("[INFO] Stopping batch publish, please check login status")
+                failed_notes.append(note_name)
+                break
             
             if not success:
-                log(f"[ERROR] Failed to publish {note_name}")
-                log("[INFO] Stopping batch publish due to error")
-                break
+                log(f"[ERROR] Failed to publish {note_name}, continuing with next note")
+                failed_notes.append(note_name)
+                continue
         
         # 如果不是最后一篇，等待指定时间
         if i < len(note_dirs):
@@ -281,7 +326,10 @@ def batch_publish(notes_dir: str, start_from: int = 1, wait_minutes: int = 10, d
     log(f"\n{'='*60}")
     log("[SUCCESS] Batch publish completed!")
     log('='*60)
+    if failed_notes:
+        log(f"[WARNING] Failed notes ({len(failed_notes)}): {', '.join(failed_notes)}")
     log(f"\n[INFO] Log saved to: {LOG_FILE}")
+    close_log()
 
 
 def main():
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结构化事件日志
+发布工具和渲染脚本共用的 JSONL 事件日志，每行一个 JSON 对象，便于统计分析
+
+特性:
+1. 调用方只把事件放入内存队列，序列化和写文件由后台线程批量完成，不阻塞发布/渲染
+2. 文件只打开一次，按批写入后 flush；超过 max_bytes 时轮转为 events.jsonl.1 ... .N
+3. 统一字段: ts, proc, pid, source, event；阶段事件另有 stage, duration_ms, ok，
+   失败时有 error（异常类名）和 error_msg，其它字段如 note_dir、note_id、bytes 由调用方提供
+4. 环境变量 XHS_EVENT_LOG 可指定日志文件，设为 off 关闭
+5. add_listener() 注册的回调在调用方线程收到每条事件（日志关闭时也会收到），
+   吞吐指标 (metrics.py) 由此汇总；设置 XHS_METRICS_DIR / XHS_METRICS_PORT 时自动开启
+
+多个进程写同一个文件时按行追加；轮转由写入量超限的进程执行，
+Windows 上文件被其它进程占用时跳过本次轮转，稍后再试。
+
+使用方法:
+    from event_log import get_logger
+    events = get_logger('engine')
+    events.emit('queue_start', notes=10)
+    with events.stage('upload', note_dir=note_dir) as fields:
+        ...
+        fields['bytes'] = total_bytes
+"""
+
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_EVENT_FILE = PROJECT_ROOT / 'logs' / 'events.jsonl'
+ENV_VAR = 'XHS_EVENT_LOG'
+
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUPS = 5
+DEFAULT_FLUSH_INTERVAL = 0.5
+DEFAULT_BATCH_SIZE = 1000
+
+# 错误信息只保留前若干字符，避免整段响应写入日志
+MAX_ERROR_CHARS = 300
+
+_PROC = Path(sys.argv[0]).stem if sys.argv and sys.argv[0] else 'python'
+
+
+class EventWriter:
+    """后台线程批量写入 JSONL 文件，按大小轮转"""
+
+    def __init__(self, path=DEFAULT_EVENT_FILE, max_bytes=DEFAULT_MAX_BYTES, backups=DEFAULT_BACKUPS,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.stats = {'written': 0, 'rotated': 0, 'errors': 0}
+
+        self._queue = queue.SimpleQueue()
+        self._file = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+
+    def write(self, event):
+        """放入一个事件（dict），立即返回"""
+        if self._closed:
+            return
+        if self._thread is None:
+            self._start()
+        self._queue.put(event)
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='event-log', daemon=True)
+                self._thread.start()
+
+    def flush(self, timeout=5):
+        """等待已放入的事件全部写入文件"""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=5):
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    # ---------- 后台线程 ----------
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch, waiters, stop = [], [], False
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if len(batch) >= DEFAULT_BATCH_SIZE:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write_batch(batch)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                return
+
+    def _write_batch(self, batch):
+        lines = []
+        for event in batch:
+            try:
+                lines.append(json.dumps(event, ensure_ascii=False, default=str))
+            except (TypeError, ValueError):
+                self.stats['errors'] += 1
+        try:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write('\n'.join(lines) + '\n')
+            self._file.flush()
+            self.stats['written'] += len(lines)
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+        except OSError:
+            self.stats['errors'] += 1
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        try:
+            for idx in range(self.backups - 1, 0, -1):
+                src = self.path.with_name(f"{self.path.name}.{idx}")
+                if src.exists():
+                    os.replace(src, self.path.with_name(f"{self.path.name}.{idx + 1}"))
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+            self.stats['rotated'] += 1
+        except OSError:
+            # 文件被其它进程占用，下次写入后再试
+            pass
+
+
+def error_fields(exc):
+    """异常转换为事件字段"""
+    return {'error': type(exc).__name__, 'error_msg': str(exc)[:MAX_ERROR_CHARS]}
+
+
+class EventLogger:
+    """绑定来源（和可选上下文字段）的事件记录器；writer 为 None 时不记录"""
+
+    def __init__(self, source, writer=None, **context):
+        self.source = source
+        self.writer = writer
+        self.context = context
+
+    def bind(self, **context):
+        """返回附加了上下文字段（如 note_dir）的记录器"""
+        return EventLogger(self.source, self.writer, **{**self.context, **context})
+
+    def emit(self, event, **fields):
+        if self.writer is None and not _listeners:
+            return
+        record = {'ts': round(time.time(), 3), 'proc': _PROC, 'pid': os.getpid(),
+                  'source': self.source, 'event': event}
+        for key, value in self.context.items():
+            if value is not None:
+                record[key] = value
+        for key, value in fields.items():
+            if value is not None:
+                record[key] = value
+        for listener in _listeners:
+            try:
+                listener(record)
+            except Exception:
+                pass
+        if self.writer is not None:
+            self.writer.write(record)
+
+    @contextmanager
+    def stage(self, stage, **fields):
+        """
+        记录一个阶段的耗时和结果
+
+        with 块内可向返回的 dict 中补充字段（如 bytes、note_id）；
+        异常会记录 error 后继续抛出。
+        """
+        extra = {}
+        start = time.perf_counter()
+        try:
+            yield extra
+        except BaseException as e:
+            self.emit('stage', **{**fields, **extra, **error_fields(e), 'stage': stage, 'ok': False,
+                                  'duration_ms': round((time.perf_counter() - start) * 1000, 1)})
+            raise
+        self.emit('stage', **{**fields, **extra, 'stage': stage, 'ok': True,
+                              'duration_ms': round((time.perf_counter() - start) * 1000, 1)})
+
+
+_listeners = []
+_default_writer = None
+_default_lock = threading.Lock()
+_exporters_started = False
+
+
+def add_listener(callback):
+    """注册事件回调 callback(record)，回调应很快返回且不修改 record"""
+    if callback not in _listeners:
+        _listeners.append(callback)
+
+
+def remove_listener(callback):
+    if callback in _listeners:
+        _listeners.remove(callback)
+
+
+def _start_exporters():
+    global _exporters_started
+    with _default_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+    import metrics
+    metrics.start_from_env()
+
+
+def default_writer():
+    """进程内共用的写入器（XHS_EVENT_LOG=off 时返回 None）"""
+    global _default_writer
+    setting = os.environ.get(ENV_VAR, '').strip()
+    if setting.lower() in ('off', '0', 'false', 'none'):
+        return None
+    with _default_lock:
+        if _default_writer is None:
+            _default_writer = EventWriter(setting or DEFAULT_EVENT_FILE)
+            atexit.register(_default_writer.close)
+        return _default_writer
+
+
+def get_logger(source, **context):
+    """获取写入默认事件日志的记录器"""
+    if not _exporters_started:
+        _start_exporters()
+    return EventLogger(source, default_writer(), **context)
+
+
+def total_size(paths):
+    """图片等文件的总字节数（不存在的文件忽略）"""
+    total = 0
+    for path in paths:
+        try:
+            total += os.path.getsize(path)
+        except OSError:
+            pass
+    return total
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模拟小红书 API 服务
+用于离线测试发布工具的吞吐量和重试行为，不访问真实平台
+
+模拟的接口（与 xhs 库 XhsClient 的请求一致）:
+    GET  /api/sns/web/v1/user/selfinfo      获取用户信息
+    GET  /api/sns/web/v2/user/me            当前用户（轻量登录检查，Cookie 中 web_session=expired 时返回 guest）
+    GET  /api/media/v1/upload/web/permit    获取上传凭证
+    PUT  /spectrum/<file_id>                上传文件（真实地址为 ros-upload.xiaohongshu.com）
+    POST /web_api/sns/v2/note               创建笔记
+    GET  /__stats                           服务端统计（非真实接口）
+
+可注入的故障:
+    latency / jitter   每个请求的固定延迟和随机附加延迟（秒）
+    error_rate         返回 500 系统繁忙
+    rate_limit_rate    返回 429 访问频次异常
+    auth_rate          返回 461 需要验证码
+    drop_rate          创建笔记成功后断开连接（响应丢失，用于验证不会重复发布）
+
+使用方法:
+    python fake_xhs_server.py --port 8765 --error-rate 0.1 --latency 0.2
+"""
+
+import argparse
+import json
+import random
+import socket
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+
+SELF_INFO_PATH = '/api/sns/web/v1/user/selfinfo'
+USER_ME_PATH = '/api/sns/web/v2/user/me'
+PERMIT_PATH = '/api/media/v1/upload/web/permit'
+UPLOAD_PREFIX = '/spectrum/'
+CREATE_PATH = '/web_api/sns/v2/note'
+STATS_PATH = '/__stats'
+
+# 真实上传地址（xhs 库中写死）
+ROS_UPLOAD_URL = 'https://ros-upload.xiaohongshu.com/'
+
+ENDPOINTS = ('info', 'permit', 'upload', 'create')
+
+
+class FaultConfig:
+    """故障注入参数"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit_rate=0.0,
+                 auth_rate=0.0, drop_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.auth_rate = auth_rate
+        self.drop_rate = drop_rate
+
+    def delay(self, rng):
+        return self.latency + (rng.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def pick(self, rng):
+        """按概率选择本次请求注入的故障，None 表示正常处理"""
+        roll = rng.random()
+        for kind, rate in (('auth', self.auth_rate), ('rate_limit', self.rate_limit_rate),
+                           ('error', self.error_rate)):
+            if roll < rate:
+                return kind
+            roll -= rate
+        return None
+
+
+class FakeXhsServer:
+    """在后台线程运行的模拟服务"""
+
+    def __init__(self, host='127.0.0.1', port=0, faults=None, endpoint_faults=None, seed=None):
+        """
+        Args:
+            host / port: 监听地址，port=0 自动选择空闲端口
+            faults: 所有接口默认的 FaultConfig
+            endpoint_faults: 按接口覆盖的 FaultConfig，键为 info / permit / upload / create
+            seed: 随机种子（便于复现）
+        """
+        self.faults = faults or FaultConfig()
+        self.endpoint_faults = endpoint_faults or {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+        self.uploaded = {}
+        self.notes = []
+        self.stats = {
+            endpoint: {'requests': 0, 'ok': 0, 'error': 0, 'rate_limit': 0, 'auth': 0, 'drop': 0}
+            for endpoint in ENDPOINTS
+        }
+
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def serve_forever(self):
+        """在当前线程运行（命令行模式）"""
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def fault_for(self, endpoint):
+        """记录请求并决定注入的故障，返回 (延迟秒数, 故障类型)"""
+        config = self.endpoint_faults.get(endpoint, self.faults)
+        with self._lock:
+            self.stats[endpoint]['requests'] += 1
+            delay = config.delay(self._rng)
+            fault = config.pick(self._rng)
+            if fault is None and endpoint == 'create' and self._rng.random() < config.drop_rate:
+                fault = 'drop'
+            self.stats[endpoint][fault or 'ok'] += 1
+        return delay, fault
+
+    def new_file_id(self):
+        return f"spectrum/{uuid.uuid4().hex}"
+
+    def record_upload(self, file_id, size):
+        with self._lock:
+            self.uploaded[file_id] = size
+
+    def record_note(self, title, file_ids):
+        """保存笔记，返回 (笔记ID, 缺失的图片)"""
+        with self._lock:
+            missing = [file_id for file_id in file_ids if file_id not in self.uploaded]
+            if missing:
+                return None, missing
+            note_id = uuid.uuid4().hex[:24]
+            self.notes.append({'id': note_id, 'title': title, 'file_ids': file_ids})
+            return note_id, []
+
+    def duplicates(self):
+        """被创建了不止一次的笔记标题"""
+        with self._lock:
+            counts = {}
+            for note in self.notes:
+                counts[note['title']] = counts.get(note['title'], 0) + 1
+        return {title: count for title, count in counts.items() if count > 1}
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'endpoints': json.loads(json.dumps(self.stats)),
+                'uploaded': len(self.uploaded),
+                'notes': len(self.notes),
+            }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def fake(self):
+        return self.server.fake
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json;charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_ok(self, data):
+        self._send_json(200, {'success': True, 'code': 0, 'msg': '成功', 'data': data})
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _apply_fault(self, endpoint):
+        """注入延迟和故障，已发送故障响应时返回 True；drop 由调用方处理"""
+        delay, fault = self.fake.fault_for(endpoint)
+        if delay:
+            time.sleep(delay)
+        if fault == 'error':
+            self._send_json(500, {'success': False, 'code': -1, 'msg': '系统繁忙，请稍后再试'})
+        elif fault == 'rate_limit':
+            self._send_json(429, {'success': False, 'code': 300013, 'msg': '访问频次异常，请勿频繁操作'})
+        elif fault == 'auth':
+            self._send_json(461, {'success': False, 'code': 461, 'msg': '需要验证'},
+                            headers={'Verifytype': '102', 'Verifyuuid': uuid.uuid4().hex})
+        else:
+            return fault
+        return True
+
+    def do_GET(self):
+        path = urllib.parse.urlsplit(self.path).path
+        if path == STATS_PATH:
+            stats = self.fake.snapshot()
+            stats['duplicates'] = self.fake.duplicates()
+            self._send_json(200, stats)
+        elif path == SELF_INFO_PATH:
+            if self._apply_fault('info') is True:
+                return
+            self._send_ok({'nickname': 'fake_user', 'user_id': 'fake_user_id', 'red_id': '10000'})
+        elif path == USER_ME_PATH:
+            if 'web_session=expired' in (self.headers.get('Cookie') or ''):
+                self._send_ok({'guest': True})
+            else:
+                self._send_ok({'guest': False, 'nickname': 'fake_user', 'user_id': 'fake_user_id'})
+        elif path == PERMIT_PATH:
+            if self._apply_fault('permit') is True:
+                return
+            self._send_ok({
+                'uploadTempPermits': [{
+                    'fileIds': [self.fake.new_file_id()],
+                    'token': uuid.uuid4().hex,
+                }]
+            })
+        else:
+            self._send_json(404, {'success': False, 'code': 404, 'msg': 'not found'})
+
+    def do_PUT(self):
+        path = urllib.parse.urlsplit(self.path).path
+        body = self._read_body()
+        if not path.startswith(UPLOAD_PREFIX):
+            self._send_json(404, {'success': False, 'code': 404, 'msg': 'not found'})
+            return
+        if self._apply_fault('upload') is True:
+            return
+        self.fake.record_upload(path.lstrip('/'), len(body))
+        # 真实上传接口成功时返回空响应体
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        path = urllib.parse.urlsplit(self.path).path
+        body = self._read_body()
+        if path != CREATE_PATH:
+            self._send_json(404, {'success': False, 'code': 404, 'msg': 'not found'})
+            return
+
+        fault = self._apply_fault('create')
+        if fault is True:
+            return
+
+        try:
+            data = json.loads(body.decode('utf-8'))
+            title = data['common']['title']
+            images = (data.get('image_info') or {}).get('images') or []
+            file_ids = [image['file_id'] for image in images]
+        except (ValueError, KeyError, TypeError):
+            self._send_json(400, {'success': False, 'code': -9999, 'msg': '参数错误'})
+            return
+
+        if not file_ids:
+            self._send_json(200, {'success': False, 'code': -9131, 'msg': '图片不能为空'})
+            return
+
+        note_id, missing = self.fake.record_note(title, file_ids)
+        if missing:
+            self._send_json(200, {'success': False, 'code': -9132, 'msg': f'图片不存在: {missing[0]}'})
+            return
+
+        if fault == 'drop':
+            # 笔记已创建，但响应在返回途中丢失
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+            return
+
+        self._send_ok({'id': note_id, 'score': 10})
+
+
+class FakeApiError(Exception):
+    """模拟服务返回的失败（response.status_code 与真实 xhs 异常一致）"""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.response = SimpleNamespace(status_code=status_code)
+
+
+class LocalApiClient:
+    """
+    仅依赖标准库的测试客户端，走与 XhsClient 相同的接口，
+    提供 xhs_api 使用的 upload_image_file / create_image_note(image_ids=...) 调用方式
+    （发布引擎 PublishEngine 和发布流水线 publish_pipeline 都经由 xhs_api 调用）
+    """
+
+    def __init__(self, base_url, timeout=10):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def _request(self, method, path, body=None, headers=None):
+        request = urllib.request.Request(
+            self.base_url + path, data=body, method=method, headers=headers or {}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                text = response.read()
+        except urllib.error.HTTPError as e:
+            text = e.read()
+            raise FakeApiError(text.decode('utf-8', 'replace'), e.code) from None
+        if not text:
+            return None
+        data = json.loads(text.decode('utf-8'))
+        if not data.get('success'):
+            raise FakeApiError(json.dumps(data, ensure_ascii=False), 200)
+        return data.get('data')
+
+    def get_self_info(self):
+        return self._request('GET', SELF_INFO_PATH)
+
+    def upload_image_file(self, img_data):
+        permit = self._request('GET', PERMIT_PATH + '?biz_name=spectrum&scene=image&file_count=1')
+        temp_permit = permit['uploadTempPermits'][0]
+        file_id = temp_permit['fileIds'][0]
+        self._request('PUT', '/' + file_id, body=img_data, headers={
+            'X-Cos-Security-Token': temp_permit['token'],
+            'Content-Type': 'image/png',
+        })
+        return {'success': True, 'data': {'image_id': file_id}}
+
+    def create_image_note(self, title, desc, image_ids, is_private=False):
+        payload = {
+            'common': {
+                'type': 'normal',
+                'title': title,
+                'desc': desc,
+                'privacy_info': {'op_type': 1, 'type': int(is_private)},
+            },
+            'image_info': {'images': [{'file_id': image_id} for image_id in image_ids]},
+        }
+        data = self._request(
+            'POST', CREATE_PATH,
+            body=json.dumps(payload, ensure_ascii=False).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}
+        )
+        return {'success': True, 'data': {'note_id': data.get('id')}}
+
+
+def point_xhs_client(client, base_url):
+    """
+    将 xhs 库的 XhsClient 指向模拟服务
+
+    API 地址通过 _host / _creator_host 覆盖，
+    写死的上传地址通过挂载到 session 上的适配器改写。
+    """
+    from requests.adapters import HTTPAdapter
+
+    base_url = base_url.rstrip('/')
+
+    class _RedirectAdapter(HTTPAdapter):
+        def send(self, request, **kwargs):
+            request.url = base_url + '/' + request.url[len(ROS_UPLOAD_URL):]
+            return super().send(request, **kwargs)
+
+    client._host = base_url
+    client._creator_host = base_url
+    client.session.mount(ROS_UPLOAD_URL, _RedirectAdapter())
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟小红书 API 服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的延迟(秒)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='随机附加延迟上限(秒)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='500 错误比例')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='429 限流比例')
+    parser.add_argument('--auth-rate', type=float, default=0.0, help='461 验证码比例')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='创建成功后丢失响应的比例')
+    parser.add_argument('--seed', type=int, help='随机种子')
+
+    args = parser.parse_args()
+
+    faults = FaultConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        auth_rate=args.auth_rate,
+        drop_rate=args.drop_rate,
+    )
+    server = FakeXhsServer(args.host, args.port, faults=faults, seed=args.seed)
+    print(f"[INFO] Fake XHS API listening on {server.url} (stats: {server.url}{STATS_PATH})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GUI 日志泵
+供各版本发布 GUI 共用的线程安全日志输出
+
+特性:
+1. 任意线程调用 write() 只是放入队列，不直接操作 Tk 控件
+2. Tk 主循环通过 after() 定时批量取出日志，一次插入控件
+3. 控件只保留最近 max_lines 行，完整日志同时写入文件
+"""
+
+import queue
+import tkinter as tk
+from datetime import datetime
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_LOG_DIR = PROJECT_ROOT / 'logs'
+
+DEFAULT_MAX_LINES = 2000
+DEFAULT_INTERVAL_MS = 100
+DEFAULT_BATCH_SIZE = 500
+
+
+class TkLogPump:
+    """队列 + after() 驱动的批量日志输出"""
+
+    def __init__(self, root, text_widget, log_file=None, max_lines=DEFAULT_MAX_LINES,
+                 interval_ms=DEFAULT_INTERVAL_MS, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Args:
+            root: Tk 根窗口
+            text_widget: 日志显示控件 (Text / ScrolledText)
+            log_file: 完整日志文件路径，默认 logs/gui_<时间>.log，传入 False 不写文件
+            max_lines: 控件中保留的最大行数
+            interval_ms: 刷新间隔
+            batch_size: 每次刷新最多处理的日志条数
+        """
+        self.root = root
+        self.text_widget = text_widget
+        self.max_lines = max_lines
+        self.interval_ms = interval_ms
+        self.batch_size = batch_size
+
+        self._queue = queue.Queue()
+        self._file = None
+        self._closed = False
+
+        if log_file is not False:
+            if log_file is None:
+                log_file = DEFAULT_LOG_DIR / f"gui_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+            self.log_file = Path(log_file)
+            try:
+                self.log_file.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.log_file, 'a', encoding='utf-8')
+            except OSError as e:
+                print(f"Warning: Failed to open log file: {e}")
+        else:
+            self.log_file = None
+
+        self._after_id = self.root.after(self.interval_ms, self._pump)
+
+    def write(self, line):
+        """写入一行日志（线程安全，可在发布线程中调用）"""
+        if not line.endswith('\n'):
+            line += '\n'
+        self._queue.put(line)
+
+    def _drain(self):
+        """取出一批日志，返回拼接后的文本"""
+        lines = []
+        for _ in range(self.batch_size):
+            try:
+                lines.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return ''.join(lines)
+
+    def _pump(self):
+        """主线程定时刷新"""
+        self._after_id = None
+        self.flush()
+        if not self._closed:
+            self._after_id = self.root.after(self.interval_ms, self._pump)
+
+    def flush(self):
+        """将队列中的日志写入控件和文件（只能在主线程调用）"""
+        text = self._drain()
+        if not text:
+            return
+
+        if self._file:
+            try:
+                self._file.write(text)
+                self._file.flush()
+            except (OSError, ValueError):
+                pass
+
+        widget = self.text_widget
+        try:
+            widget.insert(tk.END, text)
+
+            # 只保留最近 max_lines 行
+            line_count = int(widget.index('end-1c').split('.')[0])
+            excess = line_count - self.max_lines
+            if excess > 0:
+                widget.delete('1.0', f'{excess + 1}.0')
+
+            widget.see(tk.END)
+        except tk.TclError:
+            # 窗口已销毁
+            self._closed = True
+
+    def close(self):
+        """停止刷新并关闭日志文件"""
+        if self._closed and self._file is None:
+            return
+        try:
+            while not self._queue.empty():
+                self.flush()
+        except tk.TclError:
+            pass
+        self._closed = True
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except tk.TclError:
+                pass
+            self._after_id = None
+        if self._file:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+上传前图片预检与规范化
+上传前并发读取每张图片的文件头和尺寸，对照平台限制检查，必要时缩放或重新压缩，
+避免超限图片上传完成后才被拒绝，浪费带宽和一次往返
+
+检查内容:
+1. 文件格式按文件头判断（不依赖扩展名），只直接上传 PNG / JPEG
+2. 长边不超过 MAX_SIDE，文件大小不超过 MAX_FILE_SIZE
+3. 无法识别的文件直接剔除
+
+规范化需要 Pillow：缩放到长边 MAX_SIDE，仍超过大小限制时转为 JPEG 并逐步降低质量。
+结果按原图内容摘要缓存在 .image_cache 中，同一张图片只处理一次。
+未安装 Pillow 时超限图片保持原样上传（由平台决定是否接受），并给出警告。
+
+使用方法:
+    python image_preflight.py <image_or_note_dir> [...]
+"""
+
+import os
+import struct
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from note_digest import default_cache
+
+
+def _pil_image():
+    """PIL.Image，第一次处理图片时才导入（GUI 启动时不加载）；未安装时返回 None"""
+    if 'Image' not in globals():
+        try:
+            from PIL import Image
+        except ImportError:
+            Image = None
+        globals()['Image'] = Image
+    return globals()['Image']
+
+
+def __getattr__(name):
+    if name == 'Image':
+        return _pil_image()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_CACHE_DIR = PROJECT_ROOT / '.image_cache'
+
+# 平台限制（保守取值）
+MAX_FILE_SIZE = 20 * 1024 * 1024
+MAX_SIDE = 4096
+
+# 可直接上传的格式
+UPLOAD_FORMATS = ('png', 'jpeg')
+
+# 重新压缩时依次尝试的 JPEG 质量
+JPEG_QUALITIES = (92, 85, 75, 65)
+
+DEFAULT_MAX_WORKERS = 8
+
+# 读取文件头时最多读取的字节数（JPEG 的 SOF 段可能位于较大的 EXIF 之后）
+HEADER_LIMIT = 1024 * 1024
+
+
+class ImageInfo:
+    """图片文件头信息"""
+
+    __slots__ = ('path', 'format', 'width', 'height', 'size', 'error')
+
+    def __init__(self, path, format=None, width=None, height=None, size=0, error=None):
+        self.path = path
+        self.format = format
+        self.width = width
+        self.height = height
+        self.size = size
+        self.error = error
+
+    def __repr__(self):
+        return (f"ImageInfo({self.path!r}, format={self.format!r}, "
+                f"size={self.width}x{self.height}, bytes={self.size})")
+
+
+def _jpeg_size(f):
+    """扫描 JPEG 段直到 SOF，返回 (宽, 高)"""
+    f.seek(2)
+    while f.tell() < HEADER_LIMIT:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        if code == 0xFF:
+            # 填充字节
+            f.seek(-1, os.SEEK_CUR)
+            continue
+        if code in (0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7):
+            continue
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        (seg_len,) = struct.unpack('>H', length)
+        if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack('>HH', data[1:5])
+            return width, height
+        f.seek(seg_len - 2, os.SEEK_CUR)
+    return None
+
+
+def read_image_info(path):
+    """只读取文件头，得到格式、尺寸和文件大小"""
+    path = str(path)
+    try:
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            head = f.read(32)
+            if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+                width, height = struct.unpack('>II', head[16:24])
+                return ImageInfo(path, 'png', width, height, size)
+            if head.startswith(b'\xff\xd8'):
+                dims = _jpeg_size(f)
+                if dims is None:
+                    return ImageInfo(path, 'jpeg', size=size, error='JPEG 文件头损坏')
+                return ImageInfo(path, 'jpeg', dims[0], dims[1], size)
+            if head[:6] in (b'GIF87a', b'GIF89a'):
+                width, height = struct.unpack('<HH', head[6:10])
+                return ImageInfo(path, 'gif', width, height, size)
+            if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+                return ImageInfo(path, 'webp', size=size)
+            if head[:2] == b'BM':
+                width, height = struct.unpack('<ii', head[18:26])
+                return ImageInfo(path, 'bmp', width, abs(height), size)
+    except (OSError, struct.error) as e:
+        return ImageInfo(path, error=str(e))
+    return ImageInfo(path, size=size, error='无法识别的图片格式')
+
+
+class ImagePreflight:
+    """上传前图片预检与规范化（线程安全）"""
+
+    def __init__(self, max_side=MAX_SIDE, max_file_size=MAX_FILE_SIZE, cache_dir=DEFAULT_CACHE_DIR,
+                 digest_cache=None, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Args:
+            max_side: 长边上限（像素）
+            max_file_size: 文件大小上限（字节）
+            cache_dir: 规范化结果缓存目录
+            digest_cache: 计算原图摘要用的 DigestCache，默认进程内共用缓存
+            max_workers: 并发线程数
+        """
+        self.max_side = max_side
+        self.max_file_size = max_file_size
+        self.cache_dir = Path(cache_dir)
+        self.digest_cache = digest_cache
+        self.max_workers = max_workers
+        self.stats = {'checked': 0, 'normalized': 0, 'cached': 0, 'rejected': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def problems(self, info):
+        """需要规范化的原因，空列表表示可直接上传"""
+        reasons = []
+        if info.format not in UPLOAD_FORMATS:
+            reasons.append(f"格式 {info.format} 不支持直接上传")
+        if info.width and info.height and max(info.width, info.height) > self.max_side:
+            reasons.append(f"尺寸 {info.width}x{info.height} 超过 {self.max_side}")
+        if info.size > self.max_file_size:
+            reasons.append(f"大小 {info.size / 1024 / 1024:.1f}MB 超过 {self.max_file_size / 1024 / 1024:.0f}MB")
+        return reasons
+
+    def _cache_path(self, path, ext):
+        digest_cache = self.digest_cache or default_cache()
+        digest = digest_cache.file_digest(path)
+        return self.cache_dir / f"{digest}_{self.max_side}_{self.max_file_size}.{ext}"
+
+    def _save(self, img, target, **params):
+        """写入临时文件后改名，避免并发读到不完整的文件"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(self.cache_dir), suffix=target.suffix)
+        os.close(fd)
+        try:
+            img.save(tmp, **params)
+            size = os.path.getsize(tmp)
+            os.replace(tmp, target)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return size
+
+    def normalize(self, info):
+        """
+        缩放 / 重新压缩一张图片
+
+        Returns:
+            str: 规范化后的文件路径（缓存命中时直接返回）
+        """
+        Image = _pil_image()
+        with Image.open(info.path) as img:
+            has_alpha = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+            # 无透明通道、原本就是 JPEG 或体积超限时输出 JPEG，否则保持 PNG
+            as_png = info.format != 'jpeg' and has_alpha and info.size <= self.max_file_size
+            ext = 'png' if as_png else 'jpg'
+            target = self._cache_path(info.path, ext)
+            for cached in (target, target.with_suffix('.jpg')):
+                if cached.exists():
+                    self._count('cached')
+                    return str(cached)
+
+            img.load()
+            if max(img.size) > self.max_side:
+                img.thumbnail((self.max_side, self.max_side), Image.LANCZOS)
+
+            if as_png:
+                if self._save(img, target, format='PNG', optimize=True) <= self.max_file_size:
+                    self._count('normalized')
+                    return str(target)
+                # PNG 仍然超限：去掉透明通道转 JPEG
+                os.unlink(target)
+                target = self._cache_path(info.path, 'jpg')
+
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+            for quality in JPEG_QUALITIES:
+                size = self._save(img, target, format='JPEG', quality=quality, optimize=True)
+                if size <= self.max_file_size:
+                    break
+            self._count('normalized')
+            return str(target)
+
+    def check(self, path):
+        """
+        检查一张图片
+
+        Returns:
+            tuple: (上传路径或 None, 提示信息或 None)
+        """
+        info = read_image_info(path)
+        self._count('checked')
+        if info.error:
+            self._count('rejected')
+            return None, f"{os.path.basename(info.path)}: {info.error}，已跳过"
+
+        reasons = self.problems(info)
+        if not reasons:
+            return info.path, None
+
+        name = os.path.basename(info.path)
+        if _pil_image() is None:
+            if info.format in UPLOAD_FORMATS:
+                return info.path, f"{name}: {'，'.join(reasons)}（未安装 Pillow，按原图上传）"
+            self._count('rejected')
+            return None, f"{name}: {'，'.join(reasons)}（未安装 Pillow，无法转换），已跳过"
+
+        try:
+            normalized = self.normalize(info)
+        except Exception as e:
+            if info.format in UPLOAD_FORMATS:
+                return info.path, f"{name}: 规范化失败 ({e})，按原图上传"
+            self._count('rejected')
+            return None, f"{name}: 规范化失败 ({e})，已跳过"
+        return normalized, f"{name}: {'，'.join(reasons)}，已转换"
+
+    def run(self, paths):
+        """
+        并发预检一组图片
+
+        Returns:
+            tuple: (images, messages)
+                images: 实际上传的图片路径（保持原顺序，剔除无法使用的图片）
+                messages: 需要提示给用户的信息
+        """
+        paths = [str(path) for path in paths]
+        if len(paths) <= 1:
+            results = [self.check(path) for path in paths]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(paths))) as pool:
+                results = list(pool.map(self.check, paths))
+        images = [image for image, _ in results if image]
+        messages = [message for _, message in results if message]
+        return images, messages
+
+
+_default_preflight = None
+_default_lock = threading.Lock()
+
+
+def default_preflight():
+    """进程内共用的预检器"""
+    global _default_preflight
+    with _default_lock:
+        if _default_preflight is None:
+            _default_preflight = ImagePreflight()
+        return _default_preflight
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python image_preflight.py <image_or_note_dir> [...]")
+        sys.exit(1)
+
+    paths = []
+    for arg in sys.argv[1:]:
+        if os.path.isdir(arg):
+            paths.extend(sorted(
+                os.path.join(arg, name) for name in os.listdir(arg)
+                if name.lower().endswith(('.png', '.jpg', '.jpeg', '.webp', '.gif', '.bmp'))
+            ))
+        else:
+            paths.append(arg)
+
+    for info in map(read_image_info, paths):
+        print(info)
+
+    preflight = ImagePreflight()
+    images, messages = preflight.run(paths)
+    for message in messages:
+        print(f"[WARN] {message}")
+    for image in images:
+        print(f"[OK] {image}")
+    if _pil_image() is None:
+        print("[INFO] Pillow not installed, oversized images are uploaded unchanged")
+    print(f"[INFO] {preflight.stats}")
+
+
+if __name__ == '__main__':
+    main()
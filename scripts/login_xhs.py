@@ -9,29 +9,32 @@
 功能:
     1. 弹出小红书登录页面
     2. 用户扫码登录
-    3. 自动保存 Cookie 到 .env 文件
+    3. 自动保存 Cookie 到 .env 文件，浏览器 storage_state 保存到 .xhs_storage_state.json
     4. 下次发布时自动使用保存的 Cookie
+    5. 再次运行时先用轻量 HTTP 请求验证现有登录（不到一秒），
+       无法判断时才启动无头浏览器并复用 storage_state
 
 依赖安装:
-    pip install playwright python-dotenv
+    pip install playwright
     playwright install chromium
 """
 
 import asyncio
-import os
 import sys
 from pathlib import Path
-from datetime import datetime
 
 try:
     from playwright.async_api import async_playwright
-    from dotenv import load_dotenv, set_key
 except ImportError as e:
     print(f"❌ 缺少依赖: {e}")
-    print("请运行: pip install playwright python-dotenv")
+    print("请运行: pip install playwright")
     print("然后运行: playwright install chromium")
     sys.exit(1)
 
+sys.path.insert(0, str(Path(__file__).parent))
+
+from xhs_credentials import STORAGE_STATE_FILE, default_store, load_storage_state, parse_cookie, probe_session
+
 
 # 获取脚本所在目录
 SCRIPT_DIR = Path(__file__).parent.parent
@@ -40,29 +43,14 @@ ENV_FILE = SCRIPT_DIR / '.env'
 
 def load_existing_cookie():
     """加载现有的 Cookie"""
-    if ENV_FILE.exists():
-        load_dotenv(ENV_FILE)
-        return os.getenv('XHS_COOKIE')
-    return None
+    return default_store().cookie()
 
 
 def save_cookie(cookie_str: str):
     """保存 Cookie 到 .env 文件"""
     try:
-        # 如果 .env 文件不存在，创建它
-        if not ENV_FILE.exists():
-            ENV_FILE.touch()
-            print(f"✅ 创建配置文件: {ENV_FILE}")
-        
-        # 保存或更新 Cookie
-        set_key(ENV_FILE, 'XHS_COOKIE', cookie_str)
-        print(f"✅ Cookie 已保存到: {ENV_FILE}")
-        
-        # 添加备注信息
-        with open(ENV_FILE, 'a', encoding='utf-8') as f:
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            f.write(f"\n# Cookie 更新时间: {timestamp}\n")
-        
+        env_file = default_store().save_cookie(cookie_str)
+        print(f"✅ Cookie 已保存到: {env_file}")
         return True
     except Exception as e:
         print(f"❌ 保存 Cookie 失败: {e}")
@@ -167,6 +155,9 @@ async def login_with_qrcode():
             if found_keys:
                 print(f"🔑 关键 Cookie: {', '.join(found_keys)}")
             
+            # 保存 storage_state，之后的浏览器验证直接复用（含 Cookie 过期时间）
+            await context.storage_state(path=str(STORAGE_STATE_FILE))
+            
             # 保存 Cookie
             if save_cookie(cookie_str):
                 print("\n🎉 登录配置完成！")
@@ -186,33 +177,21 @@ async def login_with_qrcode():
             return False
 
 
-async def verify_cookie():
-    """验证现有 Cookie 是否有效"""
-    existing_cookie = load_existing_cookie()
-    
-    if not existing_cookie:
-        return False
-    
-    print("🔍 检测到现有 Cookie，正在验证...")
-    
+async def verify_in_browser(cookie):
+    """无头浏览器打开创作者中心验证（快速检查无法判断时使用）"""
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context()
         
-        # 设置 Cookie
-        cookies = []
-        for item in existing_cookie.split(';'):
-            item = item.strip()
-            if '=' in item:
-                name, value = item.split('=', 1)
-                cookies.append({
-                    'name': name.strip(),
-                    'value': value.strip(),
-                    'domain': '.xiaohongshu.com',
-                    'path': '/'
-                })
-        
-        await context.add_cookies(cookies)
+        # 优先复用扫码登录时保存的 storage_state，否则由 Cookie 字符串构造
+        state = load_storage_state(cookie)
+        if state:
+            context = await browser.new_context(storage_state=state)
+        else:
+            context = await browser.new_context()
+            await context.add_cookies([
+                {'name': name, 'value': value, 'domain': '.xiaohongshu.com', 'path': '/'}
+                for name, value in parse_cookie(cookie).items()
+            ])
         
         page = await context.new_page()
         
@@ -222,20 +201,58 @@ async def verify_cookie():
             await asyncio.sleep(2)
             
             # 检查是否登录成功（没有跳转到登录页）
-            current_url = page.url
-            if 'login' not in current_url:
-                print("✅ 现有 Cookie 有效")
-                await browser.close()
-                return True
-            else:
-                print("⚠️ 现有 Cookie 已失效")
-                await browser.close()
+            if 'login' in page.url:
                 return False
-                
-        except Exception as e:
-            print(f"⚠️ Cookie 验证失败: {e}")
+            if state:
+                # 更新 storage_state 中刷新过的 Cookie
+                await context.storage_state(path=str(STORAGE_STATE_FILE))
+            return True
+        finally:
             await browser.close()
-            return False
+
+
+async def verify_cookie():
+    """
+    验证现有 Cookie 是否有效
+
+    依次使用：最近的验证结果缓存 → 轻量 HTTP 检查 → 无头浏览器（仅在前两者无法判断时）
+    """
+    existing_cookie = load_existing_cookie()
+    
+    if not existing_cookie:
+        return False
+    
+    store = default_store()
+    
+    # 最近已验证通过时不再检查
+    if store.validation():
+        print("✅ 现有 Cookie 有效（最近已验证）")
+        return True
+    
+    print("🔍 检测到现有 Cookie，正在验证...")
+    
+    valid, user_id, nickname = await asyncio.to_thread(probe_session, existing_cookie)
+    if valid:
+        store.record_validation(user_id, nickname)
+        print(f"✅ 现有 Cookie 有效（当前用户: {nickname or '未知'}）")
+        return True
+    if valid is False:
+        store.invalidate()
+        print("⚠️ 现有 Cookie 已失效")
+        return False
+    
+    print("⚠️ 快速检查无法确认登录状态，使用浏览器验证...")
+    try:
+        if await verify_in_browser(existing_cookie):
+            store.record_validation()
+            print("✅ 现有 Cookie 有效")
+            return True
+        store.invalidate()
+        print("⚠️ 现有 Cookie 已失效")
+        return False
+    except Exception as e:
+        print(f"⚠️ Cookie 验证失败: {e}")
+        return False
 
 
 async def main():
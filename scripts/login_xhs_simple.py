@@ -5,20 +5,22 @@
 """
 
 import asyncio
-import os
 import sys
 from datetime import datetime
 from pathlib import Path
 
 try:
-    from dotenv import load_dotenv, set_key
     from playwright.async_api import async_playwright
 except ImportError as e:
     print(f"Missing dependency: {e}")
-    print("Run: pip install python-dotenv playwright")
+    print("Run: pip install playwright")
     print("Then run: playwright install chromium")
     sys.exit(1)
 
+sys.path.insert(0, str(Path(__file__).parent))
+
+from xhs_credentials import STORAGE_STATE_FILE, default_store
+
 
 async def get_cookie_from_browser():
     """通过浏览器扫码登录获取 Cookie"""
@@ -47,8 +49,9 @@ async def get_cookie_from_browser():
             # 等待一下确保 Cookie 完全设置
             await asyncio.sleep(3)
             
-            # 获取所有 Cookie
+            # 获取所有 Cookie，并保存 storage_state 供之后的验证复用
             cookies = await context.cookies()
+            await context.storage_state(path=str(STORAGE_STATE_FILE))
             
             if not cookies:
                 print("[ERROR] No cookies found")
@@ -66,44 +69,10 @@ async def get_cookie_from_browser():
 
 def save_cookie_to_env(cookie: str):
     """保存 Cookie 到 .env 文件"""
-    env_path = Path(__file__).parent.parent / '.env'
-    
-    # 添加更新时间注释
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    
     try:
-        # 读取现有内容
-        if env_path.exists():
-            with open(env_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        else:
-            content = ""
-        
-        # 更新或添加 Cookie
-        lines = content.split('\n')
-        new_lines = []
-        cookie_found = False
-        
-        for line in lines:
-            if line.startswith('XHS_COOKIE='):
-                new_lines.append(f"# Update time: {timestamp}")
-                new_lines.append(f"XHS_COOKIE={cookie}")
-                cookie_found = True
-            elif not line.startswith('# Update time:'):
-                new_lines.append(line)
-        
-        if not cookie_found:
-            new_lines.append(f"# Xiaohongshu Cookie")
-            new_lines.append(f"# Update time: {timestamp}")
-            new_lines.append(f"XHS_COOKIE={cookie}")
-        
-        # 写入文件
-        with open(env_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(new_lines))
-        
+        env_path = default_store().save_cookie(cookie)
         print(f"\n[SUCCESS] Cookie saved to: {env_path}")
-        print(f"[INFO] Update time: {timestamp}")
-        
+        print(f"[INFO] Update time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     except Exception as e:
         print(f"[ERROR] Failed to save cookie: {e}")
         sys.exit(1)
@@ -111,15 +80,7 @@ def save_cookie_to_env(cookie: str):
 
 def check_existing_cookie():
     """检查现有 Cookie 是否存在"""
-    env_path = Path(__file__).parent.parent / '.env'
-    
-    if not env_path.exists():
-        return False
-    
-    load_dotenv(env_path)
-    cookie = os.getenv('XHS_COOKIE')
-    
-    if cookie:
+    if default_store().cookie():
         print(f"\n[INFO] Found existing cookie in .env")
         return True
     
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发布/渲染吞吐指标（Prometheus 文本格式）
+指标由结构化事件日志（event_log）的事件汇总而来：发布工具和渲染脚本已记录的
+note / api_call / stage 事件会同时计入内存中的计数器和直方图，不需要在各处重复埋点
+
+指标:
+    xhs_notes_total{source,status}                  发布结果（published / failed / skipped ...）
+    xhs_note_duration_seconds{source}               单篇笔记发布耗时
+    xhs_api_calls_total{endpoint,ok}                API 调用次数（含重试后的最终结果）
+    xhs_api_call_duration_seconds{endpoint}         API 调用耗时（upload 即图片上传延迟）
+    xhs_stage_duration_seconds{source,stage}        阶段耗时（upload / create / render / render_card）
+    xhs_stage_failures_total{source,stage}          阶段失败次数
+    xhs_stage_bytes_total{source,stage}             阶段处理的字节数
+    xhs_render_cards_total                          渲染生成的卡片数
+
+每条指标带 proc 标签（脚本名），多个进程写同一个 textfile 目录时不会重复。
+Prometheus 中 rate(xhs_notes_total[1h]) * 3600 即每小时发布数，
+rate(xhs_render_cards_total[5m]) 即每秒渲染卡片数。
+
+开启方式（环境变量，任一即可）:
+    XHS_METRICS_DIR=/var/lib/node_exporter/textfile   定期写入 <dir>/xhs_<proc>.prom（node_exporter textfile collector）
+    XHS_METRICS_PORT=9464                              在 127.0.0.1:<port>/metrics 提供抓取接口
+发布服务 (publish_service.py) 始终提供 /metrics。
+
+使用方法:
+    XHS_METRICS_PORT=9464 python publish_gui_v3_fixed.py
+    python metrics.py                                   从事件日志生成一份指标快照并打印
+    python metrics.py --events logs/events.jsonl --out xhs.prom
+"""
+
+import argparse
+import atexit
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+import event_log
+
+
+DIR_ENV_VAR = 'XHS_METRICS_DIR'
+PORT_ENV_VAR = 'XHS_METRICS_PORT'
+DEFAULT_HOST = '127.0.0.1'
+# textfile 写入间隔（秒）
+DEFAULT_WRITE_INTERVAL = 15
+
+# 秒；覆盖单次 API 调用到整篇笔记（含多图上传）的范围
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """只增不减的计数器"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(str(labels.get(name, '')) for name in self.labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield self.name, key, None, value
+
+
+class Histogram:
+    """固定分桶的直方图（观测值单位：秒）"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[0][idx] += 1
+                    break
+            counts[1] += value
+            counts[2] += 1
+
+    def count(self, **labels):
+        counts = self._values.get(tuple(str(labels.get(name, '')) for name in self.labels))
+        return counts[2] if counts else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(c[0]), c[1], c[2])) for key, c in self._values.items())
+        for key, (buckets, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, buckets):
+                cumulative += n
+                yield self.name + '_bucket', key, f'le="{_format_value(bound)}"', cumulative
+            yield self.name + '_bucket', key, 'le="+Inf"', count
+            yield self.name + '_sum', key, None, total
+            yield self.name + '_count', key, None, count
+
+
+class MetricsRegistry:
+    """
+    发布/渲染指标集合
+
+    observe_event() 接收 event_log 的事件记录（dict）并更新对应指标；
+    render() 输出 Prometheus 文本格式。
+    """
+
+    def __init__(self, proc=None):
+        self.proc = proc or event_log._PROC
+        self.notes = Counter('xhs_notes_total', 'Notes processed by publish result', ('source', 'status'))
+        self.note_duration = Histogram('xhs_note_duration_seconds', 'Time to publish one note', ('source',))
+        self.api_calls = Counter('xhs_api_calls_total', 'API calls by final result', ('endpoint', 'ok'))
+        self.api_duration = Histogram('xhs_api_call_duration_seconds',
+                                      'API call duration including retries', ('endpoint',))
+        self.stage_duration = Histogram('xhs_stage_duration_seconds',
+                                        'Publish and render stage duration', ('source', 'stage'))
+        self.stage_failures = Counter('xhs_stage_failures_total', 'Failed stages', ('source', 'stage'))
+        self.stage_bytes = Counter('xhs_stage_bytes_total', 'Bytes handled per stage', ('source', 'stage'))
+        self.render_cards = Counter('xhs_render_cards_total', 'Rendered cards')
+        self.metrics = [self.notes, self.note_duration, self.api_calls, self.api_duration,
+                        self.stage_duration, self.stage_failures, self.stage_bytes, self.render_cards]
+
+    def observe_event(self, record):
+        event = record.get('event')
+        source = record.get('source', '')
+        seconds = record.get('duration_ms')
+        seconds = seconds / 1000 if isinstance(seconds, (int, float)) else None
+
+        if event == 'note':
+            self.notes.inc(source=source, status=record.get('status', ''))
+            if seconds is not None and record.get('status') == 'published':
+                self.note_duration.observe(seconds, source=source)
+        elif event == 'api_call':
+            endpoint = record.get('endpoint', '')
+            self.api_calls.inc(endpoint=endpoint, ok='true' if record.get('ok') else 'false')
+            if seconds is not None:
+                self.api_duration.observe(seconds, endpoint=endpoint)
+        elif event == 'stage':
+            stage = record.get('stage', '')
+            if seconds is not None:
+                self.stage_duration.observe(seconds, source=source, stage=stage)
+            if not record.get('ok', True):
+                self.stage_failures.inc(source=source, stage=stage)
+            elif stage == 'render_card':
+                self.render_cards.inc()
+            if isinstance(record.get('bytes'), int):
+                self.stage_bytes.inc(record['bytes'], source=source, stage=stage)
+
+    def render(self):
+        proc_label = f'proc="{_escape(self.proc)}"'
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, key, extra, value in metric.samples():
+                labels = _format_labels(metric.labels, key, extra)
+                labels = labels[:-1] + ',' + proc_label + '}' if labels else '{' + proc_label + '}'
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """原子写入 textfile（先写临时文件再替换，采集方不会读到半个文件）"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + f'.{os.getpid()}.tmp')
+        tmp.write_text(self.render(), encoding='utf-8')
+        os.replace(tmp, path)
+
+
+class MetricsServer:
+    """在后台线程提供 GET /metrics"""
+
+    def __init__(self, registry, host=DEFAULT_HOST, port=0):
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.registry = registry
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='metrics', daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        send_metrics(self, self.server.registry)
+
+
+def send_metrics(handler, registry):
+    """把指标写入 HTTP 响应（发布服务的 /metrics 也用这个）"""
+    body = registry.render().encode('utf-8')
+    handler.send_response(200)
+    handler.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+    handler.send_header('Content-Length', str(len(body)))
+    handler.end_headers()
+    handler.wfile.write(body)
+
+
+class _TextfileWriter:
+    """定期和退出时把指标写入 textfile"""
+
+    def __init__(self, registry, path, interval=DEFAULT_WRITE_INTERVAL):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        threading.Thread(target=self._run, name='metrics-textfile', daemon=True).start()
+        atexit.register(self.close)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._write()
+
+    def _write(self):
+        try:
+            self.registry.write_textfile(self.path)
+        except OSError:
+            pass
+
+    def close(self):
+        self._stop.set()
+        self._write()
+
+
+_default_registry = None
+_default_lock = threading.Lock()
+
+
+def default_registry():
+    """进程内共用的指标集合（首次调用时开始汇总事件）"""
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            _default_registry = MetricsRegistry()
+            event_log.add_listener(_default_registry.observe_event)
+        return _default_registry
+
+
+def start_from_env():
+    """按环境变量开启 textfile 写入和 /metrics 接口（event_log 初始化时调用）"""
+    directory = os.environ.get(DIR_ENV_VAR, '').strip()
+    port = os.environ.get(PORT_ENV_VAR, '').strip()
+    if not directory and not port:
+        return None
+    registry = default_registry()
+    if directory:
+        _TextfileWriter(registry, Path(directory) / f"xhs_{registry.proc}.prom")
+    if port:
+        try:
+            MetricsServer(registry, port=int(port)).start()
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] Metrics endpoint not started on port {port}: {e}")
+    return registry
+
+
+def registry_from_events(path):
+    """从事件日志文件汇总指标（proc 标签为 events）"""
+    registry = MetricsRegistry(proc='events')
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                registry.observe_event(json.loads(line))
+            except ValueError:
+                continue
+    return registry
+
+
+def main():
+    parser = argparse.ArgumentParser(description='发布/渲染吞吐指标')
+    parser.add_argument('--events', type=str, default=str(event_log.DEFAULT_EVENT_FILE),
+                        help='事件日志（JSONL）路径')
+    parser.add_argument('--out', type=str, help='输出 textfile 路径（不指定则打印）')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.events):
+        print(f"[ERROR] Event log not found: {args.events}")
+        sys.exit(1)
+
+    registry = registry_from_events(args.events)
+    if args.out:
+        registry.write_textfile(args.out)
+        print(f"[INFO] Metrics written to: {args.out}")
+    else:
+        sys.stdout.write(registry.render())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+笔记信息目录
+检测和发布共用的笔记信息（标题、正文、图片、发布状态）缓存
+
+优化:
+1. 每篇笔记只做一次 os.scandir，得到封面、卡片、metadata.json、publish_record.json
+   和 Markdown 文件，不再逐个 exists() 探测 card_1..card_19
+2. 多篇笔记由线程池并发加载（网络盘上效果明显）
+3. 按目录 mtime 缓存：目录未变化时只需 stat，metadata.json / publish_record.json
+   被原地改写（不改变目录 mtime）时按文件 mtime 失效
+4. NoteInfo 使用 __slots__，上万篇笔记时内存占用小
+
+使用方法:
+    python note_catalog.py <notes_dir>
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from note_scanner import MAX_IMAGES
+
+
+DEFAULT_MAX_WORKERS = 8
+
+# card_1.png 到 card_19.png，从 1 开始连续编号
+MAX_CARD_NUMBER = 19
+
+METADATA_FILE = 'metadata.json'
+PUBLISH_RECORD_FILE = 'publish_record.json'
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError) as e:
+        print(f"Warning: Failed to read {path}: {e}")
+        return {}
+
+
+def _markdown_title(path):
+    """Markdown 中第一个一级标题"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('# '):
+                    return line[2:].strip()
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Warning: Failed to read Markdown: {e}")
+    return ''
+
+
+class NoteInfo:
+    """一篇笔记的信息"""
+
+    __slots__ = ('path', 'mtime_ns', 'file_mtimes', 'title', 'metadata', 'images',
+                 'card_count', 'publish_record')
+
+    def __init__(self, path, mtime_ns, file_mtimes, title, metadata, images, card_count,
+                 publish_record):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.file_mtimes = file_mtimes
+        self.title = title
+        self.metadata = metadata
+        self.images = images
+        self.card_count = card_count
+        self.publish_record = publish_record
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    @property
+    def subtitle(self):
+        return self.metadata.get('subtitle', '')
+
+    @property
+    def desc(self):
+        """正文：优先使用 desc 字段，否则 标题 + 副标题"""
+        if self.metadata.get('desc'):
+            return self.metadata['desc']
+        subtitle = self.subtitle
+        return f"{self.title}\n{subtitle}" if subtitle else self.title
+
+    @property
+    def image_count(self):
+        return len(self.images)
+
+    @property
+    def published(self):
+        """笔记目录中留有发布痕迹（publish_record.json 或 metadata 中的 published_at）"""
+        return self.publish_record is not None or bool(self.metadata.get('published_at'))
+
+    def __repr__(self):
+        return f"NoteInfo({self.path!r}, title={self.title!r}, images={self.image_count})"
+
+
+def load_note(note_dir, mtime_ns=None):
+    """读取一篇笔记（单次 scandir）"""
+    note_dir = os.path.abspath(note_dir)
+    if mtime_ns is None:
+        mtime_ns = os.stat(note_dir).st_mtime_ns
+
+    has_cover = False
+    cards = set()
+    markdown = []
+    file_mtimes = {}
+    with os.scandir(note_dir) as it:
+        for entry in it:
+            name = entry.name
+            if name == 'cover.png':
+                has_cover = True
+            elif name.startswith('card_') and name.endswith('.png'):
+                cards.add(name)
+            elif name in (METADATA_FILE, PUBLISH_RECORD_FILE):
+                file_mtimes[name] = entry.stat().st_mtime_ns
+            elif name.endswith('.md') and entry.is_file():
+                markdown.append(name)
+
+    images = [os.path.join(note_dir, 'cover.png')] if has_cover else []
+    card_count = 0
+    for i in range(1, MAX_CARD_NUMBER + 1):
+        name = f'card_{i}.png'
+        if name not in cards:
+            break
+        images.append(os.path.join(note_dir, name))
+        card_count += 1
+
+    metadata = {}
+    if METADATA_FILE in file_mtimes:
+        metadata = _read_json(os.path.join(note_dir, METADATA_FILE))
+
+    publish_record = None
+    if PUBLISH_RECORD_FILE in file_mtimes:
+        publish_record = _read_json(os.path.join(note_dir, PUBLISH_RECORD_FILE))
+
+    title = metadata.get('title') or ''
+    if not title and markdown:
+        title = _markdown_title(os.path.join(note_dir, sorted(markdown)[0]))
+    if not title:
+        title = os.path.basename(note_dir)
+
+    return NoteInfo(note_dir, mtime_ns, file_mtimes, title, metadata, images[:MAX_IMAGES],
+                    card_count, publish_record)
+
+
+class NoteCatalog:
+    """按目录 mtime 缓存的笔记信息目录（线程安全）"""
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        self.max_workers = max_workers
+        self.stats = {'hits': 0, 'loads': 0}
+        self._lock = threading.Lock()
+        self._notes = {}
+
+    def _is_fresh(self, info, mtime_ns):
+        if info.mtime_ns != mtime_ns:
+            return False
+        for name, file_mtime in info.file_mtimes.items():
+            try:
+                if os.stat(os.path.join(info.path, name)).st_mtime_ns != file_mtime:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def get(self, note_dir):
+        """获取笔记信息（目录未变化时使用缓存）"""
+        note_dir = os.path.abspath(note_dir)
+        mtime_ns = os.stat(note_dir).st_mtime_ns
+        with self._lock:
+            info = self._notes.get(note_dir)
+        if info is not None and self._is_fresh(info, mtime_ns):
+            with self._lock:
+                self.stats['hits'] += 1
+            return info
+
+        info = load_note(note_dir, mtime_ns)
+        with self._lock:
+            self._notes[note_dir] = info
+            self.stats['loads'] += 1
+        return info
+
+    def load(self, note_dirs, on_error=None):
+        """
+        并发加载多篇笔记
+
+        Args:
+            note_dirs: 笔记目录列表
+            on_error: 可选回调 on_error(note_dir, exception)，无法读取的笔记不出现在结果中
+
+        Returns:
+            list[NoteInfo]: 与 note_dirs 顺序一致
+        """
+        def load_one(note_dir):
+            try:
+                return self.get(note_dir)
+            except OSError as e:
+                if on_error:
+                    on_error(note_dir, e)
+                return None
+
+        note_dirs = list(note_dirs)
+        if len(note_dirs) <= 1:
+            results = [load_one(note_dir) for note_dir in note_dirs]
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                results = list(pool.map(load_one, note_dirs))
+        return [info for info in results if info is not None]
+
+    def invalidate(self, note_dir=None):
+        """清除某篇笔记（或全部）的缓存"""
+        with self._lock:
+            if note_dir is None:
+                self._notes.clear()
+            else:
+                self._notes.pop(os.path.abspath(note_dir), None)
+
+
+_default_catalog = None
+_default_lock = threading.Lock()
+
+
+def default_catalog():
+    """进程内共用的笔记信息目录"""
+    global _default_catalog
+    with _default_lock:
+        if _default_catalog is None:
+            _default_catalog = NoteCatalog()
+        return _default_catalog
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python note_catalog.py <notes_dir>")
+        sys.exit(1)
+
+    from note_scanner import NoteScanner
+
+    note_dirs = [note.path for note in NoteScanner().scan(sys.argv[1])]
+    catalog = NoteCatalog()
+    start = time.perf_counter()
+    notes = catalog.load(note_dirs, on_error=lambda path, e: print(f"[ERROR] {path}: {e}"))
+    elapsed = time.perf_counter() - start
+
+    for info in notes:
+        status = 'published' if info.published else 'pending'
+        print(f"{info.path}  [{info.image_count} images, {status}]  {info.title}")
+    print(f"[INFO] Loaded {len(notes)} notes in {elapsed:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发布前重复内容检测
+在递归扫描得到的候选笔记中（并对照发布台账中的已发布笔记）查找:
+
+1. 完全重复：内容标识 (note_digest) 相同的笔记，例如复制后未做任何修改
+2. 近似重复：封面或卡片图片的感知哈希 (dHash, 64 位) 汉明距离不超过阈值，
+   且匹配的图片占较小一方图片数的比例达到 NEAR_RATIO
+
+近似匹配不做两两比较：64 位哈希切成 (阈值 + 1) 段，汉明距离不超过阈值的两个哈希
+至少有一段完全相同（抽屉原理），只在同段同值的桶内计算距离。
+安装 NumPy 时分桶和距离计算全部向量化，未安装时使用字典分桶。
+
+感知哈希需要 Pillow；每张图片的哈希按文件摘要缓存，未变化的图片不再解码。
+
+使用方法:
+    python note_dedup.py <notes_dir> [--threshold 4] [--json]
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from note_digest import METADATA_FILE, default_cache, note_files
+
+# NumPy 和 PIL 在第一次计算感知哈希时才导入（GUI 启动时不加载），未安装时为 None
+_OPTIONAL = {'np': 'numpy', 'Image': 'PIL.Image'}
+
+
+def _optional(name):
+    if name not in globals():
+        try:
+            module = importlib.import_module(_OPTIONAL[name])
+        except ImportError:
+            module = None
+        globals()[name] = module
+    return globals()[name]
+
+
+def __getattr__(name):
+    if name in _OPTIONAL:
+        return _optional(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# 感知哈希汉明距离阈值（64 位 dHash）
+DEFAULT_THRESHOLD = 4
+# 两篇笔记匹配图片数 / 较小一方图片数 达到该比例视为近似重复
+NEAR_RATIO = 0.5
+# 同一哈希出现在超过该数量的图片中时视为公共模板图（如固定的结尾卡片），不参与匹配
+COMMON_IMAGE_LIMIT = 50
+
+DEFAULT_MAX_WORKERS = 8
+HASH_BITS = 64
+
+PHASH_SCHEMA = """
+CREATE TABLE IF NOT EXISTS phashes (
+    digest TEXT PRIMARY KEY,
+    phash INTEGER
+);
+"""
+
+
+def dhash(path, size=8):
+    """64 位差值哈希：缩放为 9x8 灰度图，比较每行相邻像素"""
+    Image = _optional('Image')
+    with Image.open(path) as img:
+        img.draft('L', (size * 4, size * 4))
+        small = img.convert('L').resize((size + 1, size), Image.Resampling.BILINEAR)
+    pixels = small.tobytes()
+    bits = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+def _to_signed(value):
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+class PhashCache:
+    """按文件摘要缓存感知哈希（与 note_digest 共用旁路索引文件）"""
+
+    def __init__(self, digest_cache=None):
+        self.digest_cache = digest_cache or default_cache()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.digest_cache.db_file),
+            timeout=30,
+            check_same_thread=False
+        )
+        self._conn.executescript(PHASH_SCHEMA)
+        self._conn.commit()
+        self._memo = {
+            digest: _to_unsigned(phash)
+            for digest, phash in self._conn.execute('SELECT digest, phash FROM phashes')
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def phash(self, path):
+        """图片的感知哈希，无法解码时返回 None"""
+        digest = self.digest_cache.file_digest(path)
+        with self._lock:
+            cached = self._memo.get(digest)
+        if cached is not None:
+            return cached
+        try:
+            value = dhash(path)
+        except Exception:
+            return None
+        with self._lock:
+            self._memo[digest] = value
+            with self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO phashes VALUES (?, ?)', (digest, _to_signed(value))
+                )
+        return value
+
+
+# ---------- 近似匹配 ----------
+
+def _bands(threshold):
+    """切段方案：[(右移位数, 掩码)]，段数 = 阈值 + 1"""
+    count = threshold + 1
+    widths = [HASH_BITS // count + (1 if i < HASH_BITS % count else 0) for i in range(count)]
+    bands = []
+    shift = 0
+    for width in widths:
+        bands.append((shift, (1 << width) - 1))
+        shift += width
+    return bands
+
+
+def _popcount(values):
+    np = _optional('np')
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    return np.unpackbits(values.view(np.uint8)).reshape(-1, HASH_BITS).sum(axis=1)
+
+
+def _pairs_numpy(hashes, threshold, max_group):
+    """向量化：返回汉明距离 <= threshold 的下标对 (i, j)，i < j"""
+    np = _optional('np')
+    values = np.asarray(hashes, dtype=np.uint64)
+    # 完全相同的哈希先合并，避免大桶
+    unique, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    common = counts > max_group
+
+    left_parts = []
+    right_parts = []
+    for shift, mask in _bands(threshold):
+        keys = (unique >> np.uint64(shift)) & np.uint64(mask)
+        order = np.argsort(keys, kind='stable')
+        order = order[~common[order]]
+        sorted_keys = keys[order]
+        # 同一桶内的元素在排序后相邻：依次比较间隔 1, 2, ... 的元素
+        step = 1
+        while step < len(order):
+            same = sorted_keys[step:] == sorted_keys[:-step]
+            if not same.any():
+                break
+            left_parts.append(order[:-step][same])
+            right_parts.append(order[step:][same])
+            step += 1
+
+    unique_pairs = np.empty((0, 2), dtype=np.int64)
+    if left_parts:
+        left = np.concatenate(left_parts)
+        right = np.concatenate(right_parts)
+        distance = _popcount(unique[left] ^ unique[right])
+        keep = distance <= threshold
+        unique_pairs = np.stack([np.minimum(left, right)[keep], np.maximum(left, right)[keep]], axis=1)
+        unique_pairs = np.unique(unique_pairs, axis=0)
+
+    # 展开回原始下标：相同哈希的元素两两配对，匹配的哈希组之间交叉配对
+    members = defaultdict(list)
+    for index, group in enumerate(inverse.tolist()):
+        if not common[group]:
+            members[group].append(index)
+    pairs = set()
+    for group_members in members.values():
+        for a in range(len(group_members)):
+            for b in range(a + 1, len(group_members)):
+                pairs.add((group_members[a], group_members[b]))
+    for u, v in unique_pairs.tolist():
+        for i in members[u]:
+            for j in members[v]:
+                pairs.add((min(i, j), max(i, j)))
+    return pairs
+
+
+def _pairs_python(hashes, threshold, max_group):
+    """纯 Python 分桶实现（未安装 NumPy 时使用）"""
+    groups = defaultdict(list)
+    for index, value in enumerate(hashes):
+        groups[value].append(index)
+    groups = {value: members for value, members in groups.items() if len(members) <= max_group}
+    unique = list(groups)
+
+    candidates = set()
+    for shift, mask in _bands(threshold):
+        buckets = defaultdict(list)
+        for u, value in enumerate(unique):
+            buckets[(value >> shift) & mask].append(u)
+        for bucket in buckets.values():
+            for a in range(len(bucket)):
+                for b in range(a + 1, len(bucket)):
+                    candidates.add((bucket[a], bucket[b]))
+
+    pairs = set()
+    for group_members in groups.values():
+        for a in range(len(group_members)):
+            for b in range(a + 1, len(group_members)):
+                pairs.add((group_members[a], group_members[b]))
+    for u, v in candidates:
+        if bin(unique[u] ^ unique[v]).count('1') <= threshold:
+            for i in groups[unique[u]]:
+                for j in groups[unique[v]]:
+                    pairs.add((min(i, j), max(i, j)))
+    return pairs
+
+
+def near_pairs(hashes, threshold=DEFAULT_THRESHOLD, max_group=COMMON_IMAGE_LIMIT):
+    """
+    汉明距离不超过 threshold 的哈希下标对集合 {(i, j)}，i < j
+
+    出现次数超过 max_group 的哈希（公共模板图）不参与配对。
+    """
+    if len(hashes) < 2:
+        return set()
+    if _optional('np') is not None:
+        return _pairs_numpy(hashes, threshold, max_group)
+    return _pairs_python(hashes, threshold, max_group)
+
+
+# ---------- 检测 ----------
+
+class DuplicateReport:
+    """重复检测结果"""
+
+    def __init__(self):
+        # 内容完全相同的候选笔记组（每组第一个为保留项）
+        self.exact = []
+        # 近似重复: [{'note': 候选笔记, 'other': 相似笔记, 'matched': 匹配图片数,
+        #            'ratio': 比例, 'published': other 是否已发布}]
+        self.near = []
+        # 重复笔记（应跳过或人工确认） → 原因
+        self.duplicates = {}
+        self.phash_available = _optional('Image') is not None
+
+    def _flag(self, note_dir, reason):
+        self.duplicates.setdefault(note_dir, reason)
+
+    def is_duplicate(self, note_dir):
+        return note_dir in self.duplicates
+
+    def to_dict(self):
+        return {
+            'exact': self.exact,
+            'near': self.near,
+            'duplicates': self.duplicates,
+            'phash_available': self.phash_available,
+        }
+
+
+def _note_images(note_dir):
+    return [entry.path for name, entry in note_files(note_dir) if name != METADATA_FILE]
+
+
+def find_duplicates(note_dirs, ledger=None, threshold=DEFAULT_THRESHOLD, digest_cache=None,
+                    max_workers=DEFAULT_MAX_WORKERS, roots=None):
+    """
+    检测候选笔记中的重复内容
+
+    Args:
+        note_dirs: 候选笔记文件夹（通常为 NoteScanner 的扫描结果）
+        ledger: 可选 PublishLedger，已发布笔记参与近似比较
+        threshold: 感知哈希汉明距离阈值
+        digest_cache: note_digest.DigestCache，默认进程共用缓存
+        roots: 参与比较的已发布笔记所在目录，默认为候选笔记的公共上级目录
+
+    Returns:
+        DuplicateReport
+    """
+    digest_cache = digest_cache or default_cache()
+    report = DuplicateReport()
+    candidates = sorted(os.path.abspath(path) for path in note_dirs)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        digests = list(pool.map(digest_cache.note_digest, candidates))
+
+    # 1. 完全重复
+    by_digest = defaultdict(list)
+    for note_dir, digest in zip(candidates, digests):
+        by_digest[digest].append(note_dir)
+    for group in by_digest.values():
+        if len(group) > 1:
+            report.exact.append(group)
+            for note_dir in group[1:]:
+                report._flag(note_dir, f"与 {group[0]} 内容完全相同")
+
+    if _optional('Image') is None:
+        return report
+
+    # 2. 近似重复：候选笔记（每组完全重复只取一个）+ 已发布笔记
+    notes = [group[0] for group in by_digest.values()]
+    published = set()
+    if ledger is not None:
+        if roots is None:
+            roots = [os.path.commonpath([os.path.dirname(path) for path in candidates])] if candidates else []
+        # 只比较扫描范围内的已发布笔记（台账按 note_dir 索引范围查询），不逐条检查全部记录
+        candidate_set = set(notes)
+        for root in roots:
+            for note_dir in sorted(ledger.note_dirs_under(root)):
+                if note_dir not in candidate_set and os.path.isdir(note_dir):
+                    candidate_set.add(note_dir)
+                    notes.append(note_dir)
+                    published.add(note_dir)
+
+    image_paths = []
+    image_notes = []
+    image_counts = []
+    for index, note_dir in enumerate(notes):
+        images = _note_images(note_dir)
+        image_counts.append(len(images))
+        image_paths.extend(images)
+        image_notes.extend([index] * len(images))
+
+    with PhashCache(digest_cache) as phash_cache:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            phashes = list(pool.map(phash_cache.phash, image_paths))
+
+    valid = [i for i, value in enumerate(phashes) if value is not None]
+    matches = defaultdict(lambda: (set(), set()))
+    for i, j in near_pairs([phashes[i] for i in valid], threshold):
+        i, j = valid[i], valid[j]
+        a, b = image_notes[i], image_notes[j]
+        if a == b:
+            continue
+        if a > b:
+            a, b, i, j = b, a, j, i
+        matches[(a, b)][0].add(i)
+        matches[(a, b)][1].add(j)
+
+    for (a, b), (images_a, images_b) in sorted(matches.items()):
+        note_a, note_b = notes[a], notes[b]
+        if note_a in published and note_b in published:
+            continue
+        matched = max(len(images_a), len(images_b))
+        ratio = min(1.0, matched / max(1, min(image_counts[a], image_counts[b])))
+        if ratio < NEAR_RATIO:
+            continue
+        # 与已发布笔记相似时标记候选笔记，否则标记排序靠后的笔记
+        if note_a in published:
+            note, other = note_b, note_a
+        elif note_b in published:
+            note, other = note_a, note_b
+        else:
+            note, other = max(note_a, note_b), min(note_a, note_b)
+        report.near.append({
+            'note': note,
+            'other': other,
+            'matched': matched,
+            'ratio': round(ratio, 2),
+            'published': other in published,
+        })
+        label = "已发布笔记" if other in published else "笔记"
+        report._flag(note, f"与{label} {other} 的 {matched} 张图片相似")
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='发布前重复内容检测')
+    parser.add_argument('notes_dir', help='笔记根目录（递归扫描）')
+    parser.add_argument('--threshold', type=int, default=DEFAULT_THRESHOLD, help='感知哈希汉明距离阈值')
+    parser.add_argument('--no-ledger', action='store_true', help='不与发布台账中的已发布笔记比较')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出结果')
+
+    args = parser.parse_args()
+
+    from note_scanner import NoteScanner
+    from publish_ledger import PublishLedger
+
+    if not os.path.isdir(args.notes_dir):
+        print(f"[ERROR] Directory not found: {args.notes_dir}")
+        sys.exit(1)
+
+    note_dirs = [note.path for note in NoteScanner().scan(args.notes_dir)]
+    ledger = None if args.no_ledger else PublishLedger()
+    report = find_duplicates(note_dirs, ledger=ledger, threshold=args.threshold, roots=[args.notes_dir])
+
+    if args.json:
+        print(json.dumps(report.to_dict(), ensure_ascii=False, indent=2))
+        return
+
+    print(f"[INFO] Notes: {len(note_dirs)}")
+    if not report.phash_available:
+        print("[WARN] Pillow not installed, only exact duplicates are checked (pip install pillow)")
+    for group in report.exact:
+        print(f"[EXACT] {group[0]}")
+        for note_dir in group[1:]:
+            print(f"        = {note_dir}")
+    for item in report.near:
+        tag = ' (published)' if item['published'] else ''
+        print(f"[NEAR]  {item['note']}")
+        print(f"        ~ {item['other']}{tag}: {item['matched']} images, ratio {item['ratio']}")
+    print(f"[INFO] Duplicates: {len(report.duplicates)}")
+
+
+if __name__ == '__main__':
+    main()
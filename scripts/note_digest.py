@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+笔记内容标识模块
+以封面、内容卡片和 metadata.json 的字节内容计算笔记标识，替代 "绝对路径 + 封面修改时间"
+
+特性:
+1. 移动或复制笔记文件夹后标识不变，不会被当作未发布笔记重复发布
+2. 修改任一卡片或元数据后标识改变
+3. 单文件摘要按 (设备, inode, 大小, 修改时间) 缓存在 SQLite 旁路索引中，
+   文件未变化时只需一次 stat；移动文件夹（inode 不变）同样命中缓存
+4. 流式分块读取 + BLAKE2b，大文件不整体载入内存
+
+使用方法:
+    python note_digest.py <note_dir> [<note_dir> ...]
+    python note_digest.py --prune
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from note_scanner import card_sort_key
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_DIGEST_FILE = PROJECT_ROOT / '.note_digests.db'
+
+# 参与笔记标识计算的文件
+COVER_FILE = 'cover.png'
+METADATA_FILE = 'metadata.json'
+
+CHUNK_SIZE = 1024 * 1024
+DIGEST_SIZE = 16
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS digests (
+    dev INTEGER,
+    ino INTEGER,
+    size INTEGER,
+    mtime_ns INTEGER,
+    key_path TEXT,
+    path TEXT,
+    digest TEXT,
+    PRIMARY KEY (dev, ino, size, mtime_ns, key_path)
+);
+"""
+
+
+def file_digest(path):
+    """流式计算单个文件的 BLAKE2b 摘要（不使用缓存）"""
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    buf = bytearray(CHUNK_SIZE)
+    view = memoryview(buf)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+    return h.hexdigest()
+
+
+def note_files(note_dir):
+    """
+    笔记中参与标识计算的文件
+
+    Returns:
+        list: [(文件名, os.DirEntry)]，顺序为 封面、卡片（按编号）、metadata.json
+    """
+    cover = metadata = None
+    cards = []
+    try:
+        with os.scandir(note_dir) as it:
+            for entry in it:
+                name = entry.name
+                if name == COVER_FILE:
+                    cover = entry
+                elif name == METADATA_FILE:
+                    metadata = entry
+                elif name.startswith('card_') and name.endswith('.png'):
+                    cards.append(entry)
+    except OSError:
+        return []
+
+    files = [(COVER_FILE, cover)] if cover else []
+    cards.sort(key=lambda entry: card_sort_key(entry.name))
+    files.extend((entry.name, entry) for entry in cards)
+    if metadata:
+        files.append((METADATA_FILE, metadata))
+    return files
+
+
+class DigestCache:
+    """带旁路索引的文件摘要缓存（线程安全，多进程共用同一索引文件）"""
+
+    def __init__(self, db_file=DEFAULT_DIGEST_FILE):
+        self.db_file = Path(db_file)
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self.stats = {'hits': 0, 'misses': 0}
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.db_file),
+            timeout=30,
+            check_same_thread=False
+        )
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+        # 启动时一次性载入内存，之后查询不再访问数据库
+        self._memo = {
+            tuple(row[:5]): row[5]
+            for row in self._conn.execute('SELECT dev, ino, size, mtime_ns, key_path, digest FROM digests')
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def _key(path, st):
+        # 文件系统不提供 inode 时（st_ino 为 0）退回按路径缓存
+        key_path = '' if st.st_ino else os.path.abspath(path)
+        return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, key_path)
+
+    def _lookup(self, path, st, pending):
+        key = self._key(path, st)
+        with self._lock:
+            digest = self._memo.get(key)
+        if digest is not None:
+            self.stats['hits'] += 1
+            return digest
+
+        self.stats['misses'] += 1
+        digest = file_digest(path)
+        with self._lock:
+            self._memo[key] = digest
+        pending.append(key + (os.path.abspath(path), digest))
+        return digest
+
+    def _store(self, pending):
+        """新摘要写入索引（path 列只用于 prune）"""
+        if not pending:
+            return
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, ?, ?, ?)', pending
+                )
+
+    def file_digest(self, path):
+        """单个文件的摘要（文件未变化时直接使用缓存）"""
+        pending = []
+        digest = self._lookup(path, os.stat(path), pending)
+        self._store(pending)
+        return digest
+
+    def note_digest(self, note_dir):
+        """
+        笔记内容标识
+
+        对 封面、卡片、metadata.json 的 (文件名, 文件摘要) 序列再做一次摘要；
+        文件夹中没有任何内容文件时退回使用绝对路径。
+        """
+        note_dir = os.path.abspath(note_dir)
+        files = note_files(note_dir)
+        h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        if not files:
+            h.update(f"path:{note_dir}".encode('utf-8'))
+            return h.hexdigest()
+
+        pending = []
+        for name, entry in files:
+            digest = self._lookup(entry.path, entry.stat(), pending)
+            h.update(f"{name}:{digest}\n".encode('utf-8'))
+        self._store(pending)
+        return h.hexdigest()
+
+    def prune(self):
+        """删除已不存在或已修改的文件的缓存项，返回删除数量"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT dev, ino, size, mtime_ns, key_path, path FROM digests'
+            ).fetchall()
+        stale = []
+        for row in rows:
+            try:
+                st = os.stat(row[5])
+            except OSError:
+                st = None
+            if st is None or self._key(row[5], st) != tuple(row[:5]):
+                stale.append(tuple(row[:5]))
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    'DELETE FROM digests WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ? AND key_path = ?',
+                    stale
+                )
+            for key in stale:
+                self._memo.pop(key, None)
+        return len(stale)
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def default_cache():
+    """进程内共用的摘要缓存（首次使用时打开）"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = DigestCache()
+        return _default_cache
+
+
+def note_digest(note_dir):
+    """使用默认缓存计算笔记内容标识"""
+    return default_cache().note_digest(note_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='笔记内容标识')
+    parser.add_argument('note_dirs', nargs='*', help='笔记文件夹')
+    parser.add_argument('--db', type=str, help='摘要索引文件 (默认: 项目根目录 .note_digests.db)')
+    parser.add_argument('--prune', action='store_true', help='清理失效的缓存项')
+
+    args = parser.parse_args()
+
+    with DigestCache(args.db or DEFAULT_DIGEST_FILE) as cache:
+        if args.prune:
+            print(f"[INFO] Pruned {cache.prune()} stale entries")
+        for note_dir in args.note_dirs:
+            if not os.path.isdir(note_dir):
+                print(f"[ERROR] Not a directory: {note_dir}")
+                sys.exit(1)
+            print(f"{cache.note_digest(note_dir)}  {note_dir}")
+        print(f"[INFO] Cache hits: {cache.stats['hits']}, misses: {cache.stats['misses']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+笔记目录扫描模块
+递归查找包含 cover.png 的笔记文件夹，供检测和发布共用
+
+优化:
+1. 基于 os.scandir，一次目录读取同时得到子目录、封面和卡片文件
+2. 线程池按层并行扫描各子目录（网络盘上效果明显）
+3. 持久化目录索引：目录 mtime 未变化时直接使用缓存结果，
+   只需一次 stat 而不再读取目录内容
+
+使用方法:
+    python note_scanner.py <notes_dir>
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_INDEX_FILE = PROJECT_ROOT / '.note_scan_index.json'
+
+# 跳过的非笔记文件夹
+SKIP_DIRS = {'node_modules', 'venv', '.git', '.vscode', 'dist', 'build'}
+
+DEFAULT_MAX_DEPTH = 10
+DEFAULT_MAX_WORKERS = 8
+
+# 小红书最多9张图
+MAX_IMAGES = 9
+
+
+def should_skip_dir(name):
+    """跳过隐藏文件夹、系统文件夹和常见的非笔记文件夹"""
+    if name.startswith('.') or name.startswith('__'):
+        return True
+    return name.lower() in SKIP_DIRS
+
+
+def card_sort_key(name):
+    """card_10.png 排在 card_9.png 之后"""
+    stem = name[len('card_'):-len('.png')]
+    return (0, int(stem), name) if stem.isdigit() else (1, 0, name)
+
+
+class NoteDir:
+    """扫描到的笔记文件夹"""
+
+    __slots__ = ('path', 'card_files', 'depth')
+
+    def __init__(self, path, card_files, depth):
+        self.path = path
+        self.card_files = card_files
+        self.depth = depth
+
+    @property
+    def card_count(self):
+        return len(self.card_files)
+
+    @property
+    def image_count(self):
+        """可发布图片数（封面 + 卡片，最多9张）"""
+        return min(1 + self.card_count, MAX_IMAGES)
+
+    def __repr__(self):
+        return f"NoteDir({self.path!r}, cards={self.card_count})"
+
+
+class NoteScanner:
+    """带目录索引缓存的并行笔记扫描器"""
+
+    def __init__(self, index_file=DEFAULT_INDEX_FILE, max_workers=DEFAULT_MAX_WORKERS,
+                 max_depth=DEFAULT_MAX_DEPTH):
+        """
+        Args:
+            index_file: 目录索引文件，传入 None 则不持久化
+            max_workers: 并行扫描线程数
+            max_depth: 最大递归深度
+        """
+        self.index_file = Path(index_file) if index_file else None
+        self.max_workers = max_workers
+        self.max_depth = max_depth
+
+        self._index = self._load_index()
+        self._index_lock = threading.Lock()
+        self._dirty = False
+
+        # 最近一次扫描的统计和错误
+        self.errors = []
+        self.stats = {}
+        self._visited = set()
+        self._cancel_event = None
+
+    def _load_index(self):
+        """加载目录索引"""
+        if self.index_file and self.index_file.exists():
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Warning: Failed to load scan index: {e}")
+        return {}
+
+    def save_index(self):
+        """保存目录索引（先写临时文件再替换，避免中途崩溃损坏索引）"""
+        if not self.index_file or not self._dirty:
+            return
+        tmp_file = self.index_file.with_name(self.index_file.name + '.tmp')
+        try:
+            with self._index_lock:
+                data = json.dumps(self._index, ensure_ascii=False, separators=(',', ':'))
+                self._dirty = False
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_file, self.index_file)
+        except Exception as e:
+            print(f"Warning: Failed to save scan index: {e}")
+
+    def _read_dir(self, path, mtime_ns):
+        """
+        读取单个目录：返回 (是否笔记, 卡片文件列表, 子目录列表)
+
+        目录 mtime 与索引一致时直接返回缓存结果。
+        """
+        with self._index_lock:
+            self._visited.add(path)
+            cached = self._index.get(path)
+            if cached and cached[0] == mtime_ns:
+                self.stats['cached'] += 1
+                return cached[1], cached[2], cached[3]
+
+        has_cover = False
+        card_files = []
+        subdirs = []
+        with os.scandir(path) as it:
+            for entry in it:
+                name = entry.name
+                try:
+                    if entry.is_dir():
+                        if not should_skip_dir(name):
+                            subdirs.append(name)
+                    elif name == 'cover.png':
+                        has_cover = True
+                    elif name.startswith('card_') and name.endswith('.png'):
+                        card_files.append(name)
+                except OSError:
+                    continue
+
+        card_files.sort(key=card_sort_key)
+        subdirs.sort()
+
+        with self._index_lock:
+            self._index[path] = [mtime_ns, has_cover, card_files, subdirs]
+            self._dirty = True
+            self.stats['scanned'] += 1
+        return has_cover, card_files, subdirs
+
+    def _is_cancelled(self):
+        return self._cancel_event is not None and self._cancel_event.is_set()
+
+    def _visit(self, path, depth):
+        """扫描一个目录，返回 (NoteDir 或 None, 子目录列表)"""
+        if self._is_cancelled():
+            return None, []
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            has_cover, card_files, subdirs = self._read_dir(path, mtime_ns)
+        except PermissionError:
+            self.errors.append((path, 'permission denied'))
+            return None, []
+        except OSError as e:
+            self.errors.append((path, str(e)))
+            return None, []
+
+        note = NoteDir(path, card_files, depth) if has_cover else None
+        if depth >= self.max_depth:
+            return note, []
+        return note, [(os.path.join(path, name), depth + 1) for name in subdirs]
+
+    def scan(self, root_path, on_note=None, cancel_event=None):
+        """
+        递归扫描笔记目录
+
+        Args:
+            root_path: 根目录
+            on_note: 可选回调，每发现一个笔记调用一次 on_note(NoteDir)
+                （在调用 scan 的线程中执行）
+            cancel_event: 可选 threading.Event，置位后尽快停止扫描，
+                返回已发现的部分结果，stats['cancelled'] 为 True
+
+        Returns:
+            list[NoteDir]: 按路径排序的笔记列表
+        """
+        start = time.perf_counter()
+        self.errors = []
+        self.stats = {'scanned': 0, 'cached': 0, 'dirs': 0, 'cancelled': False}
+        self._visited = set()
+        self._cancel_event = cancel_event
+
+        root_path = os.path.abspath(root_path)
+        notes = []
+        frontier = [(root_path, 0)]
+
+        # 按层并行：同一层的目录交给线程池同时读取
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while frontier:
+                if self._is_cancelled():
+                    self.stats['cancelled'] = True
+                    break
+                self.stats['dirs'] += len(frontier)
+                results = pool.map(lambda item: self._visit(*item), frontier)
+                next_frontier = []
+                for note, children in results:
+                    if note is not None:
+                        notes.append(note)
+                        if on_note:
+                            on_note(note)
+                    next_frontier.extend(children)
+                frontier = next_frontier
+
+        if self._is_cancelled():
+            self.stats['cancelled'] = True
+
+        # 取消时未访问的目录并未删除，不能清理索引
+        if not self.stats['cancelled']:
+            self._prune(root_path)
+        self.save_index()
+
+        notes.sort(key=lambda n: n.path)
+        self.stats['elapsed'] = time.perf_counter() - start
+        return notes
+
+    def indexed_notes(self, root_path):
+        """
+        只根据目录索引列出笔记（不访问文件系统），供状态查询等只读场景使用
+
+        Returns:
+            list[NoteDir] 或 None（根目录不在索引中，需要先 scan）
+        """
+        root_path = os.path.abspath(root_path)
+        with self._index_lock:
+            if root_path not in self._index:
+                return None
+            notes = []
+            stack = [(root_path, 0)]
+            while stack:
+                path, depth = stack.pop()
+                entry = self._index.get(path)
+                if entry is None:
+                    continue
+                _, has_cover, card_files, subdirs = entry
+                if has_cover:
+                    notes.append(NoteDir(path, card_files, depth))
+                if depth < self.max_depth:
+                    stack.extend((os.path.join(path, name), depth + 1) for name in subdirs)
+        notes.sort(key=lambda n: n.path)
+        return notes
+
+    def _prune(self, root_path):
+        """删除索引中该根目录下本次未访问到的目录（已删除或被移走）"""
+        prefix = root_path.rstrip(os.sep) + os.sep
+        with self._index_lock:
+            stale = [
+                path for path in self._index
+                if path.startswith(prefix) and path not in self._visited
+            ]
+            for path in stale:
+                del self._index[path]
+            if stale:
+                self._dirty = True
+
+
+def find_note_dirs(root_path, index_file=DEFAULT_INDEX_FILE, max_depth=DEFAULT_MAX_DEPTH):
+    """便捷函数：返回笔记目录路径列表"""
+    scanner = NoteScanner(index_file=index_file, max_depth=max_depth)
+    return [note.path for note in scanner.scan(root_path)]
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python note_scanner.py <notes_dir>")
+        sys.exit(1)
+
+    root_path = sys.argv[1]
+    if not os.path.isdir(root_path):
+        print(f"[ERROR] Directory not found: {root_path}")
+        sys.exit(1)
+
+    scanner = NoteScanner()
+    notes = scanner.scan(root_path)
+
+    for i, note in enumerate(notes, 1):
+        rel_path = os.path.relpath(note.path, root_path)
+        print(f"  [{i:02d}] {rel_path} ({note.image_count} images)")
+    for path, error in scanner.errors:
+        print(f"  [SKIP] {path}: {error}")
+
+    stats = scanner.stats
+    print(f"\n[INFO] Found {len(notes)} notes in {stats['elapsed']:.2f}s "
+          f"(dirs: {stats['dirs']}, read: {stats['scanned']}, cached: {stats['cached']})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可选性能分析
+批量渲染/发布变慢时不用改脚本：加 --profile-out 目录（或设置环境变量 XHS_PROFILE）即可
+记录一次运行的性能数据，不指定时没有任何开销
+
+每次运行输出（文件名前缀 <脚本名>-<时间>-<pid>）:
+1. .pstats      主线程的 cProfile 结果，可用 python -m pstats 或 snakeviz 查看
+2. .collapsed   所有线程的采样调用栈（默认每 10ms 一次，墙钟时间，包含等待），
+               每行 "线程;函数;函数 次数"，可直接交给 flamegraph.pl 或 speedscope 生成火焰图
+3. -memory.txt  tracemalloc 内存增长记录（GUI 默认开启，其它入口设置 XHS_PROFILE_MEMORY=1），
+               每隔 memory_interval 秒写一次相对启动时增长最多的代码行；
+               结束时另存 .snapshot，可用 tracemalloc.Snapshot.load() 进一步比较
+
+使用方法:
+    python render_xhs_v2.py note.md --profile-out profiles
+    XHS_PROFILE=profiles python batch_publish_v2.py --path D:\\notes
+    python publish_gui_v3_fixed.py --profile-out profiles
+    python -m pstats profiles/render_xhs_v2-20260101_120000-1234.pstats
+"""
+
+import cProfile
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+
+ENV_VAR = 'XHS_PROFILE'
+MEMORY_ENV_VAR = 'XHS_PROFILE_MEMORY'
+
+DEFAULT_SAMPLE_INTERVAL = 0.01
+DEFAULT_MEMORY_INTERVAL = 300
+# tracemalloc 记录的调用栈深度
+MEMORY_FRAMES = 10
+MEMORY_TOP = 25
+
+
+class StackSampler:
+    """后台线程定期采样所有线程的调用栈，汇总为 collapsed stack 格式"""
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = 0
+        self._stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self._stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write_collapsed(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class MemoryTracker:
+    """tracemalloc 定期记录相对启动时的内存增长"""
+
+    def __init__(self, report_path, interval=DEFAULT_MEMORY_INTERVAL):
+        self.report_path = report_path
+        self.interval = interval
+        self._baseline = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._started_tracing = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(MEMORY_FRAMES)
+            self._started_tracing = True
+        self._baseline = tracemalloc.take_snapshot()
+        self._thread = threading.Thread(target=self._run, name='profile-memory', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def report(self):
+        """写一次增长最多的代码行，返回当前快照"""
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        stats = snapshot.compare_to(self._baseline, 'lineno')
+        with open(self.report_path, 'a', encoding='utf-8') as f:
+            f.write(f"== {datetime.now().isoformat(timespec='seconds')} "
+                    f"traced {current / 1024 / 1024:.1f} MB, peak {peak / 1024 / 1024:.1f} MB\n")
+            for stat in stats[:MEMORY_TOP]:
+                f.write(f"{stat}\n")
+            f.write("\n")
+        return snapshot
+
+    def stop(self, snapshot_path):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.report().dump(str(snapshot_path))
+        if self._started_tracing:
+            tracemalloc.stop()
+
+
+class Profiler:
+    """一次运行的性能分析：cProfile（当前线程）+ 调用栈采样（所有线程）+ 可选内存跟踪"""
+
+    def __init__(self, out_dir, name, memory=False, sample_interval=DEFAULT_SAMPLE_INTERVAL,
+                 memory_interval=DEFAULT_MEMORY_INTERVAL):
+        self.out_dir = Path(out_dir)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.prefix = self.out_dir / f"{name}-{stamp}-{os.getpid()}"
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(sample_interval)
+        self.memory = MemoryTracker(self._path('-memory.txt'), memory_interval) if memory else None
+        self._start = None
+
+    def _path(self, suffix):
+        return self.prefix.with_name(self.prefix.name + suffix)
+
+    def start(self):
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        if self.memory is not None:
+            self.memory.start()
+        self.sampler.start()
+        self._start = time.perf_counter()
+        self.profile.enable()
+
+    def stop(self):
+        """停止分析并写出文件，返回输出文件列表"""
+        self.profile.disable()
+        elapsed = time.perf_counter() - self._start
+        self.sampler.stop()
+
+        outputs = [self._path('.pstats'), self._path('.collapsed')]
+        self.profile.dump_stats(str(outputs[0]))
+        self.sampler.write_collapsed(outputs[1])
+        if self.memory is not None:
+            snapshot_path = self._path('.snapshot')
+            self.memory.stop(snapshot_path)
+            outputs += [self.memory.report_path, snapshot_path]
+        print(f"[INFO] Profiled {elapsed:.1f}s ({self.sampler.samples} samples), written to:")
+        for path in outputs:
+            print(f"  {path}")
+        return outputs
+
+
+def profile_target(out_dir=None):
+    """--profile-out 参数优先，其次环境变量 XHS_PROFILE；都没有时返回 None"""
+    return out_dir or os.environ.get(ENV_VAR, '').strip() or None
+
+
+@contextmanager
+def profiled(name, out_dir=None, memory=False):
+    """
+    在 with 块内进行性能分析（未开启时不做任何事）
+
+    Args:
+        name: 输出文件名前缀，一般为脚本名
+        out_dir: 输出目录，None 时读取环境变量 XHS_PROFILE
+        memory: 是否跟踪内存增长（环境变量 XHS_PROFILE_MEMORY=1 也会开启）
+    """
+    out_dir = profile_target(out_dir)
+    if not out_dir:
+        yield None
+        return
+    memory = memory or os.environ.get(MEMORY_ENV_VAR, '').strip() in ('1', 'true', 'yes')
+    profiler = Profiler(out_dir, name, memory=memory)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+
+
+def add_profile_argument(parser):
+    """给入口脚本的 argparse 加上 --profile-out"""
+    parser.add_argument('--profile-out', type=str, metavar='DIR',
+                        help=f'性能分析输出目录（也可设置环境变量 {ENV_VAR}）')
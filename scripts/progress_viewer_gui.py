@@ -2,22 +2,50 @@
 # -*- coding: utf-8 -*-
 """
 小红书笔记发布进度查看器 - GUI版本
+
+默认读取发布台账 (publish_records.db)，也可以指定旧版 publish_records.json。
+自动刷新先检查记录文件是否变化，未变化时跳过；表格分页显示（见 record_table），
+只查询和创建当前页的行，记录很多时也不会卡顿。
+
+使用方法:
+    python progress_viewer_gui.py
+    python progress_viewer_gui.py --db ../publish_records.db
+    python progress_viewer_gui.py --json ../publish_records.json
+    python progress_viewer_gui.py --profile-out profiles
 """
 
-import json
-import os
+import argparse
 import sys
 import tkinter as tk
-from tkinter import ttk, scrolledtext
-from datetime import datetime
+from datetime import datetime, date
 from pathlib import Path
 import webbrowser
 
+# 导入同目录下的共享模块
+SCRIPT_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from profiling import add_profile_argument, profiled
+from publish_ledger import PublishLedger
+from record_feed import JsonRecordFeed, LedgerFeed
+from record_table import RecordTable
+
+
+# 自动刷新间隔（毫秒）
+REFRESH_INTERVAL_MS = 5000
+
 
 class ProgressViewer:
-    def __init__(self):
-        self.record_file = Path(r"D:\20260127XHS\Auto-Redbook-Skills-main\publish_records.json")
-        self.notes_dir = Path(r"D:\jieyue_work\drivingschool_notes")
+    def __init__(self, db_file=None, json_file=None):
+        if json_file:
+            # 旧版 JSON 记录导入内存台账，与台账共用同一个表格
+            self.ledger = PublishLedger(':memory:')
+            self.json_feed = JsonRecordFeed(json_file)
+            self.feed = None
+        else:
+            self.ledger = PublishLedger(db_file)
+            self.json_feed = None
+            self.feed = LedgerFeed(self.ledger)
         
         # 创建主窗口
         self.root = tk.Tk()
@@ -25,7 +53,6 @@ class ProgressViewer:
         self.root.geometry("1000x700")
         
         self.setup_ui()
-        self.refresh_data()
         
         # 自动刷新
         self.auto_refresh()
@@ -77,32 +104,8 @@ class ProgressViewer:
             anchor='w'
         ).pack(fill=tk.X)
         
-        # 创建表格
-        columns = ('序号', '笔记名称', '标题', '发布时间', '操作')
-        self.tree = ttk.Treeview(list_frame, columns=columns, show='headings', height=15)
-        
-        # 设置列
-        self.tree.heading('序号', text='序号')
-        self.tree.heading('笔记名称', text='笔记名称')
-        self.tree.heading('标题', text='标题')
-        self.tree.heading('发布时间', text='发布时间')
-        self.tree.heading('操作', text='操作')
-        
-        self.tree.column('序号', width=50, anchor='center')
-        self.tree.column('笔记名称', width=100, anchor='center')
-        self.tree.column('标题', width=300, anchor='w')
-        self.tree.column('发布时间', width=150, anchor='center')
-        self.tree.column('操作', width=100, anchor='center')
-        
-        # 滚动条
-        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscroll=scrollbar.set)
-        
-        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        # 绑定双击事件
-        self.tree.bind('<Double-1>', self.on_double_click)
+        self.table = RecordTable(list_frame, self.ledger)
+        self.table.pack(fill=tk.BOTH, expand=True)
         
         # 按钮区域
         button_frame = tk.Frame(self.root, padx=20, pady=15)
@@ -114,7 +117,7 @@ class ProgressViewer:
             font=("Microsoft YaHei", 10),
             width=12,
             height=2,
-            command=self.refresh_data
+            command=lambda: self.refresh_data(force=True)
         ).pack(side=tk.LEFT, padx=5)
         
         tk.Button(
@@ -135,72 +138,70 @@ class ProgressViewer:
             command=self.root.quit
         ).pack(side=tk.RIGHT, padx=5)
         
-    def refresh_data(self):
-        """刷新数据"""
-        # 清空表格
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
+    def refresh_data(self, force=False):
+        """刷新数据（记录文件未变化时跳过，变化时只重新查询当前页）"""
         # 更新时间
         self.time_label.config(
             text=f"最后更新: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
         )
         
-        # 读取发布记录
-        if self.record_file.exists():
-            try:
-                with open(self.record_file, 'r', encoding='utf-8') as f:
-                    records = json.load(f)
-                
-                published_count = len(records)
-                self.progress_label.config(
-                    text=f"已发布: {published_count} / 10 篇"
-                )
-                
-                # 添加到表格
-                for idx, (note_name, info) in enumerate(sorted(records.items()), 1):
-                    title = info.get('title', 'Unknown')
-                    published_at = info.get('published_at', '')
-                    if published_at:
-                        try:
-                            dt = datetime.fromisoformat(published_at)
-                            published_at = dt.strftime('%Y-%m-%d %H:%M')
-                        except:
-                            pass
-                    
-                    self.tree.insert('', tk.END, values=(
-                        idx,
-                        note_name,
-                        title,
-                        published_at,
-                        '查看笔记'
-                    ), tags=(info.get('url', ''),))
-                
-            except Exception as e:
-                self.progress_label.config(text=f"读取记录失败: {e}")
-        else:
-            self.progress_label.config(text="暂无发布记录")
+        try:
+            if self.json_feed is not None:
+                if not self.load_json_changes(force):
+                    return
+            elif not self.feed.changed() and not force:
+                return
+            self.table.refresh()
+        except Exception as e:
+            self.progress_label.config(text=f"读取记录失败: {e}")
+            return
+        
+        self.update_progress()
     
-    def on_double_click(self, event):
-        """双击打开笔记链接"""
-        item = self.tree.selection()[0]
-        url = self.tree.item(item, 'tags')[0]
-        if url:
-            webbrowser.open(url)
+    def load_json_changes(self, force=False):
+        """把旧版 JSON 中新增或变化的记录写入内存台账，无变化返回 False"""
+        changes = self.json_feed.poll(force=force)
+        if changes is None:
+            return False
+        reset, records = changes
+        if reset:
+            self.ledger.close()
+            self.ledger = PublishLedger(':memory:')
+            self.table.ledger = self.ledger
+        for record in records:
+            self.ledger.add(record)
+        return True
+    
+    def update_progress(self):
+        """更新发布数量"""
+        total = self.ledger.count()
+        if not total:
+            self.progress_label.config(text="暂无发布记录")
+        else:
+            today = self.ledger.count_since(date.today())
+            self.progress_label.config(text=f"已发布: {total} 篇 | 今日 {today} 篇")
     
     def auto_refresh(self):
         """自动刷新"""
         self.refresh_data()
-        self.root.after(5000, self.auto_refresh)  # 每5秒刷新一次
+        self.root.after(REFRESH_INTERVAL_MS, self.auto_refresh)
     
     def run(self):
         """运行GUI"""
         self.root.mainloop()
+        self.ledger.close()
 
 
 def main():
-    app = ProgressViewer()
-    app.run()
+    parser = argparse.ArgumentParser(description='小红书笔记发布进度查看器')
+    parser.add_argument('--db', type=str, help='台账文件路径 (默认: 项目根目录 publish_records.db)')
+    parser.add_argument('--json', type=str, help='改为读取旧版 publish_records.json')
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with profiled('progress_viewer_gui', args.profile_out, memory=True):
+        app = ProgressViewer(db_file=args.db, json_file=args.json)
+        app.run()
 
 
 if __name__ == '__main__':
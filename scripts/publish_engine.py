@@ -0,0 +1,723 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+无界面发布引擎
+原 GUI V3 publish_task 中的发布逻辑，不依赖 Tk，可在无显示器的服务器上常驻运行
+
+特性:
+1. 笔记文件夹随时入队，后台工作线程按发布间隔依次发布，队列空时空闲等待
+2. 暂停 / 继续 / 停止由 PublishScheduler 事件唤醒，立即生效
+3. 日志、进度、单篇结果以事件形式写入 EventBus，
+   本地 GUI 或 HTTP 客户端按序号增量拉取（见 publish_service.py）
+4. 发布记录、持久化队列、重试熔断、跨进程限流与 GUI V3 共用
+
+使用方法:
+    engine = PublishEngine(wait_minutes=20)
+    engine.enqueue(['/path/to/notes'])
+    for event in engine.events(since=0, timeout=30):
+        print(event)
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+from event_log import error_fields, get_logger, total_size
+from image_preflight import default_preflight
+from note_catalog import default_catalog
+from note_dedup import find_duplicates
+from note_scanner import NoteScanner
+from publish_ledger import PublishLedger, note_hash
+from publish_queue import PublishQueue
+from publish_scheduler import PublishScheduler
+from rate_limiter import RateLimiter, account_key
+from xhs_credentials import CredentialStore, LoginError, default_store, user_from_info
+from xhs_resilience import ApiGuard, AuthError, CircuitOpenError
+import xhs_api
+
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# 事件缓冲区保留的最近事件数
+DEFAULT_MAX_EVENTS = 5000
+
+# 入队时的重复内容检测：off 不检测，flag 只记录日志，skip 不发布重复笔记
+DEDUP_MODES = ('off', 'flag', 'skip')
+
+
+class EngineError(Exception):
+    """发布任务无法开始（Cookie 缺失、客户端创建失败、登录失效）"""
+
+    def __init__(self, message, kind='fatal'):
+        super().__init__(message)
+        self.kind = kind
+
+
+class PublishRecordManager:
+    """发布记录管理器（SQLite 台账存储）"""
+
+    def __init__(self, record_file=None, digest_cache=None):
+        if record_file is None:
+            # 默认台账文件位置
+            self.record_file = PROJECT_ROOT / 'publish_records.db'
+        else:
+            self.record_file = Path(record_file)
+
+        self.ledger = PublishLedger(self.record_file, digest_cache=digest_cache)
+
+        # 首次使用时导入旧版 publish_records.json
+        imported = self.ledger.migrate_legacy(self.record_file.with_suffix('.json'))
+        if imported:
+            print(f"Imported {imported} legacy records into {self.record_file}")
+
+    def get_note_hash(self, note_dir):
+        """计算笔记的唯一标识（基于封面、卡片和元数据内容）"""
+        return note_hash(note_dir, self.ledger.digest_cache)
+
+    def is_published(self, note_dir):
+        """检查笔记是否已发布（兼容旧版标识的记录）"""
+        return self.ledger.find_note(note_dir) is not None
+
+    def add_record(self, note_dir, title, note_id_xhs, link, account=None):
+        """添加发布记录（account 为发布账号的昵称）"""
+        note_hash = self.get_note_hash(note_dir)
+
+        record = {
+            'note_dir': str(Path(note_dir).absolute()),
+            'note_name': os.path.basename(note_dir),
+            'title': title,
+            'note_id_xhs': note_id_xhs,
+            'link': link,
+            'published_at': datetime.now().isoformat(),
+            'hash': note_hash,
+            'account': account,
+        }
+
+        # 同时在笔记目录创建标记文件
+        self.create_marker_file(note_dir, record)
+
+        try:
+            return self.ledger.add(record)
+        except Exception as e:
+            print(f"Error: Failed to save record: {e}")
+            return False
+
+    def create_marker_file(self, note_dir, record):
+        """在笔记目录创建发布标记文件"""
+        marker_file = Path(note_dir) / '.published'
+
+        try:
+            with open(marker_file, 'w', encoding='utf-8') as f:
+                json.dump(record, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"Warning: Failed to create marker file: {e}")
+
+    def get_record(self, note_dir):
+        """获取笔记的发布记录"""
+        return self.ledger.find_note(note_dir)
+
+    def get_all_records(self):
+        """获取所有发布记录（按发布时间倒序）"""
+        return self.ledger.all_records()
+
+    def get_statistics(self):
+        """获取统计信息"""
+        today = datetime.now().date()
+
+        return {
+            'total': self.ledger.count(),
+            'today': self.ledger.count_since(today)
+        }
+
+
+class EventBus:
+    """
+    带序号的事件环形缓冲区（线程安全）
+
+    每个事件是一个 dict: {'seq': 序号, 'time': 时间戳, 'type': 类型, ...}
+    读取方记住最后一个 seq，用 since() 增量拉取，无新事件时阻塞等待
+    """
+
+    def __init__(self, max_events=DEFAULT_MAX_EVENTS):
+        self._events = deque(maxlen=max_events)
+        self._cond = threading.Condition()
+        self._seq = 0
+
+    @property
+    def last_seq(self):
+        return self._seq
+
+    def emit(self, type, **fields):
+        with self._cond:
+            self._seq += 1
+            event = {'seq': self._seq, 'time': time.time(), 'type': type}
+            event.update(fields)
+            self._events.append(event)
+            self._cond.notify_all()
+            return event
+
+    def since(self, seq=0, timeout=0):
+        """
+        返回序号大于 seq 的事件
+
+        Args:
+            seq: 已读取的最后一个事件序号
+            timeout: 没有新事件时最多等待的秒数
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._seq <= seq:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._cond.wait(remaining)
+            return [event for event in self._events if event['seq'] > seq]
+
+
+def load_cookie(env_file=None):
+    """从 .env 文件加载 Cookie（.env 未变化时使用缓存）"""
+    store = CredentialStore(env_file) if env_file else default_store()
+    return store.cookie()
+
+
+def create_xhs_client():
+    """
+    默认客户端工厂：用 .env 中的 Cookie 创建 XhsClient
+
+    Returns:
+        tuple: (client, 账号标识)
+    """
+    try:
+        from xhs import XhsClient
+        from xhs.help import sign as local_sign
+    except ImportError:
+        raise EngineError("未安装 xhs 库，请运行: pip install xhs", kind='client')
+
+    cookie = load_cookie()
+    if not cookie:
+        raise EngineError("未找到 Cookie，请先运行: python scripts/login_xhs.py", kind='cookie')
+
+    def sign_func(uri, data=None, a1="", web_session=""):
+        return local_sign(uri, data, a1=a1)
+
+    try:
+        client = XhsClient(cookie=cookie, sign=sign_func)
+    except Exception as e:
+        raise EngineError(f"客户端创建失败: {e}", kind='client')
+    return client, account_key(cookie)
+
+
+class PublishEngine:
+    """后台线程逐篇发布入队笔记的发布引擎"""
+
+    def __init__(self, wait_minutes=20, client_factory=create_xhs_client, record_manager=None,
+                 publish_queue=None, guard=None, scheduler=None, scanner=None, events=None,
+                 log=None, dedup='flag', catalog=None, preflight=None, credentials=None,
+                 event_log=None, digest_cache=None):
+        """
+        Args:
+            wait_minutes: 相邻两篇笔记的发布间隔（分钟）
+            client_factory: 无参函数，返回 (client, 账号标识)，失败时抛出 EngineError
+            record_manager: 发布记录，默认 PublishRecordManager()
+            publish_queue: 持久化发布队列，默认 PublishQueue()
+            guard: ApiGuard，默认带跨进程限流，等待可被 stop() 打断
+            scheduler: PublishScheduler
+            scanner: 入队文件夹时使用的 NoteScanner
+            events: EventBus
+            log: 额外的日志输出函数（如守护进程写标准输出）
+            dedup: 重复内容检测方式，见 DEDUP_MODES
+            catalog: 笔记信息目录（与界面检测共用时不再重复读取），默认进程内共用目录
+            preflight: 上传前图片预检，默认进程内共用的 ImagePreflight
+            credentials: 登录验证结果缓存（CredentialStore）；使用默认客户端工厂时
+                默认为项目 .env 的共用缓存，自定义工厂时默认不缓存
+            event_log: 结构化事件日志（event_log.EventLogger），默认写入共用的事件日志
+            digest_cache: 重复内容检测和默认发布记录使用的 DigestCache，默认进程内共用缓存
+        """
+        if dedup not in DEDUP_MODES:
+            raise ValueError(f"dedup must be one of {DEDUP_MODES}")
+        self.dedup = dedup
+        self.client_factory = client_factory
+        self.record_manager = record_manager or PublishRecordManager(digest_cache=digest_cache)
+        self.digest_cache = digest_cache
+        self.publish_queue = publish_queue or PublishQueue()
+        self.scheduler = scheduler or PublishScheduler()
+        self.scheduler.interval = wait_minutes * 60
+        self.scanner = scanner or NoteScanner()
+        self.catalog = catalog or default_catalog()
+        self.preflight = preflight or default_preflight()
+        if credentials is None and client_factory is create_xhs_client:
+            credentials = default_store()
+        self.credentials = credentials
+        self.bus = events or EventBus()
+        self.event_log = event_log or get_logger('engine')
+        self._log = log
+        # API 调用重试、熔断与跨进程限流；熔断/限流等待可被停止打断
+        self.guard = guard or ApiGuard(
+            log=self.log,
+            sleep=self.scheduler.sleep,
+            should_stop=lambda: self.scheduler.stopped,
+            limiter=RateLimiter(),
+            events=self.event_log
+        )
+
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._pending_set = set()
+        self._worker = None
+        self._active = False
+        self._closed = False
+
+        self.current = None
+        # 重新登录后置位，工作线程在下一篇笔记前重新创建客户端
+        self._reconnect = False
+        self._note_start = time.perf_counter()
+        # 当前登录账号的昵称，写入发布记录供按账号筛选
+        self.account_name = None
+        self.stats = self._new_stats()
+
+    @staticmethod
+    def _new_stats():
+        return {'done': 0, 'published': 0, 'failed': 0, 'skipped': 0}
+
+    # ---------- 事件 ----------
+
+    def log(self, message):
+        self.bus.emit('log', message=message)
+        if self._log:
+            self._log(message)
+
+    def events(self, since=0, timeout=0):
+        """增量读取事件，参见 EventBus.since"""
+        return self.bus.since(since, timeout)
+
+    def _emit_state(self):
+        self.bus.emit('state', **self.status())
+
+    # ---------- 状态 ----------
+
+    @property
+    def running(self):
+        return self._active
+
+    @property
+    def wait_minutes(self):
+        return self.scheduler.interval / 60
+
+    @wait_minutes.setter
+    def wait_minutes(self, minutes):
+        self.scheduler.interval = minutes * 60
+
+    def status(self):
+        with self._lock:
+            pending = list(self._pending)
+        if not self.running:
+            state = 'idle'
+        elif self.scheduler.stopped:
+            state = 'stopping'
+        elif self.scheduler.paused:
+            state = 'paused'
+        else:
+            state = 'running'
+        return {
+            'state': state,
+            'current': self.current,
+            'pending': len(pending),
+            'wait_minutes': self.wait_minutes,
+            'stats': dict(self.stats),
+            'records': self.record_manager.get_statistics(),
+            'last_seq': self.bus.last_seq,
+        }
+
+    # ---------- 控制 ----------
+
+    def enqueue(self, paths, wait_minutes=None):
+        """
+        加入待发布笔记
+
+        Args:
+            paths: 笔记文件夹或包含笔记的上级文件夹（递归扫描）
+            wait_minutes: 同时修改发布间隔
+
+        Returns:
+            dict: {'added': 新加入数, 'published': 已发布跳过数, 'duplicate': 已在队列中数,
+                   'similar': 重复内容检测发现的重复笔记数, 'missing': 不存在的路径}
+        """
+        if self._closed:
+            raise EngineError("引擎已关闭")
+        if isinstance(paths, (str, os.PathLike)):
+            paths = [paths]
+        if self.scheduler.stopped:
+            # 等上一个任务退出，避免新笔记被它清空
+            self.join()
+        if wait_minutes is not None:
+            self.wait_minutes = wait_minutes
+
+        result = {'added': 0, 'published': 0, 'duplicate': 0, 'similar': 0, 'missing': []}
+        note_dirs = []
+        for path in paths:
+            path = os.path.abspath(path)
+            if not os.path.isdir(path):
+                result['missing'].append(path)
+            elif os.path.exists(os.path.join(path, 'cover.png')):
+                note_dirs.append(path)
+            else:
+                note_dirs.extend(note.path for note in self.scanner.scan(path))
+
+        unpublished = []
+        for note_dir in note_dirs:
+            if self.record_manager.is_published(note_dir):
+                result['published'] += 1
+            else:
+                unpublished.append(note_dir)
+
+        similar = self._check_duplicates(unpublished)
+        result['similar'] = len(similar)
+        if self.dedup == 'skip':
+            unpublished = [note_dir for note_dir in unpublished if note_dir not in similar]
+
+        added = []
+        for note_dir in unpublished:
+            with self._lock:
+                if note_dir in self._pending_set or note_dir == self.current:
+                    result['duplicate'] += 1
+                    continue
+                self._pending.append(note_dir)
+                self._pending_set.add(note_dir)
+            added.append(note_dir)
+        result['added'] = len(added)
+
+        if added:
+            self.log(f"已加入 {len(added)} 个笔记 (已发布跳过 {result['published']} 个, "
+                     f"已在队列 {result['duplicate']} 个)")
+            self._ensure_worker()
+        self._emit_state()
+        return result
+
+    def _check_duplicates(self, note_dirs):
+        """重复内容检测（候选笔记之间及与已发布笔记），返回 {笔记: 原因}"""
+        if self.dedup == 'off' or not note_dirs:
+            return {}
+        report = find_duplicates(note_dirs, ledger=self.record_manager.ledger,
+                                 digest_cache=self.digest_cache)
+        action = "跳过" if self.dedup == 'skip' else "请确认"
+        for note_dir, reason in report.duplicates.items():
+            self.log(f"⚠️ 疑似重复笔记（{action}）: {note_dir}")
+            self.log(f"     {reason}")
+            self.bus.emit('duplicate', note_dir=note_dir, reason=reason, skipped=self.dedup == 'skip')
+        return report.duplicates
+
+    def pause(self):
+        self.scheduler.pause()
+        self.log("任务已暂停")
+        self._emit_state()
+
+    def resume(self):
+        self.scheduler.resume()
+        self.log("任务已继续")
+        self._emit_state()
+
+    def renew_session(self):
+        """
+        重新登录后调用：正在运行的任务在下一篇笔记前用新 Cookie 重新创建客户端
+        （同时重置熔断器），暂停中的任务继续
+        """
+        self._reconnect = True
+        if self.scheduler.paused:
+            self.resume()
+
+    def stop(self):
+        """停止当前任务并清空待发布笔记（正在等待的发布立即取消）"""
+        with self._lock:
+            dropped = len(self._pending)
+            self._pending.clear()
+            self._pending_set.clear()
+        self.scheduler.stop()
+        if self.running:
+            self.log(f"任务已停止 (取消 {dropped} 个待发布笔记)")
+        self._emit_state()
+
+    def join(self, timeout=None):
+        """等待当前任务结束"""
+        worker = self._worker
+        if worker and worker is not threading.current_thread():
+            worker.join(timeout)
+        return not self.running
+
+    def close(self):
+        self._closed = True
+        self.stop()
+        self.join(10)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ---------- 工作线程 ----------
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._active:
+                return
+            # 上一次任务被停止后重新开始（保留发布间隔）
+            if self.scheduler.stopped:
+                self.scheduler.reset()
+            self.stats = self._new_stats()
+            self._active = True
+            self._worker = threading.Thread(target=self._run, name='publish-engine', daemon=True)
+            self._worker.start()
+
+    def _next_note(self):
+        with self._lock:
+            if not self._pending:
+                self.current = None
+                return None
+            note_dir = self._pending.popleft()
+            self._pending_set.discard(note_dir)
+            self.current = note_dir
+            return note_dir
+
+    def _run(self):
+        self.log("=" * 60)
+        self.log("开始批量发布任务")
+        self.log("=" * 60)
+        stopped = False
+        try:
+            self._reconnect = False
+            client = self._connect()
+            while True:
+                if not self.scheduler.wait_if_paused():
+                    stopped = True
+                    break
+                if self._reconnect:
+                    self._reconnect = False
+                    client = self._connect()
+                note_dir = self._next_note()
+                if note_dir is None:
+                    break
+                try:
+                    status = self._publish_one(client, note_dir)
+                except CircuitOpenError as e:
+                    # 登录失效或熔断等待被中止：请求未发出，停止整个任务
+                    if isinstance(e, AuthError) and self.credentials is not None:
+                        self.credentials.invalidate()
+                    self.publish_queue.clear_create_attempt(note_dir)
+                    self.publish_queue.record_error(note_dir, e)
+                    self.log(f"  ⛔ 账号已暂停，停止发布: {str(e)}")
+                    self._note_done(note_dir, 'failed', exc=e, error=str(e))
+                    if not self.scheduler.stopped:
+                        self.bus.emit('error', kind='paused', message=str(e))
+                    stopped = True
+                    break
+                except Exception as e:
+                    self.log(f"  ❌ 发布异常: {str(e)}")
+                    self.publish_queue.record_error(note_dir, e)
+                    status = 'failed'
+                    self._note_done(note_dir, status, exc=e, error=str(e))
+                if status == 'stopped':
+                    stopped = True
+                    break
+        except EngineError as e:
+            self.log(f"❌ {e}")
+            self.bus.emit('error', kind=e.kind, message=str(e))
+            stopped = True
+        except Exception as e:
+            self.log(f"❌ 任务异常: {str(e)}")
+            self.bus.emit('error', kind='fatal', message=str(e))
+            stopped = True
+        finally:
+            stats = dict(self.stats)
+            with self._lock:
+                if stopped:
+                    self._pending.clear()
+                    self._pending_set.clear()
+                self.current = None
+                self._active = False
+            self.log("")
+            self.log("=" * 60)
+            self.log("发布任务完成!" if not stopped else "发布任务已结束")
+            self.log(f"成功: {stats['published']} 篇")
+            self.log(f"失败: {stats['failed']} 篇")
+            self.log("=" * 60)
+            self.bus.emit('done', stopped=stopped, **stats)
+            self._emit_state()
+
+    def _connect(self):
+        """创建客户端并验证登录，失败抛出 EngineError"""
+        self.log("正在创建小红书客户端...")
+        client, account = self.client_factory()
+        self.guard.breaker.reset()
+        self.guard.account = account
+        self.log("✅ 客户端创建成功")
+
+        ok, message = self.verify_login(client)
+        if not ok:
+            raise EngineError(f"Cookie验证失败: {message}，请重新运行 python scripts/login_xhs.py",
+                              kind='login')
+        self.account_name = message if message != "未知用户" else None
+        return client
+
+    def verify_login(self, client):
+        """验证登录状态，返回 (是否成功, 昵称或错误信息)；有效期内的验证结果直接使用缓存"""
+        def check():
+            return user_from_info(self.guard.get_self_info(client))
+
+        try:
+            self.log("正在验证登录状态...")
+            if self.credentials is not None:
+                record, cached = self.credentials.validate(check)
+                nickname = record['nickname']
+            else:
+                (_, nickname), cached = check(), False
+
+            if cached:
+                self.log(f"✅ 登录状态有效（最近已验证，跳过在线检查）当前用户: {nickname or '未知用户'}")
+                return True, nickname or "未知用户"
+            if nickname:
+                self.log(f"✅ 登录验证成功！当前用户: {nickname}")
+                return True, nickname
+            self.log("警告: 无法获取用户昵称，但登录似乎成功")
+            return True, "未知用户"
+
+        except LoginError as e:
+            self.log(f"错误: Cookie已失效 - {e}")
+            return False, str(e)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            self.log(f"登录验证异常: {str(e)}")
+            return False, str(e)
+
+    def _note_done(self, note_dir, status, exc=None, **fields):
+        self.stats['done'] += 1
+        self.stats[status] += 1
+        self.bus.emit('note', note_dir=note_dir, status=status, **fields)
+
+        event = error_fields(exc) if exc is not None else {'error_msg': fields.get('error')}
+        self.event_log.emit('note', note_dir=note_dir, status=status, note_id=fields.get('note_id'),
+                            duration_ms=round((time.perf_counter() - self._note_start) * 1000, 1),
+                            **event)
+        with self._lock:
+            total = self.stats['done'] + len(self._pending)
+        self.bus.emit('progress', current=self.stats['done'], total=total)
+
+    def _save_record(self, note_dir, title, note_id):
+        link = xhs_api.note_link(note_id)
+        self.record_manager.add_record(note_dir, title, note_id, link, account=self.account_name)
+        self.publish_queue.mark_verified(note_dir)
+        self._note_done(note_dir, 'published', title=title, note_id=note_id, link=link)
+        return link
+
+    def _publish_one(self, client, note_dir):
+        """
+        发布一篇笔记
+
+        Returns:
+            str: published / failed / skipped / stopped
+        """
+        self._note_start = time.perf_counter()
+        info = self.catalog.get(note_dir)
+        title = info.title
+        desc = info.desc
+
+        self.log("")
+        self.log(f"[{self.stats['done'] + 1}] 正在发布: {note_dir}")
+
+        if self.record_manager.is_published(note_dir):
+            # 入队后被其它进程发布
+            self.log("  跳过: 已有发布记录")
+            self._note_done(note_dir, 'skipped')
+            return 'skipped'
+
+        images, messages = self.preflight.run(info.images)
+        for message in messages:
+            self.log(f"  ⚠️ {message}")
+
+        if not images:
+            self.log("  ⚠️ 跳过: 没有找到图片")
+            self._note_done(note_dir, 'failed', error='no images')
+            return 'failed'
+
+        self.log(f"  标题: {title}")
+        self.log(f"  图片: {len(images)} 张")
+
+        # 入队（已在队列中的笔记保持原有状态）
+        job = self.publish_queue.enqueue(note_dir, title=title, state='rendered')
+        if job.state == 'verified':
+            # 队列按路径记录，台账按内容标识：发布后笔记内容被修改，作为新笔记重新发布
+            self.log("  发布后内容已修改，重新发布")
+            job = self.publish_queue.reset(note_dir)
+
+        if job.needs_manual_check:
+            self.log("  ⚠️ 跳过: 上次发布请求发出后任务中断，无法确认是否已发布")
+            self.log(f"     请到创作者中心确认后运行: python scripts/publish_queue.py --reset \"{note_dir}\"")
+            self._note_done(note_dir, 'failed', error='needs manual check')
+            return 'failed'
+
+        if job.reached('created'):
+            # 上次已发布成功但记录未落盘，直接补记录，避免重复发布
+            self.log(f"  ✅ 已在上次任务中发布 (笔记ID: {job.note_id_xhs})，补写发布记录")
+            self._save_record(note_dir, title, job.note_id_xhs)
+            return 'published'
+
+        if job.state == 'uploaded':
+            image_ids = job.image_ids
+            self.log(f"  ♻️ 复用上次已上传的 {len(image_ids)} 张图片")
+        else:
+            self.log("  正在上传图片...")
+            image_ids = []
+            with self.event_log.stage('upload', note_dir=note_dir, images=len(images),
+                                      bytes=total_size(images)) as fields:
+                for img_idx, img_path in enumerate(images, 1):
+                    try:
+                        image_ids.append(self.guard.upload_image(client, img_path))
+                        self.log(f"    [{img_idx}/{len(images)}] 上传成功")
+                    except CircuitOpenError:
+                        raise
+                    except xhs_api.XhsApiError as e:
+                        self.log(f"    [{img_idx}/{len(images)}] 上传失败: {e}")
+                    except Exception as e:
+                        self.log(f"    [{img_idx}/{len(images)}] 上传异常: {str(e)}")
+                fields['uploaded'] = len(image_ids)
+
+            if not image_ids:
+                self.log("  ❌ 发布失败: 所有图片上传失败")
+                self.publish_queue.record_error(note_dir, "all uploads failed")
+                self._note_done(note_dir, 'failed', error='all uploads failed')
+                return 'failed'
+
+            self.publish_queue.mark_uploaded(note_dir, image_ids)
+
+        # 等待发布时间窗口（与上一篇间隔 wait_minutes，暂停时间不计入）
+        slot = self.scheduler.reserve_slot()
+        delay = self.scheduler.until(slot)
+        if delay > 0:
+            self.log(f"  等待 {delay / 60:.1f} 分钟后发布...")
+        if not self.scheduler.wait_until(slot):
+            return 'stopped'
+
+        self.log("  正在发布笔记...")
+        self.publish_queue.begin_create(note_dir)
+        try:
+            with self.event_log.stage('create', note_dir=note_dir) as fields:
+                note_id = self.guard.create_note(client, title, desc, image_ids)
+                fields['note_id'] = note_id
+        except xhs_api.XhsApiError as e:
+            # 平台明确返回失败，笔记未创建，可安全重试
+            self.publish_queue.clear_create_attempt(note_dir)
+            self.publish_queue.record_error(note_dir, e)
+            self.log(f"  ❌ 发布失败: {e}")
+            self._note_done(note_dir, 'failed', exc=e, title=title, error=str(e))
+            return 'failed'
+
+        self.publish_queue.mark_created(note_dir, note_id)
+        link = self._save_record(note_dir, title, note_id)
+        self.log("  ✅ 发布成功!")
+        self.log(f"  笔记ID: {note_id}")
+        self.log(f"  链接: {link}")
+        return 'published'
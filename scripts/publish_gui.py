@@ -3,10 +3,12 @@
 """
 小红书笔记批量发布 - 独立运行版本
 不依赖终端，直接在独立窗口中运行
+每篇笔记的发布耗时和结果写入结构化事件日志（见 event_log）
 """
 
 import argparse
 import glob
+import importlib.util
 import json
 import os
 import sys
@@ -19,13 +21,22 @@ from threading import Thread
 
 try:
     from dotenv import load_dotenv
-    from xhs import XhsClient
+    # xhs 导入较慢，创建客户端时才导入，窗口先显示；这里只检查是否已安装
+    if importlib.util.find_spec('xhs') is None:
+        raise ImportError("No module named 'xhs'")
 except ImportError as e:
     print(f"Missing dependency: {e}")
     print("Run: pip install xhs python-dotenv")
     input("Press Enter to exit...")
     sys.exit(1)
 
+# 导入同目录下的共享模块
+sys.path.insert(0, str(Path(__file__).parent))
+
+from event_log import error_fields, get_logger, total_size
+from gui_log import TkLogPump
+from rate_limiter import account_key, wait_for_token
+
 
 class PublishGUI:
     def __init__(self, notes_dir, start_from=1, wait_minutes=10):
@@ -34,6 +45,7 @@ class PublishGUI:
         self.wait_minutes = wait_minutes
         self.is_running = False
         self.is_paused = False
+        self.events = get_logger('gui')
         
         # 创建主窗口
         self.root = tk.Tk()
@@ -48,6 +60,9 @@ class PublishGUI:
         
         self.setup_ui()
         
+        # 日志泵：控件保留最近日志，完整日志写入 logs/ 目录
+        self.log_pump = TkLogPump(self.root, self.log_text)
+        
     def setup_ui(self):
         """设置界面"""
         # 标题
@@ -165,9 +180,8 @@ class PublishGUI:
         timestamp = datetime.now().strftime('%H:%M:%S')
         log_message = f"[{timestamp}] {message}\n"
         
-        self.log_text.insert(tk.END, log_message)
-        self.log_text.see(tk.END)
-        self.root.update()
+        # 只放入队列，由主线程批量刷新（发布线程中调用也是安全的）
+        self.log_pump.write(log_message)
         
     def update_progress(self, current, total):
         """更新进度"""
@@ -213,6 +227,7 @@ class PublishGUI:
         if self.is_running:
             if not messagebox.askyesno("确认", "发布任务正在运行，确定要退出吗？"):
                 return
+        self.log_pump.close()
         self.root.quit()
         
     def publish_task(self):
@@ -291,7 +306,7 @@ class PublishGUI:
                 self.log(f"图片数量: {len(images)}")
                 
                 # 发布笔记
-                success = self.publish_note(client, title, desc, images)
+                success = self.publish_note(client, note_dir, title, desc, images)
                 
                 if success:
                     self.update_progress(i, total)
@@ -348,8 +363,12 @@ class PublishGUI:
     
     def create_client(self, cookie):
         """创建客户端"""
+        from xhs import XhsClient
         from xhs.help import sign as local_sign
         
+        # 与其它发布工具共享同一账号的限流
+        self.rate_account = account_key(cookie)
+        
         def sign_func(uri, data=None, a1="", web_session=""):
             return local_sign(uri, data, a1=a1)
         
@@ -406,32 +425,47 @@ class PublishGUI:
         desc += " ".join(tags)
         return desc
     
-    def publish_note(self, client, title, desc, images):
-        """发布笔记"""
+    def publish_note(self, client, note_dir, title, desc, images):
+        """发布笔记（结果写入结构化事件日志）"""
+        start = time.perf_counter()
         try:
+            if not wait_for_token(self.rate_account, 'create', log=self.log,
+                                  should_stop=lambda: not self.is_running):
+                return False
+            
             self.log("正在上传图片...")
             
-            result = client.create_image_note(
-                title=title,
-                desc=desc,
-                files=images,
-                is_private=False
-            )
+            # create_image_note 在一次调用中上传图片并创建笔记，只能整体记为 create 阶段
+            note_id = None
+            with self.events.stage('create', note_dir=note_dir, images=len(images),
+                                   bytes=total_size(images)) as fields:
+                result = client.create_image_note(
+                    title=title,
+                    desc=desc,
+                    files=images,
+                    is_private=False
+                )
+                if isinstance(result, dict):
+                    note_id = result.get('note_id') or result.get('id') or \
+                             result.get('data', {}).get('id')
+                fields['note_id'] = note_id
             
             self.log("发布成功！")
             
-            if isinstance(result, dict):
-                note_id = result.get('note_id') or result.get('id') or \
-                         result.get('data', {}).get('id')
-                if note_id:
-                    url = f"https://www.xiaohongshu.com/explore/{note_id}"
-                    self.log(f"笔记ID: {note_id}")
-                    self.log(f"链接: {url}")
+            if note_id:
+                url = f"https://www.xiaohongshu.com/explore/{note_id}"
+                self.log(f"笔记ID: {note_id}")
+                self.log(f"链接: {url}")
             
+            self.events.emit('note', note_dir=note_dir, status='published', note_id=note_id,
+                             duration_ms=round((time.perf_counter() - start) * 1000, 1))
             return True
             
         except Exception as e:
             self.log(f"发布失败: {e}")
+            self.events.emit('note', note_dir=note_dir, status='failed',
+                             duration_ms=round((time.perf_counter() - start) * 1000, 1),
+                             **error_fields(e))
             return False
     
     def run(self):
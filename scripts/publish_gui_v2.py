@@ -7,9 +7,11 @@
 2. 支持路径浏览选择
 3. 智能检测笔记结构
 4. 保持原有批量发布逻辑
+5. 每篇笔记的发布耗时和结果写入结构化事件日志（见 event_log）
 """
 
 import glob
+import importlib.util
 import json
 import os
 import sys
@@ -22,14 +24,22 @@ from threading import Thread
 
 try:
     from dotenv import load_dotenv
-    from xhs import XhsClient
-    from xhs.help import sign as local_sign
+    # xhs 导入较慢，创建客户端时才导入，窗口先显示；这里只检查是否已安装
+    if importlib.util.find_spec('xhs') is None:
+        raise ImportError("No module named 'xhs'")
 except ImportError as e:
     print(f"Missing dependency: {e}")
     print("Run: pip install xhs python-dotenv")
     input("Press Enter to exit...")
     sys.exit(1)
 
+# 导入同目录下的共享模块
+sys.path.insert(0, str(Path(__file__).parent))
+
+from event_log import MAX_ERROR_CHARS, error_fields, get_logger, total_size
+from gui_log import TkLogPump
+from rate_limiter import account_key, wait_for_token
+
 
 class PublishGUI:
     def __init__(self, default_notes_dir=None, start_from=1, wait_minutes=20):
@@ -38,6 +48,7 @@ class PublishGUI:
         self.wait_minutes = wait_minutes
         self.is_running = False
         self.is_paused = False
+        self.events = get_logger('gui')
         
         # 创建主窗口
         self.root = tk.Tk()
@@ -52,6 +63,9 @@ class PublishGUI:
         
         self.setup_ui()
         
+        # 日志泵：控件保留最近日志，完整日志写入 logs/ 目录
+        self.log_pump = TkLogPump(self.root, self.log_text)
+        
     def setup_ui(self):
         """设置界面"""
         # 标题
@@ -363,9 +377,8 @@ class PublishGUI:
         timestamp = datetime.now().strftime('%H:%M:%S')
         log_message = f"[{timestamp}] {message}\n"
         
-        self.log_text.insert(tk.END, log_message)
-        self.log_text.see(tk.END)
-        self.root.update()
+        # 只放入队列，由主线程批量刷新（发布线程中调用也是安全的）
+        self.log_pump.write(log_message)
         
     def update_progress(self, current, total):
         """更新进度"""
@@ -423,6 +436,7 @@ class PublishGUI:
         if self.is_running:
             if not messagebox.askyesno("确认", "发布任务正在运行，确定要退出吗？"):
                 return
+        self.log_pump.close()
         self.root.quit()
         
     def load_cookie(self):
@@ -446,6 +460,12 @@ class PublishGUI:
         
     def create_client(self, cookie):
         """创建小红书客户端"""
+        from xhs import XhsClient
+        from xhs.help import sign as local_sign
+        
+        # 与其它发布工具共享同一账号的限流
+        self.rate_account = account_key(cookie)
+        
         def sign_func(uri, data=None, a1="", web_session=""):
             return local_sign(uri, data, a1=a1)
         
@@ -660,16 +680,28 @@ class PublishGUI:
                 
                 # 发布笔记
                 self.log("正在发布...")
+                start = time.perf_counter()
                 try:
-                    result = client.create_image_note(
-                        title=title,
-                        desc=desc,
-                        files=images,
-                        is_private=False
-                    )
+                    if not wait_for_token(self.rate_account, 'create', log=self.log,
+                                          should_stop=lambda: not self.is_running):
+                        break
+                    
+                    # create_image_note 在一次调用中上传图片并创建笔记，只能整体记为 create 阶段
+                    with self.events.stage('create', note_dir=note_dir, images=len(images),
+                                           bytes=total_size(images)) as fields:
+                        result = client.create_image_note(
+                            title=title,
+                            desc=desc,
+                            files=images,
+                            is_private=False
+                        )
+                        note_id = None
+                        if isinstance(result, dict):
+                            note_id = result.get('id') or result.get('note_id')
+                        fields['note_id'] = note_id
+                    duration_ms = round((time.perf_counter() - start) * 1000, 1)
                     
                     if isinstance(result, dict):
-                        note_id = result.get('id') or result.get('note_id')
                         if note_id:
                             link = f'https://www.xiaohongshu.com/explore/{note_id}'
                             self.log(f"✓ 发布成功！")
@@ -690,13 +722,22 @@ class PublishGUI:
                             
                             published_count += 1
                             self.update_progress(published_count, total)
+                            self.events.emit('note', note_dir=note_dir, status='published',
+                                             note_id=note_id, duration_ms=duration_ms)
                         else:
                             self.log(f"✗ 发布失败: 未返回笔记ID")
+                            self.events.emit('note', note_dir=note_dir, status='failed',
+                                             duration_ms=duration_ms, error_msg='no note id returned')
                     else:
                         self.log(f"✗ 发布失败: {result}")
+                        self.events.emit('note', note_dir=note_dir, status='failed',
+                                         duration_ms=duration_ms, error_msg=str(result)[:MAX_ERROR_CHARS])
                         
                 except Exception as e:
                     self.log(f"✗ 发布失败: {str(e)}")
+                    self.events.emit('note', note_dir=note_dir, status='failed',
+                                     duration_ms=round((time.perf_counter() - start) * 1000, 1),
+                                     **error_fields(e))
                 
                 # 等待间隔
                 if i < total and self.is_running:
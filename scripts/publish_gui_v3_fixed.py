@@ -9,156 +9,41 @@
 3. 完善发布记录系统
 4. 改进错误提示和日志记录
 
+发布逻辑在 publish_engine.PublishEngine 中执行，界面只负责控制和显示事件；
+指定 --service 时连接常驻的发布服务 (publish_service.py)，关闭界面不影响发布。
+
 使用方法:
     python publish_gui_v3_fixed.py
+    python publish_gui_v3_fixed.py --service http://127.0.0.1:8766
+    python publish_gui_v3_fixed.py --profile-out profiles    # 性能分析和内存增长跟踪（见 profiling.py）
 """
 
-import glob
-import json
 import os
+import queue
 import sys
-import time
 import tkinter as tk
 from tkinter import scrolledtext, messagebox, filedialog
 from datetime import datetime
 from pathlib import Path
-from threading import Thread
-import hashlib
-
-try:
-    from dotenv import load_dotenv
-    from xhs import XhsClient
-    from xhs.help import sign as local_sign
-    from PIL import Image, ImageTk  # 用于显示二维码
-except ImportError as e:
-    print(f"Missing dependency: {e}")
-    print("Run: pip install xhs python-dotenv pillow")
-    input("Press Enter to exit...")
-    sys.exit(1)
+from threading import Thread, Event
 
+# 导入同目录下的共享模块
+SCRIPT_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPT_DIR))
 
-class PublishRecordManager:
-    """发布记录管理器"""
-    
-    def __init__(self, record_file=None):
-        if record_file is None:
-            # 默认记录文件位置
-            script_dir = Path(__file__).parent.parent
-            self.record_file = script_dir / 'publish_records.json'
-        else:
-            self.record_file = Path(record_file)
-        
-        self.records = self.load_records()
-    
-    def load_records(self):
-        """加载发布记录"""
-        if self.record_file.exists():
-            try:
-                with open(self.record_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"Warning: Failed to load records: {e}")
-                return {}
-        return {}
-    
-    def save_records(self):
-        """保存发布记录"""
-        try:
-            # 确保目录存在
-            self.record_file.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(self.record_file, 'w', encoding='utf-8') as f:
-                json.dump(self.records, f, ensure_ascii=False, indent=2)
-            return True
-        except Exception as e:
-            print(f"Error: Failed to save records: {e}")
-            return False
-    
-    def get_note_hash(self, note_dir):
-        """计算笔记的唯一标识（基于路径和内容）"""
-        note_dir = str(Path(note_dir).absolute())
-        
-        # 使用绝对路径作为基础
-        hash_str = note_dir
-        
-        # 添加 cover.png 的修改时间（如果存在）
-        cover_file = Path(note_dir) / 'cover.png'
-        if cover_file.exists():
-            mtime = cover_file.stat().st_mtime
-            hash_str += f"_{mtime}"
-        
-        # 计算 MD5
-        return hashlib.md5(hash_str.encode('utf-8')).hexdigest()
-    
-    def is_published(self, note_dir):
-        """检查笔记是否已发布"""
-        note_hash = self.get_note_hash(note_dir)
-        return note_hash in self.records
-    
-    def add_record(self, note_dir, title, note_id_xhs, link):
-        """添加发布记录"""
-        note_hash = self.get_note_hash(note_dir)
-        
-        record = {
-            'note_dir': str(Path(note_dir).absolute()),
-            'note_name': os.path.basename(note_dir),
-            'title': title,
-            'note_id_xhs': note_id_xhs,
-            'link': link,
-            'published_at': datetime.now().isoformat(),
-            'hash': note_hash
-        }
-        
-        self.records[note_hash] = record
-        
-        # 同时在笔记目录创建标记文件
-        self.create_marker_file(note_dir, record)
-        
-        return self.save_records()
-    
-    def create_marker_file(self, note_dir, record):
-        """在笔记目录创建发布标记文件"""
-        marker_file = Path(note_dir) / '.published'
-        
-        try:
-            with open(marker_file, 'w', encoding='utf-8') as f:
-                json.dump(record, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Warning: Failed to create marker file: {e}")
-    
-    def get_record(self, note_dir):
-        """获取笔记的发布记录"""
-        note_hash = self.get_note_hash(note_dir)
-        return self.records.get(note_hash)
-    
-    def get_all_records(self):
-        """获取所有发布记录"""
-        return list(self.records.values())
-    
-    def get_statistics(self):
-        """获取统计信息"""
-        total = len(self.records)
-        
-        # 按日期统计
-        today = datetime.now().date()
-        today_count = 0
-        
-        for record in self.records.values():
-            try:
-                pub_date = datetime.fromisoformat(record['published_at']).date()
-                if pub_date == today:
-                    today_count += 1
-            except:
-                pass
-        
-        return {
-            'total': total,
-            'today': today_count
-        }
+from note_catalog import NoteCatalog
+from note_scanner import NoteScanner
+from note_dedup import find_duplicates
+from profiling import add_profile_argument, profiled
+from gui_log import TkLogPump
+from publish_engine import PublishEngine, PublishRecordManager
+from publish_service import EngineClient, ServiceError
+from record_table import RecordTable
+from session_monitor import SessionMonitor
 
 
 class PublishGUI:
-    def __init__(self, default_notes_dir=None, start_from=1, wait_minutes=20):
+    def __init__(self, default_notes_dir=None, start_from=1, wait_minutes=20, service_url=None):
         self.notes_dir = default_notes_dir or ""
         self.start_from = start_from
         self.wait_minutes = wait_minutes
@@ -168,6 +53,34 @@ class PublishGUI:
         # 初始化发布记录管理器
         self.record_manager = PublishRecordManager()
         
+        # 笔记信息目录：检测时并发加载，本进程内发布时直接复用
+        self.catalog = NoteCatalog()
+        
+        # 发布引擎：本进程内运行，或连接常驻的发布服务
+        # 发布服务自带登录会话监控，本进程内运行时由界面启动
+        self.service_url = service_url
+        self.session_monitor = None
+        if service_url:
+            self.engine = EngineClient(service_url)
+        else:
+            self.engine = PublishEngine(
+                wait_minutes=wait_minutes,
+                record_manager=self.record_manager,
+                catalog=self.catalog
+            )
+            self.session_monitor = SessionMonitor(self.engine).start()
+        
+        # 引擎事件由后台线程拉取，主线程定时处理
+        self.event_queue = queue.Queue()
+        self.event_stop = Event()
+        self.event_seq = None
+        
+        # 后台检测状态
+        self.scan_thread = None
+        self.scan_cancel = None
+        self.scan_queue = None
+        self.scan_found = 0
+        
         # 创建主窗口
         self.root = tk.Tk()
         self.root.title("小红书笔记批量发布工具 V3.0 修复版")
@@ -175,9 +88,15 @@ class PublishGUI:
         
         self.setup_ui()
         
+        # 日志泵：控件保留最近日志，完整日志写入 logs/ 目录
+        self.log_pump = TkLogPump(self.root, self.log_text)
+        
         # 显示统计信息
         self.update_statistics()
         
+        Thread(target=self.event_task, daemon=True).start()
+        self.root.after(200, self.poll_events)
+        
     def setup_ui(self):
         """设置界面"""
         # 标题
@@ -283,7 +202,7 @@ class PublishGUI:
             command=self.browse_path
         ).pack(side=tk.LEFT, padx=(0, 5))
         
-        tk.Button(
+        self.detect_button = tk.Button(
             path_input_frame,
             text="检测笔记",
             font=("Microsoft YaHei", 9),
@@ -291,7 +210,8 @@ class PublishGUI:
             bg='#4CAF50',
             fg='white',
             command=self.detect_notes
-        ).pack(side=tk.LEFT)
+        )
+        self.detect_button.pack(side=tk.LEFT)
         
         # 路径提示
         self.path_hint_label = tk.Label(
@@ -461,56 +381,31 @@ class PublishGUI:
         )
     
     def show_publish_records(self):
-        """显示发布记录"""
-        records = self.record_manager.get_all_records()
+        """显示发布记录（分页表格，可按标题、账号、日期筛选）"""
+        total = self.record_manager.get_statistics()['total']
         
-        if not records:
+        if not total:
             messagebox.showinfo("发布记录", "暂无发布记录")
             return
         
         # 创建新窗口显示记录
         record_window = tk.Toplevel(self.root)
         record_window.title("发布记录")
-        record_window.geometry("800x600")
+        record_window.geometry("900x600")
         
         # 标题
         title_label = tk.Label(
             record_window,
-            text=f"发布记录 (共 {len(records)} 篇)",
+            text=f"发布记录 (共 {total} 篇，双击打开笔记链接)",
             font=("Microsoft YaHei", 12, "bold"),
             pady=10
         )
         title_label.pack()
         
-        # 记录列表
-        record_text = scrolledtext.ScrolledText(
-            record_window,
-            font=("Consolas", 9),
-            wrap=tk.WORD
-        )
-        record_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        # 按发布时间倒序排列
-        sorted_records = sorted(
-            records,
-            key=lambda x: x.get('published_at', ''),
-            reverse=True
-        )
-        
-        for i, record in enumerate(sorted_records, 1):
-            pub_time = record.get('published_at', 'Unknown')
-            try:
-                pub_time = datetime.fromisoformat(pub_time).strftime('%Y-%m-%d %H:%M:%S')
-            except:
-                pass
-            
-            record_text.insert(tk.END, f"[{i:03d}] {record.get('title', 'Untitled')}\n")
-            record_text.insert(tk.END, f"      发布时间: {pub_time}\n")
-            record_text.insert(tk.END, f"      笔记路径: {record.get('note_name', 'Unknown')}\n")
-            record_text.insert(tk.END, f"      笔记链接: {record.get('link', 'Unknown')}\n")
-            record_text.insert(tk.END, "\n")
-        
-        record_text.config(state=tk.DISABLED)
+        # 记录表格，只查询和显示当前页
+        table = RecordTable(record_window, self.record_manager.ledger)
+        table.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        table.refresh()
         
         # 关闭按钮
         tk.Button(
@@ -534,7 +429,14 @@ class PublishGUI:
             self.log(f"已选择路径: {path}")
     
     def detect_notes(self):
-        """检测笔记 - 递归遍历所有子文件夹"""
+        """检测笔记 - 后台线程递归遍历所有子文件夹，结果实时显示"""
+        if self.scan_thread and self.scan_thread.is_alive():
+            # 检测进行中，再次点击按钮即取消
+            self.scan_cancel.set()
+            self.detect_button.config(state=tk.DISABLED)
+            self.log("正在取消检测...")
+            return
+        
         path = self.path_entry.get().strip()
         if not path:
             messagebox.showwarning("提示", "请先输入或选择资源路径")
@@ -549,47 +451,100 @@ class PublishGUI:
         self.log(f"检测路径: {path}")
         self.log("正在递归遍历所有子文件夹...")
         
-        # 递归检测笔记结构
-        note_dirs = []
+        self.scan_queue = queue.Queue()
+        self.scan_cancel = Event()
+        self.scan_found = 0
         
-        def find_notes_recursive(root_path, depth=0, max_depth=10):
-            """递归查找包含 cover.png 的文件夹"""
-            if depth > max_depth:
-                return
-            
+        self.detect_button.config(text="取消检测", bg='#FF9800')
+        self.notes_count_label.config(text="笔记数量: 检测中... 已发现 0 个", fg='#666666')
+        self.new_notes_label.config(text="")
+        
+        self.scan_thread = Thread(
+            target=self.scan_task,
+            args=(path, self.scan_queue, self.scan_cancel),
+            daemon=True
+        )
+        self.scan_thread.start()
+        self.root.after(100, self.poll_scan, path)
+    
+    def scan_task(self, path, scan_queue, cancel_event):
+        """后台检测线程：发现的笔记逐个放入队列，由主线程显示"""
+        try:
+            # 共享扫描模块，目录未变化时使用索引缓存
+            scanner = NoteScanner()
+            notes = scanner.scan(
+                path,
+                on_note=lambda note: scan_queue.put(('note', note)),
+                cancel_event=cancel_event
+            )
+            # 重复内容检测（候选笔记之间及与已发布笔记）
+            report = None
+            published = {}
+            if not scanner.stats['cancelled']:
+                note_dirs = [note.path for note in notes]
+                # 预先并发读取标题等信息，结果显示与发布时直接使用缓存
+                self.catalog.load(note_dirs)
+                report = find_duplicates(note_dirs, ledger=self.record_manager.ledger, roots=[path])
+                # 查询台账区分已发布/未发布，主线程只负责显示
+                for note_dir in note_dirs:
+                    record = self.record_manager.get_record(note_dir)
+                    if record is not None:
+                        published[note_dir] = record
+            scan_queue.put(('done', (notes, scanner.errors, scanner.stats, published, report)))
+        except Exception as e:
+            scan_queue.put(('error', e))
+    
+    def poll_scan(self, path):
+        """主线程定时取出检测结果（每批最多200条，保持界面响应）"""
+        finished = None
+        for _ in range(200):
             try:
-                # 检查当前目录是否包含 cover.png
-                has_cover = os.path.exists(os.path.join(root_path, 'cover.png'))
-                if has_cover:
-                    note_dirs.append(root_path)
-                    rel_path = os.path.relpath(root_path, path)
-                    if rel_path == '.':
-                        rel_path = os.path.basename(root_path)
-                    self.log(f"  [发现] {rel_path}")
-                
-                # 继续遍历子目录（即使当前目录有cover.png，子目录也可能有笔记）
-                try:
-                    items = os.listdir(root_path)
-                except PermissionError:
-                    self.log(f"  [跳过] 无权限访问: {os.path.relpath(root_path, path)}")
-                    return
-                
-                for item in items:
-                    item_path = os.path.join(root_path, item)
-                    if os.path.isdir(item_path):
-                        # 跳过隐藏文件夹和系统文件夹
-                        if item.startswith('.') or item.startswith('__'):
-                            continue
-                        # 跳过常见的非笔记文件夹
-                        if item.lower() in ['node_modules', 'venv', '.git', '.vscode', 'dist', 'build']:
-                            continue
-                        # 递归检查子文件夹
-                        find_notes_recursive(item_path, depth + 1, max_depth)
-            except Exception as e:
-                self.log(f"  [错误] 检测 {root_path} 时出错: {str(e)}")
-        
-        # 开始递归查找
-        find_notes_recursive(path)
+                kind, payload = self.scan_queue.get_nowait()
+            except queue.Empty:
+                break
+            
+            if kind == 'note':
+                self.scan_found += 1
+                rel_path = os.path.relpath(payload.path, path)
+                if rel_path == '.':
+                    rel_path = os.path.basename(payload.path)
+                self.log(f"  [发现] {rel_path}")
+            else:
+                finished = (kind, payload)
+                break
+        
+        if finished is None:
+            self.notes_count_label.config(text=f"笔记数量: 检测中... 已发现 {self.scan_found} 个")
+            self.root.after(100, self.poll_scan, path)
+            return
+        
+        self.detect_button.config(text="检测笔记", bg='#4CAF50', state=tk.NORMAL)
+        
+        kind, payload = finished
+        if kind == 'error':
+            self.log(f"  [错误] 检测 {path} 时出错: {str(payload)}")
+            self.notes_count_label.config(text="笔记数量: 检测失败", fg='red')
+            messagebox.showerror("错误", f"检测笔记时出错\n\n{str(payload)}")
+            return
+        
+        notes, errors, stats, published, report = payload
+        for error_path, error in errors:
+            self.log(f"  [跳过] 无法访问: {os.path.relpath(error_path, path)} ({error})")
+        
+        if stats['cancelled']:
+            self.log(f"检测已取消，已发现 {len(notes)} 个笔记")
+            self.notes_count_label.config(
+                text=f"笔记数量: 检测已取消 (已发现 {len(notes)} 个)",
+                fg='#FF9800'
+            )
+            return
+        
+        self.finish_detect(path, notes, published, report)
+    
+    def finish_detect(self, path, notes, published, report=None):
+        """检测完成：显示已发布/未发布笔记（published 为后台查询的发布记录）"""
+        note_dirs = [note.path for note in notes]
+        notes_by_dir = {note.path: note for note in notes}
         
         if not note_dirs:
             self.log("错误: 未检测到有效的笔记结构")
@@ -601,18 +556,9 @@ class PublishGUI:
             messagebox.showerror("错误", "未检测到有效的笔记结构\n\n请确保文件夹或其子文件夹包含:\n- cover.png (封面)\n- card_*.png (内容卡片)")
             return
         
-        # 按路径排序
-        note_dirs.sort()
-        
-        # 检查哪些是新笔记（未发布）
-        new_notes = []
-        published_notes = []
-        
-        for note_dir in note_dirs:
-            if self.record_manager.is_published(note_dir):
-                published_notes.append(note_dir)
-            else:
-                new_notes.append(note_dir)
+        # 区分新笔记（未发布）和已发布笔记
+        new_notes = [note_dir for note_dir in note_dirs if note_dir not in published]
+        published_notes = [note_dir for note_dir in note_dirs if note_dir in published]
         
         # 显示检测结果
         self.notes_count_label.config(
@@ -644,31 +590,35 @@ class PublishGUI:
                 note_name = os.path.basename(note_dir)
                 rel_path = os.path.relpath(note_dir, path)
                 
+                note = notes_by_dir[note_dir]
                 try:
-                    images = [f for f in os.listdir(note_dir) if f.endswith('.png')]
-                    cover_count = 1 if 'cover.png' in images else 0
-                    card_count = len([f for f in images if f.startswith('card_')])
-                    total_images = min(cover_count + card_count, 9)
-                    
-                    self.log(f"  [{i:02d}] {rel_path}")
-                    self.log(f"       └─ {total_images} 张图片 (封面:{cover_count}, 卡片:{card_count})")
-                except Exception as e:
-                    self.log(f"  [{i:02d}] {rel_path} - 读取失败: {str(e)}")
-        
+                    title = self.catalog.get(note_dir).title
+                except OSError:
+                    title = note_name
+                self.log(f"  [{i:02d}] {rel_path}  {title}")
+                self.log(f"       └─ {note.image_count} 张图片 (封面:1, 卡片:{note.card_count})")
+
+        # 显示疑似重复的未发布笔记
+        duplicates = [note_dir for note_dir in new_notes if report and report.is_duplicate(note_dir)]
+        if duplicates:
+            self.log("")
+            self.log(f"⚠️ 疑似重复的笔记 ({len(duplicates)} 个)，发布前请确认:")
+            for note_dir in duplicates:
+                self.log(f"  {os.path.relpath(note_dir, path)}")
+                self.log(f"       └─ {report.duplicates[note_dir]}")
+
         # 显示已发布的笔记（简略）
         if published_notes:
             self.log("")
             self.log(f"已发布的笔记 ({len(published_notes)} 个):")
             for i, note_dir in enumerate(published_notes[:5], 1):  # 只显示前5个
                 rel_path = os.path.relpath(note_dir, path)
-                record = self.record_manager.get_record(note_dir)
-                if record:
-                    pub_time = record.get('published_at', '')
-                    try:
-                        pub_time = datetime.fromisoformat(pub_time).strftime('%Y-%m-%d %H:%M')
-                    except:
-                        pass
-                    self.log(f"  [{i:02d}] {rel_path} (发布于: {pub_time})")
+                pub_time = published[note_dir].get('published_at', '')
+                try:
+                    pub_time = datetime.fromisoformat(pub_time).strftime('%Y-%m-%d %H:%M')
+                except:
+                    pass
+                self.log(f"  [{i:02d}] {rel_path} (发布于: {pub_time})")
             
             if len(published_notes) > 5:
                 self.log(f"  ... 还有 {len(published_notes) - 5} 个已发布笔记")
@@ -701,9 +651,8 @@ class PublishGUI:
         timestamp = datetime.now().strftime('%H:%M:%S')
         log_message = f"[{timestamp}] {message}\n"
         
-        self.log_text.insert(tk.END, log_message)
-        self.log_text.see(tk.END)
-        self.root.update()
+        # 只放入队列，由主线程批量刷新（发布线程中调用也是安全的）
+        self.log_pump.write(log_message)
     
     def update_progress(self, current, total):
         """更新进度"""
@@ -712,7 +661,7 @@ class PublishGUI:
         )
     
     def start_publish(self):
-        """开始发布"""
+        """开始发布：把笔记文件夹交给发布引擎"""
         if self.is_running:
             return
         
@@ -727,34 +676,143 @@ class PublishGUI:
         self.wait_minutes = self.wait_minutes_var.get()
         
         self.is_running = True
-        self.start_button.config(state=tk.DISABLED)
-        self.pause_button.config(state=tk.NORMAL)
-        self.stop_button.config(state=tk.NORMAL)
-        self.path_entry.config(state=tk.DISABLED)
-        
-        # 在新线程中运行发布任务
-        thread = Thread(target=self.publish_task, daemon=True)
-        thread.start()
+        self.is_paused = False
+        self.set_running_buttons(True)
+        
+        # 入队需要扫描目录，放到后台线程，结果通过事件显示
+        Thread(target=self.enqueue_task, args=(path, self.wait_minutes), daemon=True).start()
+    
+    def enqueue_task(self, path, wait_minutes):
+        """后台入队线程"""
+        try:
+            result = self.engine.enqueue([path], wait_minutes=wait_minutes)
+        except Exception as e:
+            self.event_queue.put({'type': 'enqueue_failed', 'message': str(e)})
+            return
+        self.event_queue.put(dict(result, type='enqueued'))
     
     def toggle_pause(self):
         """暂停/继续"""
-        self.is_paused = not self.is_paused
-        if self.is_paused:
-            self.pause_button.config(text="继续")
-            self.log("任务已暂停")
-        else:
-            self.pause_button.config(text="暂停")
-            self.log("任务已继续")
+        try:
+            if self.is_paused:
+                self.engine.resume()
+            else:
+                self.engine.pause()
+        except ServiceError as e:
+            messagebox.showerror("错误", f"发布服务无响应\n\n{str(e)}")
     
     def stop_publish(self):
         """停止发布"""
         if messagebox.askyesno("确认", "确定要停止发布任务吗？"):
+            try:
+                self.engine.stop()
+            except ServiceError as e:
+                messagebox.showerror("错误", f"发布服务无响应\n\n{str(e)}")
+    
+    def set_running_buttons(self, running):
+        """根据任务状态切换按钮"""
+        self.start_button.config(state=tk.DISABLED if running else tk.NORMAL)
+        self.pause_button.config(state=tk.NORMAL if running else tk.DISABLED)
+        self.stop_button.config(state=tk.NORMAL if running else tk.DISABLED)
+        self.path_entry.config(state=tk.DISABLED if running else tk.NORMAL)
+        if not running:
+            self.pause_button.config(text="暂停")
+    
+    def event_task(self):
+        """后台线程：从发布引擎长轮询事件，放入队列由主线程处理"""
+        while not self.event_stop.is_set():
+            try:
+                if self.event_seq is None:
+                    # 只显示本次打开界面之后的事件，先同步一次当前状态
+                    status = self.engine.status()
+                    self.event_seq = status['last_seq']
+                    self.event_queue.put(dict(status, type='state'))
+                for event in self.engine.events(self.event_seq, timeout=1):
+                    self.event_seq = event['seq']
+                    self.event_queue.put(event)
+            except ServiceError as e:
+                self.event_queue.put({'type': 'disconnected', 'message': str(e)})
+                self.event_stop.wait(5)
+    
+    def poll_events(self):
+        """主线程定时处理引擎事件"""
+        for _ in range(500):
+            try:
+                event = self.event_queue.get_nowait()
+            except queue.Empty:
+                break
+            self.handle_event(event)
+        
+        if not self.event_stop.is_set():
+            self.root.after(200, self.poll_events)
+    
+    def handle_event(self, event):
+        """把引擎事件显示到界面"""
+        kind = event['type']
+        
+        if kind == 'log':
+            timestamp = datetime.fromtimestamp(event['time']).strftime('%H:%M:%S')
+            self.log_pump.write(f"[{timestamp}] {event['message']}\n")
+        
+        elif kind == 'state':
+            running = event['state'] != 'idle'
+            self.is_running = running
+            self.is_paused = event['state'] == 'paused'
+            self.set_running_buttons(running)
+            if running:
+                self.pause_button.config(text="继续" if self.is_paused else "暂停")
+        
+        elif kind == 'progress':
+            self.update_progress(event['current'], event['total'])
+        
+        elif kind == 'note':
+            if event['status'] == 'published':
+                self.update_statistics()
+        
+        elif kind == 'enqueued':
+            # 按钮状态随后由引擎的 state 事件更新
+            if not event['added']:
+                if event['published']:
+                    self.log("✅ 所有笔记都已发布，没有新笔记需要发布")
+                    messagebox.showinfo("提示", "所有笔记都已发布过\n\n没有新笔记需要发布")
+                elif not event['duplicate']:
+                    self.log("❌ 错误: 没有找到要发布的笔记")
+        
+        elif kind == 'enqueue_failed':
             self.is_running = False
-            self.start_button.config(state=tk.NORMAL)
-            self.pause_button.config(state=tk.DISABLED)
-            self.stop_button.config(state=tk.DISABLED)
-            self.path_entry.config(state=tk.NORMAL)
-            self.log("任务已停止")
+            self.set_running_buttons(False)
+            self.log(f"❌ 加入发布队列失败: {event['message']}")
+            messagebox.showerror("错误", f"加入发布队列失败\n\n{event['message']}")
+        
+        elif kind == 'error':
+            if event['kind'] in ('cookie', 'login'):
+                messagebox.showerror(
+                    "Cookie无效",
+                    f"{event['message']}\n\n"
+                    "请先重新登录:\n\n"
+                    "方法1: 运行 python scripts/login_xhs.py\n"
+                    "方法2: 双击运行 fix_cookie.bat\n\n"
+                    "扫码登录后重试"
+                )
+            else:
+                messagebox.showerror("错误", f"任务执行异常\n\n{event['message']}")
+        
+        elif kind == 'session':
+            # 提示内容已作为日志显示，队列被暂停或即将过期时弹窗提醒
+            if event['status'] in ('expired', 'expiring'):
+                messagebox.showwarning("登录即将失效", event['message'])
+        
+        elif kind == 'done':
+            if not event['stopped']:
+                messagebox.showinfo(
+                    "发布完成",
+                    f"发布任务完成！\n\n"
+                    f"成功: {event['published']} 篇\n"
+                    f"失败: {event['failed']} 篇"
+                )
+        
+        elif kind == 'disconnected':
+            self.log(f"⚠️ 发布服务连接失败，5 秒后重试: {event['message']}")
     
     def show_donation_qrcode(self):
         """显示赞赏二维码"""
@@ -805,6 +863,9 @@ class PublishGUI:
             qrcode_path = script_dir / 'sang.jpg'
             
             if qrcode_path.exists():
+                # PIL 只用于显示二维码，打开窗口时才导入（未安装时显示加载失败）
+                from PIL import Image, ImageTk
+                
                 # 加载并调整图片大小
                 img = Image.open(qrcode_path)
                 # 调整大小为300x300
@@ -862,424 +923,17 @@ class PublishGUI:
     
     def quit_app(self):
         """退出应用"""
-        if self.is_running:
+        if self.is_running and not self.service_url:
             if not messagebox.askyesno("确认", "发布任务正在运行，确定要退出吗？"):
                 return
+        self.event_stop.set()
+        if self.session_monitor:
+            self.session_monitor.stop()
+        if not self.service_url:
+            self.engine.close()
+        self.log_pump.close()
         self.root.quit()
     
-    def load_cookie(self):
-        """加载 Cookie"""
-        script_dir = Path(__file__).parent.parent
-        env_file = script_dir / '.env'
-        
-        if not env_file.exists():
-            return None
-        
-        cookie = None
-        with open(env_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                if line.startswith('XHS_COOKIE='):
-                    cookie = line.replace('XHS_COOKIE=', '').strip()
-                    cookie = cookie.strip("'\"")
-                    if cookie and 'your_cookie_string_here' not in cookie:
-                        break
-        
-        return cookie
-    
-    def create_client(self, cookie):
-        """创建小红书客户端"""
-        def sign_func(uri, data=None, a1="", web_session=""):
-            return local_sign(uri, data, a1=a1)
-        
-        client = XhsClient(cookie=cookie, sign=sign_func)
-        return client
-    
-    def verify_login(self, client):
-        """验证登录状态 - 修复版"""
-        try:
-            self.log("正在验证登录状态...")
-            user_info = client.get_self_info()
-            
-            # 打印原始响应用于调试
-            self.log(f"DEBUG: 用户信息响应: {user_info}")
-            
-            # 检查响应类型和内容
-            if not isinstance(user_info, dict):
-                self.log(f"警告: 响应类型异常: {type(user_info)}")
-                return False, "响应格式错误"
-            
-            # 检查错误码
-            code = user_info.get('code')
-            success = user_info.get('success', True)
-            
-            if code == -1 or code == -100:
-                msg = user_info.get('msg', '无登录信息')
-                self.log(f"错误: Cookie已失效 - {msg}")
-                return False, msg
-            
-            if not success:
-                msg = user_info.get('msg', '登录验证失败')
-                self.log(f"错误: {msg}")
-                return False, msg
-            
-            # 尝试获取用户昵称
-            data = user_info.get('data', {})
-            if isinstance(data, dict):
-                nickname = data.get('nickname') or data.get('name') or data.get('basic_info', {}).get('nickname')
-            else:
-                nickname = user_info.get('nickname') or user_info.get('name')
-            
-            if nickname:
-                self.log(f"✅ 登录验证成功！当前用户: {nickname}")
-                return True, nickname
-            else:
-                self.log("警告: 无法获取用户昵称，但登录似乎成功")
-                return True, "未知用户"
-                
-        except Exception as e:
-            self.log(f"登录验证异常: {str(e)}")
-            return False, str(e)
-    
-    def get_note_info(self, note_dir):
-        """获取笔记信息"""
-        metadata_file = os.path.join(note_dir, 'metadata.json')
-        if os.path.exists(metadata_file):
-            try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                pass
-        
-        # 如果没有 metadata，返回基本信息
-        note_name = os.path.basename(note_dir)
-        return {
-            'title': note_name,
-            'subtitle': '',
-            'theme': ''
-        }
-    
-    def get_note_images(self, note_dir):
-        """获取笔记图片"""
-        images = []
-        
-        # 封面
-        cover = os.path.join(note_dir, 'cover.png')
-        if os.path.exists(cover):
-            images.append(cover)
-        
-        # 内容卡片（最多9张）
-        for i in range(1, 20):
-            card = os.path.join(note_dir, f'card_{i}.png')
-            if os.path.exists(card):
-                images.append(card)
-            else:
-                break
-        
-        return images[:9]  # 小红书最多9张图
-    
-    def publish_task(self):
-        """发布任务主逻辑 - 修复版"""
-        try:
-            self.log("="*60)
-            self.log("开始批量发布任务 (V3.0 修复版)")
-            self.log("="*60)
-            
-            # 加载 Cookie
-            self.log("正在加载 Cookie...")
-            cookie = self.load_cookie()
-            if not cookie:
-                self.log("❌ 错误: 未找到 Cookie")
-                self.log("")
-                self.log("请先运行登录脚本:")
-                self.log("  python scripts/login_xhs.py")
-                self.log("")
-                messagebox.showerror(
-                    "Cookie未找到",
-                    "未找到登录Cookie\n\n"
-                    "请先运行登录脚本:\n"
-                    "python scripts/login_xhs.py\n\n"
-                    "或双击运行 fix_cookie.bat"
-                )
-                self.is_running = False
-                self.start_button.config(state=tk.NORMAL)
-                self.path_entry.config(state=tk.NORMAL)
-                self.pause_button.config(state=tk.DISABLED)
-                self.stop_button.config(state=tk.DISABLED)
-                return
-            
-            self.log(f"✅ Cookie加载成功 (长度: {len(cookie)})")
-            
-            # 创建客户端
-            self.log("正在创建小红书客户端...")
-            try:
-                client = self.create_client(cookie)
-                self.log("✅ 客户端创建成功")
-            except Exception as e:
-                self.log(f"❌ 错误: 客户端创建失败 - {str(e)}")
-                messagebox.showerror("错误", f"客户端创建失败\n\n{str(e)}\n\n请检查网络连接")
-                self.is_running = False
-                self.start_button.config(state=tk.NORMAL)
-                self.path_entry.config(state=tk.NORMAL)
-                self.pause_button.config(state=tk.DISABLED)
-                self.stop_button.config(state=tk.DISABLED)
-                return
-            
-            # 验证登录状态 - 使用修复后的验证方法
-            login_ok, login_msg = self.verify_login(client)
-            
-            if not login_ok:
-                self.log("❌ Cookie验证失败")
-                self.log("")
-                self.log("Cookie可能已过期，请重新登录:")
-                self.log("  1. 运行: python scripts/login_xhs.py")
-                self.log("  2. 或双击运行: fix_cookie.bat")
-                self.log("  3. 扫码登录后重试")
-                self.log("")
-                messagebox.showerror(
-                    "Cookie已失效",
-                    f"Cookie验证失败: {login_msg}\n\n"
-                    "Cookie可能已过期，请重新登录:\n\n"
-                    "方法1: 运行 python scripts/login_xhs.py\n"
-                    "方法2: 双击运行 fix_cookie.bat\n\n"
-                    "扫码登录后重试"
-                )
-                self.is_running = False
-                self.start_button.config(state=tk.NORMAL)
-                self.path_entry.config(state=tk.NORMAL)
-                self.pause_button.config(state=tk.DISABLED)
-                self.stop_button.config(state=tk.DISABLED)
-                return
-            
-            # 获取笔记列表 - 递归扫描
-            self.log("")
-            self.log("正在递归扫描笔记...")
-            note_dirs = []
-            
-            def find_notes_recursive(root_path, depth=0, max_depth=10):
-                """递归查找包含 cover.png 的文件夹"""
-                if depth > max_depth:
-                    return
-                
-                try:
-                    # 检查当前目录是否包含 cover.png
-                    has_cover = os.path.exists(os.path.join(root_path, 'cover.png'))
-                    if has_cover:
-                        note_dirs.append(root_path)
-                    
-                    # 继续遍历子目录（即使当前目录有cover.png，子目录也可能有笔记）
-                    try:
-                        items = os.listdir(root_path)
-                    except PermissionError:
-                        return
-                    
-                    for item in items:
-                        item_path = os.path.join(root_path, item)
-                        if os.path.isdir(item_path):
-                            # 跳过隐藏文件夹和系统文件夹
-                            if item.startswith('.') or item.startswith('__'):
-                                continue
-                            # 跳过常见的非笔记文件夹
-                            if item.lower() in ['node_modules', 'venv', '.git', '.vscode', 'dist', 'build']:
-                                continue
-                            # 递归检查子文件夹
-                            find_notes_recursive(item_path, depth + 1, max_depth)
-                except Exception:
-                    pass
-            
-            # 开始递归查找
-            find_notes_recursive(self.notes_dir)
-            
-            # 按路径排序
-            note_dirs.sort()
-            
-            if not note_dirs:
-                self.log("❌ 错误: 没有找到要发布的笔记")
-                self.is_running = False
-                self.start_button.config(state=tk.NORMAL)
-                self.path_entry.config(state=tk.NORMAL)
-                self.pause_button.config(state=tk.DISABLED)
-                self.stop_button.config(state=tk.DISABLED)
-                return
-            
-            # 过滤已发布的笔记
-            self.log("")
-            self.log("正在检查发布记录...")
-            
-            new_notes = []
-            skipped_notes = []
-            
-            for note_dir in note_dirs:
-                if self.record_manager.is_published(note_dir):
-                    skipped_notes.append(note_dir)
-                else:
-                    new_notes.append(note_dir)
-            
-            self.log(f"总笔记数: {len(note_dirs)}")
-            self.log(f"已发布: {len(skipped_notes)} 个 (将跳过)")
-            self.log(f"未发布: {len(new_notes)} 个 (将发布)")
-            
-            if not new_notes:
-                self.log("")
-                self.log("✅ 所有笔记都已发布，没有新笔记需要发布")
-                messagebox.showinfo("提示", "所有笔记都已发布过\n\n没有新笔记需要发布")
-                self.is_running = False
-                self.start_button.config(state=tk.NORMAL)
-                self.path_entry.config(state=tk.DISABLED)
-                self.pause_button.config(state=tk.DISABLED)
-                self.stop_button.config(state=tk.DISABLED)
-                return
-            
-            # 开始发布
-            self.log("")
-            self.log("="*60)
-            self.log(f"开始发布 {len(new_notes)} 个新笔记")
-            self.log("="*60)
-            
-            published_count = 0
-            failed_count = 0
-            
-            for idx, note_dir in enumerate(new_notes, 1):
-                if not self.is_running:
-                    self.log("任务已停止")
-                    break
-                
-                # 暂停检查
-                while self.is_paused and self.is_running:
-                    time.sleep(1)
-                
-                if not self.is_running:
-                    break
-                
-                note_name = os.path.basename(note_dir)
-                rel_path = os.path.relpath(note_dir, self.notes_dir)
-                
-                self.log("")
-                self.log(f"[{idx}/{len(new_notes)}] 正在发布: {rel_path}")
-                
-                try:
-                    # 获取笔记信息
-                    note_info = self.get_note_info(note_dir)
-                    title = note_info.get('title', note_name)
-                    subtitle = note_info.get('subtitle', '')
-                    
-                    # 构建描述
-                    desc = f"{title}\n{subtitle}" if subtitle else title
-                    
-                    # 获取图片
-                    images = self.get_note_images(note_dir)
-                    
-                    if not images:
-                        self.log(f"  ⚠️ 跳过: 没有找到图片")
-                        failed_count += 1
-                        continue
-                    
-                    self.log(f"  标题: {title}")
-                    self.log(f"  图片: {len(images)} 张")
-                    
-                    # 上传图片
-                    self.log(f"  正在上传图片...")
-                    image_ids = []
-                    
-                    for img_idx, img_path in enumerate(images, 1):
-                        try:
-                            with open(img_path, 'rb') as f:
-                                img_data = f.read()
-                            
-                            result = client.upload_image_file(img_data)
-                            
-                            if isinstance(result, dict) and result.get('success'):
-                                image_id = result.get('data', {}).get('image_id')
-                                if image_id:
-                                    image_ids.append(image_id)
-                                    self.log(f"    [{img_idx}/{len(images)}] 上传成功")
-                                else:
-                                    self.log(f"    [{img_idx}/{len(images)}] 上传失败: 未获取到image_id")
-                            else:
-                                self.log(f"    [{img_idx}/{len(images)}] 上传失败: {result}")
-                        except Exception as e:
-                            self.log(f"    [{img_idx}/{len(images)}] 上传异常: {str(e)}")
-                    
-                    if not image_ids:
-                        self.log(f"  ❌ 发布失败: 所有图片上传失败")
-                        failed_count += 1
-                        continue
-                    
-                    # 发布笔记
-                    self.log(f"  正在发布笔记...")
-                    
-                    result = client.create_image_note(
-                        title=title,
-                        desc=desc,
-                        image_ids=image_ids,
-                        is_private=False
-                    )
-                    
-                    if isinstance(result, dict) and result.get('success'):
-                        note_id = result.get('data', {}).get('note_id')
-                        link = f"https://www.xiaohongshu.com/explore/{note_id}" if note_id else "Unknown"
-                        
-                        self.log(f"  ✅ 发布成功!")
-                        self.log(f"  笔记ID: {note_id}")
-                        self.log(f"  链接: {link}")
-                        
-                        # 记录发布
-                        self.record_manager.add_record(note_dir, title, note_id, link)
-                        published_count += 1
-                        
-                        # 更新统计
-                        self.update_statistics()
-                        
-                    else:
-                        self.log(f"  ❌ 发布失败: {result}")
-                        failed_count += 1
-                    
-                except Exception as e:
-                    self.log(f"  ❌ 发布异常: {str(e)}")
-                    failed_count += 1
-                
-                # 更新进度
-                self.update_progress(idx, len(new_notes))
-                
-                # 等待间隔（最后一个不等待）
-                if idx < len(new_notes) and self.is_running:
-                    wait_seconds = self.wait_minutes * 60
-                    self.log(f"  等待 {self.wait_minutes} 分钟后发布下一篇...")
-                    
-                    for i in range(wait_seconds):
-                        if not self.is_running:
-                            break
-                        while self.is_paused and self.is_running:
-                            time.sleep(1)
-                        if not self.is_running:
-                            break
-                        time.sleep(1)
-            
-            # 完成
-            self.log("")
-            self.log("="*60)
-            self.log("发布任务完成!")
-            self.log(f"成功: {published_count} 篇")
-            self.log(f"失败: {failed_count} 篇")
-            self.log("="*60)
-            
-            messagebox.showinfo(
-                "发布完成",
-                f"发布任务完成！\n\n"
-                f"成功: {published_count} 篇\n"
-                f"失败: {failed_count} 篇"
-            )
-            
-        except Exception as e:
-            self.log(f"❌ 任务异常: {str(e)}")
-            messagebox.showerror("错误", f"任务执行异常\n\n{str(e)}")
-        
-        finally:
-            self.is_running = False
-            self.start_button.config(state=tk.NORMAL)
-            self.pause_button.config(state=tk.DISABLED)
-            self.stop_button.config(state=tk.DISABLED)
-            self.path_entry.config(state=tk.NORMAL)
-    
     def run(self):
         """运行GUI"""
         self.root.mainloop()
@@ -1293,16 +947,20 @@ def main():
     parser.add_argument('--path', type=str, help='笔记资源路径')
     parser.add_argument('--start-from', type=int, default=1, help='起始笔记序号')
     parser.add_argument('--wait-minutes', type=int, default=20, help='发布间隔(分钟)')
+    parser.add_argument('--service', type=str, help='发布服务地址，如 http://127.0.0.1:8766（不指定则在本进程内发布）')
+    add_profile_argument(parser)
     
     args = parser.parse_args()
     
-    # 创建并运行GUI
-    app = PublishGUI(
-        default_notes_dir=args.path,
-        start_from=args.start_from,
-        wait_minutes=args.wait_minutes
-    )
-    app.run()
+    # 创建并运行GUI（开启性能分析时同时跟踪长时间运行的内存增长）
+    with profiled('publish_gui_v3_fixed', args.profile_out, memory=True):
+        app = PublishGUI(
+            default_notes_dir=args.path,
+            start_from=args.start_from,
+            wait_minutes=args.wait_minutes,
+            service_url=args.service
+        )
+        app.run()
 
 
 if __name__ == '__main__':
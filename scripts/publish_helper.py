@@ -5,38 +5,32 @@
 提供统一的发布接口
 """
 
-import sys
-import os
+import time
 from pathlib import Path
 
-try:
-    from xhs import XhsClient
-    from xhs.help import sign as local_sign
-except ImportError:
-    print("Please install xhs library: pip install xhs")
-    sys.exit(1)
+from event_log import get_logger, total_size
+from image_preflight import default_preflight
+from rate_limiter import RateLimiter, account_key
+from xhs_credentials import LoginError, default_store, user_from_info
+from xhs_resilience import ApiGuard, AuthError, CircuitOpenError, classify_error, is_safe_to_resend
+
+
+# 同一进程内的调用共用一个熔断器（同一账号），限流与其它进程共享；
+# 首次创建客户端或发布时才创建（限流数据库在那时才打开）
+_api_guard = None
+_events = get_logger('helper')
+
+
+def _guard():
+    global _api_guard
+    if _api_guard is None:
+        _api_guard = ApiGuard(limiter=RateLimiter())
+    return _api_guard
 
 
 def load_cookie():
-    """从 .env 文件加载 Cookie"""
-    # 优先使用项目根目录的 .env
-    project_root = Path(__file__).parent.parent
-    env_file = project_root / '.env'
-    
-    if not env_file.exists():
-        return None
-    
-    cookie = None
-    with open(env_file, 'r', encoding='utf-8') as f:
-        for line in f:
-            if line.startswith('XHS_COOKIE=') and 'your_cookie_string_here' not in line:
-                cookie = line.replace('XHS_COOKIE=', '').strip()
-                # 移除引号
-                cookie = cookie.strip("'\"")
-                if cookie:
-                    break
-    
-    return cookie
+    """从 .env 文件加载 Cookie（.env 未变化时使用缓存）"""
+    return default_store().cookie()
 
 
 def create_client():
@@ -46,9 +40,18 @@ def create_client():
     if not cookie:
         raise Exception("No valid Cookie found, please run login_xhs.py first")
     
+    # xhs 导入较慢，创建客户端时才导入
+    try:
+        from xhs import XhsClient
+        from xhs.help import sign as local_sign
+    except ImportError:
+        raise Exception("Please install xhs library: pip install xhs")
+    
     def sign_func(uri, data=None, a1="", web_session=""):
         return local_sign(uri, data, a1=a1)
     
+    _guard().account = account_key(cookie)
+    
     try:
         client = XhsClient(cookie=cookie, sign=sign_func)
         return client
@@ -58,7 +61,7 @@ def create_client():
 
 def publish_note(title, desc, images, is_private=False):
     """
-    发布笔记
+    发布笔记（结果写入结构化事件日志）
     
     Args:
         title: 笔记标题
@@ -72,31 +75,52 @@ def publish_note(title, desc, images, is_private=False):
                 'success': bool,
                 'note_id': str,
                 'link': str,
-                'error': str (if failed)
+                'error': str (if failed),
+                'error_kind': str (if failed: retryable / auth / fatal / paused),
+                'request_sent': bool (if failed, whether the publish request was sent)
             }
     """
+    start = time.perf_counter()
+    result = _publish_note(title, desc, images, is_private)
+    _events.emit(
+        'note', status='published' if result['success'] else 'failed',
+        note_id=result.get('note_id'), images=len(images), bytes=total_size(images),
+        duration_ms=round((time.perf_counter() - start) * 1000, 1),
+        error=result.get('error_type'), error_msg=None if result['success'] else result.get('error')
+    )
+    return result
+
+
+def _publish_note(title, desc, images, is_private):
+    request_sent = False
     try:
         client = create_client()
         
-        # 验证图片
-        valid_images = []
-        for img_path in images:
-            img_file = Path(img_path)
-            if img_file.exists() and img_file.suffix.lower() in ['.png', '.jpg', '.jpeg']:
-                valid_images.append(str(img_file.absolute()))
+        # 预检图片：按文件头检查格式和尺寸，超限图片缩放/压缩后再上传
+        valid_images, messages = default_preflight().run(
+            [str(Path(img_path).absolute()) for img_path in images]
+        )
+        for message in messages:
+            print(f"Warning: {message}")
         
         if not valid_images:
             return {
                 'success': False,
-                'error': 'No valid image files'
+                'error': 'No valid image files',
+                'request_sent': False
             }
         
         # 发布笔记
-        result = client.create_image_note(
+        request_sent = True
+        result = _guard().call(
+            client.create_image_note,
             title=title,
             desc=desc,
             files=valid_images,
-            is_private=is_private
+            is_private=is_private,
+            idempotent=False,
+            label='Publish',
+            endpoint='create'
         )
         
         # 解析结果
@@ -113,27 +137,53 @@ def publish_note(title, desc, images, is_private=False):
         return {
             'success': False,
             'error': 'Publish failed, no note ID returned',
+            'error_kind': 'fatal',
+            'request_sent': True,
             'result': result
         }
         
     except Exception as e:
+        if isinstance(e, AuthError):
+            default_store().invalidate()
         return {
             'success': False,
-            'error': str(e)
+            'error': str(e),
+            'error_type': type(e).__name__,
+            'error_kind': _error_kind(e),
+            'request_sent': request_sent and not is_safe_to_resend(e)
         }
 
 
-def get_user_info():
-    """获取当前用户信息"""
-    try:
+def _error_kind(error):
+    """失败类型：auth / paused 表示账号不可用，应停止批量发布"""
+    if isinstance(error, (AuthError, LoginError)):
+        return 'auth'
+    if isinstance(error, CircuitOpenError):
+        return 'paused'
+    return classify_error(error)
+
+
+def get_user_info(force=False):
+    """
+    获取当前用户信息
+
+    有效期内的登录验证结果直接使用缓存（返回中 cached 为 True），不请求接口；
+    force=True 时总是在线验证
+    """
+    def check():
         client = create_client()
-        info = client.get_self_info()
+        return user_from_info(_guard().get_self_info(client))
+
+    try:
+        record, cached = default_store().validate(check, force=force)
         return {
             'success': True,
-            'info': info
+            'info': {'user_id': record['user_id'], 'nickname': record['nickname']},
+            'cached': cached
         }
     except Exception as e:
         return {
             'success': False,
-            'error': str(e)
+            'error': str(e),
+            'error_kind': _error_kind(e)
         }
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发布台账模块
+使用 SQLite (WAL 模式) 保存发布记录，替代整文件重写的 publish_records.json
+
+特性:
+1. 每次发布只写入一行，写入开销与记录总数无关
+2. 按笔记哈希、笔记路径、小红书笔记ID 建立索引，查询无需加载全部记录
+3. WAL 日志保证写入中途崩溃不会损坏已有记录
+4. 支持导入旧版 publish_records.json
+5. 笔记标识基于内容（note_digest），旧版 "路径 + 封面时间" 标识的记录在查询命中时自动升级
+6. 分页查询（按标题、账号、日期筛选，按列排序），界面只读取当前页
+
+使用方法:
+    python publish_ledger.py --import-json ../publish_records.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from note_digest import default_cache
+
+
+# 默认台账文件位置（项目根目录）
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_LEDGER_FILE = PROJECT_ROOT / 'publish_records.db'
+LEGACY_RECORD_FILE = PROJECT_ROOT / 'publish_records.json'
+
+# 台账表的列（顺序与建表语句一致）
+RECORD_FIELDS = (
+    'hash',
+    'note_dir',
+    'note_name',
+    'title',
+    'note_id_xhs',
+    'link',
+    'published_at',
+    'extra',
+    'account',
+)
+
+# 允许排序的列（列名会拼接进 SQL，只接受白名单）
+SORT_FIELDS = ('published_at', 'title', 'note_name', 'account')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    hash TEXT PRIMARY KEY,
+    note_dir TEXT,
+    note_name TEXT,
+    title TEXT,
+    note_id_xhs TEXT,
+    link TEXT,
+    published_at TEXT,
+    extra TEXT,
+    account TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_records_note_dir ON records(note_dir);
+CREATE INDEX IF NOT EXISTS idx_records_note_id_xhs ON records(note_id_xhs);
+CREATE INDEX IF NOT EXISTS idx_records_published_at ON records(published_at);
+"""
+
+# 在 SCHEMA 之后执行（旧台账补齐 account 列后才能建索引）
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_records_account ON records(account, published_at);
+CREATE INDEX IF NOT EXISTS idx_records_title ON records(title);
+"""
+
+
+def note_hash(note_dir, digest_cache=None):
+    """
+    计算笔记的唯一标识（基于封面、卡片和 metadata.json 的内容）
+
+    digest_cache 为 note_digest.DigestCache，默认进程内共用缓存
+    """
+    return (digest_cache or default_cache()).note_digest(note_dir)
+
+
+def legacy_note_hash(note_dir):
+    """旧版笔记标识（基于路径和 cover.png 修改时间），仅用于匹配旧记录"""
+    note_dir = str(Path(note_dir).absolute())
+
+    # 使用绝对路径作为基础
+    hash_str = note_dir
+
+    # 添加 cover.png 的修改时间（如果存在）
+    cover_file = Path(note_dir) / 'cover.png'
+    if cover_file.exists():
+        mtime = cover_file.stat().st_mtime
+        hash_str += f"_{mtime}"
+
+    # 计算 MD5
+    return hashlib.md5(hash_str.encode('utf-8')).hexdigest()
+
+
+def legacy_record(key, item):
+    """将旧版 JSON 中的一条记录转换为台账记录格式"""
+    record = dict(item)
+    record['hash'] = item.get('hash') or key
+    record.setdefault('note_name', key)
+    if not record.get('note_id_xhs') and item.get('note_id'):
+        record['note_id_xhs'] = item['note_id']
+    if not record.get('link') and item.get('url'):
+        record['link'] = item['url']
+    return record
+
+
+class PublishLedger:
+    """基于 SQLite 的发布台账"""
+
+    def __init__(self, db_file=None, digest_cache=None):
+        """
+        Args:
+            db_file: 台账文件，默认项目根目录 publish_records.db
+            digest_cache: 计算笔记内容标识用的 DigestCache，默认进程内共用缓存
+        """
+        self.db_file = Path(db_file) if db_file else DEFAULT_LEDGER_FILE
+        self.digest_cache = digest_cache
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+
+        # GUI 的发布线程和主线程共用一个连接，由锁串行化访问
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.db_file),
+            timeout=30,
+            check_same_thread=False
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        columns = {row['name'] for row in self._conn.execute('PRAGMA table_info(records)')}
+        if 'account' not in columns:
+            self._conn.execute('ALTER TABLE records ADD COLUMN account TEXT')
+        self._conn.executescript(INDEXES)
+        self._conn.commit()
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def _row_to_record(row):
+        """将数据库行转换为记录字典（与旧版 JSON 记录格式一致）"""
+        if row is None:
+            return None
+        record = {key: row[key] for key in RECORD_FIELDS if key != 'extra'}
+        if row['extra']:
+            try:
+                extra = json.loads(row['extra'])
+                for key, value in extra.items():
+                    record.setdefault(key, value)
+            except ValueError:
+                pass
+        return record
+
+    def add(self, record):
+        """写入一条发布记录（同一哈希重复写入时覆盖）"""
+        if not record.get('hash'):
+            raise ValueError("record must contain 'hash'")
+
+        extra = {k: v for k, v in record.items() if k not in RECORD_FIELDS}
+        values = (
+            record['hash'],
+            record.get('note_dir'),
+            record.get('note_name'),
+            record.get('title'),
+            record.get('note_id_xhs'),
+            record.get('link'),
+            record.get('published_at') or datetime.now().isoformat(),
+            json.dumps(extra, ensure_ascii=False) if extra else None,
+            record.get('account'),
+        )
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    f'INSERT OR REPLACE INTO records ({", ".join(RECORD_FIELDS)}) '
+                    f'VALUES ({", ".join("?" * len(RECORD_FIELDS))})',
+                    values
+                )
+        return True
+
+    def _query_one(self, sql, params):
+        with self._lock:
+            row = self._conn.execute(sql, params).fetchone()
+        return self._row_to_record(row)
+
+    def contains(self, note_hash):
+        """检查哈希是否已存在"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT 1 FROM records WHERE hash = ? LIMIT 1', (note_hash,)
+            ).fetchone()
+        return row is not None
+
+    def get(self, note_hash):
+        """按笔记哈希查询"""
+        return self._query_one('SELECT * FROM records WHERE hash = ?', (note_hash,))
+
+    def find_note(self, note_dir):
+        """
+        按笔记内容标识查询发布记录
+
+        未命中时再按旧版标识查询，命中的旧记录改写为内容标识，
+        之后移动或复制该笔记也能识别为已发布。
+        """
+        digest = note_hash(note_dir, self.digest_cache)
+        record = self.get(digest)
+        if record is not None:
+            return record
+
+        # 先只读查询旧版标识，命中时才写入（未发布笔记的检查不占用写锁）
+        legacy = legacy_note_hash(note_dir)
+        if not self.contains(legacy):
+            return None
+        with self._lock:
+            with self._conn:
+                updated = self._conn.execute(
+                    'UPDATE records SET hash = ? WHERE hash = ?', (digest, legacy)
+                ).rowcount
+        return self.get(digest) if updated else None
+
+    def find_by_path(self, note_dir):
+        """按笔记路径查询最近一次发布记录"""
+        note_dir = str(Path(note_dir).absolute())
+        return self._query_one(
+            'SELECT * FROM records WHERE note_dir = ? ORDER BY published_at DESC LIMIT 1',
+            (note_dir,)
+        )
+
+    def find_by_note_id(self, note_id_xhs):
+        """按小红书笔记ID查询"""
+        return self._query_one(
+            'SELECT * FROM records WHERE note_id_xhs = ? LIMIT 1',
+            (note_id_xhs,)
+        )
+
+    def note_dirs_under(self, root_path):
+        """某目录下有发布记录的笔记路径（按 note_dir 索引范围查询）"""
+        prefix = str(Path(root_path).absolute()).rstrip(os.sep) + os.sep
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT DISTINCT note_dir FROM records WHERE note_dir >= ? AND note_dir < ?',
+                (prefix, prefix[:-1] + chr(ord(os.sep) + 1))
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def last_published_at(self):
+        """最近一次发布时间（ISO 字符串），没有记录时返回 None"""
+        with self._lock:
+            return self._conn.execute('SELECT MAX(published_at) FROM records').fetchone()[0]
+
+    def count(self):
+        """记录总数"""
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+
+    def count_since(self, since):
+        """统计某时间点（ISO 字符串或 datetime/date）之后的发布数"""
+        if not isinstance(since, str):
+            since = since.isoformat()
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM records WHERE published_at >= ?', (since,)
+            ).fetchone()[0]
+
+    def all_records(self, newest_first=True):
+        """获取所有记录（按发布时间排序）"""
+        order = 'DESC' if newest_first else 'ASC'
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT * FROM records ORDER BY published_at {order}'
+            ).fetchall()
+        return [self._row_to_record(row) for row in rows]
+
+    @staticmethod
+    def _filters(search=None, account=None, since=None, until=None):
+        """构造查询条件；since 含，until 不含（ISO 字符串或 datetime/date）"""
+        clauses, params = [], []
+        if search:
+            # instr 按字面匹配，比转义后的 LIKE 快
+            clauses.append('(instr(title, ?) > 0 OR instr(note_name, ?) > 0)')
+            params += [search, search]
+        if account:
+            clauses.append('account = ?')
+            params.append(account)
+        if since:
+            clauses.append('published_at >= ?')
+            params.append(since if isinstance(since, str) else since.isoformat())
+        if until:
+            clauses.append('published_at < ?')
+            params.append(until if isinstance(until, str) else until.isoformat())
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        return where, params
+
+    def query(self, search=None, account=None, since=None, until=None,
+              order_by='published_at', descending=True, limit=100, offset=0):
+        """
+        分页查询记录
+
+        Args:
+            search: 标题或笔记名称包含的文字
+            account: 发布账号
+            since / until: 发布时间范围（since 含，until 不含）
+            order_by: 排序列，见 SORT_FIELDS
+            descending: 是否倒序
+            limit / offset: 分页
+        """
+        if order_by not in SORT_FIELDS:
+            raise ValueError(f"Unsupported sort field: {order_by}")
+        where, params = self._filters(search, account, since, until)
+        order = 'DESC' if descending else 'ASC'
+        # 排序列相同时按哈希排序，翻页结果稳定
+        sql = (f'SELECT * FROM records{where} ORDER BY {order_by} {order}, hash {order} '
+               f'LIMIT ? OFFSET ?')
+        with self._lock:
+            rows = self._conn.execute(sql, params + [limit, offset]).fetchall()
+        return [self._row_to_record(row) for row in rows]
+
+    def count_matching(self, search=None, account=None, since=None, until=None):
+        """符合查询条件的记录数"""
+        where, params = self._filters(search, account, since, until)
+        with self._lock:
+            return self._conn.execute(f'SELECT COUNT(*) FROM records{where}', params).fetchone()[0]
+
+    def accounts(self):
+        """台账中出现过的发布账号"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT DISTINCT account FROM records WHERE account IS NOT NULL ORDER BY account'
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def import_json(self, json_file):
+        """
+        导入旧版 publish_records.json
+
+        兼容两种格式:
+        1. GUI V3: {hash: {note_dir, note_name, title, note_id_xhs, link, published_at, hash}}
+        2. 批量脚本: {note_name: {note_id, title, published_at, url}}
+
+        Returns:
+            int: 导入的记录数
+        """
+        json_file = Path(json_file)
+        with open(json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        if not isinstance(data, dict):
+            raise ValueError(f"Unsupported record file format: {json_file}")
+
+        rows = [legacy_record(key, item) for key, item in data.items() if isinstance(item, dict)]
+
+        for record in rows:
+            self.add(record)
+
+        return len(rows)
+
+    def migrate_legacy(self, json_file=None):
+        """台账为空且存在旧版 JSON 时自动导入，返回导入数量"""
+        json_file = Path(json_file) if json_file else LEGACY_RECORD_FILE
+        if self.count() > 0 or not json_file.exists():
+            return 0
+        try:
+            return self.import_json(json_file)
+        except Exception as e:
+            print(f"Warning: Failed to import legacy records: {e}")
+            return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='发布台账工具')
+    parser.add_argument('--db', type=str, help='台账文件路径 (默认: 项目根目录 publish_records.db)')
+    parser.add_argument('--import-json', type=str, help='导入旧版 publish_records.json')
+
+    args = parser.parse_args()
+
+    with PublishLedger(args.db) as ledger:
+        if args.import_json:
+            if not os.path.exists(args.import_json):
+                print(f"[ERROR] File not found: {args.import_json}")
+                sys.exit(1)
+            count = ledger.import_json(args.import_json)
+            print(f"[SUCCESS] Imported {count} records into {ledger.db_file}")
+
+        print(f"[INFO] Ledger: {ledger.db_file}")
+        print(f"[INFO] Total records: {ledger.count()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+渲染 → 上传 → 发布 流水线
+
+将 Markdown 渲染、图片上传和笔记发布串成一条 asyncio 流水线，
+各阶段之间用有界队列连接:
+
+    渲染 (解析/分页/截图) --[队列]--> 上传 --[队列]--> 发布 (按间隔)
+
+第 N 篇笔记等待发布时间窗口的同时，第 N+1 篇已经在渲染并预先上传图片，
+整批耗时只取决于发布间隔，而不是各阶段耗时之和。
+队列有上限，上游不会跑得太远（避免预上传的图片过期）。
+
+断点续传基于 publish_queue，发布记录写入 publish_ledger；
+台账中已有的笔记（GUI、发布引擎或旧版 JSON 台账发布过的，按路径或内容标识匹配）直接跳过。
+各阶段耗时和每篇笔记的结果写入结构化事件日志（见 event_log）。
+
+使用方法:
+    python publish_pipeline.py note1.md note2.md -o ./output --interval 20
+    python publish_pipeline.py D:\\notes\\note_01 D:\\notes\\note_02 --interval 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from event_log import error_fields, get_logger, total_size
+from image_preflight import default_preflight
+from note_catalog import default_catalog
+from publish_ledger import PublishLedger, note_hash
+from publish_queue import PublishQueue
+import xhs_api
+from xhs_resilience import ApiGuard, CircuitOpenError
+
+
+DEFAULT_INTERVAL_MINUTES = 20
+DEFAULT_QUEUE_SIZE = 1
+DEFAULT_UPLOAD_CONCURRENCY = 3
+
+class PipelineNote:
+    """流水线中的一篇笔记"""
+
+    __slots__ = ('source', 'note_dir', 'title', 'desc', 'images', 'job')
+
+    def __init__(self, source, note_dir):
+        self.source = source
+        self.note_dir = note_dir
+        self.title = ''
+        self.desc = ''
+        self.images = []
+        self.job = None
+
+
+class PublishPipeline:
+    """渲染 → 上传 → 发布 流水线"""
+
+    def __init__(self, client, output_dir=None, style='purple',
+                 interval_minutes=DEFAULT_INTERVAL_MINUTES, queue_size=DEFAULT_QUEUE_SIZE,
+                 upload_concurrency=DEFAULT_UPLOAD_CONCURRENCY, publish_queue=None,
+                 ledger=None, guard=None, catalog=None, preflight=None, log=print,
+                 event_log=None, account=None):
+        """
+        Args:
+            client: XhsClient
+            output_dir: Markdown 渲染输出根目录（每篇笔记一个子目录）
+            style: 渲染样式
+            interval_minutes: 发布间隔（分钟）
+            queue_size: 阶段之间的队列长度（预处理的笔记数上限）
+            upload_concurrency: 单篇笔记的并发上传数
+            publish_queue: PublishQueue，默认使用项目根目录的队列
+            ledger: PublishLedger，默认使用项目根目录的台账
+            guard: ApiGuard，API 调用的重试与熔断
+            catalog: NoteCatalog，默认进程内共用目录
+            preflight: ImagePreflight，上传前图片预检
+            log: 日志输出函数
+            event_log: 结构化事件日志（event_log.EventLogger），默认写入共用的事件日志
+            account: 当前登录账号的昵称，写入发布记录供按账号筛选
+        """
+        self.client = client
+        self.output_dir = Path(output_dir) if output_dir else Path.cwd()
+        self.style = style
+        self.interval_seconds = interval_minutes * 60
+        self.queue_size = queue_size
+        self.upload_concurrency = upload_concurrency
+        self.publish_queue = publish_queue or PublishQueue()
+        if ledger is None:
+            ledger = PublishLedger()
+            # 首次使用时导入旧版 publish_records.json
+            ledger.migrate_legacy()
+        self.ledger = ledger
+        self.account = account
+        self.event_log = event_log or get_logger('pipeline')
+        self.guard = guard or ApiGuard(log=log, events=self.event_log)
+        self.catalog = catalog or default_catalog()
+        self.preflight = preflight or default_preflight()
+        self.log = log
+
+        self.stats = {'published': 0, 'failed': 0, 'skipped': 0}
+
+    async def run(self, sources):
+        """运行流水线，sources 为 Markdown 文件或已渲染的笔记目录"""
+        render_q = asyncio.Queue(maxsize=self.queue_size)
+        upload_q = asyncio.Queue(maxsize=self.queue_size)
+
+        start = time.monotonic()
+        tasks = [
+            asyncio.create_task(self._render_stage(sources, render_q)),
+            asyncio.create_task(self._upload_stage(render_q, upload_q)),
+            asyncio.create_task(self._publish_stage(upload_q)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except CircuitOpenError as e:
+            self.log(f"[ERROR] 账号已暂停，停止发布: {e}")
+            self.stats['stopped'] = str(e)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        self.stats['elapsed'] = time.monotonic() - start
+        return self.stats
+
+    # ---------- 渲染阶段 ----------
+
+    async def _render_stage(self, sources, out_q):
+        for source in sources:
+            try:
+                note = await self._prepare(source)
+            except Exception as e:
+                self.log(f"[ERROR] 渲染失败 {source}: {e}")
+                self._note_failed(str(source), e)
+                continue
+            if note is not None:
+                # 队列已满时在此等待（背压）
+                await out_q.put(note)
+        await out_q.put(None)
+
+    async def _prepare(self, source):
+        """渲染 Markdown（如需要），读取标题/正文/图片并入队"""
+        source = Path(source)
+        if source.is_dir():
+            note = PipelineNote(source, str(source.absolute()))
+            job = self.publish_queue.enqueue(note.note_dir, state='rendered')
+        else:
+            note = PipelineNote(source, str((self.output_dir / source.stem).absolute()))
+            job = self.publish_queue.enqueue(note.note_dir, state='pending')
+
+        if job.state == 'verified':
+            self.log(f"[SKIP] 已发布: {note.note_dir}")
+            self.stats['skipped'] += 1
+            return None
+        if job.needs_manual_check:
+            self.log(f"[SKIP] 上次发布中断，结果未知，请确认后运行 publish_queue.py --reset: {note.note_dir}")
+            self.stats['skipped'] += 1
+            return None
+
+        record = self._published_record(note.note_dir)
+        if record is not None:
+            self._mark_published(job, record)
+            self.log(f"[SKIP] 台账中已有发布记录: {note.note_dir}")
+            self.stats['skipped'] += 1
+            return None
+
+        if not source.is_dir():
+            if job.state == 'pending' or not os.path.exists(os.path.join(note.note_dir, 'cover.png')):
+                await self._render_markdown(source, note.note_dir)
+                if job.state == 'pending':
+                    job = self.publish_queue.mark_rendered(note.note_dir)
+
+        note.job = job
+        info = self.catalog.get(note.note_dir)
+        note.title = info.title
+        note.desc = info.desc
+        note.images, messages = await asyncio.to_thread(self.preflight.run, info.images)
+        for message in messages:
+            self.log(f"[WARN] {message}")
+        if not note.images:
+            self.log(f"[ERROR] 没有找到图片: {note.note_dir}")
+            self._note_failed(note.note_dir, 'no images')
+            return None
+        return note
+
+    def _published_record(self, note_dir):
+        """台账中的发布记录（先按路径，再按内容标识和旧版标识），未发布返回 None"""
+        record = self.ledger.find_by_path(note_dir)
+        if record is None and os.path.isdir(note_dir):
+            record = self.ledger.find_note(note_dir)
+        return record
+
+    def _mark_published(self, job, record):
+        """其它工具已发布的笔记：队列任务直接标记为完成"""
+        note_dir = job.note_dir
+        if job.state == 'pending':
+            job = self.publish_queue.mark_rendered(note_dir)
+        if job.state != 'created':
+            self.publish_queue.mark_created(note_dir, record.get('note_id_xhs'))
+        self.publish_queue.mark_verified(note_dir)
+
+    async def _render_markdown(self, md_file, note_dir):
+        """调用 render_xhs_v2 渲染卡片，并写入 metadata.json"""
+        # 仅在需要渲染时才加载 Playwright 等依赖
+        from render_xhs_v2 import parse_markdown_file, render_markdown_to_cards
+
+        data = parse_markdown_file(str(md_file))
+        metadata = {
+            key: data['metadata'][key]
+            for key in ('title', 'subtitle', 'emoji', 'desc')
+            if data['metadata'].get(key)
+        }
+        await render_markdown_to_cards(str(md_file), note_dir, self.style)
+
+        with open(os.path.join(note_dir, 'metadata.json'), 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        return metadata
+
+    # ---------- 上传阶段 ----------
+
+    async def _upload_stage(self, in_q, out_q):
+        semaphore = asyncio.Semaphore(self.upload_concurrency)
+
+        async def upload_one(path):
+            async with semaphore:
+                return await asyncio.to_thread(self.guard.upload_image, self.client, path)
+
+        while True:
+            note = await in_q.get()
+            if note is None:
+                break
+
+            if note.job.reached('uploaded'):
+                await out_q.put(note)
+                continue
+
+            self.log(f"[UPLOAD] {note.title} ({len(note.images)} 张图片)")
+            try:
+                # 保持图片顺序，任意一张失败则整篇失败
+                with self.event_log.stage('upload', note_dir=note.note_dir, images=len(note.images),
+                                          bytes=total_size(note.images)):
+                    image_ids = await asyncio.gather(*(upload_one(p) for p in note.images))
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                self.log(f"[ERROR] 上传失败 {note.note_dir}: {e}")
+                self.publish_queue.record_error(note.note_dir, e)
+                self._note_failed(note.note_dir, e)
+                continue
+
+            note.job = self.publish_queue.mark_uploaded(note.note_dir, image_ids)
+            await out_q.put(note)
+        await out_q.put(None)
+
+    # ---------- 发布阶段 ----------
+
+    async def _publish_stage(self, in_q):
+        next_slot = 0.0
+        while True:
+            note = await in_q.get()
+            if note is None:
+                break
+
+            if note.job.state == 'created':
+                # 上次已发布成功但记录未写入，补写记录
+                self._save_record(note, note.job.note_id_xhs)
+                continue
+
+            delay = next_slot - time.monotonic()
+            if delay > 0:
+                self.log(f"[WAIT] {delay / 60:.1f} 分钟后发布: {note.title}")
+                await asyncio.sleep(delay)
+
+            try:
+                self.publish_queue.begin_create(note.note_dir)
+                with self.event_log.stage('create', note_dir=note.note_dir) as fields:
+                    note_id = await asyncio.to_thread(
+                        self.guard.create_note, self.client, note.title, note.desc, note.job.image_ids
+                    )
+                    fields['note_id'] = note_id
+            except CircuitOpenError as e:
+                # 熔断/登录失效时请求未发出或被明确拒绝
+                self.publish_queue.clear_create_attempt(note.note_dir)
+                self.publish_queue.record_error(note.note_dir, e)
+                raise
+            except xhs_api.XhsApiError as e:
+                # 平台明确返回失败，可安全重试
+                self.publish_queue.clear_create_attempt(note.note_dir)
+                self.publish_queue.record_error(note.note_dir, e)
+                self.log(f"[ERROR] 发布失败 {note.note_dir}: {e}")
+                self._note_failed(note.note_dir, e)
+                continue
+            except Exception as e:
+                self.publish_queue.record_error(note.note_dir, e)
+                self.log(f"[ERROR] 发布异常 {note.note_dir}: {e}")
+                self._note_failed(note.note_dir, e)
+                continue
+
+            self.publish_queue.mark_created(note.note_dir, note_id)
+            self._save_record(note, note_id)
+            next_slot = time.monotonic() + self.interval_seconds
+
+    def _save_record(self, note, note_id):
+        link = xhs_api.note_link(note_id)
+        self.ledger.add({
+            'hash': note_hash(note.note_dir, self.ledger.digest_cache),
+            'note_dir': note.note_dir,
+            'note_name': os.path.basename(note.note_dir),
+            'title': note.title,
+            'note_id_xhs': note_id,
+            'link': link,
+            'published_at': datetime.now().isoformat(),
+            'account': self.account,
+        })
+        self.publish_queue.mark_verified(note.note_dir)
+        self.stats['published'] += 1
+        self.event_log.emit('note', note_dir=note.note_dir, status='published', note_id=note_id)
+        self.log(f"[SUCCESS] {note.title} -> {link}")
+
+    def _note_failed(self, note_dir, error):
+        """记录一篇失败的笔记，error 为异常或错误说明"""
+        self.stats['failed'] += 1
+        fields = error_fields(error) if isinstance(error, Exception) else {'error_msg': error}
+        self.event_log.emit('note', note_dir=note_dir, status='failed', **fields)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='小红书 渲染 → 上传 → 发布 流水线')
+    parser.add_argument('sources', nargs='+', help='Markdown 文件或已渲染的笔记目录')
+    parser.add_argument('--output-dir', '-o', default=os.getcwd(), help='Markdown 渲染输出根目录')
+    parser.add_argument('--style', '-s', default='purple', help='渲染样式（默认: purple）')
+    parser.add_argument('--interval', type=int, default=DEFAULT_INTERVAL_MINUTES,
+                        help=f'发布间隔(分钟)，默认 {DEFAULT_INTERVAL_MINUTES}')
+    parser.add_argument('--lookahead', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help='提前渲染/上传的笔记数，默认 1')
+
+    args = parser.parse_args()
+
+    for source in args.sources:
+        if not os.path.exists(source):
+            print(f"[ERROR] Not found: {source}")
+            sys.exit(1)
+
+    from publish_helper import create_client, get_user_info, load_cookie
+    from rate_limiter import RateLimiter, account_key
+    client = create_client()
+    guard = ApiGuard(limiter=RateLimiter(), account=account_key(load_cookie()))
+    user = get_user_info()
+    account = user['info']['nickname'] if user['success'] else None
+
+    pipeline = PublishPipeline(
+        client,
+        guard=guard,
+        output_dir=args.output_dir,
+        style=args.style,
+        interval_minutes=args.interval,
+        queue_size=args.lookahead,
+        account=account or None,
+    )
+    stats = asyncio.run(pipeline.run(args.sources))
+
+    print(f"\n[INFO] 成功: {stats['published']}, 失败: {stats['failed']}, "
+          f"跳过: {stats['skipped']}, 用时: {stats['elapsed'] / 60:.1f} 分钟")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+持久化发布队列
+每篇笔记按状态机推进，每次状态变更都以单条事务写入 SQLite
+
+状态流转:
+    pending -> rendered -> uploaded -> created -> verified
+
+- pending:  已入队，图片尚未渲染
+- rendered: 图片已就绪
+- uploaded: 图片已上传，image_ids 已保存（续传时不再重复上传）
+- created:  笔记已创建，note_id 已保存（续传时不再重复发布）
+- verified: 已写入发布台账，任务完成
+
+任何发布工具（命令行或 GUI）崩溃后重新启动，都可以从队列中读取
+每篇笔记的状态，从中断处继续。
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_QUEUE_FILE = PROJECT_ROOT / 'publish_queue.db'
+
+STATES = ('pending', 'rendered', 'uploaded', 'created', 'verified')
+STATE_ORDER = {state: idx for idx, state in enumerate(STATES)}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_key TEXT PRIMARY KEY,
+    note_dir TEXT NOT NULL,
+    state TEXT NOT NULL,
+    title TEXT,
+    image_ids TEXT,
+    note_id_xhs TEXT,
+    create_started_at TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state);
+"""
+
+
+class InvalidTransition(Exception):
+    """非法的状态变更（状态不存在或已被其他进程推进）"""
+
+
+class PublishJob:
+    """队列中的一篇笔记"""
+
+    __slots__ = (
+        'job_key', 'note_dir', 'state', 'title', 'image_ids', 'note_id_xhs',
+        'create_started_at', 'attempts', 'last_error', 'created_at', 'updated_at',
+    )
+
+    def __init__(self, row):
+        for key in self.__slots__:
+            setattr(self, key, row[key])
+        self.image_ids = json.loads(self.image_ids) if self.image_ids else []
+
+    def reached(self, state):
+        """是否已达到（或越过）某个状态"""
+        return STATE_ORDER[self.state] >= STATE_ORDER[state]
+
+    @property
+    def needs_manual_check(self):
+        """
+        上次在发布请求发出后、结果落盘前中断
+
+        此时无法确定笔记是否已在平台创建，自动重试可能导致重复发布。
+        """
+        return self.state in ('rendered', 'uploaded') and bool(self.create_started_at)
+
+    def __repr__(self):
+        return f"PublishJob({self.note_dir!r}, state={self.state!r})"
+
+
+class PublishQueue:
+    """基于 SQLite 的持久化发布队列"""
+
+    def __init__(self, db_file=None):
+        self.db_file = Path(db_file) if db_file else DEFAULT_QUEUE_FILE
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.db_file),
+            timeout=30,
+            check_same_thread=False
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=FULL')
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def job_key(note_dir):
+        """队列主键：笔记目录的绝对路径"""
+        return str(Path(note_dir).absolute())
+
+    def get(self, note_dir):
+        """获取笔记的队列状态，未入队返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT * FROM jobs WHERE job_key = ?', (self.job_key(note_dir),)
+            ).fetchone()
+        return PublishJob(row) if row else None
+
+    def enqueue(self, note_dir, title=None, state='pending'):
+        """
+        入队（已存在时保持原有状态不变）
+
+        Args:
+            note_dir: 笔记目录
+            title: 笔记标题
+            state: 初始状态，图片已渲染好的笔记传入 'rendered'
+
+        Returns:
+            PublishJob: 当前任务状态
+        """
+        if state not in ('pending', 'rendered'):
+            raise InvalidTransition(f"Cannot enqueue with state {state!r}")
+
+        now = datetime.now().isoformat()
+        key = self.job_key(note_dir)
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    'INSERT OR IGNORE INTO jobs '
+                    '(job_key, note_dir, state, title, created_at, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (key, key, state, title, now, now)
+                )
+        return self.get(note_dir)
+
+    def _transition(self, note_dir, from_states, to_state, **fields):
+        """原子状态变更：仅当当前状态在 from_states 中时才更新"""
+        assignments = ['state = ?', 'updated_at = ?']
+        params = [to_state, datetime.now().isoformat()]
+        for column, value in fields.items():
+            assignments.append(f'{column} = ?')
+            params.append(value)
+
+        placeholders = ', '.join('?' for _ in from_states)
+        params.extend([self.job_key(note_dir), *from_states])
+
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    f'UPDATE jobs SET {", ".join(assignments)} '
+                    f'WHERE job_key = ? AND state IN ({placeholders})',
+                    params
+                )
+        if cursor.rowcount != 1:
+            job = self.get(note_dir)
+            current = job.state if job else None
+            raise InvalidTransition(
+                f"{note_dir}: cannot move from {current!r} to {to_state!r}"
+            )
+        return self.get(note_dir)
+
+    def mark_rendered(self, note_dir):
+        """图片渲染完成"""
+        return self._transition(note_dir, ('pending',), 'rendered')
+
+    def mark_uploaded(self, note_dir, image_ids):
+        """图片上传完成，保存 image_ids"""
+        return self._transition(
+            note_dir, ('rendered',), 'uploaded',
+            image_ids=json.dumps(list(image_ids))
+        )
+
+    def begin_create(self, note_dir):
+        """发布请求发出前记录时间点，用于识别中断时结果未知的任务"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    'UPDATE jobs SET create_started_at = ?, attempts = attempts + 1, '
+                    'updated_at = ? WHERE job_key = ? AND state IN (?, ?)',
+                    (now, now, self.job_key(note_dir), 'rendered', 'uploaded')
+                )
+        if cursor.rowcount != 1:
+            raise InvalidTransition(f"{note_dir}: not ready for create")
+        return self.get(note_dir)
+
+    def mark_created(self, note_dir, note_id_xhs):
+        """笔记已创建，保存平台笔记ID"""
+        return self._transition(
+            note_dir, ('rendered', 'uploaded'), 'created',
+            note_id_xhs=note_id_xhs, last_error=None
+        )
+
+    def mark_verified(self, note_dir):
+        """发布记录已落盘，任务完成"""
+        return self._transition(note_dir, ('created',), 'verified')
+
+    def record_error(self, note_dir, error):
+        """记录失败原因（状态不变）"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    'UPDATE jobs SET last_error = ?, updated_at = ? WHERE job_key = ?',
+                    (str(error), datetime.now().isoformat(), self.job_key(note_dir))
+                )
+
+    def clear_create_attempt(self, note_dir):
+        """发布请求明确失败（平台未创建笔记）时清除标记，允许安全重试"""
+        job = self.get(note_dir)
+        state = job.state if job else None
+        return self._transition(
+            note_dir, ('rendered', 'uploaded'), state, create_started_at=None
+        )
+
+    def reset(self, note_dir, state='rendered'):
+        """人工确认后重置任务（例如确认笔记未发布，或图片需重新上传）"""
+        key = self.job_key(note_dir)
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    'UPDATE jobs SET state = ?, image_ids = NULL, note_id_xhs = NULL, '
+                    'create_started_at = NULL, updated_at = ? WHERE job_key = ?',
+                    (state, datetime.now().isoformat(), key)
+                )
+        return self.get(note_dir)
+
+    def jobs(self, states=None):
+        """按入队顺序列出任务，可按状态过滤"""
+        sql = 'SELECT * FROM jobs'
+        params = []
+        if states:
+            sql += f' WHERE state IN ({", ".join("?" for _ in states)})'
+            params.extend(states)
+        sql += ' ORDER BY created_at, job_key'
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [PublishJob(row) for row in rows]
+
+    @staticmethod
+    def _under(root_path):
+        """某目录下任务的主键范围条件"""
+        if root_path is None:
+            return '', []
+        prefix = PublishQueue.job_key(root_path).rstrip(os.sep) + os.sep
+        return ' WHERE job_key >= ? AND job_key < ?', [prefix, prefix[:-1] + chr(ord(os.sep) + 1)]
+
+    def counts(self, root_path=None):
+        """各状态的任务数，可只统计某目录下的笔记"""
+        where, params = self._under(root_path)
+        result = {state: 0 for state in STATES}
+        with self._lock:
+            for state, count in self._conn.execute(
+                f'SELECT state, COUNT(*) FROM jobs{where} GROUP BY state', params
+            ):
+                result[state] = count
+        return result
+
+    def needs_check_count(self, root_path=None):
+        """发布请求已发出但结果未落盘、需要人工确认的任务数"""
+        where, params = self._under(root_path)
+        where = f"{where} AND" if where else ' WHERE'
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT COUNT(*) FROM jobs{where} state IN ('rendered', 'uploaded') "
+                f"AND create_started_at IS NOT NULL", params
+            ).fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='持久化发布队列工具')
+    parser.add_argument('--db', type=str, help='队列文件路径 (默认: 项目根目录 publish_queue.db)')
+    parser.add_argument('--list', action='store_true', help='列出所有未完成的任务')
+    parser.add_argument('--reset', type=str, metavar='NOTE_DIR', help='人工确认后重置任务为 rendered')
+
+    args = parser.parse_args()
+
+    with PublishQueue(args.db) as queue:
+        if args.reset:
+            job = queue.reset(args.reset)
+            if job is None:
+                print(f"[ERROR] Not in queue: {args.reset}")
+            else:
+                print(f"[SUCCESS] Reset: {job.note_dir} -> {job.state}")
+
+        if args.list:
+            for job in queue.jobs(states=('pending', 'rendered', 'uploaded', 'created')):
+                flag = ' [NEEDS CHECK]' if job.needs_manual_check else ''
+                print(f"  {job.state:9} {job.note_dir}{flag}")
+                if job.last_error:
+                    print(f"            last error: {job.last_error}")
+
+        counts = queue.counts()
+        print("[INFO] " + ", ".join(f"{state}: {counts[state]}" for state in STATES))
+
+
+if __name__ == '__main__':
+    main()
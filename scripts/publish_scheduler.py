@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发布调度器
+基于条件变量的定时等待，替代每秒轮询 is_running / is_paused 的循环
+
+特性:
+1. 等待在截止时间精确唤醒，暂停、继续、停止立即生效（无需轮询）
+2. 暂停期间不计时：暂停 5 分钟，所有截止时间顺延 5 分钟
+3. 发布时间窗口：多个任务依次领取间隔 interval 的时间窗口，
+   同一调度器上的任务共享同一发布节奏
+"""
+
+import threading
+import time
+
+
+class PublishScheduler:
+    """可暂停、可停止的发布调度器（线程安全）"""
+
+    def __init__(self, interval=0.0, clock=time.monotonic):
+        """
+        Args:
+            interval: 相邻发布时间窗口的间隔（秒）
+            clock: 时间函数
+        """
+        self._clock = clock
+        self._cond = threading.Condition()
+        self.reset(interval)
+
+    def reset(self, interval=None):
+        """开始新任务：清除暂停/停止状态和已分配的时间窗口"""
+        with self._cond:
+            if interval is not None:
+                self.interval = interval
+            self._stopped = False
+            self._paused_at = None
+            self._paused_total = 0.0
+            self._last_slot = None
+            self._cond.notify_all()
+
+    # ---------- 状态控制 ----------
+
+    @property
+    def paused(self):
+        return self._paused_at is not None
+
+    @property
+    def stopped(self):
+        return self._stopped
+
+    def pause(self):
+        with self._cond:
+            if self._paused_at is None:
+                self._paused_at = self._clock()
+            self._cond.notify_all()
+
+    def resume(self):
+        with self._cond:
+            if self._paused_at is not None:
+                self._paused_total += self._clock() - self._paused_at
+                self._paused_at = None
+            self._cond.notify_all()
+
+    def stop(self):
+        """停止：所有等待立即返回 False"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    # ---------- 计时 ----------
+
+    def now(self):
+        """调度时间（不含暂停时长）"""
+        with self._cond:
+            return self._now()
+
+    def _now(self):
+        paused = self._paused_total
+        if self._paused_at is not None:
+            paused += self._clock() - self._paused_at
+        return self._clock() - paused
+
+    def wait_until(self, deadline):
+        """
+        等待到调度时间 deadline
+
+        Returns:
+            bool: 到达截止时间返回 True，被停止返回 False
+        """
+        with self._cond:
+            while True:
+                if self._stopped:
+                    return False
+                if self._paused_at is not None:
+                    self._cond.wait()
+                    continue
+                remaining = deadline - self._now()
+                if remaining <= 0:
+                    return True
+                self._cond.wait(remaining)
+
+    def sleep(self, seconds):
+        """等待 seconds 秒（暂停时间不计入），被停止返回 False"""
+        return self.wait_until(self.now() + seconds)
+
+    def wait_if_paused(self):
+        """暂停时阻塞直到继续，被停止返回 False"""
+        return self.wait_until(float('-inf'))
+
+    # ---------- 发布时间窗口 ----------
+
+    def reserve_slot(self):
+        """
+        领取下一个发布时间窗口
+
+        第一个窗口为当前时间，之后每个窗口与上一个间隔 interval；
+        若已超过应发布的时间，则从当前时间开始。
+
+        Returns:
+            float: 窗口的调度时间，配合 wait_until 使用
+        """
+        with self._cond:
+            now = self._now()
+            if self._last_slot is None:
+                slot = now
+            else:
+                slot = max(now, self._last_slot + self.interval)
+            self._last_slot = slot
+            return slot
+
+    def until(self, deadline):
+        """距 deadline 的秒数（不含暂停时长）"""
+        return max(0.0, deadline - self.now())
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发布服务（本地 HTTP/JSON API）
+在无显示器的服务器上常驻运行 PublishEngine，GUI 和脚本通过本地 HTTP 接口控制
+
+接口:
+    GET  /api/status                      引擎状态、待发布数、本次统计、发布记录统计
+    POST /api/enqueue   {"paths": [...], "wait_minutes": 20}
+                                          加入笔记文件夹（上级文件夹会递归扫描）
+    POST /api/pause                       暂停
+    POST /api/resume                      继续
+    POST /api/stop                        停止当前任务并清空待发布笔记
+    GET  /api/events?since=0&timeout=30   长轮询：返回序号大于 since 的事件
+    GET  /api/events/stream?since=0       Server-Sent Events 持续推送事件
+    GET  /metrics                         发布吞吐指标（Prometheus 文本格式，见 metrics.py）
+
+事件类型: log / state / progress / note / duplicate / error / done
+
+访问控制:
+    每次启动生成随机访问令牌，写入项目根目录 .publish_service_token（仅当前用户可读），
+    /api/ 下的请求须带请求头 X-Publish-Token；POST 请求体须为 application/json。
+    浏览器页面无法读取令牌、也无法跨站发送带自定义请求头或 JSON 类型的请求，
+    因此恶意网页不能借用户的浏览器入队或停止发布（CSRF）。
+    EngineClient 自动读取令牌文件。/metrics 不需要令牌。
+    默认只监听 127.0.0.1，不要暴露到公网。
+
+使用方法:
+    python publish_service.py --port 8766 --wait-minutes 20
+    curl -X POST http://127.0.0.1:8766/api/enqueue -H "X-Publish-Token: $(cat .publish_service_token)" \
+         -H 'Content-Type: application/json' -d '{"paths": ["/data/notes"]}'
+    curl -N -H "X-Publish-Token: $(cat .publish_service_token)" http://127.0.0.1:8766/api/events/stream
+"""
+
+import argparse
+import hmac
+import json
+import os
+import secrets
+import sys
+import tempfile
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from metrics import default_registry, send_metrics
+from publish_engine import DEDUP_MODES, EngineError, PublishEngine
+from session_monitor import SessionMonitor
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8766
+
+PROJECT_ROOT = Path(__file__).parent.parent
+# 当前运行的服务的访问令牌，EngineClient 默认从这里读取
+DEFAULT_TOKEN_FILE = PROJECT_ROOT / '.publish_service_token'
+TOKEN_HEADER = 'X-Publish-Token'
+
+# 长轮询最长等待时间（秒）
+MAX_POLL_TIMEOUT = 60
+# SSE 无事件时发送心跳的间隔（秒）
+STREAM_HEARTBEAT = 15
+
+
+def write_token(token, token_file=DEFAULT_TOKEN_FILE):
+    """写入访问令牌文件（mkstemp 创建，仅当前用户可读写）"""
+    token_file = Path(token_file)
+    fd, tmp = tempfile.mkstemp(dir=str(token_file.parent), prefix=token_file.name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(token)
+        os.replace(tmp, token_file)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def read_token(token_file=DEFAULT_TOKEN_FILE):
+    """读取访问令牌，文件不存在时返回 None"""
+    try:
+        return Path(token_file).read_text(encoding='utf-8').strip() or None
+    except OSError:
+        return None
+
+
+class PublishService:
+    """在后台线程运行的发布服务"""
+
+    def __init__(self, engine, host=DEFAULT_HOST, port=DEFAULT_PORT, token=None):
+        """
+        Args:
+            engine: PublishEngine
+            host / port: 监听地址
+            token: 访问令牌，默认每次启动随机生成（命令行模式写入令牌文件）
+        """
+        self.engine = engine
+        self.token = token or secrets.token_urlsafe(32)
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.engine = engine
+        self._httpd.token = self.token
+        # 从启动开始汇总事件，供 /metrics 使用
+        self._httpd.metrics = default_registry()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def serve_forever(self):
+        """在当前线程运行（命令行模式）"""
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def engine(self):
+        return self.server.engine
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json;charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        self._send_json(status, {'success': False, 'error': message})
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        body = json.loads(self.rfile.read(length).decode('utf-8'))
+        if not isinstance(body, dict):
+            raise ValueError("body must be a JSON object")
+        return body
+
+    def _authorized(self):
+        """校验访问令牌（常量时间比较）"""
+        token = self.headers.get(TOKEN_HEADER) or ''
+        return hmac.compare_digest(token.encode('utf-8'), self.server.token.encode('utf-8'))
+
+    def _dispatch(self, handler, path):
+        """/api/ 请求先校验令牌；处理中的异常返回 500，不断开连接"""
+        try:
+            if path.startswith('/api/') and not self._authorized():
+                self._send_error(401, f"missing or invalid {TOKEN_HEADER}")
+                return
+            handler()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except Exception as e:
+            self._send_error(500, f"{type(e).__name__}: {e}")
+
+    def do_GET(self):
+        self._dispatch(self._handle_get, urllib.parse.urlsplit(self.path).path)
+
+    def do_POST(self):
+        self._dispatch(self._handle_post, urllib.parse.urlsplit(self.path).path)
+
+    def _handle_get(self):
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        try:
+            since = int(query.get('since', ['0'])[0])
+            timeout = min(float(query.get('timeout', ['0'])[0]), MAX_POLL_TIMEOUT)
+        except ValueError as e:
+            self._send_error(400, f"invalid query: {e}")
+            return
+
+        if url.path == '/api/status':
+            self._send_json(200, {'success': True, 'data': self.engine.status()})
+        elif url.path == '/api/events':
+            events = self.engine.events(since, timeout)
+            self._send_json(200, {'success': True, 'data': events})
+        elif url.path == '/api/events/stream':
+            self._stream_events(since)
+        elif url.path == '/metrics':
+            send_metrics(self, self.server.metrics)
+        else:
+            self._send_error(404, f"unknown path: {url.path}")
+
+    def _handle_post(self):
+        url = urllib.parse.urlsplit(self.path)
+        content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+        if content_type != 'application/json':
+            self._send_error(415, "Content-Type must be application/json")
+            return
+        try:
+            body = self._read_json()
+        except ValueError as e:
+            self._send_error(400, f"invalid json: {e}")
+            return
+
+        try:
+            if url.path == '/api/enqueue':
+                paths = body.get('paths')
+                wait_minutes = body.get('wait_minutes')
+                if not isinstance(paths, list) or not paths or \
+                        not all(isinstance(path, str) and path for path in paths):
+                    self._send_error(400, "paths must be a non-empty list of strings")
+                    return
+                if wait_minutes is not None and (
+                        isinstance(wait_minutes, bool) or not isinstance(wait_minutes, (int, float))
+                        or not 0 <= wait_minutes < float('inf')):
+                    self._send_error(400, "wait_minutes must be a non-negative number")
+                    return
+                data = self.engine.enqueue(paths, wait_minutes=wait_minutes)
+            elif url.path == '/api/pause':
+                self.engine.pause()
+                data = self.engine.status()
+            elif url.path == '/api/resume':
+                self.engine.resume()
+                data = self.engine.status()
+            elif url.path == '/api/stop':
+                self.engine.stop()
+                data = self.engine.status()
+            else:
+                self._send_error(404, f"unknown path: {url.path}")
+                return
+        except EngineError as e:
+            self._send_error(409, str(e))
+            return
+        self._send_json(200, {'success': True, 'data': data})
+
+    def _stream_events(self, since):
+        """Server-Sent Events：连接期间持续推送新事件"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream;charset=UTF-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        try:
+            while True:
+                events = self.engine.events(since, STREAM_HEARTBEAT)
+                if not events:
+                    self.wfile.write(b': keep-alive\n\n')
+                for event in events:
+                    since = event['seq']
+                    data = json.dumps(event, ensure_ascii=False)
+                    self.wfile.write(f"id: {since}\nevent: {event['type']}\ndata: {data}\n\n".encode('utf-8'))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class ServiceError(Exception):
+    """发布服务返回失败或无法连接"""
+
+
+class EngineClient:
+    """
+    发布服务的 HTTP 客户端，接口与 PublishEngine 一致
+    （enqueue / pause / resume / stop / status / events），GUI 可直接替换使用
+    """
+
+    def __init__(self, base_url=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", timeout=10, token=None,
+                 token_file=DEFAULT_TOKEN_FILE):
+        """
+        Args:
+            base_url: 发布服务地址
+            timeout: 请求超时（秒）
+            token: 访问令牌；不指定时每次请求读取 token_file（服务重启后令牌会变化）
+            token_file: 服务写入的令牌文件
+        """
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.token = token
+        self.token_file = token_file
+
+    def _request(self, method, path, payload=None, timeout=None):
+        body = None
+        headers = {}
+        token = self.token or read_token(self.token_file)
+        if token:
+            headers[TOKEN_HEADER] = token
+        if method == 'POST':
+            body = json.dumps(payload or {}, ensure_ascii=False).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        request = urllib.request.Request(self.base_url + path, data=body, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=timeout or self.timeout) as response:
+                data = json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read().decode('utf-8')).get('error')
+            except ValueError:
+                message = None
+            raise ServiceError(message or f"HTTP {e.code}") from None
+        except (urllib.error.URLError, OSError) as e:
+            raise ServiceError(f"无法连接发布服务 {self.base_url}: {e}") from None
+        return data.get('data')
+
+    def status(self):
+        return self._request('GET', '/api/status')
+
+    def enqueue(self, paths, wait_minutes=None):
+        if isinstance(paths, (str, Path)):
+            paths = [paths]
+        payload = {'paths': [str(path) for path in paths]}
+        if wait_minutes is not None:
+            payload['wait_minutes'] = wait_minutes
+        return self._request('POST', '/api/enqueue', payload)
+
+    def pause(self):
+        return self._request('POST', '/api/pause')
+
+    def resume(self):
+        return self._request('POST', '/api/resume')
+
+    def stop(self):
+        return self._request('POST', '/api/stop')
+
+    def events(self, since=0, timeout=0):
+        query = urllib.parse.urlencode({'since': since, 'timeout': timeout})
+        return self._request('GET', f'/api/events?{query}', timeout=timeout + self.timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='小红书发布服务（本地 HTTP/JSON API）')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='监听地址（默认仅本机）')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--wait-minutes', type=float, default=20, help='发布间隔(分钟)')
+    parser.add_argument('--dedup', choices=DEDUP_MODES, default='flag',
+                        help='重复内容检测: off 不检测 / flag 只提示 / skip 不发布重复笔记')
+    parser.add_argument('--no-session-monitor', action='store_true',
+                        help='不在后台监控登录过期（默认过期前提醒并暂停队列）')
+    parser.add_argument('paths', nargs='*', help='启动后立即加入的笔记文件夹')
+
+    args = parser.parse_args()
+
+    def log(message):
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}", flush=True)
+
+    engine = PublishEngine(wait_minutes=args.wait_minutes, log=log, dedup=args.dedup)
+    monitor = None if args.no_session_monitor else SessionMonitor(engine).start()
+    service = PublishService(engine, args.host, args.port)
+    write_token(service.token)
+    print(f"[INFO] Publish service listening on {service.url}")
+    print(f"[INFO] Access token written to {DEFAULT_TOKEN_FILE}")
+    if args.paths:
+        engine.enqueue(args.paths)
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if monitor:
+            monitor.stop()
+        engine.close()
+
+
+if __name__ == '__main__':
+    main()
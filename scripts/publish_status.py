@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发布状态查询
+从发布台账、持久化队列和笔记扫描索引回答 "发布了多少、今天发了多少、还有哪些没发"，
+不读取笔记的 metadata.json，大目录也只需几毫秒，适合 cron 监控频繁调用
+
+数据来源:
+1. 发布台账 (publish_records.db): 总数、今日数、最近一小时数、最近发布时间
+2. 发布队列 (publish_queue.db): 各状态任务数、需要人工确认的任务数
+3. 扫描索引 (.note_scan_index.json): 目录下的笔记列表；目录不在索引中或指定 --rescan 时才扫描
+
+目录下的笔记按路径与台账记录匹配，移动过的笔记会显示为未发布（发布前仍按内容去重）。
+
+使用方法:
+    python publish_status.py
+    python publish_status.py D:\\notes --list-pending
+    python publish_status.py D:\\notes --json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from note_scanner import NoteScanner
+from publish_ledger import DEFAULT_LEDGER_FILE, PublishLedger
+from publish_queue import DEFAULT_QUEUE_FILE, STATES, PublishQueue
+
+
+def collect_status(notes_dir=None, ledger_file=DEFAULT_LEDGER_FILE, queue_file=DEFAULT_QUEUE_FILE,
+                   scanner=None, rescan=False, now=None):
+    """
+    汇总发布状态
+
+    Args:
+        notes_dir: 可选笔记根目录，统计该目录下的已发布/未发布笔记
+        ledger_file / queue_file: 台账和队列文件，不存在时按空处理（不会创建）
+        scanner: NoteScanner，默认使用项目的扫描索引
+        rescan: 是否重新扫描目录（默认只读索引）
+        now: 当前时间（测试时可替换）
+
+    Returns:
+        dict: 可直接序列化为 JSON
+    """
+    start = time.perf_counter()
+    now = now or datetime.now()
+    root = os.path.abspath(notes_dir) if notes_dir else None
+
+    status = {
+        'time': now.isoformat(timespec='seconds'),
+        'ledger': {'total': 0, 'today': 0, 'last_hour': 0, 'last_published_at': None},
+        'queue': {state: 0 for state in STATES},
+    }
+    status['queue']['needs_check'] = 0
+
+    published_dirs = set()
+    if Path(ledger_file).exists():
+        with PublishLedger(ledger_file) as ledger:
+            status['ledger'] = {
+                'total': ledger.count(),
+                'today': ledger.count_since(now.date()),
+                'last_hour': ledger.count_since(now - timedelta(hours=1)),
+                'last_published_at': ledger.last_published_at(),
+            }
+            if root:
+                published_dirs = ledger.note_dirs_under(root)
+
+    if Path(queue_file).exists():
+        with PublishQueue(queue_file) as queue:
+            status['queue'] = queue.counts(root)
+            status['queue']['needs_check'] = queue.needs_check_count(root)
+
+    if root:
+        scanner = scanner or NoteScanner()
+        notes = None if rescan else scanner.indexed_notes(root)
+        source = 'index'
+        if notes is None:
+            notes = scanner.scan(root)
+            source = 'scan'
+        pending = [note.path for note in notes if note.path not in published_dirs]
+        status['notes'] = {
+            'root': root,
+            'source': source,
+            'total': len(notes),
+            'published': len(notes) - len(pending),
+            'pending': len(pending),
+            'pending_dirs': pending,
+        }
+
+    status['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return status
+
+
+def print_status(status, list_pending=False):
+    ledger = status['ledger']
+    queue = status['queue']
+    print(f"[INFO] Published: {ledger['total']} total, {ledger['today']} today, "
+          f"{ledger['last_hour']} in the last hour")
+    if ledger['last_published_at']:
+        print(f"[INFO] Last published at: {ledger['last_published_at']}")
+    print("[INFO] Queue: " + ", ".join(f"{state}: {queue[state]}" for state in STATES))
+    if queue['needs_check']:
+        print(f"[WARNING] {queue['needs_check']} job(s) need a manual check "
+              f"(python publish_queue.py --list)")
+
+    notes = status.get('notes')
+    if notes:
+        print(f"[INFO] Notes under {notes['root']}: {notes['total']} total, "
+              f"{notes['published']} published, {notes['pending']} pending (from {notes['source']})")
+        if list_pending:
+            for path in notes['pending_dirs']:
+                print(f"  {os.path.relpath(path, notes['root'])}")
+    print(f"[INFO] Answered in {status['elapsed_ms']} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='发布状态查询')
+    parser.add_argument('notes_dir', nargs='?', help='笔记根目录（可选，统计该目录下未发布的笔记）')
+    parser.add_argument('--json', action='store_true', help='输出 JSON')
+    parser.add_argument('--list-pending', action='store_true', help='列出未发布的笔记')
+    parser.add_argument('--rescan', action='store_true', help='重新扫描目录而不是只读扫描索引')
+    parser.add_argument('--db', type=str, default=str(DEFAULT_LEDGER_FILE), help='台账文件路径')
+    parser.add_argument('--queue', type=str, default=str(DEFAULT_QUEUE_FILE), help='队列文件路径')
+
+    args = parser.parse_args()
+
+    if args.notes_dir and not os.path.isdir(args.notes_dir):
+        print(f"[ERROR] Directory not found: {args.notes_dir}")
+        sys.exit(1)
+
+    status = collect_status(args.notes_dir, args.db, args.queue, rescan=args.rescan)
+    if args.json:
+        if not args.list_pending and 'notes' in status:
+            del status['notes']['pending_dirs']
+        print(json.dumps(status, ensure_ascii=False, indent=2))
+    else:
+        print_status(status, args.list_pending)
+
+
+if __name__ == '__main__':
+    main()
@@ -27,6 +27,15 @@ except ImportError as e:
     print("请运行: pip install xhs python-dotenv")
     sys.exit(1)
 
+sys.path.insert(0, str(Path(__file__).parent))
+
+from event_log import get_logger, total_size
+from rate_limiter import account_key, wait_for_token
+
+
+# 发布耗时和结果写入结构化事件日志
+events = get_logger('publish_xhs')
+
 
 def load_cookie():
     """从 .env 文件加载 Cookie"""
@@ -91,13 +100,16 @@ def publish_note(client: XhsClient, title: str, desc: str, images: list,
         print(f"  📝 描述: {desc[:50]}..." if len(desc) > 50 else f"  📝 描述: {desc}")
         print(f"  🖼️ 图片数量: {len(images)}")
         
-        result = client.create_image_note(
-            title=title,
-            desc=desc,
-            files=images,
-            is_private=is_private,
-            post_time=post_time
-        )
+        with events.stage('create', images=len(images), bytes=total_size(images)) as fields:
+            result = client.create_image_note(
+                title=title,
+                desc=desc,
+                files=images,
+                is_private=is_private,
+                post_time=post_time
+            )
+            if isinstance(result, dict):
+                fields['note_id'] = result.get('note_id') or result.get('id')
         
         print("\n✨ 笔记发布成功！")
         if isinstance(result, dict):
@@ -187,7 +199,8 @@ def main():
         print("\n✅ 验证通过，可以发布")
         return
     
-    # 发布笔记
+    # 发布笔记（与其它发布工具共享限流）
+    wait_for_token(account_key(cookie), 'create')
     publish_note(
         client=client,
         title=args.title,
@@ -17,6 +17,15 @@ except ImportError as e:
     print("Run: pip install xhs python-dotenv")
     sys.exit(1)
 
+sys.path.insert(0, str(Path(__file__).parent))
+
+from event_log import get_logger, total_size
+from rate_limiter import account_key, wait_for_token
+
+
+# 发布耗时和结果写入结构化事件日志
+events = get_logger('publish_xhs_simple')
+
 
 def load_cookie():
     """从 .env 文件加载 Cookie"""
@@ -75,13 +84,16 @@ def publish_note(client: XhsClient, title: str, desc: str, images: list,
         print(f"  Title: {title}")
         print(f"  Images: {len(images)} files")
         
-        result = client.create_image_note(
-            title=title,
-            desc=desc,
-            files=images,
-            is_private=is_private,
-            post_time=post_time
-        )
+        with events.stage('create', images=len(images), bytes=total_size(images)) as fields:
+            result = client.create_image_note(
+                title=title,
+                desc=desc,
+                files=images,
+                is_private=is_private,
+                post_time=post_time
+            )
+            if isinstance(result, dict):
+                fields['note_id'] = result.get('note_id') or result.get('id')
         
         print("\n[SUCCESS] Note published!")
         if isinstance(result, dict):
@@ -142,7 +154,8 @@ def main():
         print(f"  Images: {valid_images}")
         return
     
-    # 发布笔记
+    # 发布笔记（与其它发布工具共享限流）
+    wait_for_token(account_key(cookie), 'create')
     publish_note(
         client=client,
         title=args.title,
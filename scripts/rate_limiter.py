@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨进程令牌桶限流
+所有发布工具在上传图片、发布笔记前都先从这里取令牌，
+多个工具同时操作同一账号时共享同一组令牌桶，避免突发请求触发风控
+
+令牌桶状态保存在 SQLite 中，BEGIN IMMEDIATE 保证多进程下取令牌是原子操作。
+
+令牌桶按 (账号, 接口) 划分，默认配置见 DEFAULT_BUCKETS，
+可在项目根目录 rate_limits.json 中覆盖:
+
+    {
+        "default": {"create": {"capacity": 1, "interval": 300}},
+        "accounts": {"<账号标识>": {"upload": {"capacity": 10, "interval": 3}}}
+    }
+
+capacity 为桶容量（允许的最大突发数），interval 为每生成一个令牌的秒数。
+
+使用方法:
+    python rate_limiter.py --status
+    python rate_limiter.py --reset
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_LIMIT_FILE = PROJECT_ROOT / 'rate_limits.db'
+DEFAULT_CONFIG_FILE = PROJECT_ROOT / 'rate_limits.json'
+
+# 接口 -> 令牌桶参数
+DEFAULT_BUCKETS = {
+    'create': {'capacity': 1, 'interval': 300},
+    'upload': {'capacity': 20, 'interval': 2},
+    'info': {'capacity': 5, 'interval': 10},
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    account TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (account, endpoint)
+);
+"""
+
+
+def account_key(cookie):
+    """
+    由 Cookie 生成账号标识（不保存 Cookie 本身）
+
+    优先使用 a1（设备标识，重新登录后不变），否则使用整个 Cookie。
+    """
+    if not cookie:
+        return 'default'
+    value = cookie
+    for part in cookie.split(';'):
+        name, _, item = part.strip().partition('=')
+        if name == 'a1' and item:
+            value = item
+            break
+    return hashlib.md5(value.encode('utf-8')).hexdigest()[:12]
+
+
+def load_config(config_file=None):
+    """读取 rate_limits.json，文件不存在时返回空配置"""
+    config_file = Path(config_file) if config_file else DEFAULT_CONFIG_FILE
+    if not config_file.exists():
+        return {}
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Warning: Failed to load rate limit config: {e}")
+        return {}
+
+
+class RateLimiter:
+    """基于 SQLite 的跨进程令牌桶"""
+
+    def __init__(self, db_file=None, config=None, clock=time.time):
+        """
+        Args:
+            db_file: 令牌桶状态文件，默认项目根目录 rate_limits.db
+            config: 限流配置（格式同 rate_limits.json），默认读取配置文件
+            clock: 时间函数（各进程需一致，因此使用墙上时间）
+        """
+        self.db_file = Path(db_file) if db_file else DEFAULT_LIMIT_FILE
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self.config = load_config() if config is None else config
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.db_file),
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False
+        )
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def bucket(self, account, endpoint):
+        """获取 (容量, 令牌间隔)；未配置的接口返回 None（不限流）"""
+        params = dict(DEFAULT_BUCKETS.get(endpoint, {}))
+        params.update(self.config.get('default', {}).get(endpoint, {}))
+        params.update(self.config.get('accounts', {}).get(account, {}).get(endpoint, {}))
+        if not params:
+            return None
+        return float(params['capacity']), float(params['interval'])
+
+    def try_acquire(self, account, endpoint):
+        """
+        尝试取一个令牌
+
+        Returns:
+            float: 0 表示已取得令牌，否则为需要等待的秒数
+        """
+        bucket = self.bucket(account, endpoint)
+        if bucket is None:
+            return 0.0
+        capacity, interval = bucket
+
+        with self._lock:
+            # 立即获取写锁，其它进程在此等待，保证读-改-写原子性
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                now = self._clock()
+                row = self._conn.execute(
+                    'SELECT tokens, updated_at FROM buckets WHERE account = ? AND endpoint = ?',
+                    (account, endpoint)
+                ).fetchone()
+
+                if row is None:
+                    tokens = capacity
+                else:
+                    elapsed = max(0.0, now - row[1])
+                    tokens = min(capacity, row[0] + elapsed / interval)
+
+                if tokens >= 1:
+                    tokens -= 1
+                    wait = 0.0
+                else:
+                    wait = (1 - tokens) * interval
+
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?)',
+                    (account, endpoint, tokens, now)
+                )
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        return wait
+
+    def acquire(self, account, endpoint, sleep=time.sleep, should_stop=None):
+        """
+        阻塞直到取得令牌
+
+        Args:
+            sleep: 等待函数
+            should_stop: 可选回调，返回 True 时放弃等待
+
+        Returns:
+            bool: 是否取得令牌（被 should_stop 中止时为 False）
+        """
+        while True:
+            wait = self.try_acquire(account, endpoint)
+            if wait <= 0:
+                return True
+            if should_stop and should_stop():
+                return False
+            sleep(wait)
+
+    def status(self):
+        """所有令牌桶的当前状态"""
+        now = self._clock()
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT account, endpoint, tokens, updated_at FROM buckets ORDER BY account, endpoint'
+            ).fetchall()
+
+        result = []
+        for account, endpoint, tokens, updated_at in rows:
+            bucket = self.bucket(account, endpoint)
+            if bucket is None:
+                continue
+            capacity, interval = bucket
+            tokens = min(capacity, tokens + max(0.0, now - updated_at) / interval)
+            result.append({
+                'account': account,
+                'endpoint': endpoint,
+                'tokens': tokens,
+                'capacity': capacity,
+                'interval': interval,
+            })
+        return result
+
+    def reset(self):
+        """清空所有令牌桶（全部恢复为满）"""
+        with self._lock:
+            self._conn.execute('DELETE FROM buckets')
+
+
+def wait_for_token(account, endpoint, log=print, should_stop=None):
+    """
+    便捷函数：阻塞直到取得令牌（供未使用 ApiGuard 的发布脚本在调用接口前使用）
+
+    Returns:
+        bool: 是否取得令牌（被 should_stop 中止时为 False）
+    """
+    def sleep(seconds):
+        if seconds >= 5:
+            log(f"[RATE LIMIT] Waiting {seconds:.0f}s before {endpoint}")
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            if should_stop and should_stop():
+                return
+            time.sleep(min(1.0, max(0.0, end - time.monotonic())))
+
+    with RateLimiter() as limiter:
+        return limiter.acquire(account, endpoint, sleep=sleep, should_stop=should_stop)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='发布限流工具')
+    parser.add_argument('--db', type=str, help='令牌桶状态文件 (默认: 项目根目录 rate_limits.db)')
+    parser.add_argument('--status', action='store_true', help='查看令牌桶状态')
+    parser.add_argument('--reset', action='store_true', help='清空令牌桶')
+
+    args = parser.parse_args()
+
+    with RateLimiter(args.db) as limiter:
+        if args.reset:
+            limiter.reset()
+            print("[SUCCESS] Rate limit buckets reset")
+
+        buckets = limiter.status()
+        if not buckets:
+            print("[INFO] No buckets in use")
+        for item in buckets:
+            print(f"  {item['account']}  {item['endpoint']:<8} "
+                  f"{item['tokens']:.2f}/{item['capacity']:.0f} tokens "
+                  f"(1 per {item['interval']:.0f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发布记录读取模块
+供进度查看器等定时刷新的界面使用，刷新开销与新增记录数（或一页记录数）成正比，而不是记录总数
+
+策略:
+1. 每次刷新先 stat 记录文件（台账还包括 -wal 日志），未变化时直接跳过
+2. 台账 (publish_records.db): 文件变化时由 RecordPager 重新查询当前页
+3. 旧版 JSON (publish_records.json): 文件变化时重新解析，但只返回新增或内容变化的记录
+4. RecordPager: 记录表格的分页、排序与筛选状态，每次只向台账查询当前页
+
+使用方法:
+    feed = LedgerFeed(PublishLedger())
+    if feed.changed():         # 只 stat，不查询
+        rows = pager.fetch()
+
+    pager = RecordPager(PublishLedger())
+    pager.set_filters(search='驾校', since='2026-01-01')
+    rows = pager.fetch()
+"""
+
+import json
+import math
+import os
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from publish_ledger import legacy_record
+
+
+DEFAULT_PAGE_SIZE = 100
+
+
+def file_stamp(*paths):
+    """文件的 (mtime_ns, size) 组合，不存在的文件记为 None"""
+    stamp = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+class LedgerFeed:
+    """检测 SQLite 台账是否有新写入"""
+
+    def __init__(self, ledger):
+        self.ledger = ledger
+        self._files = (ledger.db_file, Path(f"{ledger.db_file}-wal"))
+        self._stamp = None
+
+    def changed(self):
+        """记录文件自上次检查以来是否变化（只 stat，不查询）"""
+        stamp = file_stamp(*self._files)
+        if stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        return True
+
+
+class JsonRecordFeed:
+    """从旧版 publish_records.json 增量读取发布记录"""
+
+    def __init__(self, record_file):
+        self.record_file = Path(record_file)
+        self._stamp = None
+        self._known = {}
+
+    @property
+    def total(self):
+        return len(self._known)
+
+    def poll(self, force=False):
+        """
+        读取上次以来的变化（文件内容无法解析时抛出 ValueError）
+
+        Returns:
+            None: 记录文件未变化
+            (reset, records): reset 为 True 时 records 是全部记录，
+                否则是新增或内容变化的记录；均按发布时间升序
+        """
+        stamp = file_stamp(self.record_file)
+        if stamp == self._stamp and not force:
+            return None
+        self._stamp = stamp
+
+        data = {}
+        if stamp[0] is not None:
+            with open(self.record_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError(f"Unsupported record file format: {self.record_file}")
+
+        records = {}
+        for key, item in data.items():
+            if isinstance(item, dict):
+                record = legacy_record(key, item)
+                records[record['hash']] = record
+
+        reset = bool(self._known.keys() - records.keys()) or not self._known
+        if reset:
+            changed = list(records.values())
+        else:
+            changed = [r for h, r in records.items() if self._known.get(h) != r]
+        self._known = records
+        if not reset and not changed:
+            return None
+        changed.sort(key=lambda r: r.get('published_at') or '')
+        return reset, changed
+
+
+def parse_day(text):
+    """解析 YYYY-MM-DD，空白返回 None，格式错误抛出 ValueError"""
+    text = (text or '').strip()
+    if not text:
+        return None
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"日期格式应为 YYYY-MM-DD: {text}")
+
+
+class RecordPager:
+    """记录表格的分页、排序与筛选状态"""
+
+    def __init__(self, ledger, page_size=DEFAULT_PAGE_SIZE):
+        self.ledger = ledger
+        self.page_size = page_size
+        self.search = None
+        self.account = None
+        self.since = None
+        self.until = None
+        self.order_by = 'published_at'
+        self.descending = True
+        self.page = 0
+        self.total = 0
+
+    @property
+    def pages(self):
+        return max(1, math.ceil(self.total / self.page_size))
+
+    @property
+    def offset(self):
+        return self.page * self.page_size
+
+    def set_filters(self, search=None, account=None, since=None, until=None):
+        """设置筛选条件并回到第一页；since / until 为 YYYY-MM-DD，包含当天"""
+        since, until = parse_day(since), parse_day(until)
+        self.search = (search or '').strip() or None
+        self.account = account or None
+        self.since = since
+        self.until = until + timedelta(days=1) if until else None
+        self.page = 0
+
+    def sort(self, column):
+        """按列排序；再次点击同一列时切换升降序"""
+        if column == self.order_by:
+            self.descending = not self.descending
+        else:
+            self.order_by = column
+            self.descending = column == 'published_at'
+        self.page = 0
+
+    def goto(self, page):
+        self.page = max(0, min(page, self.pages - 1))
+
+    def fetch(self):
+        """查询符合条件的记录数和当前页的记录"""
+        filters = {'search': self.search, 'account': self.account,
+                   'since': self.since, 'until': self.until}
+        self.total = self.ledger.count_matching(**filters)
+        self.goto(self.page)
+        return self.ledger.query(order_by=self.order_by, descending=self.descending,
+                                 limit=self.page_size, offset=self.offset, **filters)
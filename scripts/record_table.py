@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发布记录表格组件
+分页显示发布台账，排序和筛选（标题/笔记名称搜索、账号、日期范围）由台账查询完成，
+表格只创建当前页的行，记录数达到十万级时翻页和筛选依然即时
+
+使用方法:
+    table = RecordTable(parent, ledger)
+    table.pack(fill=tk.BOTH, expand=True)
+    table.refresh()
+"""
+
+import sys
+import tkinter as tk
+import webbrowser
+from datetime import datetime
+from pathlib import Path
+from tkinter import ttk
+
+SCRIPT_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from record_feed import DEFAULT_PAGE_SIZE, RecordPager
+
+
+ALL_ACCOUNTS = '全部账号'
+
+# (列名, 标题, 宽度, 对齐, 排序字段)
+COLUMNS = (
+    ('seq', '序号', 60, 'center', None),
+    ('note_name', '笔记名称', 140, 'center', 'note_name'),
+    ('title', '标题', 300, 'w', 'title'),
+    ('account', '账号', 120, 'center', 'account'),
+    ('published_at', '发布时间', 150, 'center', 'published_at'),
+)
+
+
+def format_time(value):
+    """ISO 时间显示为 YYYY-MM-DD HH:MM"""
+    if not value:
+        return ''
+    try:
+        return datetime.fromisoformat(value).strftime('%Y-%m-%d %H:%M')
+    except ValueError:
+        return value
+
+
+class RecordTable(tk.Frame):
+    """分页的发布记录表格（双击打开笔记链接）"""
+
+    def __init__(self, parent, ledger, page_size=DEFAULT_PAGE_SIZE, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.pager = RecordPager(ledger, page_size)
+        self.setup_ui()
+
+    @property
+    def ledger(self):
+        return self.pager.ledger
+
+    @ledger.setter
+    def ledger(self, ledger):
+        self.pager.ledger = ledger
+
+    def setup_ui(self):
+        font = ("Microsoft YaHei", 9)
+
+        # 筛选条件
+        filter_frame = tk.Frame(self)
+        filter_frame.pack(fill=tk.X, pady=(0, 5))
+
+        tk.Label(filter_frame, text="搜索:", font=font).pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        search_entry = tk.Entry(filter_frame, textvariable=self.search_var, font=font, width=20)
+        search_entry.pack(side=tk.LEFT, padx=(2, 10))
+
+        tk.Label(filter_frame, text="账号:", font=font).pack(side=tk.LEFT)
+        self.account_var = tk.StringVar(value=ALL_ACCOUNTS)
+        self.account_box = ttk.Combobox(filter_frame, textvariable=self.account_var,
+                                        state='readonly', width=14, postcommand=self.load_accounts)
+        self.account_box.pack(side=tk.LEFT, padx=(2, 10))
+
+        tk.Label(filter_frame, text="日期:", font=font).pack(side=tk.LEFT)
+        self.since_var = tk.StringVar()
+        self.until_var = tk.StringVar()
+        since_entry = tk.Entry(filter_frame, textvariable=self.since_var, font=font, width=11)
+        since_entry.pack(side=tk.LEFT, padx=2)
+        tk.Label(filter_frame, text="至", font=font).pack(side=tk.LEFT)
+        until_entry = tk.Entry(filter_frame, textvariable=self.until_var, font=font, width=11)
+        until_entry.pack(side=tk.LEFT, padx=2)
+
+        tk.Button(filter_frame, text="查询", font=font, width=8,
+                  command=self.apply_filters).pack(side=tk.LEFT, padx=10)
+
+        for entry in (search_entry, since_entry, until_entry):
+            entry.bind('<Return>', lambda event: self.apply_filters())
+        self.account_box.bind('<<ComboboxSelected>>', lambda event: self.apply_filters())
+
+        # 表格
+        table_frame = tk.Frame(self)
+        table_frame.pack(fill=tk.BOTH, expand=True)
+
+        self.tree = ttk.Treeview(table_frame, columns=[c[0] for c in COLUMNS],
+                                 show='headings', height=15)
+        for name, text, width, anchor, field in COLUMNS:
+            if field:
+                self.tree.heading(name, text=text, command=lambda f=field: self.sort_by(f))
+            else:
+                self.tree.heading(name, text=text)
+            self.tree.column(name, width=width, anchor=anchor)
+
+        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscroll=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.bind('<Double-1>', self.on_double_click)
+
+        # 翻页
+        page_frame = tk.Frame(self)
+        page_frame.pack(fill=tk.X, pady=(5, 0))
+
+        self.prev_btn = tk.Button(page_frame, text="上一页", font=font, width=8,
+                                  command=lambda: self.goto(self.pager.page - 1))
+        self.prev_btn.pack(side=tk.LEFT)
+        self.page_label = tk.Label(page_frame, text="", font=font, fg='#666666')
+        self.page_label.pack(side=tk.LEFT, padx=10)
+        self.next_btn = tk.Button(page_frame, text="下一页", font=font, width=8,
+                                  command=lambda: self.goto(self.pager.page + 1))
+        self.next_btn.pack(side=tk.LEFT)
+
+    def load_accounts(self):
+        """下拉时读取台账中的账号列表"""
+        self.account_box['values'] = [ALL_ACCOUNTS] + self.ledger.accounts()
+
+    def apply_filters(self):
+        account = self.account_var.get()
+        try:
+            self.pager.set_filters(
+                search=self.search_var.get(),
+                account=None if account == ALL_ACCOUNTS else account,
+                since=self.since_var.get(),
+                until=self.until_var.get(),
+            )
+        except ValueError as e:
+            self.page_label.config(text=str(e), fg='#FF2442')
+            return
+        self.refresh()
+
+    def sort_by(self, field):
+        self.pager.sort(field)
+        self.refresh()
+
+    def goto(self, page):
+        self.pager.goto(page)
+        self.refresh()
+
+    def refresh(self):
+        """重新查询当前页（只创建当前页的行）"""
+        records = self.pager.fetch()
+
+        self.tree.delete(*self.tree.get_children())
+        for idx, record in enumerate(records, self.pager.offset + 1):
+            self.tree.insert('', tk.END, values=(
+                idx,
+                record.get('note_name') or '',
+                record.get('title') or 'Unknown',
+                record.get('account') or '',
+                format_time(record.get('published_at')),
+            ), tags=(record.get('link') or '',))
+
+        # 排序列标题显示方向
+        for name, text, _, _, field in COLUMNS:
+            if field and field == self.pager.order_by:
+                text += ' ▼' if self.pager.descending else ' ▲'
+            self.tree.heading(name, text=text)
+
+        pager = self.pager
+        self.page_label.config(
+            text=f"第 {pager.page + 1} / {pager.pages} 页 · 共 {pager.total} 条",
+            fg='#666666'
+        )
+        self.prev_btn.config(state=tk.NORMAL if pager.page > 0 else tk.DISABLED)
+        self.next_btn.config(state=tk.NORMAL if pager.page + 1 < pager.pages else tk.DISABLED)
+
+    def on_double_click(self, event):
+        """双击打开笔记链接"""
+        selection = self.tree.selection()
+        if not selection:
+            return
+        tags = self.tree.item(selection[0], 'tags')
+        if tags and tags[0]:
+            webbrowser.open(tags[0])
@@ -2,6 +2,7 @@
 """
 小红书卡片渲染脚本 - Python 版本
 将 Markdown 文件渲染为小红书风格的图片卡片
+整体和每张卡片的渲染耗时写入结构化事件日志（见 event_log）
 
 使用方法:
     python render_xhs.py <markdown_file> [--output-dir <output_directory>]
@@ -28,6 +29,11 @@ except ImportError as e:
     print("请运行: pip install markdown pyyaml playwright && playwright install chromium")
     sys.exit(1)
 
+# 导入同目录下的共享模块
+sys.path.insert(0, str(Path(__file__).parent))
+
+from event_log import get_logger
+
 
 # 获取脚本所在目录
 SCRIPT_DIR = Path(__file__).parent.parent
@@ -37,6 +43,8 @@ ASSETS_DIR = SCRIPT_DIR / "assets"
 CARD_WIDTH = 1080
 CARD_HEIGHT = 1440
 
+events = get_logger('render')
+
 
 def parse_markdown_file(file_path: str) -> dict:
     """解析 Markdown 文件，提取 YAML 头部和正文内容"""
@@ -181,6 +189,13 @@ async def render_html_to_image(html_content: str, output_path: str, width: int =
 
 async def render_markdown_to_cards(md_file: str, output_dir: str):
     """主渲染函数：将 Markdown 文件渲染为多张卡片图片"""
+    with events.stage('render', md_file=str(md_file)) as fields:
+        total_cards = await _render_markdown_to_cards(md_file, output_dir)
+        fields['cards'] = total_cards
+    return total_cards
+
+
+async def _render_markdown_to_cards(md_file: str, output_dir: str):
     print(f"\n🎨 开始渲染: {md_file}")
     
     # 确保输出目录存在
@@ -209,7 +224,9 @@ async def render_markdown_to_cards(md_file: str, output_dir: str):
         print(f"  📷 生成卡片 {i}/{total_cards}...")
         card_html = generate_card_html(content, i, total_cards)
         card_path = os.path.join(output_dir, f'card_{i}.png')
-        await render_html_to_image(card_html, card_path)
+        with events.stage('render_card', md_file=str(md_file), card=i) as fields:
+            await render_html_to_image(card_html, card_path)
+            fields['bytes'] = os.path.getsize(card_path)
     
     print(f"\n✨ 渲染完成！图片已保存到: {output_dir}")
     return total_cards
@@ -10,6 +10,7 @@
 
 使用方法:
     python render_xhs_v2.py <markdown_file> [options]
+    python render_xhs_v2.py <markdown_file> --profile-out profiles    # 性能分析（见 profiling.py）
 
 依赖安装:
     pip install markdown pyyaml playwright
@@ -17,28 +18,54 @@
 """
 
 import argparse
-import asyncio
 import os
 import re
 import sys
 import tempfile
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import TYPE_CHECKING, List, Dict, Tuple
 
-try:
-    import markdown
-    import yaml
-    from playwright.async_api import async_playwright, Page
-except ImportError as e:
-    print(f"缺少依赖: {e}")
-    print("请运行: pip install markdown pyyaml playwright && playwright install chromium")
-    sys.exit(1)
+if TYPE_CHECKING:
+    from playwright.async_api import Page
+
+# markdown / yaml / playwright 在首次解析或渲染时才导入（见 load_dependencies），
+# --help、--list-styles 等短命令不加载
+markdown = None
+yaml = None
+async_playwright = None
+
+
+def load_dependencies():
+    """
+    导入渲染依赖（已导入时直接返回）
+
+    Raises:
+        ImportError: 缺少依赖，错误信息包含安装命令
+    """
+    global markdown, yaml, async_playwright
+    if async_playwright is not None:
+        return
+    try:
+        import markdown
+        import yaml
+        from playwright.async_api import async_playwright
+    except ImportError as e:
+        raise ImportError(
+            f"缺少依赖: {e}\n请运行: pip install markdown pyyaml playwright && playwright install chromium"
+        ) from e
 
 
 # 获取脚本所在目录
 SCRIPT_DIR = Path(__file__).parent.parent
 ASSETS_DIR = SCRIPT_DIR / "assets"
 
+sys.path.insert(0, str(Path(__file__).parent))
+from event_log import get_logger
+from profiling import add_profile_argument, profiled
+
+# 渲染耗时写入结构化事件日志
+events = get_logger('render')
+
 # 卡片尺寸配置 (3:4 比例)
 CARD_WIDTH = 1080
 CARD_HEIGHT = 1440
@@ -100,6 +127,7 @@ STYLES = {
 
 def parse_markdown_file(file_path: str) -> dict:
     """解析 Markdown 文件，提取 YAML 头部和正文内容"""
+    load_dependencies()
     with open(file_path, 'r', encoding='utf-8') as f:
         content = f.read()
     
@@ -260,6 +288,7 @@ def smart_split_content(content: str, max_height: int = SAFE_HEIGHT) -> List[str
 
 def convert_markdown_to_html(md_content: str, style: dict = None) -> str:
     """将 Markdown 转换为 HTML"""
+    load_dependencies()
     style = style or STYLES["purple"]
     
     # 处理 tags（以 # 开头的标签）
@@ -515,7 +544,7 @@ def generate_card_html(content: str, page_number: int = 1, total_pages: int = 1,
 </html>'''
 
 
-async def measure_content_height(page: Page, html_content: str) -> int:
+async def measure_content_height(page: 'Page', html_content: str) -> int:
     """使用 Playwright 测量实际内容高度"""
     await page.set_content(html_content, wait_until='networkidle')
     await page.wait_for_timeout(300)  # 等待字体渲染
@@ -535,6 +564,7 @@ async def measure_content_height(page: Page, html_content: str) -> int:
 async def render_html_to_image(html_content: str, output_path: str, 
                                 width: int = CARD_WIDTH, height: int = CARD_HEIGHT):
     """使用 Playwright 将 HTML 渲染为图片"""
+    load_dependencies()
     async with async_playwright() as p:
         browser = await p.chromium.launch()
         page = await browser.new_page(viewport={'width': width, 'height': height})
@@ -562,6 +592,7 @@ async def process_and_render_cards(card_contents: List[str], output_dir: str,
     处理卡片内容，检测高度并自动分页，然后渲染
     返回最终生成的所有卡片文件路径
     """
+    load_dependencies()
     async with async_playwright() as p:
         browser = await p.chromium.launch()
         page = await browser.new_page(viewport={'width': CARD_WIDTH, 'height': CARD_HEIGHT})
@@ -618,6 +649,14 @@ async def process_and_render_cards(card_contents: List[str], output_dir: str,
 
 async def render_markdown_to_cards(md_file: str, output_dir: str, style_key: str = "purple"):
     """主渲染函数：将 Markdown 文件渲染为多张卡片图片"""
+    load_dependencies()
+    with events.stage('render', md_file=str(md_file), style=style_key) as fields:
+        total_cards = await _render_markdown_to_cards(md_file, output_dir, style_key)
+        fields['cards'] = total_cards
+    return total_cards
+
+
+async def _render_markdown_to_cards(md_file: str, output_dir: str, style_key: str):
     print(f"\n🎨 开始渲染: {md_file}")
     print(f"🎨 使用样式: {STYLES[style_key]['name']}")
     
@@ -657,14 +696,16 @@ async def render_markdown_to_cards(md_file: str, output_dir: str, style_key: str
                 card_html = generate_card_html(content, i, total_cards, style_key)
                 card_path = os.path.join(output_dir, f'card_{i}.png')
                 
-                await page.set_content(card_html, wait_until='networkidle')
-                await page.wait_for_timeout(300)
-                
-                await page.screenshot(
-                    path=card_path,
-                    clip={'x': 0, 'y': 0, 'width': CARD_WIDTH, 'height': CARD_HEIGHT},
-                    type='png'
-                )
+                with events.stage('render_card', md_file=str(md_file), card=i) as fields:
+                    await page.set_content(card_html, wait_until='networkidle')
+                    await page.wait_for_timeout(300)
+                    
+                    await page.screenshot(
+                        path=card_path,
+                        clip={'x': 0, 'y': 0, 'width': CARD_WIDTH, 'height': CARD_HEIGHT},
+                        type='png'
+                    )
+                    fields['bytes'] = os.path.getsize(card_path)
                 print(f"  ✅ 已生成: {card_path}")
         
         finally:
@@ -715,6 +756,7 @@ def main():
         action='store_true',
         help='列出所有可用样式'
     )
+    add_profile_argument(parser)
     
     args = parser.parse_args()
     
@@ -730,7 +772,15 @@ def main():
         print(f"❌ 错误: 文件不存在 - {args.markdown_file}")
         sys.exit(1)
     
-    asyncio.run(render_markdown_to_cards(args.markdown_file, args.output_dir, args.style))
+    try:
+        load_dependencies()
+    except ImportError as e:
+        print(e)
+        sys.exit(1)
+    
+    import asyncio
+    with profiled('render_xhs_v2', args.profile_out):
+        asyncio.run(render_markdown_to_cards(args.markdown_file, args.output_dir, args.style))
 
 
 if __name__ == '__main__':
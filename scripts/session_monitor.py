@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录会话监控
+后台线程跟踪 web_session 的过期时间并低频检查登录状态，
+在会话失效前提醒、暂停发布队列，避免夜间长批次在发布失败时才发现登录已失效
+
+策略:
+1. 过期时间来自扫码登录保存的 storage_state（Cookie 的 expires），不需要网络
+2. 距过期不足 warn_minutes 时提醒（每个会话只提醒一次）
+3. 距过期不足 pause_minutes 或在线检查发现已失效时暂停队列，避免请求带着失效的 Cookie 发出
+4. 在线检查（轻量 HTTP，见 xhs_credentials.probe_session）只在队列有任务时进行，
+   间隔 check_minutes
+5. 暂停后检测到重新登录（.env 中换成了新会话且检查通过）时，发布线程用新 Cookie 重建客户端并继续
+
+扫码登录需要人工操作，无法在后台自动续期；监控负责尽早发现并保住待发布的队列。
+
+使用方法:
+    monitor = SessionMonitor(engine)
+    monitor.start()
+    ...
+    monitor.stop()
+"""
+
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from xhs_credentials import STORAGE_STATE_FILE, default_store, probe_session, session_expiry, session_key
+
+
+DEFAULT_CHECK_MINUTES = 30
+DEFAULT_WARN_MINUTES = 120
+DEFAULT_PAUSE_MINUTES = 10
+
+# 暂停等待重新登录期间检查 .env 的间隔（秒，只 stat 文件，不访问网络）
+RELOGIN_CHECK_SECONDS = 60
+
+
+class SessionMonitor:
+    """发布引擎的登录会话监控"""
+
+    def __init__(self, engine, store=None, probe=probe_session, state_file=STORAGE_STATE_FILE,
+                 check_minutes=DEFAULT_CHECK_MINUTES, warn_minutes=DEFAULT_WARN_MINUTES,
+                 pause_minutes=DEFAULT_PAUSE_MINUTES, clock=time.time):
+        """
+        Args:
+            engine: PublishEngine（使用 status / pause / renew_session / log / bus）
+            store: CredentialStore，默认项目 .env 的共用缓存
+            probe: 在线检查函数 probe(cookie) -> (状态, user_id, nickname)
+            state_file: 扫码登录保存的 storage_state
+            check_minutes: 队列有任务时在线检查的间隔
+            warn_minutes: 距过期多久开始提醒
+            pause_minutes: 距过期多久暂停队列
+            clock: 时间函数（测试时可替换）
+        """
+        self.engine = engine
+        self.store = store or default_store()
+        self.probe = probe
+        self.state_file = state_file
+        self.check_seconds = check_minutes * 60
+        self.warn_seconds = warn_minutes * 60
+        self.pause_seconds = pause_minutes * 60
+        self._clock = clock
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_probe = None
+        self._warned = None
+        self._paused_key = None
+        self.expires_at = None
+
+    # ---------- 线程 ----------
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='session-monitor', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                self.engine.log(f"⚠️ 登录状态检查异常: {e}")
+            if self._stop.wait(self._next_wait()):
+                break
+
+    def _next_wait(self):
+        if self._paused_key is not None:
+            return RELOGIN_CHECK_SECONDS
+        wait = self.check_seconds
+        if self.expires_at is not None:
+            # 在到达提醒/暂停时间点时醒来
+            now = self._clock()
+            for threshold in (self.warn_seconds, self.pause_seconds):
+                until = self.expires_at - threshold - now
+                if until > 0:
+                    wait = min(wait, until)
+        return max(1, wait)
+
+    # ---------- 检查 ----------
+
+    def _emit(self, status, message):
+        self.engine.log(message)
+        self.engine.bus.emit('session', status=status, message=message, expires_at=self.expires_at)
+
+    def _pause(self, status, message):
+        """暂停正在运行的队列，并记住是监控暂停的"""
+        if self.engine.status()['state'] == 'running':
+            self.engine.pause()
+            self._paused_key = session_key(self.store.cookie())
+        self._emit(status, message)
+
+    def check(self):
+        """
+        检查一次会话状态
+
+        Returns:
+            str: ok / missing / warning / expiring / expired / renewed
+        """
+        now = self._clock()
+        cookie = self.store.cookie()
+        if not cookie:
+            self.expires_at = None
+            return 'missing'
+
+        key = session_key(cookie)
+        self.expires_at = session_expiry(cookie, self.state_file)
+        remaining = self.expires_at - now if self.expires_at is not None else None
+
+        if self._paused_key is not None:
+            return self._check_relogin(key, remaining)
+
+        state = self.engine.status()['state']
+        active = state != 'idle'
+
+        if active and (self._last_probe is None or now - self._last_probe >= self.check_seconds):
+            self._last_probe = now
+            valid, user_id, nickname = self.probe(cookie)
+            if valid is False:
+                self.store.invalidate()
+                self._pause('expired', "⛔ 登录已失效，已暂停发布队列。请运行 python scripts/login_xhs.py 重新登录，登录后自动继续")
+                return 'expired'
+            if valid:
+                self.store.record_validation(user_id, nickname)
+
+        if remaining is None:
+            return 'ok'
+
+        expires = datetime.fromtimestamp(self.expires_at).strftime('%m-%d %H:%M')
+        if remaining <= self.pause_seconds:
+            if state == 'running':
+                self._pause('expiring', f"⛔ 登录将于 {expires} 过期，已暂停发布队列。请重新登录，登录后自动继续")
+            elif self._warned != (key, 'expiring'):
+                self._emit('expiring', f"⚠️ 登录将于 {expires} 过期，请在发布前重新登录")
+            self._warned = (key, 'expiring')
+            return 'expiring'
+        if remaining <= self.warn_seconds:
+            if self._warned is None or self._warned[0] != key:
+                self._warned = (key, 'warning')
+                self._emit('warning', f"⚠️ 登录将于 {expires} 过期（约 {remaining / 3600:.1f} 小时后），建议提前重新登录")
+            return 'warning'
+        return 'ok'
+
+    def _check_relogin(self, key, remaining):
+        """监控暂停队列后，等待换成新的有效会话再继续"""
+        if key == self._paused_key:
+            return 'expired'
+        if remaining is not None and remaining <= self.pause_seconds:
+            return 'expiring'
+        valid, user_id, nickname = self.probe(self.store.cookie())
+        if not valid:
+            return 'expired'
+
+        self.store.record_validation(user_id, nickname)
+        self._paused_key = None
+        self._warned = None
+        self._last_probe = self._clock()
+        # 发布线程用新 Cookie 重新创建客户端后继续
+        self.engine.renew_session()
+        self._emit('renewed', f"✅ 已重新登录{f'（{nickname}）' if nickname else ''}，发布队列继续")
+        return 'renewed'
@@ -2,28 +2,33 @@
 # -*- coding: utf-8 -*-
 """
 验证小红书 Cookie 是否有效
+
+使用方法:
+    python validate_cookie.py            # 最近已验证过时直接显示缓存结果
+    python validate_cookie.py --force    # 总是在线验证
 """
 
-import os
+import argparse
 import sys
+from datetime import datetime
 from pathlib import Path
 
 try:
-    from dotenv import load_dotenv
     from xhs import XhsClient
 except ImportError as e:
     print(f"Missing dependency: {e}")
-    print("Run: pip install xhs python-dotenv")
+    print("Run: pip install xhs")
     sys.exit(1)
 
+SCRIPT_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from xhs_credentials import default_store, parse_cookie, user_from_info
+
 
 def load_cookie():
     """从 .env 文件加载 Cookie"""
-    env_path = Path(__file__).parent.parent / '.env'
-    if env_path.exists():
-        load_dotenv(env_path)
-    
-    cookie = os.getenv('XHS_COOKIE')
+    cookie = default_store().cookie()
     if not cookie:
         print("[ERROR] XHS_COOKIE not found in .env file")
         sys.exit(1)
@@ -45,11 +50,8 @@ def validate_cookie(cookie: str):
     
     # 检查是否包含常见的小红书 Cookie 字段
     required_fields = ['a1', 'web_session']
-    found_fields = []
-    
-    for field in required_fields:
-        if f'{field}=' in cookie:
-            found_fields.append(field)
+    cookies = parse_cookie(cookie)
+    found_fields = [field for field in required_fields if field in cookies]
     
     print(f"  Found fields: {found_fields}")
     
@@ -62,10 +64,10 @@ def validate_cookie(cookie: str):
 
 
 def test_cookie(cookie: str):
-    """测试 Cookie 是否可以正常使用"""
+    """测试 Cookie 是否可以正常使用（结果写入登录验证缓存）"""
     print("\n[INFO] Testing cookie with Xiaohongshu API...")
     
-    try:
+    def check():
         from xhs.help import sign as local_sign
         
         def sign_func(uri, data=None, a1="", web_session=""):
@@ -75,25 +77,24 @@ def test_cookie(cookie: str):
         
         # 尝试获取用户信息
         print("[INFO] Fetching user info...")
-        info = client.get_self_info()
-        
-        if info and isinstance(info, dict):
-            nickname = info.get('nickname', 'Unknown')
-            user_id = info.get('user_id', 'Unknown')
-            print(f"\n[SUCCESS] Cookie is valid!")
-            print(f"  Nickname: {nickname}")
-            print(f"  User ID: {user_id}")
-            return True
-        else:
-            print("[ERROR] Failed to get user info")
-            return False
-            
+        return user_from_info(client.get_self_info())
+    
+    try:
+        record, _ = default_store().validate(check, force=True)
+        print(f"\n[SUCCESS] Cookie is valid!")
+        print(f"  Nickname: {record['nickname'] or 'Unknown'}")
+        print(f"  User ID: {record['user_id'] or 'Unknown'}")
+        return True
     except Exception as e:
         print(f"[ERROR] Cookie validation failed: {e}")
         return False
 
 
 def main():
+    parser = argparse.ArgumentParser(description='Xiaohongshu Cookie Validator')
+    parser.add_argument('--force', action='store_true', help='Always validate online, ignore cached result')
+    args = parser.parse_args()
+    
     print("="*60)
     print("Xiaohongshu Cookie Validator")
     print("="*60)
@@ -101,6 +102,16 @@ def main():
     # 加载 Cookie
     cookie = load_cookie()
     
+    # 最近已验证通过时不再请求接口
+    record = None if args.force else default_store().validation()
+    if record:
+        checked = datetime.fromtimestamp(record['checked_at']).strftime('%Y-%m-%d %H:%M:%S')
+        print(f"\n[SUCCESS] Cookie was validated at {checked}")
+        print(f"  Nickname: {record['nickname'] or 'Unknown'}")
+        print(f"  User ID: {record['user_id'] or 'Unknown'}")
+        print("[INFO] Use --force to validate online again")
+        sys.exit(0)
+    
     # 验证格式
     format_valid = validate_cookie(cookie)
     
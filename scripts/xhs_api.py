@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+小红书 API 调用封装
+统一图片上传、笔记创建和用户信息查询，供各发布工具共用
+
+兼容两种 XhsClient 接口:
+1. 提供 upload_image_file / create_image_note(image_ids=...) 的版本（GUI V3 使用）
+2. PyPI xhs 库: get_upload_files_permit + upload_file 上传，create_note 创建
+"""
+
+import mimetypes
+from pathlib import Path
+
+
+class XhsApiError(Exception):
+    """API 返回失败结果"""
+
+    def __init__(self, message, result=None):
+        super().__init__(message)
+        self.result = result
+
+
+def _has_image_id_api(client):
+    return hasattr(client, 'upload_image_file')
+
+
+def upload_image(client, image_path):
+    """
+    上传单张图片
+
+    Args:
+        client: XhsClient
+        image_path: 图片路径
+
+    Returns:
+        str: 图片 ID（发布笔记时使用）
+    """
+    image_path = str(Path(image_path).absolute())
+
+    if _has_image_id_api(client):
+        with open(image_path, 'rb') as f:
+            img_data = f.read()
+
+        result = client.upload_image_file(img_data)
+        if isinstance(result, dict) and result.get('success'):
+            image_id = result.get('data', {}).get('image_id')
+            if image_id:
+                return image_id
+            raise XhsApiError("未获取到image_id", result)
+        raise XhsApiError(f"上传失败: {result}", result)
+
+    content_type = mimetypes.guess_type(image_path)[0] or 'image/jpeg'
+    file_id, token = client.get_upload_files_permit('image')
+    client.upload_file(file_id, token, image_path, content_type=content_type)
+    return file_id
+
+
+def create_note(client, title, desc, image_ids, is_private=False):
+    """
+    使用已上传的图片创建图文笔记
+
+    Returns:
+        str: 笔记 ID（平台未返回时为 None）
+    """
+    if _has_image_id_api(client):
+        result = client.create_image_note(
+            title=title,
+            desc=desc,
+            image_ids=image_ids,
+            is_private=is_private
+        )
+        if isinstance(result, dict) and result.get('success'):
+            return result.get('data', {}).get('note_id')
+        raise XhsApiError(f"发布失败: {result}", result)
+
+    images = [
+        {
+            'file_id': image_id,
+            'metadata': {'source': -1},
+            'stickers': {'version': 2, 'floating': []},
+            'extra_info_json': '{"mimeType":"image/jpeg"}',
+        }
+        for image_id in image_ids
+    ]
+    result = client.create_note(
+        title, desc, 'normal',
+        image_info={'images': images},
+        is_private=is_private
+    )
+    if isinstance(result, dict):
+        return result.get('id') or result.get('note_id')
+    return None
+
+
+def get_self_info(client):
+    """获取当前登录用户信息"""
+    return client.get_self_info()
+
+
+def note_link(note_id):
+    """笔记链接"""
+    return f"https://www.xiaohongshu.com/explore/{note_id}" if note_id else "Unknown"
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+小红书登录凭证管理
+各脚本共用的 Cookie 读取、保存和登录状态缓存
+
+特性:
+1. .env 中的 XHS_COOKIE 只解析一次，.env 被修改（修改时间或大小变化）后自动重新读取
+2. 最近一次登录验证结果（用户ID、昵称、验证时间）按会话缓存在 .session_cache.json，
+   有效期内各工具启动时不再重复请求用户信息接口
+3. 缓存只保存会话指纹，不保存 Cookie 本身；重新登录（web_session 变化）后旧结果自动失效
+4. 发布时遇到登录失效立即清除缓存
+5. probe_session 用一次不需要签名的轻量 HTTP 请求检查登录状态，无需启动浏览器
+
+使用方法:
+    python xhs_credentials.py            # 查看当前 Cookie 与缓存的验证结果
+    python xhs_credentials.py --clear    # 清除验证缓存
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from rate_limiter import account_key
+
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_ENV_FILE = PROJECT_ROOT / '.env'
+DEFAULT_STATE_FILE = PROJECT_ROOT / '.session_cache.json'
+# 扫码登录后保存的 Playwright storage_state（含 Cookie 过期时间）
+STORAGE_STATE_FILE = PROJECT_ROOT / '.xhs_storage_state.json'
+
+COOKIE_KEY = 'XHS_COOKIE'
+PLACEHOLDER = 'your_cookie_string_here'
+
+# 登录验证结果有效期（秒）
+DEFAULT_TTL = 6 * 3600
+
+# 缓存文件中最多保留的会话数
+MAX_SESSIONS = 20
+
+# 轻量登录检查：网页端当前用户接口，不需要签名，未登录时返回 guest
+PROBE_URL = 'https://edith.xiaohongshu.com/api/sns/web/v2/user/me'
+PROBE_TIMEOUT = 5
+PROBE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                  '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/json',
+    'Origin': 'https://www.xiaohongshu.com',
+    'Referer': 'https://www.xiaohongshu.com/',
+}
+
+
+def parse_cookie(cookie):
+    """Cookie 字符串解析为 {名称: 值}"""
+    cookies = {}
+    for item in (cookie or '').split(';'):
+        name, sep, value = item.strip().partition('=')
+        if sep and name.strip():
+            cookies[name.strip()] = value.strip()
+    return cookies
+
+
+def parse_env(text):
+    """
+    从 .env 内容中取出 XHS_COOKIE
+
+    支持 export 前缀和引号，忽略示例占位值；有多行时取第一个有效值
+    """
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('export '):
+            line = line[len('export '):].lstrip()
+        if not line.startswith(COOKIE_KEY + '='):
+            continue
+        value = line[len(COOKIE_KEY) + 1:].strip().strip("'\"")
+        if value and PLACEHOLDER not in value:
+            return value
+    return None
+
+
+def session_key(cookie):
+    """
+    会话指纹：a1 + web_session（重新登录后改变），不保存 Cookie 本身
+    """
+    cookies = parse_cookie(cookie)
+    parts = [cookies.get('a1', ''), cookies.get('web_session', '')]
+    value = '\n'.join(parts) if any(parts) else (cookie or '')
+    return hashlib.blake2b(value.encode('utf-8'), digest_size=12).hexdigest()
+
+
+class CredentialStore:
+    """Cookie 与登录验证结果缓存（线程安全）"""
+
+    def __init__(self, env_file=DEFAULT_ENV_FILE, state_file=DEFAULT_STATE_FILE, ttl=DEFAULT_TTL,
+                 clock=time.time):
+        """
+        Args:
+            env_file: 保存 XHS_COOKIE 的 .env 文件
+            state_file: 登录验证结果缓存文件
+            ttl: 验证结果有效期（秒）
+            clock: 时间函数（测试时可替换）
+        """
+        self.env_file = Path(env_file)
+        self.state_file = Path(state_file)
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._env_stamp = None
+        self._cookie = None
+        self._sessions = None
+        self._state_stamp = None
+
+    # ---------- Cookie ----------
+
+    def _env_changed(self):
+        try:
+            st = os.stat(self.env_file)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+        if stamp == self._env_stamp and self._env_stamp is not None:
+            return False
+        self._env_stamp = stamp
+        return True
+
+    def cookie(self):
+        """当前 Cookie；.env 未变化时直接返回上次解析结果，没有时使用环境变量 XHS_COOKIE"""
+        with self._lock:
+            if self._env_changed():
+                self._cookie = None
+                if self._env_stamp is not None:
+                    try:
+                        self._cookie = parse_env(self.env_file.read_text(encoding='utf-8'))
+                    except (OSError, UnicodeDecodeError) as e:
+                        print(f"Warning: Failed to read {self.env_file}: {e}")
+            if self._cookie:
+                return self._cookie
+        value = os.environ.get(COOKIE_KEY, '').strip().strip("'\"")
+        return value if value and PLACEHOLDER not in value else None
+
+    def cookies(self):
+        """当前 Cookie 的 {名称: 值}"""
+        return parse_cookie(self.cookie())
+
+    def account(self):
+        """当前账号标识（与限流器一致）"""
+        return account_key(self.cookie())
+
+    def save_cookie(self, cookie):
+        """
+        写入 .env 中的 XHS_COOKIE（保留其它配置），并在前一行记录更新时间
+        """
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        lines = []
+        if self.env_file.exists():
+            lines = self.env_file.read_text(encoding='utf-8').splitlines()
+
+        new_lines = []
+        found = False
+        for line in lines:
+            stripped = line.strip()
+            if stripped.startswith('# Update time:'):
+                continue
+            if stripped.startswith(COOKIE_KEY + '=') or stripped.startswith(f'export {COOKIE_KEY}='):
+                if not found:
+                    new_lines.append(f"# Update time: {timestamp}")
+                    new_lines.append(f"{COOKIE_KEY}={cookie}")
+                    found = True
+                continue
+            new_lines.append(line)
+        if not found:
+            new_lines.append("# Xiaohongshu Cookie")
+            new_lines.append(f"# Update time: {timestamp}")
+            new_lines.append(f"{COOKIE_KEY}={cookie}")
+
+        self.env_file.parent.mkdir(parents=True, exist_ok=True)
+        self._write_atomic(self.env_file, '\n'.join(new_lines) + '\n')
+        with self._lock:
+            self._env_stamp = None
+        return self.env_file
+
+    # ---------- 登录验证结果 ----------
+
+    def _load_sessions(self):
+        """读取验证缓存（其它进程写入后重新读取）"""
+        try:
+            st = os.stat(self.state_file)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+        if self._sessions is None or stamp != self._state_stamp:
+            self._sessions = {}
+            self._state_stamp = stamp
+            if stamp is not None:
+                try:
+                    with open(self.state_file, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    if isinstance(data, dict):
+                        self._sessions = data
+                except (OSError, ValueError) as e:
+                    print(f"Warning: Failed to read {self.state_file}: {e}")
+        return self._sessions
+
+    def _save_sessions(self):
+        sessions = sorted(self._sessions.items(), key=lambda item: item[1].get('checked_at', 0))
+        self._sessions = dict(sessions[-MAX_SESSIONS:])
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            self._write_atomic(self.state_file, json.dumps(self._sessions, ensure_ascii=False, indent=2))
+            st = os.stat(self.state_file)
+            self._state_stamp = (st.st_mtime_ns, st.st_size)
+        except OSError as e:
+            print(f"Warning: Failed to write {self.state_file}: {e}")
+
+    @staticmethod
+    def _write_atomic(path, text):
+        fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=path.name, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def validation(self):
+        """
+        当前 Cookie 在有效期内的验证结果
+
+        Returns:
+            dict: {'user_id', 'nickname', 'checked_at'}，没有或已过期时返回 None
+        """
+        cookie = self.cookie()
+        if not cookie:
+            return None
+        key = session_key(cookie)
+        with self._lock:
+            record = self._load_sessions().get(key)
+        if not record or not record.get('valid'):
+            return None
+        if self._clock() - record.get('checked_at', 0) > self.ttl:
+            return None
+        return record
+
+    def record_validation(self, user_id='', nickname=''):
+        """记录当前 Cookie 验证通过"""
+        cookie = self.cookie()
+        if not cookie:
+            return None
+        record = {
+            'valid': True,
+            'user_id': user_id or '',
+            'nickname': nickname or '',
+            'checked_at': self._clock(),
+        }
+        with self._lock:
+            self._load_sessions()[session_key(cookie)] = record
+            self._save_sessions()
+        return record
+
+    def invalidate(self):
+        """当前 Cookie 已失效（或需要重新验证）"""
+        cookie = self.cookie()
+        if not cookie:
+            return
+        with self._lock:
+            if self._load_sessions().pop(session_key(cookie), None) is not None:
+                self._save_sessions()
+
+    def clear(self):
+        """清除全部验证缓存"""
+        with self._lock:
+            self._sessions = {}
+            self._save_sessions()
+
+    def validate(self, check, force=False):
+        """
+        返回当前 Cookie 的验证结果，缓存有效时不调用 check
+
+        Args:
+            check: 无参函数，验证登录并返回 (user_id, nickname)，失败时抛出异常
+            force: 忽略缓存
+
+        Returns:
+            tuple: (record, cached)
+        """
+        if not force:
+            record = self.validation()
+            if record:
+                return record, True
+        try:
+            user_id, nickname = check()
+        except Exception:
+            self.invalidate()
+            raise
+        return self.record_validation(user_id, nickname), False
+
+
+class LoginError(Exception):
+    """登录验证失败（Cookie 已失效或响应异常）"""
+
+
+def user_from_info(info):
+    """
+    检查用户信息接口的返回，取出 (user_id, nickname)
+
+    Raises:
+        LoginError: 返回未登录 (code -1 / -100)、success 为 False 或格式异常
+    """
+    if not isinstance(info, dict):
+        raise LoginError(f"响应格式错误: {type(info).__name__}")
+    if info.get('code') in (-1, -100):
+        raise LoginError(info.get('msg') or '无登录信息')
+    if not info.get('success', True):
+        raise LoginError(info.get('msg') or '登录验证失败')
+
+    data = info.get('data', info)
+    if not isinstance(data, dict):
+        data = info
+    basic = data.get('basic_info') or {}
+    nickname = data.get('nickname') or data.get('name') or basic.get('nickname') or ''
+    user_id = data.get('user_id') or data.get('userId') or basic.get('user_id') or ''
+    return user_id, nickname
+
+
+def load_storage_state(cookie, state_file=STORAGE_STATE_FILE):
+    """
+    扫码登录时保存的 storage_state；与 cookie 不是同一会话（如手动改过 .env）时返回 None
+    """
+    state_file = Path(state_file)
+    if not cookie or not state_file.exists():
+        return None
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(state, dict):
+        return None
+    saved = {c.get('name'): c.get('value') for c in state.get('cookies', []) if isinstance(c, dict)}
+    if saved.get('web_session') != parse_cookie(cookie).get('web_session'):
+        return None
+    return state
+
+
+def session_expiry(cookie, state_file=STORAGE_STATE_FILE, names=('web_session',)):
+    """
+    会话 Cookie 的过期时间（Unix 时间戳），来自 storage_state 中的 expires；
+    没有 storage_state 或为会话级 Cookie（expires 为 -1）时返回 None
+    """
+    state = load_storage_state(cookie, state_file)
+    if not state:
+        return None
+    expires = [
+        c['expires'] for c in state.get('cookies', [])
+        if isinstance(c, dict) and c.get('name') in names
+        and isinstance(c.get('expires'), (int, float)) and c['expires'] > 0
+    ]
+    return min(expires) if expires else None
+
+
+def probe_session(cookie, url=PROBE_URL, timeout=PROBE_TIMEOUT):
+    """
+    轻量 HTTP 登录检查（不启动浏览器，不需要签名）
+
+    Returns:
+        tuple: (状态, user_id, nickname)
+            状态 True 已登录 / False 已失效 / None 无法判断（网络异常、需要验证码等）
+    """
+    if not cookie:
+        return False, '', ''
+    request = urllib.request.Request(url, headers=dict(PROBE_HEADERS, Cookie=cookie))
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            info = json.loads(response.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        return (False if e.code == 401 else None), '', ''
+    except (OSError, ValueError):
+        return None, '', ''
+
+    if not isinstance(info, dict):
+        return None, '', ''
+    if info.get('code') in (-100, -101):
+        return False, '', ''
+    data = info.get('data')
+    if not info.get('success') or not isinstance(data, dict):
+        return None, '', ''
+    if data.get('guest'):
+        return False, '', ''
+    return True, data.get('user_id', ''), data.get('nickname', '')
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def default_store():
+    """进程内共用的凭证缓存（项目根目录 .env）"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = CredentialStore()
+        return _default_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description='小红书登录凭证')
+    parser.add_argument('--env', type=str, help='.env 文件 (默认: 项目根目录 .env)')
+    parser.add_argument('--clear', action='store_true', help='清除登录验证缓存')
+
+    args = parser.parse_args()
+
+    store = CredentialStore(args.env) if args.env else default_store()
+    if args.clear:
+        store.clear()
+        print("[INFO] Validation cache cleared")
+        return
+
+    cookie = store.cookie()
+    if not cookie:
+        print(f"[ERROR] {COOKIE_KEY} not found in {store.env_file}")
+        sys.exit(1)
+
+    names = sorted(store.cookies())
+    print(f"[INFO] Cookie: {len(cookie)} characters, fields: {', '.join(names)}")
+    print(f"[INFO] Account: {store.account()}")
+    record = store.validation()
+    if record:
+        checked = datetime.fromtimestamp(record['checked_at']).strftime('%Y-%m-%d %H:%M:%S')
+        print(f"[INFO] Validated at {checked}: {record['nickname']} ({record['user_id']})")
+    else:
+        print("[INFO] No valid cached validation, the next tool run will check online")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发布工具离线压测
+启动本地模拟服务 (fake_xhs_server)，生成测试笔记，
+驱动发布流程并统计吞吐量（篇/小时）、重试次数和重复发布
+
+模式:
+    engine    与 GUI V3 和 publish_service 相同的调用链：PublishEngine 逐篇发布
+              （PublishEngine._publish_one：ApiGuard + xhs_api + 发布队列 + 台账）
+    pipeline  batch_publish_v2 --pipeline 的 上传 → 发布 流水线（publish_pipeline）
+    helper    逐篇调用 publish_helper.publish_note（需要安装 xhs 库）
+
+客户端:
+    local     仅依赖标准库的 LocalApiClient（upload_image_file / create_image_note 接口）
+    xhs       xhs 库的 XhsClient，地址改写到模拟服务
+
+使用方法:
+    python xhs_load_test.py --notes 50 --images 4 --error-rate 0.1 --rate-limit-rate 0.05
+    python xhs_load_test.py --mode engine --notes 20 --error-rate 0.1
+    python xhs_load_test.py --mode helper --client xhs --latency 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from fake_xhs_server import FakeXhsServer, FaultConfig, LocalApiClient, point_xhs_client
+from note_digest import DigestCache
+from note_scanner import NoteScanner
+from publish_engine import PublishEngine, PublishRecordManager
+from publish_ledger import PublishLedger
+from publish_pipeline import PublishPipeline
+from publish_queue import PublishQueue
+from xhs_resilience import ApiGuard, CircuitBreaker, RetryPolicy
+
+
+# 压测使用较短的退避，避免测试时间被退避主导
+LOAD_TEST_POLICY = dict(max_attempts=5, base_delay=0.05, max_delay=1.0)
+
+# 最小的合法 PNG（1x1 像素）
+PNG_BYTES = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082'
+)
+
+
+def make_notes(root, count, images):
+    """生成测试笔记目录"""
+    note_dirs = []
+    for i in range(1, count + 1):
+        note_dir = Path(root) / f'note_{i:03d}'
+        note_dir.mkdir(parents=True)
+        (note_dir / 'cover.png').write_bytes(PNG_BYTES)
+        for j in range(1, images):
+            (note_dir / f'card_{j}.png').write_bytes(PNG_BYTES)
+        (note_dir / 'metadata.json').write_text(
+            json.dumps({'title': f'压测笔记 {i:03d}', 'subtitle': 'load test'}, ensure_ascii=False),
+            encoding='utf-8'
+        )
+        note_dirs.append(note_dir)
+    return note_dirs
+
+
+def make_client(kind, base_url):
+    """创建指向模拟服务的客户端"""
+    if kind == 'local':
+        return LocalApiClient(base_url)
+
+    try:
+        from xhs import XhsClient
+        from xhs.help import sign as local_sign
+    except ImportError:
+        print("Please install xhs library: pip install xhs")
+        sys.exit(1)
+
+    def sign_func(uri, data=None, a1="", web_session=""):
+        return local_sign(uri, data, a1=a1)
+
+    client = XhsClient(cookie='a1=load_test; web_session=load_test', sign=sign_func)
+    return point_xhs_client(client, base_url)
+
+
+def make_guard(log):
+    return ApiGuard(
+        policy=RetryPolicy(**LOAD_TEST_POLICY),
+        breaker=CircuitBreaker(cooldown=5),
+        log=log,
+    )
+
+
+def run_pipeline(client, note_dirs, work_dir, log):
+    """通过发布流水线发布（batch_publish_v2 --pipeline 的调用链）"""
+    with PublishQueue(Path(work_dir) / 'queue.db') as publish_queue, \
+            DigestCache(Path(work_dir) / 'digests.db') as digest_cache, \
+            PublishLedger(Path(work_dir) / 'ledger.db', digest_cache=digest_cache) as ledger:
+        pipeline = PublishPipeline(
+            client,
+            interval_minutes=0,
+            publish_queue=publish_queue,
+            ledger=ledger,
+            guard=make_guard(log),
+            log=log,
+        )
+        stats = asyncio.run(pipeline.run(note_dirs))
+        return stats['published'], stats['failed'] + stats['skipped']
+
+
+def run_engine(client, note_dirs, work_dir, log):
+    """通过发布引擎逐篇发布（与 GUI V3 / publish_service 相同的调用链）"""
+    digest_cache = DigestCache(Path(work_dir) / 'digests.db')
+    engine = PublishEngine(
+        wait_minutes=0,
+        client_factory=lambda: (client, 'load_test'),
+        record_manager=PublishRecordManager(Path(work_dir) / 'ledger.db', digest_cache=digest_cache),
+        publish_queue=PublishQueue(Path(work_dir) / 'queue.db'),
+        guard=make_guard(log),
+        scanner=NoteScanner(index_file=Path(work_dir) / 'index.json'),
+        log=log,
+        # 压测笔记的图片内容相同，不做重复内容检测
+        dedup='off',
+        digest_cache=digest_cache,
+    )
+    with engine, digest_cache:
+        engine.enqueue(note_dirs)
+        engine.join()
+        stats = dict(engine.stats)
+    return stats['published'], stats['failed'] + stats['skipped']
+
+
+def run_helper(client, note_dirs, log):
+    """逐篇调用 publish_helper.publish_note"""
+    import publish_helper
+
+    # 让 publish_helper 使用指向模拟服务的客户端，并关闭真实账号的限流
+    publish_helper.create_client = lambda: client
+    publish_helper._api_guard = make_guard(log)
+
+    published = failed = 0
+    for note_dir in note_dirs:
+        metadata = json.loads((note_dir / 'metadata.json').read_text(encoding='utf-8'))
+        images = [str(note_dir / 'cover.png')] + sorted(str(p) for p in note_dir.glob('card_*.png'))
+        result = publish_helper.publish_note(metadata['title'], metadata['subtitle'], images)
+        if result['success']:
+            published += 1
+        else:
+            failed += 1
+            log(f"[ERROR] {note_dir.name}: {result.get('error')}")
+    return published, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='发布工具离线压测')
+    parser.add_argument('--mode', choices=('pipeline', 'engine', 'helper'), default='pipeline')
+    parser.add_argument('--client', choices=('local', 'xhs'), default='local')
+    parser.add_argument('--notes', type=int, default=20, help='笔记数量')
+    parser.add_argument('--images', type=int, default=4, help='每篇图片数')
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的延迟(秒)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='随机附加延迟上限(秒)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='500 错误比例')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='429 限流比例')
+    parser.add_argument('--auth-rate', type=float, default=0.0, help='461 验证码比例')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='创建成功后丢失响应的比例')
+    parser.add_argument('--seed', type=int, help='随机种子')
+    parser.add_argument('--verbose', '-v', action='store_true', help='输出发布日志')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出结果')
+
+    args = parser.parse_args()
+
+    faults = FaultConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        auth_rate=args.auth_rate,
+        drop_rate=args.drop_rate,
+    )
+    log = print if args.verbose else (lambda message: None)
+
+    with FakeXhsServer(faults=faults, seed=args.seed) as server, \
+            tempfile.TemporaryDirectory() as work_dir:
+        note_dirs = make_notes(Path(work_dir) / 'notes', args.notes, args.images)
+        client = make_client(args.client, server.url)
+
+        start = time.perf_counter()
+        if args.mode == 'pipeline':
+            published, failed = run_pipeline(client, note_dirs, work_dir, log)
+        elif args.mode == 'engine':
+            published, failed = run_engine(client, note_dirs, work_dir, log)
+        else:
+            published, failed = run_helper(client, note_dirs, log)
+        elapsed = time.perf_counter() - start
+
+        server_stats = server.snapshot()
+        duplicates = server.duplicates()
+
+    requests = sum(item['requests'] for item in server_stats['endpoints'].values())
+    # 理想情况：每张图 permit + upload 两次请求，每篇一次 create
+    ideal = args.notes * (args.images * 2 + 1)
+    result = {
+        'mode': args.mode,
+        'client': args.client,
+        'published': published,
+        'failed': failed,
+        'elapsed': round(elapsed, 3),
+        'notes_per_hour': round(published / elapsed * 3600, 1) if elapsed else 0.0,
+        'requests': requests,
+        'extra_requests': max(0, requests - ideal),
+        'duplicates': duplicates,
+        'server': server_stats['endpoints'],
+    }
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return
+
+    print(f"\n[INFO] Mode: {args.mode} / client: {args.client}")
+    print(f"[INFO] Published: {published}, failed: {failed}, elapsed: {elapsed:.2f}s")
+    print(f"[INFO] Throughput: {result['notes_per_hour']} notes/hour")
+    print(f"[INFO] Requests: {requests} (retries/extra: {result['extra_requests']})")
+    for endpoint, item in server_stats['endpoints'].items():
+        print(f"  {endpoint:<7} requests={item['requests']:<5} ok={item['ok']:<5} "
+              f"500={item['error']:<4} 429={item['rate_limit']:<4} 461={item['auth']:<4} drop={item['drop']}")
+    if duplicates:
+        print(f"[ERROR] Duplicate notes created: {duplicates}")
+    else:
+        print("[SUCCESS] No duplicate notes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+小红书 API 调用容错
+为上传、发布、获取用户信息等调用提供重试、退避和熔断
+
+错误分为三类:
+1. retryable: 网络抖动、超时、签名失败、限流、5xx —— 指数退避 + 随机抖动后重试
+2. auth: Cookie 失效、需要验证码、IP 被封 —— 不重试，熔断并停止批量任务
+3. fatal: 参数错误、内容被拒等 —— 不重试，跳过当前笔记
+
+连续出现可重试错误达到阈值时熔断器打开，暂停该账号的所有调用，
+冷却结束后放行一次探测请求，成功则恢复。
+
+传入 RateLimiter 时，每次调用（包括重试）前先从跨进程令牌桶取令牌。
+
+每次调用结束（成功或最终失败）写一条 api_call 事件到结构化事件日志（见 event_log）:
+接口、尝试次数、总耗时 duration_ms（含限流/熔断等待）、请求耗时 request_ms 和错误类型。
+
+发布笔记不是幂等操作：请求可能已被服务器处理但响应丢失，
+因此只有确定请求未被处理时（连接失败、签名失败、被限流拒绝）才会重发。
+"""
+
+import random
+import threading
+import time
+
+import xhs_api
+from event_log import error_fields, get_logger
+
+
+RETRYABLE = 'retryable'
+AUTH = 'auth'
+FATAL = 'fatal'
+
+DEFAULT_MAX_ATTEMPTS = 4
+DEFAULT_BASE_DELAY = 2.0
+DEFAULT_MAX_DELAY = 60.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_COOLDOWN = 600.0
+
+# 按异常类名识别，避免强依赖 xhs / requests
+_AUTH_ERRORS = {'NeedVerifyError', 'IPBlockError'}
+_RETRYABLE_ERRORS = {
+    'SignError', 'ConnectionError', 'Timeout', 'ConnectTimeout', 'ReadTimeout',
+    'ChunkedEncodingError', 'TimeoutError', 'ProxyError', 'SSLError',
+}
+# 这些错误说明请求没有被服务器处理，重发不会重复发布
+_NOT_SENT_ERRORS = {'SignError', 'ConnectTimeout', 'ConnectionRefusedError', 'ProxyError'}
+
+_AUTH_KEYWORDS = ('登录', 'cookie', 'unauthorized', '"code": -100', "'code': -100", '-101')
+_RETRYABLE_KEYWORDS = ('频繁', '稍后', 'timeout', 'timed out', 'too many requests', '系统繁忙')
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，账号暂停调用"""
+
+
+class AuthError(CircuitOpenError):
+    """登录失效或需要人工验证，重新登录前不再调用"""
+
+
+def _error_names(exc):
+    return {cls.__name__ for cls in type(exc).__mro__}
+
+
+def _status_code(exc):
+    response = getattr(exc, 'response', None)
+    return getattr(response, 'status_code', None)
+
+
+def classify_error(exc):
+    """
+    判断异常类型
+
+    Returns:
+        str: RETRYABLE / AUTH / FATAL
+    """
+    if isinstance(exc, AuthError):
+        return AUTH
+    if isinstance(exc, CircuitOpenError):
+        return RETRYABLE
+
+    names = _error_names(exc)
+    if names & _AUTH_ERRORS:
+        return AUTH
+
+    status = _status_code(exc)
+    if status in (401, 403, 461, 471):
+        return AUTH
+    if status == 429 or (status is not None and status >= 500):
+        return RETRYABLE
+
+    if names & _RETRYABLE_ERRORS:
+        return RETRYABLE
+
+    text = str(exc).lower()
+    if any(keyword in text for keyword in _AUTH_KEYWORDS):
+        return AUTH
+    if any(keyword in text for keyword in _RETRYABLE_KEYWORDS):
+        return RETRYABLE
+
+    return FATAL
+
+
+def is_safe_to_resend(exc):
+    """请求确定未被服务器处理（重发不会导致重复发布）"""
+    if isinstance(exc, CircuitOpenError):
+        return True
+    if _error_names(exc) & _NOT_SENT_ERRORS:
+        return True
+    if _status_code(exc) in (429, 461, 471):
+        return True
+    # 平台返回了明确的失败结果
+    return isinstance(exc, xhs_api.XhsApiError)
+
+
+class RetryPolicy:
+    """指数退避 + 全抖动（full jitter）"""
+
+    def __init__(self, max_attempts=DEFAULT_MAX_ATTEMPTS, base_delay=DEFAULT_BASE_DELAY,
+                 max_delay=DEFAULT_MAX_DELAY, rng=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = rng or random.Random()
+
+    def delay(self, attempt):
+        """第 attempt 次失败后的等待秒数（attempt 从 1 开始）"""
+        cap = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return self._rng.uniform(0, cap)
+
+
+class CircuitBreaker:
+    """单个账号的熔断器"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, cooldown=DEFAULT_COOLDOWN,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """恢复为关闭状态（例如重新登录后）"""
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.reason = None
+            self._opened_at = None
+
+    def _trip(self, reason):
+        self.state = self.OPEN
+        self.reason = reason
+        self._opened_at = self._clock()
+
+    def remaining(self):
+        """距离冷却结束的秒数（登录失效时为 None）"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            if self.reason == AUTH:
+                return None
+            return max(0.0, self._opened_at + self.cooldown - self._clock())
+
+    def allow(self):
+        """是否允许发起调用；冷却结束后转为半开并放行探测请求"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return True
+            if self.reason == AUTH:
+                return False
+            if self._clock() - self._opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.reason = None
+
+    def record_failure(self, kind):
+        with self._lock:
+            if kind == AUTH:
+                self._trip(AUTH)
+            elif kind == RETRYABLE:
+                self.failures += 1
+                if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                    self._trip(RETRYABLE)
+
+
+class ApiGuard:
+    """带重试和熔断的 API 调用入口"""
+
+    def __init__(self, policy=None, breaker=None, log=print, sleep=time.sleep, should_stop=None,
+                 limiter=None, account='default', events=None):
+        """
+        Args:
+            policy: RetryPolicy
+            breaker: CircuitBreaker（同一账号的调用应共用一个）
+            log: 日志输出函数
+            sleep: 等待函数，GUI 可传入可中断的等待
+            should_stop: 可选回调，返回 True 时放弃熔断/限流等待
+            limiter: 可选 RateLimiter，跨进程限流
+            account: 限流使用的账号标识（rate_limiter.account_key）
+            events: 事件记录器（event_log.EventLogger），默认写入共用的事件日志
+        """
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.limiter = limiter
+        self.account = account
+        self.log = log
+        self._sleep = sleep
+        self._should_stop = should_stop
+        self.events = events or get_logger('api')
+
+    def _wait_for_breaker(self, label):
+        while not self.breaker.allow():
+            remaining = self.breaker.remaining()
+            if remaining is None:
+                raise AuthError(f"{label}: 登录已失效，请重新登录后再试")
+            if self._should_stop and self._should_stop():
+                raise CircuitOpenError(f"{label}: 熔断中，任务已停止")
+            self.log(f"  ⏸ 连续调用失败，账号暂停 {remaining / 60:.1f} 分钟后重试")
+            self._sleep(remaining)
+
+    def _throttle(self, endpoint, label):
+        if self.limiter is None or endpoint is None:
+            return
+        wait = self.limiter.try_acquire(self.account, endpoint)
+        while wait > 0:
+            if self._should_stop and self._should_stop():
+                raise CircuitOpenError(f"{label}: 等待限流时任务已停止")
+            if wait >= 5:
+                self.log(f"  ⏳ 限流: {wait:.0f} 秒后{label}")
+            self._sleep(wait)
+            wait = self.limiter.try_acquire(self.account, endpoint)
+
+    def call(self, func, *args, idempotent=True, label='API', endpoint=None, **kwargs):
+        """
+        调用 func(*args, **kwargs)，按错误类型重试或抛出
+
+        Args:
+            idempotent: False 时只在请求确定未被处理时重试（用于发布笔记）
+            label: 日志中显示的调用名称
+            endpoint: 限流使用的接口名（create / upload / info），None 表示不限流
+
+        Raises:
+            AuthError: 登录失效
+            CircuitOpenError: 熔断或限流等待被中止
+            其它异常: 不可重试或重试次数用尽时原样抛出
+        """
+        timing = {'attempts': 0, 'request_ms': 0.0}
+        start = time.perf_counter()
+        try:
+            result = self._call(func, args, kwargs, idempotent, label, endpoint, timing)
+        except Exception as e:
+            self._emit(endpoint, label, start, timing, False, **error_fields(e))
+            raise
+        self._emit(endpoint, label, start, timing, True)
+        return result
+
+    def _emit(self, endpoint, label, start, timing, ok, **fields):
+        self.events.emit(
+            'api_call', endpoint=endpoint or label, ok=ok, attempts=timing['attempts'],
+            duration_ms=round((time.perf_counter() - start) * 1000, 1),
+            request_ms=round(timing['request_ms'], 1), **fields
+        )
+
+    def _call(self, func, args, kwargs, idempotent, label, endpoint, timing):
+        attempt = 0
+        while True:
+            self._wait_for_breaker(label)
+            self._throttle(endpoint, label)
+            timing['attempts'] += 1
+            request_start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                timing['request_ms'] += (time.perf_counter() - request_start) * 1000
+                kind = classify_error(e)
+                self.breaker.record_failure(kind)
+                if kind == AUTH:
+                    raise AuthError(f"{label}: {e}") from e
+                if kind == FATAL:
+                    raise
+
+                attempt += 1
+                if attempt >= self.policy.max_attempts:
+                    raise
+                if not idempotent and not is_safe_to_resend(e):
+                    raise
+
+                delay = self.policy.delay(attempt)
+                self.log(f"  ⚠️ {label}失败: {e}，{delay:.1f} 秒后重试 ({attempt}/{self.policy.max_attempts - 1})")
+                self._sleep(delay)
+                if self._should_stop and self._should_stop():
+                    raise CircuitOpenError(f"{label}: 任务已停止")
+                continue
+
+            timing['request_ms'] += (time.perf_counter() - request_start) * 1000
+            self.breaker.record_success()
+            return result
+
+    def upload_image(self, client, image_path):
+        """上传图片（可安全重试）"""
+        return self.call(xhs_api.upload_image, client, image_path, label='上传图片', endpoint='upload')
+
+    def create_note(self, client, title, desc, image_ids, is_private=False):
+        """创建笔记（仅在请求确定未被处理时重试）"""
+        return self.call(
+            xhs_api.create_note, client, title, desc, image_ids, is_private,
+            idempotent=False, label='发布笔记', endpoint='create'
+        )
+
+    def get_self_info(self, client):
+        """获取用户信息"""
+        return self.call(client.get_self_info, label='获取用户信息', endpoint='info')
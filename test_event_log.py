@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试结构化事件日志（后台批量写入、轮转、阶段耗时和 API 调用事件）
+"""
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+from event_log import EventLogger, EventWriter
+from xhs_resilience import ApiGuard, RetryPolicy
+
+
+def read_events(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_writer_batches_and_stage_fields():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'logs' / 'events.jsonl'
+        writer = EventWriter(path)
+        events = EventLogger('engine', writer, account='测试账号')
+
+        events.emit('queue_start', notes=2, skipped=None)
+        with events.stage('upload', note_dir='note_01', images=3) as fields:
+            fields['bytes'] = 1024
+        try:
+            with events.stage('create', note_dir='note_01'):
+                raise ValueError('x' * 1000)
+        except ValueError:
+            pass
+        assert writer.flush()
+
+        start, upload, create = read_events(path)
+        assert start['event'] == 'queue_start' and start['source'] == 'engine'
+        assert start['account'] == '测试账号' and 'skipped' not in start
+        assert upload['stage'] == 'upload' and upload['ok'] and upload['bytes'] == 1024
+        assert upload['images'] == 3 and upload['duration_ms'] >= 0
+        assert not create['ok'] and create['error'] == 'ValueError'
+        assert len(create['error_msg']) == 300
+        assert writer.stats['written'] == 3
+
+        writer.close()
+        events.emit('after_close')
+        assert len(read_events(path)) == 3
+
+
+def test_rotation():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'events.jsonl'
+        writer = EventWriter(path, max_bytes=2000, backups=2)
+        events = EventLogger('render', writer)
+        for n in range(10):
+            for _ in range(20):
+                events.emit('stage', stage='render_card', card=n)
+            writer.flush()
+        writer.close()
+
+        assert writer.stats['rotated'] >= 2
+        assert (Path(tmp) / 'events.jsonl.1').exists()
+        assert (Path(tmp) / 'events.jsonl.2').exists()
+        assert not (Path(tmp) / 'events.jsonl.3').exists()
+
+
+def test_disabled_logger():
+    events = EventLogger('engine', None)
+    events.emit('queue_start')
+    with events.stage('upload') as fields:
+        fields['bytes'] = 1
+
+
+def test_api_guard_emits_api_call():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'events.jsonl'
+        writer = EventWriter(path)
+        guard = ApiGuard(policy=RetryPolicy(max_attempts=3, base_delay=0, max_delay=0),
+                         log=lambda msg: None, sleep=lambda s: None,
+                         events=EventLogger('api', writer))
+
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) < 2:
+                raise ConnectionError('reset')
+            return {'ok': True}
+
+        guard.call(flaky, label='上传图片', endpoint='upload')
+        try:
+            guard.call(lambda: (_ for _ in ()).throw(ValueError('bad request')), label='发布笔记')
+        except ValueError:
+            pass
+        writer.close()
+
+        ok_call, failed_call = read_events(path)
+        assert ok_call['event'] == 'api_call' and ok_call['endpoint'] == 'upload'
+        assert ok_call['ok'] and ok_call['attempts'] == 2
+        assert failed_call['endpoint'] == '发布笔记' and not failed_call['ok']
+        assert failed_call['error'] == 'ValueError'
+
+
+if __name__ == '__main__':
+    test_writer_batches_and_stage_fields()
+    test_rotation()
+    test_disabled_logger()
+    test_api_guard_emits_api_call()
+    print("OK All event log tests passed")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试本地模拟小红书服务与发布流程的离线联调
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+from fake_xhs_server import FakeXhsServer, FaultConfig, LocalApiClient
+from note_digest import DigestCache
+from publish_ledger import PublishLedger
+from publish_pipeline import PublishPipeline
+from publish_queue import PublishQueue
+from xhs_load_test import make_notes, run_engine
+from xhs_resilience import ApiGuard, CircuitBreaker, RetryPolicy
+
+
+def make_guard():
+    # 重试次数充足，避免随机故障导致测试不稳定
+    return ApiGuard(
+        policy=RetryPolicy(max_attempts=10, base_delay=0.01, max_delay=0.05),
+        breaker=CircuitBreaker(failure_threshold=100),
+        log=lambda msg: None,
+    )
+
+
+def run(server, tmp, count):
+    note_dirs = make_notes(Path(tmp) / 'notes', count, 3)
+    with PublishQueue(Path(tmp) / 'queue.db') as queue, \
+            DigestCache(Path(tmp) / 'digests.db') as digest_cache, \
+            PublishLedger(Path(tmp) / 'ledger.db', digest_cache=digest_cache) as ledger:
+        pipeline = PublishPipeline(
+            LocalApiClient(server.url),
+            interval_minutes=0,
+            publish_queue=queue,
+            ledger=ledger,
+            guard=make_guard(),
+            log=lambda msg: None,
+        )
+        stats = asyncio.run(pipeline.run(note_dirs))
+        jobs = {job.note_dir: job for job in queue.jobs()}
+        return stats, jobs, note_dirs
+
+
+def test_publish_without_faults():
+    with FakeXhsServer() as server, tempfile.TemporaryDirectory() as tmp:
+        stats, _, _ = run(server, tmp, 5)
+        assert stats['published'] == 5
+        assert server.snapshot()['notes'] == 5
+        assert server.snapshot()['endpoints']['upload']['requests'] == 15
+
+
+def test_retries_transient_errors():
+    """上传遇到 500/429 时重试，最终全部发布"""
+    faults = FaultConfig(error_rate=0.15, rate_limit_rate=0.05)
+    endpoint_faults = {'create': FaultConfig()}
+    with FakeXhsServer(faults=faults, endpoint_faults=endpoint_faults, seed=7) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        stats, _, _ = run(server, tmp, 5)
+        assert stats['published'] == 5
+        uploads = server.snapshot()['endpoints']['upload']
+        permits = server.snapshot()['endpoints']['permit']
+        assert uploads['requests'] + permits['requests'] > 30
+        assert uploads['error'] + uploads['rate_limit'] + permits['error'] + permits['rate_limit'] > 0
+        assert not server.duplicates()
+
+
+def test_lost_response_is_not_republished():
+    """创建成功但响应丢失时不重发，任务标记为需人工确认"""
+    endpoint_faults = {'create': FaultConfig(drop_rate=1.0)}
+    with FakeXhsServer(endpoint_faults=endpoint_faults) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        stats, jobs, note_dirs = run(server, tmp, 2)
+        assert stats['published'] == 0
+        assert server.snapshot()['notes'] == 2
+        assert server.snapshot()['endpoints']['create']['requests'] == 2
+        assert all(job.needs_manual_check for job in jobs.values())
+
+
+def test_engine_mode():
+    """发布引擎（GUI V3 / publish_service 的调用链）对接模拟服务：上传重试后全部发布"""
+    faults = FaultConfig(error_rate=0.15)
+    endpoint_faults = {'create': FaultConfig()}
+    with FakeXhsServer(faults=faults, endpoint_faults=endpoint_faults, seed=11) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        note_dirs = make_notes(Path(tmp) / 'notes', 4, 3)
+        published, failed = run_engine(LocalApiClient(server.url), note_dirs, tmp, lambda msg: None)
+        assert (published, failed) == (4, 0)
+        assert server.snapshot()['notes'] == 4
+        assert not server.duplicates()
+
+
+if __name__ == '__main__':
+    test_publish_without_faults()
+    test_retries_transient_errors()
+    test_lost_response_is_not_republished()
+    test_engine_mode()
+    print("OK All fake server tests passed")
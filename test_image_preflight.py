@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试上传前图片预检（文件头解析、超限检测、规范化缓存）
+"""
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+import image_preflight
+from image_preflight import ImagePreflight, read_image_info
+from note_digest import DigestCache
+from xhs_load_test import PNG_BYTES
+
+
+def png_header(width, height):
+    """只有文件头的 PNG（足够预检读取尺寸）"""
+    return b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' + struct.pack('>II', width, height) + b'\x08\x06\x00\x00\x00'
+
+
+def jpeg_header(width, height):
+    """SOI + APP0 + SOF0"""
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9
+    sof0 = b'\xff\xc0' + struct.pack('>HBHHB', 11, 8, height, width, 3) + b'\x00' * 3
+    return b'\xff\xd8' + app0 + sof0
+
+
+def test_read_image_info():
+    with tempfile.TemporaryDirectory() as tmp:
+        png = Path(tmp) / 'a.png'
+        png.write_bytes(png_header(1080, 1440))
+        info = read_image_info(png)
+        assert (info.format, info.width, info.height) == ('png', 1080, 1440)
+
+        # 扩展名与内容不符时按文件头识别
+        jpeg = Path(tmp) / 'b.png'
+        jpeg.write_bytes(jpeg_header(3000, 4000))
+        info = read_image_info(jpeg)
+        assert (info.format, info.width, info.height) == ('jpeg', 3000, 4000)
+
+        broken = Path(tmp) / 'c.png'
+        broken.write_bytes(b'not an image')
+        assert read_image_info(broken).error
+        assert read_image_info(Path(tmp) / 'missing.png').error
+
+
+def test_preflight_without_pillow():
+    """未安装 Pillow：合格图片直接通过，超限图片按原图上传，无法识别的图片剔除"""
+    saved = image_preflight.Image
+    image_preflight.Image = None
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            ok = Path(tmp) / 'ok.png'
+            ok.write_bytes(PNG_BYTES)
+            big = Path(tmp) / 'big.png'
+            big.write_bytes(png_header(8000, 8000))
+            bad = Path(tmp) / 'bad.png'
+            bad.write_bytes(b'garbage')
+
+            preflight = ImagePreflight(cache_dir=Path(tmp) / 'cache')
+            images, messages = preflight.run([ok, bad, big])
+            assert images == [str(ok), str(big)]
+            assert len(messages) == 2
+            assert preflight.stats['rejected'] == 1
+    finally:
+        image_preflight.Image = saved
+
+
+def test_normalize_cached():
+    """超限图片缩放后写入缓存，再次预检直接使用缓存"""
+    if image_preflight.Image is None:
+        print("SKIP Pillow not installed")
+        return
+    Image = image_preflight.Image
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / 'card_1.png'
+        Image.new('RGB', (1200, 600), (200, 100, 50)).save(src)
+
+        with DigestCache(Path(tmp) / 'digests.db') as cache:
+            preflight = ImagePreflight(max_side=800, cache_dir=Path(tmp) / 'cache', digest_cache=cache)
+            images, messages = preflight.run([src])
+            assert len(images) == 1 and images[0] != str(src) and messages
+            with Image.open(images[0]) as out:
+                assert out.size == (800, 400)
+
+            again, _ = preflight.run([src])
+            assert again == images
+            assert preflight.stats['normalized'] == 1 and preflight.stats['cached'] == 1
+
+
+def test_command_line():
+    """命令行检查（Pillow 未安装时也能输出统计）"""
+    with tempfile.TemporaryDirectory() as tmp:
+        ok = Path(tmp) / 'ok.png'
+        ok.write_bytes(PNG_BYTES)
+        result = subprocess.run(
+            [sys.executable, str(Path(__file__).parent / 'scripts' / 'image_preflight.py'),
+             str(ok), str(Path(tmp) / 'missing.png')],
+            capture_output=True, text=True, encoding='utf-8', timeout=60
+        )
+        assert result.returncode == 0, result.stderr
+        assert "'checked': 2" in result.stdout
+
+
+if __name__ == '__main__':
+    test_read_image_info()
+    test_preflight_without_pillow()
+    test_normalize_cached()
+    test_command_line()
+    print("OK All image preflight tests passed")
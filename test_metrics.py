@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试发布/渲染吞吐指标（事件汇总、Prometheus 文本格式、textfile 和 /metrics）
+"""
+import json
+import os
+import sys
+import tempfile
+import urllib.request
+from pathlib import Path
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+import event_log
+from event_log import EventLogger
+from metrics import MetricsRegistry, MetricsServer, registry_from_events
+
+
+def test_events_to_metrics():
+    registry = MetricsRegistry(proc='test')
+    event_log.add_listener(registry.observe_event)
+    try:
+        # 事件日志关闭（writer 为 None）时仍然计入指标
+        events = EventLogger('engine', None)
+        events.emit('note', status='published', duration_ms=1500)
+        events.emit('note', status='failed', error='XhsApiError')
+        events.emit('api_call', endpoint='upload', ok=True, duration_ms=80)
+        events.emit('api_call', endpoint='upload', ok=True, duration_ms=400000)
+        with events.stage('upload', bytes=2048):
+            pass
+        render = EventLogger('render', None)
+        for card in range(3):
+            with render.stage('render_card', card=card):
+                pass
+    finally:
+        event_log.remove_listener(registry.observe_event)
+
+    assert registry.notes.value(source='engine', status='published') == 1
+    assert registry.notes.value(source='engine', status='failed') == 1
+    assert registry.note_duration.count(source='engine') == 1
+    assert registry.render_cards.value() == 3
+    assert registry.stage_bytes.value(source='engine', stage='upload') == 2048
+
+    text = registry.render()
+    assert '# TYPE xhs_api_call_duration_seconds histogram' in text
+    assert 'xhs_api_call_duration_seconds_bucket{endpoint="upload",le="0.1",proc="test"} 1' in text
+    assert 'xhs_api_call_duration_seconds_bucket{endpoint="upload",le="300",proc="test"} 1' in text
+    assert 'xhs_api_call_duration_seconds_bucket{endpoint="upload",le="+Inf",proc="test"} 2' in text
+    assert 'xhs_render_cards_total{proc="test"} 3' in text
+
+
+def test_textfile_and_endpoint():
+    with tempfile.TemporaryDirectory() as tmp:
+        events_file = Path(tmp) / 'events.jsonl'
+        lines = [{'event': 'note', 'source': 'helper', 'status': 'published', 'duration_ms': 900},
+                 {'event': 'stage', 'source': 'render', 'stage': 'render', 'ok': False,
+                  'duration_ms': 10, 'error': 'TimeoutError'}]
+        events_file.write_text('\n'.join(json.dumps(e) for e in lines) + '\nnot json\n', encoding='utf-8')
+
+        registry = registry_from_events(events_file)
+        assert registry.stage_failures.value(source='render', stage='render') == 1
+
+        out = Path(tmp) / 'textfile' / 'xhs.prom'
+        registry.write_textfile(out)
+        text = out.read_text(encoding='utf-8')
+        assert 'xhs_notes_total{source="helper",status="published",proc="events"} 1' in text
+        assert [p.name for p in out.parent.iterdir()] == ['xhs.prom']
+
+        server = MetricsServer(registry)
+        url = server.start()
+        try:
+            with urllib.request.urlopen(url) as resp:
+                assert resp.headers['Content-Type'].startswith('text/plain')
+                assert resp.read().decode('utf-8') == text
+        finally:
+            server.stop()
+
+
+if __name__ == '__main__':
+    test_events_to_metrics()
+    test_textfile_and_endpoint()
+    print("OK All metrics tests passed")
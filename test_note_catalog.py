@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试笔记信息目录（单次扫描读取、并发加载、按 mtime 缓存）
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+from note_catalog import NoteCatalog, load_note
+
+
+def make_note(note_dir, cards=2, metadata=None):
+    note_dir.mkdir(parents=True)
+    (note_dir / 'cover.png').write_bytes(b'cover')
+    for i in range(1, cards + 1):
+        (note_dir / f'card_{i}.png').write_bytes(f'card {i}'.encode())
+    if metadata is not None:
+        (note_dir / 'metadata.json').write_text(json.dumps(metadata, ensure_ascii=False), encoding='utf-8')
+    return note_dir
+
+
+def touch_later(path):
+    """确保修改时间变化（部分文件系统 mtime 精度较低）"""
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000))
+
+
+def test_load_note():
+    """封面 + 连续卡片（最多9张），标题和正文的回退顺序与发布脚本一致"""
+    with tempfile.TemporaryDirectory() as tmp:
+        note = make_note(Path(tmp) / 'note', cards=12, metadata={'title': '标题', 'subtitle': '副标题'})
+        (note / 'card_14.png').write_bytes(b'gap')
+        info = load_note(note)
+        assert info.images[0] == str(note / 'cover.png')
+        assert info.images[1:] == [str(note / f'card_{i}.png') for i in range(1, 9)]
+        assert info.card_count == 12
+        assert info.title == '标题' and info.desc == '标题\n副标题'
+        assert not info.published
+
+        md_note = make_note(Path(tmp) / 'md_note', cards=1)
+        (md_note / 'note.md').write_text('前言\n# Markdown 标题\n', encoding='utf-8')
+        assert load_note(md_note).title == 'Markdown 标题'
+        assert load_note(make_note(Path(tmp) / 'bare', cards=0)).title == 'bare'
+
+        (md_note / 'publish_record.json').write_text('{"note_id_xhs": "x"}', encoding='utf-8')
+        assert load_note(md_note).published
+
+
+def test_catalog_cache():
+    """目录未变化时命中缓存；metadata.json 原地改写、新增卡片后重新读取"""
+    with tempfile.TemporaryDirectory() as tmp:
+        notes = [make_note(Path(tmp) / f'note_{i:02d}', metadata={'title': f'笔记 {i}'}) for i in range(20)]
+        catalog = NoteCatalog(max_workers=4)
+
+        infos = catalog.load([str(note) for note in notes] + [str(Path(tmp) / 'missing')])
+        assert [info.title for info in infos] == [f'笔记 {i}' for i in range(20)]
+        assert catalog.stats == {'hits': 0, 'loads': 20}
+
+        catalog.load(notes)
+        assert catalog.stats == {'hits': 20, 'loads': 20}
+
+        meta = notes[0] / 'metadata.json'
+        meta.write_text('{"title": "新标题"}', encoding='utf-8')
+        touch_later(meta)
+        assert catalog.get(notes[0]).title == '新标题'
+
+        time.sleep(0.01)
+        (notes[1] / 'card_3.png').write_bytes(b'card 3')
+        touch_later(notes[1])
+        assert catalog.get(notes[1]).image_count == 4
+        assert catalog.stats['loads'] == 22
+
+
+if __name__ == '__main__':
+    test_load_note()
+    test_catalog_cache()
+    print("OK All note catalog tests passed")
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试发布前重复内容检测
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+import note_dedup
+from note_dedup import find_duplicates, near_pairs
+from note_digest import DigestCache
+from publish_ledger import PublishLedger
+
+
+def brute_force(hashes, threshold):
+    return {
+        (i, j)
+        for i in range(len(hashes))
+        for j in range(i + 1, len(hashes))
+        if bin(hashes[i] ^ hashes[j]).count('1') <= threshold
+    }
+
+
+def test_near_pairs_matches_brute_force():
+    """分桶结果与两两比较一致（含完全相同的哈希）"""
+    rng = random.Random(3)
+    hashes = [rng.getrandbits(64) for _ in range(300)]
+    for i in range(0, 300, 10):
+        flipped = hashes[i]
+        for bit in rng.sample(range(64), rng.randint(0, 6)):
+            flipped ^= 1 << bit
+        hashes.append(flipped)
+    hashes.append(hashes[0])
+
+    for threshold in (0, 2, 4, 8):
+        expected = brute_force(hashes, threshold)
+        assert near_pairs(hashes, threshold) == expected
+        assert note_dedup._pairs_python(hashes, threshold, note_dedup.COMMON_IMAGE_LIMIT) == expected
+
+
+def test_common_images_ignored():
+    """大量笔记共用的模板图不参与配对"""
+    hashes = [12345] * 5 + [1, 2]
+    assert near_pairs(hashes, 0, max_group=4) == set()
+    assert len(near_pairs(hashes, 0, max_group=5)) == 10
+
+
+def make_note(note_dir, cover=b'cover', title='标题'):
+    note_dir.mkdir(parents=True)
+    (note_dir / 'cover.png').write_bytes(cover)
+    (note_dir / 'card_1.png').write_bytes(b'card')
+    (note_dir / 'metadata.json').write_text(f'{{"title": "{title}"}}', encoding='utf-8')
+    return str(note_dir)
+
+
+def test_exact_duplicates():
+    """复制后未修改的笔记被标记，保留排序靠前的一个"""
+    with tempfile.TemporaryDirectory() as tmp:
+        with DigestCache(Path(tmp) / 'digests.db') as cache:
+            original = make_note(Path(tmp) / 'a_note')
+            copy = str(Path(tmp) / 'b_copy')
+            shutil.copytree(original, copy)
+            other = make_note(Path(tmp) / 'c_other', title='另一篇')
+
+            report = find_duplicates([copy, other, original], digest_cache=cache)
+            assert report.exact == [[original, copy]]
+            assert report.is_duplicate(copy)
+            assert not report.is_duplicate(original)
+            assert not report.is_duplicate(other)
+
+
+def test_near_duplicate_of_published():
+    """与已发布笔记的图片相似时标记候选笔记（需要 Pillow）"""
+    if note_dedup.Image is None:
+        return
+    Image = note_dedup.Image
+    with tempfile.TemporaryDirectory() as tmp:
+        def save(note_dir, shade):
+            note_dir.mkdir(parents=True)
+            for name in ('cover.png', 'card_1.png'):
+                img = Image.linear_gradient('L').resize((64, 64))
+                img.point(lambda v: min(255, v + shade)).save(note_dir / name)
+            return str(note_dir)
+
+        published = save(Path(tmp) / 'published', 0)
+        candidate = save(Path(tmp) / 'candidate', 3)
+        with DigestCache(Path(tmp) / 'digests.db') as cache, \
+                PublishLedger(Path(tmp) / 'ledger.db') as ledger:
+            ledger.add({'hash': cache.note_digest(published), 'note_dir': published})
+            report = find_duplicates([candidate], ledger=ledger, digest_cache=cache)
+            assert report.is_duplicate(candidate)
+            assert report.near[0]['other'] == published and report.near[0]['published']
+
+
+def test_published_outside_roots_ignored():
+    """只与扫描目录下的已发布笔记比较（需要 Pillow）"""
+    if note_dedup.Image is None:
+        return
+    Image = note_dedup.Image
+    with tempfile.TemporaryDirectory() as tmp:
+        def save(note_dir, shade):
+            note_dir.mkdir(parents=True)
+            for name in ('cover.png', 'card_1.png'):
+                img = Image.linear_gradient('L').resize((64, 64))
+                img.point(lambda v: min(255, v + shade)).save(note_dir / name)
+            return str(note_dir)
+
+        published = save(Path(tmp) / 'archive' / 'published', 0)
+        candidate = save(Path(tmp) / 'notes' / 'candidate', 3)
+        with DigestCache(Path(tmp) / 'digests.db') as cache, \
+                PublishLedger(Path(tmp) / 'ledger.db') as ledger:
+            ledger.add({'hash': cache.note_digest(published), 'note_dir': published})
+            report = find_duplicates([candidate], ledger=ledger, digest_cache=cache,
+                                     roots=[str(Path(tmp) / 'notes')])
+            assert not report.is_duplicate(candidate)
+            report = find_duplicates([candidate], ledger=ledger, digest_cache=cache, roots=[tmp])
+            assert report.is_duplicate(candidate)
+
+
+if __name__ == '__main__':
+    test_near_pairs_matches_brute_force()
+    test_common_images_ignored()
+    test_exact_duplicates()
+    test_near_duplicate_of_published()
+    test_published_outside_roots_ignored()
+    print("OK All note dedup tests passed")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试基于内容的笔记标识与摘要缓存
+"""
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+import note_digest
+from note_digest import DigestCache
+from publish_ledger import PublishLedger, legacy_note_hash
+
+
+def make_note(note_dir, cards=2):
+    note_dir.mkdir(parents=True)
+    (note_dir / 'cover.png').write_bytes(b'cover')
+    for i in range(1, cards + 1):
+        (note_dir / f'card_{i}.png').write_bytes(f'card {i}'.encode())
+    (note_dir / 'metadata.json').write_text('{"title": "标题"}', encoding='utf-8')
+    return note_dir
+
+
+def test_identity_follows_content():
+    """移动、复制后标识不变；修改卡片或元数据后标识改变"""
+    with tempfile.TemporaryDirectory() as tmp:
+        with DigestCache(Path(tmp) / 'digests.db') as cache:
+            note = make_note(Path(tmp) / 'a' / 'note')
+            digest = cache.note_digest(note)
+
+            copied = Path(tmp) / 'copy'
+            shutil.copytree(note, copied)
+            assert cache.note_digest(copied) == digest
+
+            moved = Path(tmp) / 'b' / 'note'
+            moved.parent.mkdir()
+            note.rename(moved)
+            assert cache.note_digest(moved) == digest
+
+            (moved / 'card_2.png').write_bytes(b'edited card')
+            assert cache.note_digest(moved) != digest
+
+            (copied / 'metadata.json').write_text('{"title": "新标题"}', encoding='utf-8')
+            assert cache.note_digest(copied) != digest
+
+            # 空文件夹按路径区分，不会互相冲突
+            empty_a, empty_b = Path(tmp) / 'empty_a', Path(tmp) / 'empty_b'
+            empty_a.mkdir()
+            empty_b.mkdir()
+            assert cache.note_digest(empty_a) != cache.note_digest(empty_b)
+
+
+def test_cache_hits_after_restart():
+    """未变化的文件只 stat 不读取，缓存跨实例持久化"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = Path(tmp) / 'digests.db'
+        notes = [make_note(Path(tmp) / f'note_{i}', cards=3) for i in range(5)]
+        with DigestCache(db_file) as cache:
+            first = [cache.note_digest(note) for note in notes]
+            assert cache.stats == {'hits': 0, 'misses': 25}
+
+        with DigestCache(db_file) as cache:
+            assert [cache.note_digest(note) for note in notes] == first
+            assert cache.stats == {'hits': 25, 'misses': 0}
+
+            (notes[0] / 'card_3.png').write_bytes(b'changed size')
+            cache.note_digest(notes[0])
+            assert cache.stats['misses'] == 1
+            assert cache.prune() == 1
+
+
+def test_ledger_upgrades_legacy_records():
+    """旧版标识（路径 + 封面时间）的记录仍被识别，并改写为内容标识"""
+    with tempfile.TemporaryDirectory() as tmp:
+        note_digest._default_cache = DigestCache(Path(tmp) / 'digests.db')
+        try:
+            note = make_note(Path(tmp) / 'note')
+            with PublishLedger(Path(tmp) / 'ledger.db') as ledger:
+                ledger.add({'hash': legacy_note_hash(note), 'note_dir': str(note), 'title': '旧记录'})
+                assert ledger.find_note(note)['title'] == '旧记录'
+
+                moved = Path(tmp) / 'moved'
+                note.rename(moved)
+                assert ledger.find_note(moved)['title'] == '旧记录'
+                assert ledger.count() == 1
+
+                (moved / 'cover.png').write_bytes(b'new cover')
+                assert ledger.find_note(moved) is None
+        finally:
+            note_digest._default_cache.close()
+            note_digest._default_cache = None
+
+
+if __name__ == '__main__':
+    test_identity_follows_content()
+    test_cache_hits_after_restart()
+    test_ledger_upgrades_legacy_records()
+    print("OK All note digest tests passed")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试共享笔记扫描模块（递归检测 + 目录索引缓存）
+"""
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+from note_scanner import NoteScanner
+
+
+def make_note(note_dir, cards=3):
+    """创建一个包含封面和卡片的测试笔记"""
+    note_dir.mkdir(parents=True, exist_ok=True)
+    (note_dir / 'cover.png').write_bytes(b'png')
+    for i in range(1, cards + 1):
+        (note_dir / f'card_{i}.png').write_bytes(b'png')
+
+
+def test_recursive_scan_and_cache():
+    """递归发现笔记，跳过非笔记文件夹，第二次扫描命中索引"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / 'notes'
+        make_note(root / 'batch_1' / 'note_01', cards=2)
+        make_note(root / 'batch_2' / 'group_a' / 'note_02', cards=11)
+        make_note(root / 'node_modules' / 'note_x')
+        make_note(root / '.hidden' / 'note_y')
+
+        index_file = Path(tmp) / 'index.json'
+        scanner = NoteScanner(index_file=index_file, max_workers=4)
+        notes = scanner.scan(root)
+
+        rel_paths = [os.path.relpath(n.path, root) for n in notes]
+        assert rel_paths == [
+            os.path.join('batch_1', 'note_01'),
+            os.path.join('batch_2', 'group_a', 'note_02'),
+        ]
+        assert notes[1].card_files[-1] == 'card_11.png'
+        assert notes[1].image_count == 9
+        assert index_file.exists()
+
+        # 新扫描器加载持久化索引，目录未变化时不再读取目录内容
+        scanner = NoteScanner(index_file=index_file)
+        assert len(scanner.scan(root)) == 2
+        assert scanner.stats['scanned'] == 0
+        assert scanner.stats['cached'] == scanner.stats['dirs']
+
+        # 新增笔记后只重新读取发生变化的目录
+        make_note(root / 'batch_1' / 'note_03')
+        notes = scanner.scan(root)
+        assert len(notes) == 3
+        assert scanner.stats['scanned'] == 2
+
+
+def test_streaming_and_cancel():
+    """发现笔记时回调；取消后返回部分结果且不清理索引"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / 'notes'
+        for i in range(1, 4):
+            make_note(root / f'note_{i:02d}')
+
+        index_file = Path(tmp) / 'index.json'
+        found = []
+        scanner = NoteScanner(index_file=index_file)
+        scanner.scan(root, on_note=found.append)
+        assert len(found) == 3
+
+        cancel_event = threading.Event()
+        cancel_event.set()
+        notes = scanner.scan(root, cancel_event=cancel_event)
+        assert notes == []
+        assert scanner.stats['cancelled']
+
+        # 取消的扫描不会把未访问的目录从索引中删除
+        scanner = NoteScanner(index_file=index_file)
+        scanner.scan(root)
+        assert scanner.stats['scanned'] == 0
+
+
+if __name__ == '__main__':
+    test_recursive_scan_and_cache()
+    test_streaming_and_cancel()
+    print("OK All scanner tests passed")
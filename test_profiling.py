@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试可选性能分析（cProfile、线程调用栈采样、内存增长跟踪）
+"""
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+from profiling import ENV_VAR, Profiler, profiled
+
+
+def busy_render(seconds=0.2):
+    end = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < end:
+        n += sum(i * i for i in range(200))
+    return n
+
+
+def test_profile_outputs():
+    with tempfile.TemporaryDirectory() as tmp:
+        out_dir = Path(tmp) / 'profiles'
+        with profiled('render_test', out_dir) as profiler:
+            worker = threading.Thread(target=busy_render, name='upload-worker')
+            worker.start()
+            busy_render()
+            worker.join()
+
+        pstats_file, = out_dir.glob('render_test-*.pstats')
+        collapsed_file, = out_dir.glob('render_test-*.collapsed')
+        stats = pstats.Stats(str(pstats_file))
+        assert any(func[2] == 'busy_render' for func in stats.stats)
+
+        lines = collapsed_file.read_text(encoding='utf-8').splitlines()
+        assert profiler.sampler.samples > 0
+        assert any(line.startswith('upload-worker;') and 'busy_render' in line for line in lines)
+        assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+        assert not list(out_dir.glob('*-memory.txt'))
+
+
+def test_memory_tracking():
+    with tempfile.TemporaryDirectory() as tmp:
+        profiler = Profiler(tmp, 'gui_test', memory=True, memory_interval=0.05)
+        profiler.start()
+        retained = [bytearray(1024) for _ in range(2000)]
+        busy_render(0.15)
+        outputs = profiler.stop()
+
+        report = Path(profiler.memory.report_path).read_text(encoding='utf-8')
+        assert report.count('== ') >= 2 and 'test_profiling.py' in report
+        snapshot = tracemalloc.Snapshot.load(str(outputs[-1]))
+        assert snapshot.statistics('filename')
+        assert not tracemalloc.is_tracing()
+        del retained
+
+
+def test_disabled_by_default():
+    saved = os.environ.pop(ENV_VAR, None)
+    try:
+        with profiled('render_test') as profiler:
+            busy_render(0.01)
+        assert profiler is None
+    finally:
+        if saved is not None:
+            os.environ[ENV_VAR] = saved
+
+
+if __name__ == '__main__':
+    test_profile_outputs()
+    test_memory_tracking()
+    test_disabled_by_default()
+    print("OK All profiling tests passed")
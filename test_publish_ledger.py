@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试 SQLite 发布台账
+"""
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+from note_digest import DigestCache
+from publish_ledger import PublishLedger, legacy_note_hash, note_hash
+from xhs_load_test import make_notes
+
+
+def test_add_and_lookup():
+    """写入后按哈希、路径、笔记ID 查询"""
+    with tempfile.TemporaryDirectory() as tmp:
+        with PublishLedger(Path(tmp) / 'ledger.db') as ledger:
+            note_dir = str(Path(tmp, 'note_01').absolute())
+            ledger.add({
+                'hash': 'abc',
+                'note_dir': note_dir,
+                'note_name': 'note_01',
+                'title': '标题',
+                'note_id_xhs': 'xhs123',
+                'link': 'https://www.xiaohongshu.com/explore/xhs123',
+                'published_at': '2026-01-27T10:00:00',
+            })
+
+            assert ledger.contains('abc')
+            assert not ledger.contains('missing')
+            assert ledger.get('abc')['title'] == '标题'
+            assert ledger.find_by_path(note_dir)['hash'] == 'abc'
+            assert ledger.find_by_note_id('xhs123')['note_name'] == 'note_01'
+            assert ledger.count() == 1
+            assert ledger.count_since('2026-01-27') == 1
+            assert ledger.count_since('2026-01-28') == 0
+
+
+def test_import_legacy_json():
+    """导入两种旧版 JSON 格式"""
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = Path(tmp) / 'publish_records.json'
+        legacy.write_text(json.dumps({
+            'h1': {'hash': 'h1', 'title': 'GUI 记录', 'note_id_xhs': 'n1',
+                   'published_at': '2026-01-27T10:00:00'},
+            'note_02': {'note_id': 'n2', 'title': '脚本记录',
+                        'url': 'https://www.xiaohongshu.com/explore/n2',
+                        'published_at': '2026-01-27T11:00:00'},
+        }, ensure_ascii=False), encoding='utf-8')
+
+        with PublishLedger(Path(tmp) / 'ledger.db') as ledger:
+            assert ledger.migrate_legacy(legacy) == 2
+            # 已有记录时不再重复导入
+            assert ledger.migrate_legacy(legacy) == 0
+
+            record = ledger.get('note_02')
+            assert record['note_id_xhs'] == 'n2'
+            assert record['link'].endswith('/n2')
+            assert [r['hash'] for r in ledger.all_records()] == ['note_02', 'h1']
+
+
+def test_query_filters_and_paging():
+    """按标题、账号、日期筛选，按列排序分页"""
+    with tempfile.TemporaryDirectory() as tmp:
+        with PublishLedger(Path(tmp) / 'ledger.db') as ledger:
+            for n in range(25):
+                ledger.add({
+                    'hash': f'h{n:02d}',
+                    'note_name': f'note_{n:02d}',
+                    'title': f'科目{"一二"[n % 2]}_{n:02d}' + ('%' if n == 7 else ''),
+                    'account': 'A' if n < 10 else 'B',
+                    'published_at': f'2026-01-{n + 1:02d}T10:00:00',
+                })
+
+            page = ledger.query(limit=10, offset=10)
+            assert [r['hash'] for r in page][:2] == ['h14', 'h13']
+            assert ledger.query(order_by='title', descending=False, limit=1)[0]['hash'] == 'h00'
+            assert ledger.count_matching(search='科目一') == 13
+            # % 按字面匹配
+            assert [r['hash'] for r in ledger.query(search='%')] == ['h07']
+            assert ledger.count_matching(account='A') == 10
+            assert ledger.count_matching(account='B', since='2026-01-20', until='2026-01-22') == 2
+            assert ledger.accounts() == ['A', 'B']
+            try:
+                ledger.query(order_by='title; DROP TABLE records')
+                assert False, 'expected ValueError'
+            except ValueError:
+                pass
+
+
+def test_adds_account_column_to_old_ledger():
+    """旧版台账（没有 account 列）打开时自动补齐"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = Path(tmp) / 'ledger.db'
+        conn = sqlite3.connect(str(db_file))
+        conn.execute('CREATE TABLE records (hash TEXT PRIMARY KEY, note_dir TEXT, note_name TEXT, '
+                     'title TEXT, note_id_xhs TEXT, link TEXT, published_at TEXT, extra TEXT)')
+        conn.execute("INSERT INTO records (hash, title, published_at) VALUES ('old', '旧记录', '2026-01-01')")
+        conn.commit()
+        conn.close()
+
+        with PublishLedger(db_file) as ledger:
+            assert ledger.get('old')['account'] is None
+            ledger.add({'hash': 'new', 'title': '新记录', 'account': 'A'})
+            assert ledger.query(account='A')[0]['hash'] == 'new'
+
+
+def test_find_note_reads_without_write_lock():
+    """未发布笔记的查询不写台账（其它进程持有写锁时也能查询）；旧版标识命中时升级"""
+    with tempfile.TemporaryDirectory() as tmp:
+        fresh, old = make_notes(Path(tmp) / 'notes', 2, 1)
+        db_file = Path(tmp) / 'ledger.db'
+        with DigestCache(Path(tmp) / 'digests.db') as cache, \
+                PublishLedger(db_file, digest_cache=cache) as ledger:
+            ledger.add({'hash': legacy_note_hash(old), 'title': '旧记录'})
+            ledger._conn.execute('PRAGMA busy_timeout = 100')
+
+            writer = sqlite3.connect(str(db_file))
+            writer.execute('BEGIN IMMEDIATE')
+            try:
+                assert ledger.find_note(fresh) is None
+            finally:
+                writer.rollback()
+                writer.close()
+
+            assert ledger.find_note(old)['title'] == '旧记录'
+            assert ledger.contains(note_hash(old, cache))
+
+
+if __name__ == '__main__':
+    test_add_and_lookup()
+    test_import_legacy_json()
+    test_query_filters_and_paging()
+    test_adds_account_column_to_old_ledger()
+    test_find_note_reads_without_write_lock()
+    print("OK All ledger tests passed")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试 渲染 → 上传 → 发布 流水线（使用假客户端，不访问网络）
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+from note_digest import DigestCache
+from publish_ledger import PublishLedger, note_hash
+from publish_pipeline import PublishPipeline
+from publish_queue import PublishQueue
+from xhs_load_test import PNG_BYTES
+
+
+class FakeClient:
+    """记录调用顺序的假客户端"""
+
+    def __init__(self, fail_titles=()):
+        self.calls = []
+        self.fail_titles = set(fail_titles)
+
+    def upload_image_file(self, data):
+        self.calls.append(('upload', data))
+        return {'success': True, 'data': {'image_id': f'img_{len(self.calls)}'}}
+
+    def create_image_note(self, title, desc, image_ids, is_private=False):
+        self.calls.append(('create', title))
+        if title in self.fail_titles:
+            return {'success': False, 'msg': 'rejected'}
+        return {'success': True, 'data': {'note_id': f'xhs_{title}'}}
+
+
+def make_note(root, name, cards=2):
+    note_dir = Path(root) / name
+    note_dir.mkdir()
+    # 合法 PNG 后附加名字，每张图片内容不同
+    (note_dir / 'cover.png').write_bytes(PNG_BYTES + name.encode())
+    for i in range(1, cards + 1):
+        (note_dir / f'card_{i}.png').write_bytes(PNG_BYTES + f'{name}_{i}'.encode())
+    (note_dir / 'metadata.json').write_text(
+        '{"title": "%s", "subtitle": "sub"}' % name, encoding='utf-8'
+    )
+    return note_dir
+
+
+def run_pipeline(tmp, client, sources, account=None):
+    with PublishQueue(Path(tmp) / 'queue.db') as queue, \
+            DigestCache(Path(tmp) / 'digests.db') as digest_cache, \
+            PublishLedger(Path(tmp) / 'ledger.db', digest_cache=digest_cache) as ledger:
+        pipeline = PublishPipeline(
+            client, interval_minutes=0, publish_queue=queue, ledger=ledger, log=lambda msg: None,
+            account=account
+        )
+        stats = asyncio.run(pipeline.run(sources))
+        return stats, ledger.count()
+
+
+def test_publish_in_order():
+    """按顺序发布全部笔记，记录写入台账"""
+    with tempfile.TemporaryDirectory() as tmp:
+        notes_dir = Path(tmp) / 'notes'
+        notes_dir.mkdir()
+        sources = [make_note(notes_dir, f'note_{i:02d}') for i in range(1, 4)]
+
+        client = FakeClient()
+        stats, records = run_pipeline(tmp, client, sources)
+
+        assert stats['published'] == 3
+        assert records == 3
+        creates = [call[1] for call in client.calls if call[0] == 'create']
+        assert creates == ['note_01', 'note_02', 'note_03']
+        assert len([call for call in client.calls if call[0] == 'upload']) == 9
+
+
+def test_resume_skips_published_and_reuses_uploads():
+    """再次运行时跳过已发布笔记；发布失败的笔记重用已上传的图片"""
+    with tempfile.TemporaryDirectory() as tmp:
+        notes_dir = Path(tmp) / 'notes'
+        notes_dir.mkdir()
+        sources = [make_note(notes_dir, 'note_01'), make_note(notes_dir, 'note_02')]
+
+        stats, _ = run_pipeline(tmp, FakeClient(fail_titles={'note_02'}), sources)
+        assert stats['published'] == 1
+        assert stats['failed'] == 1
+
+        client = FakeClient()
+        stats, records = run_pipeline(tmp, client, sources)
+        assert stats['skipped'] == 1
+        assert stats['published'] == 1
+        assert records == 2
+        assert client.calls == [('create', 'note_02')]
+
+
+def test_skips_notes_published_by_other_tools():
+    """GUI / 发布引擎已发布的笔记（台账中按路径或内容标识匹配）不再重复发布"""
+    with tempfile.TemporaryDirectory() as tmp:
+        notes_dir = Path(tmp) / 'notes'
+        notes_dir.mkdir()
+        by_path = make_note(notes_dir, 'note_01')
+        moved = make_note(notes_dir, 'note_02')
+        fresh = make_note(notes_dir, 'note_03')
+        with DigestCache(Path(tmp) / 'digests.db') as digest_cache, \
+                PublishLedger(Path(tmp) / 'ledger.db') as ledger:
+            ledger.add({'hash': 'gui_hash', 'note_dir': str(by_path.absolute()),
+                        'title': 'note_01', 'note_id_xhs': 'xhs_gui'})
+            # 发布后被移动过的目录：路径不同，内容标识相同
+            ledger.add({'hash': note_hash(str(moved), digest_cache), 'note_dir': '/old/place/note_02',
+                        'title': 'note_02', 'note_id_xhs': 'xhs_engine'})
+
+        client = FakeClient()
+        stats, records = run_pipeline(tmp, client, [by_path, moved, fresh], account='测试账号')
+        assert stats['skipped'] == 2 and stats['published'] == 1
+        assert client.calls[-1] == ('create', 'note_03')
+        assert len(client.calls) == 4
+        assert records == 3
+
+        with PublishQueue(Path(tmp) / 'queue.db') as queue:
+            assert queue.get(moved).state == 'verified'
+            assert queue.get(by_path).note_id_xhs == 'xhs_gui'
+        with PublishLedger(Path(tmp) / 'ledger.db') as ledger:
+            assert ledger.find_by_path(str(fresh.absolute()))['account'] == '测试账号'
+
+
+if __name__ == '__main__':
+    test_publish_in_order()
+    test_resume_skips_published_and_reuses_uploads()
+    test_skips_notes_published_by_other_tools()
+    print("OK All pipeline tests passed")
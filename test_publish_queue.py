@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试持久化发布队列的状态机与断点续传
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+from publish_queue import PublishQueue, InvalidTransition
+
+
+def test_state_machine():
+    """按顺序推进状态，非法跳转被拒绝"""
+    with tempfile.TemporaryDirectory() as tmp:
+        note_dir = Path(tmp) / 'note_01'
+        with PublishQueue(Path(tmp) / 'queue.db') as queue:
+            job = queue.enqueue(note_dir, title='标题')
+            assert job.state == 'pending'
+
+            try:
+                queue.mark_created(note_dir, 'xhs1')
+                assert False, "pending -> created should be rejected"
+            except InvalidTransition:
+                pass
+
+            queue.mark_rendered(note_dir)
+            job = queue.mark_uploaded(note_dir, ['img1', 'img2'])
+            assert job.image_ids == ['img1', 'img2']
+
+            queue.begin_create(note_dir)
+            queue.mark_created(note_dir, 'xhs1')
+            job = queue.mark_verified(note_dir)
+            assert job.state == 'verified'
+            assert job.attempts == 1
+            assert queue.counts()['verified'] == 1
+
+
+def test_resume_after_crash():
+    """重新打开队列后保留上传结果和未知结果标记"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = Path(tmp) / 'queue.db'
+        uploaded_dir = Path(tmp) / 'note_01'
+        creating_dir = Path(tmp) / 'note_02'
+
+        with PublishQueue(db_file) as queue:
+            queue.enqueue(uploaded_dir, state='rendered')
+            queue.mark_uploaded(uploaded_dir, ['img1'])
+
+            queue.enqueue(creating_dir, state='rendered')
+            queue.begin_create(creating_dir)
+
+        with PublishQueue(db_file) as queue:
+            # 再次入队不会覆盖已有状态
+            job = queue.enqueue(uploaded_dir, state='rendered')
+            assert job.state == 'uploaded'
+            assert job.image_ids == ['img1']
+            assert not job.needs_manual_check
+
+            job = queue.get(creating_dir)
+            assert job.needs_manual_check
+
+            job = queue.reset(creating_dir)
+            assert job.state == 'rendered'
+            assert not job.needs_manual_check
+
+
+if __name__ == '__main__':
+    test_state_machine()
+    test_resume_after_crash()
+    print("OK All queue tests passed")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试事件驱动的发布调度器
+"""
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+from publish_scheduler import PublishScheduler
+
+
+def run_in_thread(func):
+    result = {}
+
+    def target():
+        start = time.monotonic()
+        result['value'] = func()
+        result['elapsed'] = time.monotonic() - start
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread, result
+
+
+def test_wait_fires_at_deadline():
+    scheduler = PublishScheduler()
+    start = time.monotonic()
+    assert scheduler.sleep(0.2) is True
+    elapsed = time.monotonic() - start
+    assert 0.2 <= elapsed < 0.4
+
+
+def test_stop_wakes_immediately():
+    """停止后等待立即返回 False，而不是等到下一次轮询"""
+    scheduler = PublishScheduler()
+    thread, result = run_in_thread(lambda: scheduler.sleep(30))
+    time.sleep(0.05)
+    scheduler.stop()
+    thread.join(2)
+    assert result['value'] is False
+    assert result['elapsed'] < 1
+
+
+def test_pause_extends_deadline():
+    """暂停期间不计时，继续后按剩余时间唤醒"""
+    scheduler = PublishScheduler()
+    thread, result = run_in_thread(lambda: scheduler.sleep(0.3))
+    time.sleep(0.1)
+    scheduler.pause()
+    time.sleep(0.3)
+    assert thread.is_alive()
+    scheduler.resume()
+    thread.join(2)
+    assert result['value'] is True
+    assert 0.55 <= result['elapsed'] < 0.9
+
+
+def test_slots():
+    """时间窗口依次间隔 interval；落后时从当前时间开始"""
+    clock = [100.0]
+    scheduler = PublishScheduler(interval=60, clock=lambda: clock[0])
+    assert scheduler.reserve_slot() == 100
+    assert scheduler.reserve_slot() == 160
+    assert scheduler.reserve_slot() == 220
+    clock[0] = 1000.0
+    assert scheduler.reserve_slot() == 1000
+
+    scheduler.reset(interval=10)
+    assert scheduler.reserve_slot() == 1000
+    assert scheduler.reserve_slot() == 1010
+
+
+def test_shared_slots_between_threads():
+    """多个线程共享同一调度器时按窗口依次执行"""
+    scheduler = PublishScheduler(interval=0.1)
+    fired = []
+    lock = threading.Lock()
+
+    def job():
+        slot = scheduler.reserve_slot()
+        scheduler.wait_until(slot)
+        with lock:
+            fired.append(time.monotonic())
+
+    threads = [threading.Thread(target=job) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(2)
+
+    fired.sort()
+    assert len(fired) == 3
+    assert fired[1] - fired[0] >= 0.09
+    assert fired[2] - fired[1] >= 0.09
+
+
+def test_batch_wait_in_short_steps():
+    """批量发布等待发布时间时分段等待（Windows 上 Ctrl+C 及时生效）"""
+    from batch_publish_v2 import wait_for_slot
+
+    class RecordingScheduler(PublishScheduler):
+        def __init__(self):
+            super().__init__(interval=0)
+            self.timeouts = []
+
+        def wait_until(self, deadline):
+            self.timeouts.append(deadline - self.now())
+            return super().wait_until(deadline)
+
+    scheduler = RecordingScheduler()
+    slot = scheduler.now() + 0.3
+    wait_for_slot(scheduler, slot, step=0.1)
+    assert scheduler.until(slot) == 0
+    assert len(scheduler.timeouts) >= 3
+    assert max(scheduler.timeouts) <= 0.1
+
+
+if __name__ == '__main__':
+    test_wait_fires_at_deadline()
+    test_stop_wakes_immediately()
+    test_pause_extends_deadline()
+    test_slots()
+    test_shared_slots_between_threads()
+    test_batch_wait_in_short_steps()
+    print("OK All scheduler tests passed")
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试无界面发布引擎与本地 HTTP/JSON 发布服务
+"""
+import os
+import sys
+import tempfile
+import json
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+from fake_xhs_server import FakeXhsServer, LocalApiClient
+from note_digest import DigestCache
+from note_scanner import NoteScanner
+from publish_engine import EngineError, EventBus, PublishEngine, PublishRecordManager
+from publish_queue import PublishQueue
+from publish_scheduler import PublishScheduler
+from publish_service import EngineClient, PublishService, ServiceError
+from xhs_load_test import make_notes
+from xhs_resilience import ApiGuard, CircuitBreaker, RetryPolicy
+
+
+def make_engine(client_factory, tmp, wait_minutes=0):
+    scheduler = PublishScheduler()
+    guard = ApiGuard(
+        policy=RetryPolicy(max_attempts=3, base_delay=0.01, max_delay=0.05),
+        breaker=CircuitBreaker(),
+        log=lambda msg: None,
+        sleep=scheduler.sleep,
+        should_stop=lambda: scheduler.stopped,
+    )
+    digest_cache = DigestCache(Path(tmp) / 'digests.db')
+    return PublishEngine(
+        wait_minutes=wait_minutes,
+        client_factory=client_factory,
+        record_manager=PublishRecordManager(Path(tmp) / 'records.db', digest_cache=digest_cache),
+        publish_queue=PublishQueue(Path(tmp) / 'queue.db'),
+        guard=guard,
+        scheduler=scheduler,
+        scanner=NoteScanner(index_file=Path(tmp) / 'index.json'),
+        digest_cache=digest_cache,
+    )
+
+
+def wait_for(client, event_type, since=0, timeout=10):
+    """拉取事件直到出现 event_type，返回 (事件, 之前的全部事件)"""
+    seen = []
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for event in client.events(since, timeout=1):
+            since = event['seq']
+            seen.append(event)
+            if event['type'] == event_type:
+                return event, seen
+    raise AssertionError(f"no {event_type} event")
+
+
+def test_event_bus():
+    bus = EventBus(max_events=3)
+    assert bus.since(0) == []
+    for i in range(5):
+        bus.emit('log', message=str(i))
+    events = bus.since(0)
+    assert [e['seq'] for e in events] == [3, 4, 5]
+    assert bus.since(5, timeout=0.05) == []
+
+
+def test_publish_through_service():
+    """通过 HTTP 接口入队上级文件夹，事件流给出进度，已发布笔记不重复入队"""
+    with FakeXhsServer() as server, tempfile.TemporaryDirectory() as tmp:
+        make_notes(Path(tmp) / 'notes', 3, 2)
+        engine = make_engine(lambda: (LocalApiClient(server.url), 'test'), tmp)
+        with PublishService(engine, port=0) as service:
+            client = EngineClient(service.url, token=service.token)
+            result = client.enqueue([str(Path(tmp) / 'notes')])
+            assert result['added'] == 3
+
+            done, events = wait_for(client, 'done')
+            assert done['published'] == 3 and not done['stopped']
+            notes = [e for e in events if e['type'] == 'note']
+            assert all(e['status'] == 'published' and e['note_id'] for e in notes)
+            assert [e['current'] for e in events if e['type'] == 'progress'] == [1, 2, 3]
+
+            assert server.snapshot()['notes'] == 3
+            assert engine.record_manager.get_statistics()['total'] == 3
+            assert (Path(tmp) / 'notes' / 'note_001' / '.published').exists()
+
+            with urllib.request.urlopen(service.url + '/metrics') as resp:
+                text = resp.read().decode('utf-8')
+            assert 'xhs_notes_total{source="engine",status="published"' in text
+            assert 'xhs_api_call_duration_seconds_count{endpoint="upload"' in text
+
+            again = client.enqueue([str(Path(tmp) / 'notes')])
+            assert again == {'added': 0, 'published': 3, 'duplicate': 0, 'similar': 0, 'missing': []}
+        engine.close()
+
+
+def test_pause_and_stop():
+    """发布间隔等待期间可暂停、继续和停止，停止后待发布笔记被清空"""
+    with FakeXhsServer() as server, tempfile.TemporaryDirectory() as tmp:
+        note_dirs = make_notes(Path(tmp) / 'notes', 3, 1)
+        engine = make_engine(lambda: (LocalApiClient(server.url), 'test'), tmp, wait_minutes=60)
+        with PublishService(engine, port=0) as service:
+            client = EngineClient(service.url, token=service.token)
+            client.enqueue([str(path) for path in note_dirs])
+
+            # 第一篇立即发布，第二篇等待 60 分钟
+            first, _ = wait_for(client, 'note')
+            assert first['status'] == 'published'
+
+            assert client.pause()['state'] == 'paused'
+            assert client.resume()['state'] == 'running'
+            client.stop()
+
+            done, _ = wait_for(client, 'done', since=first['seq'])
+            assert done['stopped'] and done['published'] == 1
+            status = client.status()
+            assert status['state'] == 'idle' and status['pending'] == 0
+            assert server.snapshot()['notes'] == 1
+
+            # 停止后可以重新入队
+            engine.wait_minutes = 0
+            assert client.enqueue([str(note_dirs[1])])['added'] == 1
+            done, _ = wait_for(client, 'done', since=done['seq'])
+            assert done['published'] == 1
+        engine.close()
+
+
+def test_republish_edited_note():
+    """已发布的笔记修改内容后按新笔记重新发布（队列中的旧任务重置）"""
+    with FakeXhsServer() as server, tempfile.TemporaryDirectory() as tmp:
+        note_dir, = make_notes(Path(tmp) / 'notes', 1, 1)
+        engine = make_engine(lambda: (LocalApiClient(server.url), 'test'), tmp)
+        engine.enqueue([str(note_dir)])
+        assert engine.join(10) and engine.stats['published'] == 1
+
+        (note_dir / 'metadata.json').write_text(
+            '{"title": "修改后的标题", "subtitle": "edited"}', encoding='utf-8'
+        )
+        assert engine.enqueue([str(note_dir)])['added'] == 1
+        assert engine.join(10)
+        assert engine.stats['published'] == 1 and engine.stats['failed'] == 0
+        assert server.snapshot()['notes'] == 2
+        assert engine.record_manager.get_statistics()['total'] == 2
+        assert engine.publish_queue.get(note_dir).state == 'verified'
+        engine.close()
+
+
+def test_login_failure_reported():
+    with tempfile.TemporaryDirectory() as tmp:
+        make_notes(Path(tmp) / 'notes', 1, 1)
+
+        def missing_cookie():
+            raise EngineError("未找到 Cookie", kind='cookie')
+
+        engine = make_engine(missing_cookie, tmp)
+        engine.enqueue(str(Path(tmp) / 'notes'))
+        assert engine.join(10)
+        types = {e['type']: e for e in engine.events(0)}
+        assert types['error']['kind'] == 'cookie'
+        assert types['done']['stopped']
+        engine.close()
+
+
+def post(service, path, body, content_type='application/json', token=None):
+    """发送原始 POST 请求，返回 (状态码, 响应 JSON)"""
+    headers = {'Content-Type': content_type}
+    if token is not None:
+        headers['X-Publish-Token'] = token
+    request = urllib.request.Request(service.url + path, data=body, method='POST', headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=10) as resp:
+            return resp.status, json.loads(resp.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read().decode('utf-8'))
+
+
+def test_rejects_unauthorized_and_invalid_requests():
+    """缺少令牌或非 JSON 请求体（跨站表单）被拒绝；字段类型错误返回 400，处理异常返回 500"""
+    with tempfile.TemporaryDirectory() as tmp:
+        notes = make_notes(Path(tmp) / 'notes', 1, 1)
+        engine = make_engine(lambda: (None, 'test'), tmp)
+        with PublishService(engine, port=0) as service:
+            body = json.dumps({'paths': [str(notes[0])]}).encode('utf-8')
+            assert post(service, '/api/enqueue', body)[0] == 401
+            assert post(service, '/api/stop', b'{}', token='wrong')[0] == 401
+            # 浏览器无需预检即可跨站发送的 text/plain 请求
+            status, data = post(service, '/api/enqueue', body, 'text/plain', token=service.token)
+            assert status == 415 and not data['success']
+            try:
+                EngineClient(service.url, token_file=Path(tmp) / 'missing').status()
+                raise AssertionError("request without token accepted")
+            except ServiceError as e:
+                assert 'X-Publish-Token' in str(e)
+
+            for invalid in ({'paths': [str(notes[0])], 'wait_minutes': '20'},
+                            {'paths': [str(notes[0])], 'wait_minutes': True},
+                            {'paths': [1, 2]},
+                            {'paths': str(notes[0])},
+                            [str(notes[0])]):
+                status, data = post(service, '/api/enqueue', json.dumps(invalid).encode('utf-8'),
+                                    token=service.token)
+                assert status == 400 and not data['success'], invalid
+            assert engine.status()['pending'] == 0 and engine.wait_minutes == 0
+
+            engine.status = lambda: 1 / 0
+            status, data = post(service, '/api/pause', b'', token=service.token)
+            assert status == 500 and 'ZeroDivisionError' in data['error']
+            del engine.status
+        engine.close()
+
+
+if __name__ == '__main__':
+    test_event_bus()
+    test_publish_through_service()
+    test_pause_and_stop()
+    test_republish_edited_note()
+    test_login_failure_reported()
+    test_rejects_unauthorized_and_invalid_requests()
+    print("OK All publish service tests passed")
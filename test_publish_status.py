@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试发布状态查询（台账 + 队列 + 扫描索引）
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+from note_scanner import NoteScanner
+from publish_ledger import PublishLedger
+from publish_queue import PublishQueue
+from publish_status import collect_status
+
+
+def make_note(note_dir):
+    note_dir.mkdir(parents=True, exist_ok=True)
+    (note_dir / 'cover.png').write_bytes(b'png')
+
+
+def test_collect_status():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / 'notes'
+        for name in ('note_01', 'note_02', 'batch/note_03'):
+            make_note(root / name)
+        make_note(Path(tmp) / 'notes_other' / 'note_x')
+
+        ledger_file = Path(tmp) / 'ledger.db'
+        queue_file = Path(tmp) / 'queue.db'
+        with PublishLedger(ledger_file) as ledger:
+            ledger.add({'hash': 'a', 'note_dir': str(root / 'note_01'),
+                        'published_at': '2026-03-01T09:30:00'})
+            ledger.add({'hash': 'b', 'note_dir': str(Path(tmp) / 'notes_other' / 'note_x'),
+                        'published_at': '2026-02-28T09:00:00'})
+        with PublishQueue(queue_file) as queue:
+            queue.enqueue(root / 'note_02', state='rendered')
+            queue.begin_create(root / 'note_02')
+            queue.enqueue(Path(tmp) / 'notes_other' / 'note_x')
+
+        scanner = NoteScanner(index_file=Path(tmp) / 'index.json')
+        now = datetime(2026, 3, 1, 10, 0)
+        status = collect_status(root, ledger_file, queue_file, scanner=scanner, now=now)
+        assert status['ledger']['total'] == 2
+        assert status['ledger']['today'] == 1 and status['ledger']['last_hour'] == 1
+        assert status['queue']['rendered'] == 1 and status['queue']['pending'] == 0
+        assert status['queue']['needs_check'] == 1
+        notes = status['notes']
+        assert notes['source'] == 'scan' and notes['total'] == 3 and notes['published'] == 1
+        assert [os.path.basename(p) for p in notes['pending_dirs']] == ['note_03', 'note_02']
+
+        # 之后只读扫描索引，不访问目录；--rescan 时才发现新笔记
+        make_note(root / 'note_04')
+        status = collect_status(root, ledger_file, queue_file, scanner=scanner, now=now)
+        assert status['notes']['source'] == 'index' and status['notes']['pending'] == 2
+        status = collect_status(root, ledger_file, queue_file, scanner=scanner, rescan=True, now=now)
+        assert status['notes']['source'] == 'scan' and status['notes']['pending'] == 3
+
+
+def test_missing_files_are_not_created():
+    with tempfile.TemporaryDirectory() as tmp:
+        status = collect_status(None, Path(tmp) / 'ledger.db', Path(tmp) / 'queue.db')
+        assert status['ledger']['total'] == 0 and status['queue']['pending'] == 0
+        assert 'notes' not in status
+        assert not any(Path(tmp).iterdir())
+
+
+if __name__ == '__main__':
+    test_collect_status()
+    test_missing_files_are_not_created()
+    print("OK All publish status tests passed")
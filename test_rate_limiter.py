@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试跨进程令牌桶限流
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+from rate_limiter import RateLimiter, account_key
+from xhs_resilience import ApiGuard
+
+CONFIG = {
+    'default': {'create': {'capacity': 2, 'interval': 60}},
+    'accounts': {'vip': {'create': {'capacity': 5, 'interval': 60}}},
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_token_bucket():
+    """桶满时允许突发，之后按间隔补充令牌"""
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = FakeClock()
+        with RateLimiter(Path(tmp) / 'limits.db', config=CONFIG, clock=clock) as limiter:
+            assert limiter.try_acquire('acc', 'create') == 0
+            assert limiter.try_acquire('acc', 'create') == 0
+            wait = limiter.try_acquire('acc', 'create')
+            assert 59 <= wait <= 60
+
+            clock.now += 30
+            assert 29 <= limiter.try_acquire('acc', 'create') <= 30
+            clock.now += 30
+            assert limiter.try_acquire('acc', 'create') == 0
+
+            # 账号配置覆盖默认配置，不同账号互不影响
+            for _ in range(5):
+                assert limiter.try_acquire('vip', 'create') == 0
+            assert limiter.try_acquire('vip', 'create') > 0
+
+            # 未配置的接口不限流
+            assert limiter.try_acquire('acc', 'unknown') == 0
+
+
+def test_shared_between_instances():
+    """两个实例（模拟两个工具）共用同一组令牌"""
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = FakeClock()
+        db_file = Path(tmp) / 'limits.db'
+        with RateLimiter(db_file, config=CONFIG, clock=clock) as gui, \
+                RateLimiter(db_file, config=CONFIG, clock=clock) as batch:
+            assert gui.try_acquire('acc', 'create') == 0
+            assert batch.try_acquire('acc', 'create') == 0
+            assert gui.try_acquire('acc', 'create') > 0
+            assert batch.try_acquire('acc', 'create') > 0
+
+
+def _acquire_once(db_file):
+    with RateLimiter(db_file, config=CONFIG) as limiter:
+        return limiter.try_acquire('acc', 'create') == 0
+
+
+def test_cross_process():
+    """多个进程同时取令牌，取得的总数不超过桶容量"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = str(Path(tmp) / 'limits.db')
+        RateLimiter(db_file, config=CONFIG).close()
+        with multiprocessing.Pool(4) as pool:
+            results = pool.map(_acquire_once, [db_file] * 8)
+        assert sum(results) == 2
+
+
+def test_guard_waits_for_token():
+    """ApiGuard 调用前先取令牌，令牌不足时等待"""
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = FakeClock()
+        with RateLimiter(Path(tmp) / 'limits.db', config=CONFIG, clock=clock) as limiter:
+            guard = ApiGuard(limiter=limiter, account='acc', log=lambda msg: None, sleep=clock.sleep)
+            for _ in range(3):
+                guard.call(lambda: 'ok', endpoint='create')
+            assert clock.now >= 1000 + 60
+
+
+def test_account_key():
+    assert account_key('a1=abc; web_session=1') == account_key('web_session=2; a1=abc')
+    assert account_key('a1=abc') != account_key('a1=def')
+    assert account_key(None) == 'default'
+
+
+if __name__ == '__main__':
+    test_token_bucket()
+    test_shared_between_instances()
+    test_cross_process()
+    test_guard_waits_for_token()
+    test_account_key()
+    print("OK All rate limiter tests passed")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试发布记录增量读取（文件未变化时跳过、只返回新增记录）
+"""
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+from publish_ledger import PublishLedger
+from record_feed import JsonRecordFeed, LedgerFeed, RecordPager
+
+
+def record(n, published_at=None):
+    return {'hash': f'h{n}', 'note_name': f'note_{n:02d}', 'title': f'标题{n}',
+            'published_at': published_at or f'2026-01-27T10:{n:02d}:00'}
+
+
+def test_ledger_feed_changed():
+    """台账有新写入（含 WAL 日志）时才报告变化"""
+    with tempfile.TemporaryDirectory() as tmp:
+        with PublishLedger(Path(tmp) / 'ledger.db') as ledger:
+            ledger.add(record(0))
+            feed = LedgerFeed(ledger)
+            assert feed.changed()
+            assert not feed.changed()
+
+            ledger.add(record(1))
+            assert feed.changed()
+            assert not feed.changed()
+
+
+def test_json_feed_diff():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'publish_records.json'
+        feed = JsonRecordFeed(path)
+        assert feed.poll() == (True, [])
+
+        data = {'note_01': {'note_id': 'n1', 'title': 'A', 'url': 'u1',
+                            'published_at': '2026-01-27T10:00:00'}}
+        path.write_text(json.dumps(data), encoding='utf-8')
+        reset, records = feed.poll()
+        assert reset and records[0]['link'] == 'u1' and records[0]['hash'] == 'note_01'
+
+        data['note_02'] = {'note_id': 'n2', 'title': 'B', 'published_at': '2026-01-27T11:00:00'}
+        path.write_text(json.dumps(data), encoding='utf-8')
+        reset, records = feed.poll()
+        assert not reset and [r['note_name'] for r in records] == ['note_02']
+
+        del data['note_01']
+        path.write_text(json.dumps(data), encoding='utf-8')
+        reset, records = feed.poll()
+        assert reset and feed.total == 1
+
+
+def test_record_pager():
+    """分页、排序切换和日期筛选（结束日期包含当天）"""
+    with tempfile.TemporaryDirectory() as tmp:
+        with PublishLedger(Path(tmp) / 'ledger.db') as ledger:
+            for n in range(30):
+                ledger.add(record(n, f'2026-01-{n // 10 + 1:02d}T10:{n:02d}:00'))
+            pager = RecordPager(ledger, page_size=8)
+
+            assert len(pager.fetch()) == 8 and pager.pages == 4
+            pager.goto(10)
+            rows = pager.fetch()
+            assert pager.page == 3 and len(rows) == 6 and rows[-1]['hash'] == 'h0'
+
+            pager.sort('title')
+            assert not pager.descending and pager.page == 0
+            assert pager.fetch()[0]['hash'] == 'h0'
+            pager.sort('title')
+            assert pager.descending
+
+            pager.set_filters(since='2026-01-02', until='2026-01-02')
+            pager.fetch()
+            assert pager.total == 10
+            try:
+                pager.set_filters(since='01/02/2026')
+                assert False, 'expected ValueError'
+            except ValueError:
+                pass
+
+
+if __name__ == '__main__':
+    test_ledger_feed_changed()
+    test_json_feed_diff()
+    test_record_pager()
+    print("OK All record feed tests passed")
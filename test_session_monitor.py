@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试登录会话监控（过期提醒、暂停队列、重新登录后继续）
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+from fake_xhs_server import FakeApiError, FakeXhsServer, LocalApiClient
+from note_digest import DigestCache
+from note_scanner import NoteScanner
+from publish_engine import EventBus, PublishEngine, PublishRecordManager
+from publish_queue import PublishQueue
+from session_monitor import SessionMonitor
+from xhs_load_test import make_notes
+from xhs_resilience import ApiGuard, RetryPolicy
+from xhs_credentials import CredentialStore, session_expiry
+
+
+COOKIE = 'a1=device; web_session=session_1'
+HOUR = 3600
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class StubEngine:
+    """只实现监控用到的引擎接口"""
+
+    def __init__(self, state='running'):
+        self.state = state
+        self.bus = EventBus()
+
+    def status(self):
+        return {'state': self.state}
+
+    def pause(self):
+        self.state = 'paused'
+
+    def resume(self):
+        self.state = 'running'
+
+    def renew_session(self):
+        self.state = 'running'
+
+    def log(self, message):
+        pass
+
+    def session_events(self):
+        return [event['status'] for event in self.bus.since(0) if event['type'] == 'session']
+
+
+def write_state(path, web_session, expires):
+    state = {'cookies': [
+        {'name': 'a1', 'value': 'device', 'expires': expires + 1000},
+        {'name': 'web_session', 'value': web_session, 'expires': expires},
+    ], 'origins': []}
+    Path(path).write_text(json.dumps(state), encoding='utf-8')
+
+
+def make_monitor(tmp, engine, clock, probe):
+    env = Path(tmp) / '.env'
+    env.write_text(f"XHS_COOKIE={COOKIE}\n", encoding='utf-8')
+    store = CredentialStore(env, Path(tmp) / 'sessions.json', clock=clock)
+    return SessionMonitor(engine, store=store, probe=probe, state_file=Path(tmp) / 'state.json',
+                          check_minutes=30, warn_minutes=120, pause_minutes=10, clock=clock)
+
+
+def test_session_expiry():
+    with tempfile.TemporaryDirectory() as tmp:
+        state = Path(tmp) / 'state.json'
+        write_state(state, 'session_1', 5000)
+        assert session_expiry(COOKIE, state) == 5000
+        # storage_state 属于另一个会话时不使用
+        assert session_expiry('a1=device; web_session=other', state) is None
+        assert session_expiry(COOKIE, Path(tmp) / 'missing.json') is None
+
+
+def test_warn_then_pause_then_resume_after_relogin():
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = Clock()
+        engine = StubEngine()
+        probes = []
+
+        def probe(cookie):
+            probes.append(cookie)
+            return True, 'uid', '昵称'
+
+        monitor = make_monitor(tmp, engine, clock, probe)
+        write_state(Path(tmp) / 'state.json', 'session_1', clock.now + 3 * HOUR)
+
+        assert monitor.check() == 'ok' and len(probes) == 1
+        clock.now += HOUR + 5 * 60
+        assert monitor.check() == 'warning' and len(probes) == 2
+        # 距上次在线检查不足 30 分钟，不再请求；同一会话只提醒一次
+        assert monitor.check() == 'warning' and len(probes) == 2
+        assert engine.session_events() == ['warning']
+
+        clock.now += HOUR + 50 * 60
+        assert monitor.check() == 'expiring'
+        assert engine.state == 'paused'
+        assert monitor._next_wait() == 60
+
+        # 重新登录前保持暂停
+        assert monitor.check() == 'expired' and engine.state == 'paused'
+
+        monitor.store.save_cookie('a1=device; web_session=session_2')
+        write_state(Path(tmp) / 'state.json', 'session_2', clock.now + 24 * HOUR)
+        assert monitor.check() == 'renewed'
+        assert engine.state == 'running'
+        assert engine.session_events() == ['warning', 'expiring', 'renewed']
+
+
+def test_probe_detects_expired_session():
+    """没有过期时间信息时由在线检查发现失效；队列空闲时不在线检查"""
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = Clock()
+        engine = StubEngine()
+        monitor = make_monitor(tmp, engine, clock, lambda cookie: (False, '', ''))
+        assert monitor.check() == 'expired'
+        assert engine.state == 'paused'
+
+        idle = StubEngine(state='idle')
+        calls = []
+        monitor = make_monitor(tmp, idle, clock, lambda cookie: calls.append(cookie))
+        # 队列空闲时不在线检查
+        assert monitor.check() == 'ok' and not calls
+
+
+class SessionClient(LocalApiClient):
+    """会话过期后所有请求返回 401 的客户端"""
+
+    def __init__(self, base_url):
+        super().__init__(base_url)
+        self.expired = False
+
+    def _request(self, method, path, body=None, headers=None):
+        if self.expired:
+            raise FakeApiError('登录已过期', 401)
+        return super()._request(method, path, body, headers)
+
+
+def test_engine_reconnects_after_relogin():
+    """真实引擎：监控暂停后旧客户端过期，重新登录后用新客户端继续发布"""
+    with FakeXhsServer() as server, tempfile.TemporaryDirectory() as tmp:
+        clock = Clock()
+        clients = []
+        connecting = threading.Event()
+        release = threading.Event()
+
+        def client_factory():
+            connecting.set()
+            release.wait(10)
+            clients.append(SessionClient(server.url))
+            return clients[-1], 'test'
+
+        note_dir, = make_notes(Path(tmp) / 'notes', 1, 2)
+        digest_cache = DigestCache(Path(tmp) / 'digests.db')
+        engine = PublishEngine(
+            wait_minutes=0, client_factory=client_factory,
+            record_manager=PublishRecordManager(Path(tmp) / 'records.db', digest_cache=digest_cache),
+            publish_queue=PublishQueue(Path(tmp) / 'queue.db'),
+            guard=ApiGuard(policy=RetryPolicy(max_attempts=2, base_delay=0.01), log=lambda msg: None),
+            scanner=NoteScanner(index_file=Path(tmp) / 'index.json'),
+            digest_cache=digest_cache,
+        )
+        monitor = make_monitor(tmp, engine, clock, lambda cookie: (True, 'uid', '昵称'))
+        write_state(Path(tmp) / 'state.json', 'session_1', clock.now + 5 * 60)
+        try:
+            engine.enqueue([note_dir])
+            assert connecting.wait(10)
+            # 任务运行中（正在连接）时会话即将过期：监控暂停队列
+            assert monitor.check() == 'expiring'
+            release.set()
+
+            # 登录验证完成后（工作线程已在暂停处等待）旧会话失效，随后重新登录
+            deadline = time.monotonic() + 10
+            while server.snapshot()['endpoints']['info']['requests'] < 1 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            clients[0].expired = True
+            monitor.store.save_cookie('a1=device; web_session=session_2')
+            write_state(Path(tmp) / 'state.json', 'session_2', clock.now + 24 * HOUR)
+            assert monitor.check() == 'renewed'
+
+            assert engine.join(10)
+            assert len(clients) == 2
+            assert engine.stats['published'] == 1 and engine.stats['failed'] == 0
+            assert server.snapshot()['notes'] == 1
+        finally:
+            release.set()
+            engine.close()
+
+
+if __name__ == '__main__':
+    test_session_expiry()
+    test_warn_then_pause_then_resume_after_relogin()
+    test_probe_detects_expired_session()
+    test_engine_reconnects_after_relogin()
+    print("OK All session monitor tests passed")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试命令行和 GUI 入口的启动开销（python -X importtime）
+
+入口模块导入时不应加载 markdown / yaml / playwright / xhs / PIL / numpy，
+也不应在项目根目录创建限流、摘要等数据文件（--help、--list-styles 和 GUI 首次显示前的开销）。
+导入耗时与机器负载有关，只在设置环境变量 XHS_IMPORT_BUDGET_MS 时检查。
+依赖未安装的入口（导入时会提示安装并退出）不参与测试。
+"""
+import importlib.util
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+
+PROJECT_ROOT = Path(__file__).parent
+SCRIPTS_DIR = PROJECT_ROOT / 'scripts'
+
+BUDGET_ENV_VAR = 'XHS_IMPORT_BUDGET_MS'
+HEAVY_MODULES = {'markdown', 'yaml', 'playwright', 'xhs', 'PIL', 'numpy'}
+
+# 入口模块 → 导入时必须已安装的依赖
+ENTRY_POINTS = {
+    'render_xhs_v2': (),
+    'batch_publish_v2': (),
+    'publish_status': (),
+    'progress_viewer_gui': (),
+    'publish_gui_v3_fixed': (),
+    'publish_gui_v3': ('dotenv',),
+    'publish_gui_v2': ('dotenv',),
+    'publish_gui': ('dotenv',),
+}
+
+
+def import_profile(module):
+    """
+    在子进程中导入模块
+
+    Returns:
+        tuple: (导入的顶层包名集合, 该模块导入总耗时 ms)
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=SCRIPTS_DIR, capture_output=True, text=True, encoding='utf-8',
+        stdin=subprocess.DEVNULL, timeout=60
+    )
+    assert result.returncode == 0, f"{module}: {result.stdout}{result.stderr}"
+
+    packages, cumulative_ms = set(), None
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        packages.add(name.strip().split('.')[0])
+        if name.strip() == module and name == ' ' + module:
+            cumulative_ms = int(cumulative) / 1000
+    return packages, cumulative_ms
+
+
+def available_entry_points():
+    return [module for module, required in ENTRY_POINTS.items()
+            if all(importlib.util.find_spec(dep) is not None for dep in required)]
+
+
+def test_entry_points_import_lazily():
+    modules = available_entry_points()
+    assert len(modules) >= 4
+    before = set(os.listdir(PROJECT_ROOT))
+    for module in modules:
+        packages, _ = import_profile(module)
+        heavy = packages & HEAVY_MODULES
+        assert not heavy, f"{module} imports {sorted(heavy)} at startup"
+    created = set(os.listdir(PROJECT_ROOT)) - before
+    assert not created, f"importing entry points created {sorted(created)}"
+
+
+def test_import_time_budget():
+    """可选：导入耗时不超过 XHS_IMPORT_BUDGET_MS（毫秒）"""
+    budget = os.environ.get(BUDGET_ENV_VAR, '').strip()
+    if not budget:
+        print(f"SKIP set {BUDGET_ENV_VAR} to check import time")
+        return
+    for module in available_entry_points():
+        _, elapsed_ms = import_profile(module)
+        assert elapsed_ms is not None and elapsed_ms < float(budget), \
+            f"{module} took {elapsed_ms} ms to import"
+
+
+def test_short_commands_skip_render_dependencies():
+    result = subprocess.run(
+        [sys.executable, 'render_xhs_v2.py', '--list-styles'],
+        cwd=SCRIPTS_DIR, capture_output=True, text=True, encoding='utf-8', timeout=60
+    )
+    assert result.returncode == 0 and 'purple' in result.stdout
+
+
+if __name__ == '__main__':
+    test_entry_points_import_lazily()
+    test_import_time_budget()
+    test_short_commands_skip_render_dependencies()
+    print("OK All startup time tests passed")
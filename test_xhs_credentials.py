@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试登录凭证缓存（.env 变化重新读取、验证结果有效期、会话指纹）
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+from fake_xhs_server import FakeXhsServer, LocalApiClient
+from note_digest import DigestCache
+from note_scanner import NoteScanner
+from publish_engine import PublishEngine, PublishRecordManager
+from publish_queue import PublishQueue
+from publish_scheduler import PublishScheduler
+from xhs_credentials import CredentialStore, LoginError, parse_env, probe_session, user_from_info
+from xhs_load_test import make_notes
+from xhs_resilience import ApiGuard, RetryPolicy
+
+
+COOKIE = 'a1=device; web_session=session_1; webId=x'
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_store(tmp, clock=None, ttl=3600):
+    return CredentialStore(Path(tmp) / '.env', Path(tmp) / 'sessions.json', ttl=ttl, clock=clock or Clock())
+
+
+def test_parse_env():
+    text = "OTHER=1\nXHS_COOKIE=your_cookie_string_here\nexport XHS_COOKIE='a1=x; web_session=y'\n"
+    assert parse_env(text) == 'a1=x; web_session=y'
+    assert parse_env("OTHER=1\n") is None
+
+
+def test_cookie_reload_and_save():
+    """.env 未变化时不重新读取；save_cookie 保留其它配置"""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = Path(tmp) / '.env'
+        env.write_text("OTHER=1\nXHS_COOKIE=a1=old\n", encoding='utf-8')
+        store = make_store(tmp)
+        assert store.cookie() == 'a1=old'
+
+        store.save_cookie(COOKIE)
+        assert store.cookie() == COOKIE
+        text = env.read_text(encoding='utf-8')
+        assert 'OTHER=1' in text and text.count('XHS_COOKIE=') == 1
+
+
+def test_validation_ttl():
+    """有效期内不再调用在线检查；过期、重新登录或检查失败后重新验证"""
+    with tempfile.TemporaryDirectory() as tmp:
+        Path(tmp, '.env').write_text(f"XHS_COOKIE={COOKIE}\n", encoding='utf-8')
+        clock = Clock()
+        store = make_store(tmp, clock)
+        calls = []
+
+        def check():
+            calls.append(1)
+            return 'uid', '昵称'
+
+        record, cached = store.validate(check)
+        assert not cached and record['nickname'] == '昵称'
+        # 新进程读取同一缓存文件
+        record, cached = make_store(tmp, clock).validate(check)
+        assert cached and record['user_id'] == 'uid' and len(calls) == 1
+
+        clock.now += 3601
+        assert store.validate(check)[1] is False and len(calls) == 2
+
+        store.save_cookie(COOKIE.replace('session_1', 'session_2'))
+        assert store.validation() is None
+
+        def fail():
+            raise LoginError('无登录信息')
+
+        store.record_validation('uid', '昵称')
+        try:
+            store.validate(fail, force=True)
+            assert False, 'expected LoginError'
+        except LoginError:
+            pass
+        assert store.validation() is None
+
+
+def test_user_from_info():
+    assert user_from_info({'success': True, 'data': {'nickname': 'n', 'user_id': 'u'}}) == ('u', 'n')
+    for info in ({'code': -100, 'msg': '无登录信息'}, {'success': False}, 'bad'):
+        try:
+            user_from_info(info)
+            assert False, 'expected LoginError'
+        except LoginError:
+            pass
+
+
+def test_probe_session():
+    """轻量 HTTP 检查：已登录、guest（已失效）、无法连接"""
+    with FakeXhsServer() as server:
+        url = server.url + '/api/sns/web/v2/user/me'
+        assert probe_session(COOKIE, url=url) == (True, 'fake_user_id', 'fake_user')
+        assert probe_session('a1=x; web_session=expired', url=url)[0] is False
+        assert probe_session(COOKIE, url=server.url + '/missing')[0] is None
+    assert probe_session(COOKIE, url=url, timeout=1)[0] is None
+    assert probe_session('', url=url)[0] is False
+
+
+def test_engine_skips_recent_validation():
+    """发布引擎第二次启动时使用缓存的验证结果，不再请求用户信息接口"""
+    with FakeXhsServer() as server, tempfile.TemporaryDirectory() as tmp:
+        Path(tmp, '.env').write_text(f"XHS_COOKIE={COOKIE}\n", encoding='utf-8')
+        note_dirs = make_notes(Path(tmp) / 'notes', 2, 1)
+        scheduler = PublishScheduler()
+        digest_cache = DigestCache(Path(tmp) / 'digests.db')
+        engine = PublishEngine(
+            wait_minutes=0,
+            client_factory=lambda: (LocalApiClient(server.url), 'test'),
+            record_manager=PublishRecordManager(Path(tmp) / 'records.db', digest_cache=digest_cache),
+            publish_queue=PublishQueue(Path(tmp) / 'queue.db'),
+            scanner=NoteScanner(index_file=Path(tmp) / 'index.json'),
+            scheduler=scheduler,
+            guard=ApiGuard(policy=RetryPolicy(max_attempts=1), log=lambda msg: None, sleep=scheduler.sleep),
+            credentials=make_store(tmp),
+            digest_cache=digest_cache,
+        )
+        for note_dir in note_dirs:
+            engine.enqueue([str(note_dir)])
+            assert engine.join(10)
+        assert engine.stats['published'] == 1
+        assert engine.record_manager.get_statistics()['total'] == 2
+        assert server.snapshot()['endpoints']['info']['requests'] == 1
+        engine.close()
+
+
+if __name__ == '__main__':
+    test_parse_env()
+    test_cookie_reload_and_save()
+    test_validation_ttl()
+    test_user_from_info()
+    test_probe_session()
+    test_engine_skips_recent_validation()
+    print("OK All credential tests passed")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试 API 调用的错误分类、退避重试和熔断
+"""
+import os
+import sys
+from pathlib import Path
+
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+from xhs_api import XhsApiError
+from xhs_resilience import (
+    ApiGuard, AuthError, CircuitBreaker, CircuitOpenError, RetryPolicy,
+    AUTH, FATAL, RETRYABLE, classify_error,
+)
+
+
+class ReadTimeout(Exception):
+    """模拟 requests.exceptions.ReadTimeout（请求可能已被处理）"""
+
+
+class SignError(Exception):
+    """模拟 xhs.exception.SignError（请求未发出）"""
+
+
+class NeedVerifyError(Exception):
+    """模拟 xhs.exception.NeedVerifyError"""
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def flaky(errors, result='ok'):
+    """前几次调用依次抛出 errors 中的异常，之后返回 result"""
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    return func, calls
+
+
+def make_guard(clock, **breaker_kwargs):
+    return ApiGuard(
+        policy=RetryPolicy(max_attempts=4, base_delay=1, max_delay=10),
+        breaker=CircuitBreaker(clock=clock, **breaker_kwargs),
+        log=lambda msg: None,
+        sleep=clock.sleep,
+    )
+
+
+def test_classify_error():
+    assert classify_error(ReadTimeout('read timed out')) == RETRYABLE
+    assert classify_error(SignError('sign failed')) == RETRYABLE
+    assert classify_error(NeedVerifyError('captcha')) == AUTH
+    assert classify_error(XhsApiError("发布失败: {'code': -100, 'msg': '登录已过期'}")) == AUTH
+    assert classify_error(XhsApiError("发布失败: {'msg': '操作频繁'}")) == RETRYABLE
+    assert classify_error(ValueError('bad title')) == FATAL
+
+
+def test_retry_with_backoff():
+    """可重试错误退避后重试，退避时间不超过上限"""
+    clock = FakeClock()
+    guard = make_guard(clock)
+    func, calls = flaky([ReadTimeout('timeout'), ReadTimeout('timeout')])
+
+    assert guard.call(func) == 'ok'
+    assert len(calls) == 3
+    assert 0 <= clock.now <= 1 + 2
+    assert guard.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_non_idempotent_retry():
+    """发布请求只在确定未被处理时重发"""
+    clock = FakeClock()
+    guard = make_guard(clock)
+
+    func, calls = flaky([ReadTimeout('timeout')])
+    try:
+        guard.call(func, idempotent=False)
+        assert False, "ReadTimeout must not be resent"
+    except ReadTimeout:
+        pass
+    assert len(calls) == 1
+
+    func, calls = flaky([SignError('sign failed')])
+    assert guard.call(func, idempotent=False) == 'ok'
+    assert len(calls) == 2
+
+
+def test_fatal_and_auth_errors():
+    """不可重试错误直接抛出；登录失效后熔断，不再调用"""
+    clock = FakeClock()
+    guard = make_guard(clock)
+
+    func, calls = flaky([ValueError('bad')])
+    try:
+        guard.call(func)
+        assert False
+    except ValueError:
+        pass
+    assert len(calls) == 1
+
+    func, calls = flaky([NeedVerifyError('captcha')])
+    try:
+        guard.call(func)
+        assert False
+    except AuthError:
+        pass
+
+    func, calls = flaky([])
+    try:
+        guard.call(func)
+        assert False, "calls must be blocked until login is refreshed"
+    except AuthError:
+        pass
+    assert len(calls) == 0
+
+    guard.breaker.reset()
+    assert guard.call(func) == 'ok'
+
+
+def test_circuit_breaker_pauses_account():
+    """连续失败达到阈值后暂停冷却时间，冷却后探测成功即恢复"""
+    clock = FakeClock()
+    guard = make_guard(clock, failure_threshold=3, cooldown=600)
+
+    func, calls = flaky([ReadTimeout('timeout')] * 3)
+    assert guard.call(func) == 'ok'
+    assert len(calls) == 4
+    # 第三次失败触发熔断，等待冷却后才放行第四次调用
+    assert clock.now >= 600
+    assert guard.breaker.state == CircuitBreaker.CLOSED
+
+    stopped = ApiGuard(
+        breaker=CircuitBreaker(failure_threshold=1, cooldown=600, clock=clock),
+        log=lambda msg: None,
+        sleep=clock.sleep,
+        should_stop=lambda: True,
+    )
+    func, calls = flaky([ReadTimeout('timeout')] * 5)
+    try:
+        stopped.call(func)
+        assert False
+    except CircuitOpenError:
+        pass
+    assert len(calls) == 1
+
+
+if __name__ == '__main__':
+    test_classify_error()
+    test_retry_with_backoff()
+    test_non_idempotent_retry()
+    test_fatal_and_auth_errors()
+    test_circuit_breaker_pauses_account()
+    print("OK All resilience tests passed")